@@ -26,7 +26,8 @@ python speech_to_text_buffered_infer_ctc.py \
     --total_buffer_in_secs=4.0 \
     --chunk_len_in_ms=1000
 
-
+To batch the buffers of many files together instead of the buffers of a single file, add `--batch_files`.
+The merge algorithm of the buffers of a file can then be chosen with `--merge_algo=middle` or `--merge_algo=timestamp`.
 
 """
 
@@ -42,7 +43,7 @@ from tqdm import tqdm
 
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.metrics.wer import word_error_rate
-from nemo.collections.asr.parts.utils.streaming_utils import FrameBatchASR
+from nemo.collections.asr.parts.utils.streaming_utils import BatchedFrameASRCTC, FrameBatchASR
 from nemo.utils import logging
 
 can_gpu = torch.cuda.is_available()
@@ -71,6 +72,20 @@ def get_wer_feat(mfst, asr, frame_len, tokens_per_chunk, delay, preprocessor_cfg
     return hyps, refs, wer
 
 
+def get_wer_feat_batched(mfst, asr, tokens_per_chunk, delay, model_stride_in_secs):
+    audio_filepaths = []
+    refs = []
+    with open(mfst, "r") as mfst_f:
+        for l in mfst_f:
+            row = json.loads(l.strip())
+            audio_filepaths.append(row['audio_filepath'])
+            refs.append(row['text'])
+
+    hyps = asr.transcribe(audio_filepaths, tokens_per_chunk, delay, model_stride_in_secs)
+    wer = word_error_rate(hypotheses=hyps, references=refs)
+    return hyps, refs, wer
+
+
 def main():
     parser = ArgumentParser()
     parser.add_argument(
@@ -92,6 +107,17 @@ def main():
         default=8,
         help="Model downsampling factor, 8 for Citrinet models and 4 for Conformer models",
     )
+    parser.add_argument(
+        "--batch_files",
+        action="store_true",
+        help="Batch the buffers of batch_size different files together, instead of the buffers of a single file",
+    )
+    parser.add_argument(
+        "--merge_algo",
+        default="middle",
+        choices=["middle", "timestamp"],
+        help="Algorithm which merges the predictions of the buffers of a file, when --batch_files is used",
+    )
 
     args = parser.parse_args()
     torch.set_grad_enabled(False)
@@ -127,20 +153,35 @@ def main():
     mid_delay = math.ceil((chunk_len + (total_buffer - chunk_len) / 2) / model_stride_in_secs)
     print(tokens_per_chunk, mid_delay)
 
-    frame_asr = FrameBatchASR(
-        asr_model=asr_model, frame_len=chunk_len, total_buffer=args.total_buffer_in_secs, batch_size=args.batch_size,
-    )
+    if args.batch_files:
+        frame_asr = BatchedFrameASRCTC(
+            asr_model=asr_model,
+            frame_len=chunk_len,
+            total_buffer=args.total_buffer_in_secs,
+            batch_size=args.batch_size,
+            merge_algo=args.merge_algo,
+        )
+        hyps, refs, wer = get_wer_feat_batched(
+            args.test_manifest, frame_asr, tokens_per_chunk, mid_delay, model_stride_in_secs,
+        )
+    else:
+        frame_asr = FrameBatchASR(
+            asr_model=asr_model,
+            frame_len=chunk_len,
+            total_buffer=args.total_buffer_in_secs,
+            batch_size=args.batch_size,
+        )
 
-    hyps, refs, wer = get_wer_feat(
-        args.test_manifest,
-        frame_asr,
-        chunk_len,
-        tokens_per_chunk,
-        mid_delay,
-        cfg.preprocessor,
-        model_stride_in_secs,
-        asr_model.device,
-    )
+        hyps, refs, wer = get_wer_feat(
+            args.test_manifest,
+            frame_asr,
+            chunk_len,
+            tokens_per_chunk,
+            mid_delay,
+            cfg.preprocessor,
+            model_stride_in_secs,
+            asr_model.device,
+        )
     logging.info(f"WER is {round(wer, 4)} when decoded with a delay of {round(mid_delay*model_stride_in_secs, 2)}s")
 
     if args.output_path is not None:
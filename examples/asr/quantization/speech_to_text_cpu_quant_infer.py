@@ -0,0 +1,140 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Script to compare the CPU inference variant of an ASR model, with the batch normalizations of the encoder folded into
+the convolutions and the encoder dynamically quantized (see `ASRModuleMixin.prepare_for_cpu_inference`), with the
+floating point model on a manifest.
+
+It reports the WER of both models and its delta, and the real time factor (RTF) of both models, i.e. the processing
+time divided by the duration of the audio. The script exits with an error if the WER delta exceeds `--wer_tolerance`.
+
+Works with CTC and RNNT models whose encoder is a `ConformerEncoder` or a `ConvASREncoder`:
+
+python speech_to_text_cpu_quant_infer.py \
+    --asr_model stt_en_conformer_ctc_small \
+    --dataset test_manifest.json \
+    --batch_size 8 \
+    --num_threads 8
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+
+import soundfile as sf
+import torch
+
+from nemo.collections.asr.metrics.wer import word_error_rate
+from nemo.collections.asr.models import ASRModel
+from nemo.utils import logging
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--asr_model", type=str, required=True, help="Path to a .nemo file or name of a pretrained model",
+    )
+    parser.add_argument("--dataset", type=str, required=True, help="path to evaluation manifest")
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--num_threads", type=int, default=None, help="Number of intra-op CPU threads of PyTorch")
+    parser.add_argument(
+        "--dtype", type=str, default="qint8", choices=["qint8", "float16"], help="Type of the quantized weights"
+    )
+    parser.add_argument(
+        "--no_fold_batch_norm", action="store_true", help="Do not fold the batch normalizations into the convolutions"
+    )
+    parser.add_argument(
+        "--no_quantize_pointwise_conv",
+        action="store_true",
+        help="Only quantize the linear layers, and keep the pointwise convolutions in floating point",
+    )
+    parser.add_argument(
+        "--use_cer", default=False, action='store_true', help="Use Character Error Rate as the evaluation metric"
+    )
+    parser.add_argument(
+        "--wer_tolerance",
+        type=float,
+        default=None,
+        help="Fail if the WER of the quantized model exceeds the WER of "
+        "the floating point model by more than this (absolute, e.g. 0.005 for half a point of WER)",
+    )
+    args = parser.parse_args()
+    torch.set_grad_enabled(False)
+    if args.num_threads is not None:
+        torch.set_num_threads(args.num_threads)
+
+    asr_model = load_model(args.asr_model)
+
+    audio_filepaths, references, total_duration = [], [], 0.0
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        for line in f:
+            item = json.loads(line)
+            audio_filepaths.append(item['audio_filepath'])
+            references.append(item['text'])
+            duration = item.get('duration')
+            total_duration += duration if duration is not None else sf.info(item['audio_filepath']).duration
+    logging.info(f"Evaluating {len(audio_filepaths)} files with a total duration of {total_duration:.1f} seconds")
+
+    cpu_model = load_model(args.asr_model)
+    cpu_model.prepare_for_cpu_inference(
+        dtype=torch.qint8 if args.dtype == 'qint8' else torch.float16,
+        fold_batch_norm=not args.no_fold_batch_norm,
+        quantize_pointwise_conv=not args.no_quantize_pointwise_conv,
+    )
+
+    results = {}
+    for name, model in [('float', asr_model), ('quantized', cpu_model)]:
+        # Warm up the kernels and allocators before timing
+        transcribe(model, audio_filepaths[: args.batch_size], args.batch_size)
+        start = time.perf_counter()
+        hypotheses = transcribe(model, audio_filepaths, args.batch_size)
+        elapsed = time.perf_counter() - start
+        wer = word_error_rate(hypotheses=hypotheses, references=references, use_cer=args.use_cer)
+        results[name] = (wer, elapsed / total_duration)
+        logging.info(
+            f"{name:>9} model: {'CER' if args.use_cer else 'WER'} {wer:.4f}, RTF {elapsed / total_duration:.4f}"
+        )
+
+    wer_delta = results['quantized'][0] - results['float'][0]
+    speedup = results['float'][1] / results['quantized'][1]
+    logging.info(f"{'CER' if args.use_cer else 'WER'} delta: {wer_delta:+.4f}, speedup: {speedup:.2f}x")
+
+    if args.wer_tolerance is not None and wer_delta > args.wer_tolerance:
+        logging.error(f"The WER delta {wer_delta:.4f} exceeds the tolerance {args.wer_tolerance}")
+        sys.exit(1)
+
+
+def load_model(asr_model):
+    if asr_model.endswith('.nemo'):
+        logging.info(f"Using local ASR model from {asr_model}")
+        model = ASRModel.restore_from(restore_path=asr_model, map_location=torch.device('cpu'))
+    else:
+        logging.info(f"Using NGC cloud ASR model {asr_model}")
+        model = ASRModel.from_pretrained(model_name=asr_model, map_location=torch.device('cpu'))
+    model.eval()
+    return model
+
+
+def transcribe(model, audio_filepaths, batch_size):
+    hypotheses = model.transcribe(paths2audio_files=audio_filepaths, batch_size=batch_size)
+    # RNNT models return the best hypotheses and all the hypotheses
+    if isinstance(hypotheses, tuple):
+        hypotheses = hypotheses[0]
+    return hypotheses
+
+
+if __name__ == '__main__':
+    main()  # noqa pylint: disable=no-value-for-parameter
@@ -31,6 +31,7 @@ for full list of arguments >>
     tolerance: Float, minimum WER/CER required to pass some arbitrary tolerance.
 
     only_score_manifest: Bool, when set will skip audio transcription and just calculate WER of provided manifest.
+    scoring_num_workers: Int, number of worker processes which align the transcriptions to compute the WER/CER.
 
 # Usage
 
@@ -65,7 +66,7 @@ import torch
 import transcribe_speech
 from omegaconf import MISSING, OmegaConf, open_dict
 
-from nemo.collections.asr.metrics.wer import word_error_rate
+from nemo.collections.asr.metrics.corpus_wer import CorpusWER
 from nemo.core.config import hydra_runner
 from nemo.utils import logging
 
@@ -79,6 +80,7 @@ class EvaluationConfig(transcribe_speech.TranscriptionConfig):
     tolerance: Optional[float] = None
 
     only_score_manifest: bool = False
+    scoring_num_workers: int = 0
 
 
 @hydra_runner(config_name="EvaluationConfig", schema=EvaluationConfig)
@@ -134,7 +136,15 @@ def main(cfg: EvaluationConfig):
 
     # Compute the WER
     metric_name = 'CER' if cfg.use_cer else 'WER'
-    metric_value = word_error_rate(hypotheses=predicted_text, references=ground_truth_text, use_cer=cfg.use_cer)
+    metric = CorpusWER(use_cer=cfg.use_cer, num_workers=cfg.scoring_num_workers)
+    metric.update(hypotheses=predicted_text, references=ground_truth_text)
+    metric_value, substitutions, deletions, insertions, words = metric.compute()
+    metric.close()
+    metric_value = metric_value.item()
+    logging.info(
+        f'Substitutions: {int(substitutions)}, deletions: {int(deletions)}, insertions: {int(insertions)}, '
+        f'reference {"characters" if cfg.use_cer else "words"}: {int(words)}'
+    )
 
     if cfg.tolerance is not None:
         if metric_value > cfg.tolerance:
@@ -226,6 +226,7 @@ target_label_n, "offset": offset_in_sec_n}
             Defaults to None.
         trim (bool): Whether to use trim silence from beginning and end of audio signal using librosa.effects.trim().
             Defaults to False.
+        manifest_cache_dir (str): Optional directory of binary manifest caches, see `ASRSpeechLabel`.
     """
 
     @property
@@ -268,6 +269,7 @@ target_label_n, "offset": offset_in_sec_n}
         max_duration: Optional[float] = None,
         trim: bool = False,
         is_regression_task: bool = False,
+        manifest_cache_dir: Optional[str] = None,
     ):
         super().__init__()
         self.collection = collections.ASRSpeechLabel(
@@ -275,6 +277,7 @@ target_label_n, "offset": offset_in_sec_n}
             min_duration=min_duration,
             max_duration=max_duration,
             is_regression_task=is_regression_task,
+            cache_dir=manifest_cache_dir,
         )
 
         self.featurizer = featurizer
@@ -381,6 +384,7 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
         normalize_audio (bool): Whether to normalize audio signal.
             Defaults to False.
         is_regression_task (bool): Whether the dataset is for a regression task instead of classification
+        manifest_cache_dir (str): Optional directory of binary manifest caches, see `ASRSpeechLabel`.
     """
 
     def __init__(
@@ -396,6 +400,7 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
         shift_length_in_sec: Optional[float] = 1,
         normalize_audio: bool = False,
         is_regression_task: bool = False,
+        manifest_cache_dir: Optional[str] = None,
     ):
         self.window_length_in_sec = window_length_in_sec
         self.shift_length_in_sec = shift_length_in_sec
@@ -412,6 +417,7 @@ class AudioToSpeechLabelDataset(_AudioLabelDataset):
             max_duration=max_duration,
             trim=trim,
             is_regression_task=is_regression_task,
+            manifest_cache_dir=manifest_cache_dir,
         )
 
     def fixed_seq_collate_fn(self, batch):
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import bisect
 import io
 import math
 import os
@@ -22,6 +23,8 @@ import torch
 import webdataset as wd
 from torch.utils.data import ChainDataset
 
+from nemo.collections.asr.data.audio_to_text_sampler import get_collection_durations, pack_by_duration
+from nemo.collections.asr.data.tarred_audio_index import TarredAudioIndex
 from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
 from nemo.collections.common import tokenizers
 from nemo.collections.common.parts.preprocessing import collections, parsers
@@ -108,6 +111,8 @@ class ASRManifestProcessor:
         bos_id: Id of beginning of sequence symbol to append if not None.
         eos_id: Id of end of sequence symbol to append if not None.
         pad_id: Id of pad symbol. Defaults to 0.
+        index_by_file_id: If True, saves a mapping from filename base (ID) to index in the collection.
+        manifest_cache_dir: Optional directory of binary manifest caches, see `ASRAudioText`.
     """
 
     def __init__(
@@ -121,6 +126,7 @@ class ASRManifestProcessor:
         eos_id: Optional[int] = None,
         pad_id: int = 0,
         index_by_file_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
     ):
         self.parser = parser
 
@@ -131,6 +137,7 @@ class ASRManifestProcessor:
             max_duration=max_duration,
             max_number=max_utts,
             index_by_file_id=index_by_file_id,
+            cache_dir=manifest_cache_dir,
         )
 
         self.eos_id = eos_id
@@ -230,6 +237,10 @@ class _AudioTextDataset(Dataset):
         eos_id: Id of end of sequence symbol to append if not None
         pad_id: Id of pad symbol. Defaults to 0
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches. If set, the parsed manifest is
+            memory-mapped from there instead of being kept as Python objects.
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     @property
@@ -259,6 +270,8 @@ class _AudioTextDataset(Dataset):
         eos_id: Optional[int] = None,
         pad_id: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         if type(manifest_filepath) == str:
             manifest_filepath = manifest_filepath.split(",")
@@ -272,8 +285,11 @@ class _AudioTextDataset(Dataset):
             bos_id=bos_id,
             eos_id=eos_id,
             pad_id=pad_id,
+            manifest_cache_dir=manifest_cache_dir,
+        )
+        self.featurizer = WaveformFeaturizer(
+            sample_rate=sample_rate, int_values=int_values, augmentor=augmentor, resample_quality=resample_quality
         )
-        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
         self.trim = trim
         self.return_sample_id = return_sample_id
 
@@ -337,6 +353,9 @@ class AudioToCharDataset(_AudioTextDataset):
         bos_id: Id of beginning of sequence symbol to append if not None
         eos_id: Id of end of sequence symbol to append if not None
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     @property
@@ -370,6 +389,8 @@ class AudioToCharDataset(_AudioTextDataset):
         pad_id: int = 0,
         parser: Union[str, Callable] = 'en',
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         self.labels = labels
 
@@ -391,6 +412,8 @@ class AudioToCharDataset(_AudioTextDataset):
             eos_id=eos_id,
             pad_id=pad_id,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
         )
 
 
@@ -428,6 +451,9 @@ class AudioToBPEDataset(_AudioTextDataset):
         use_start_end_token: Boolean which dictates whether to add [BOS] and [EOS]
             tokens to beginning and ending of speech respectively.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     @property
@@ -455,6 +481,8 @@ class AudioToBPEDataset(_AudioTextDataset):
         trim: bool = False,
         use_start_end_token: bool = True,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         if use_start_end_token and hasattr(tokenizer, 'bos_token'):
             bos_id = tokenizer.bos_id
@@ -497,7 +525,152 @@ class AudioToBPEDataset(_AudioTextDataset):
             pad_id=pad_id,
             trim=trim,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
+        )
+
+
+class _RandomAccessTarredAudioToTextDataset(_AudioTextDataset):
+    """
+    Map-style counterpart of _TarredAudioToTextDataset: the audio files of the tarred manifest are read with random
+    access through the tarball indices (see `nemo.collections.asr.data.tarred_audio_index`) instead of being streamed
+    from the tarballs. Every instance has access to all shards, so sharding across ranks is left to the sampler.
+    """
+
+    def _setup_tarred_audio_index(self, audio_tar_filepaths: Union[str, List[str]]):
+        audio_tar_filepaths = expand_audio_filepaths(
+            audio_tar_filepaths=audio_tar_filepaths, shard_strategy='replicate', world_size=1, global_rank=0
+        )
+        self.tarred_audio_index = TarredAudioIndex(audio_tar_filepaths)
+
+    def __getitem__(self, index):
+        sample = self.manifest_processor.collection[index]
+        offset = sample.offset
+
+        if offset is None:
+            offset = 0
+
+        features = self.featurizer.process(
+            self.tarred_audio_index.open(sample.audio_file),
+            offset=offset,
+            duration=sample.duration,
+            trim=self.trim,
+            orig_sr=sample.orig_sr,
         )
+        f, fl = features, torch.tensor(features.shape[0]).long()
+
+        t, tl = self.manifest_processor.process_text_by_sample(sample=sample)
+
+        if self.return_sample_id:
+            output = f, fl, torch.tensor(t).long(), torch.tensor(tl).long(), index
+        else:
+            output = f, fl, torch.tensor(t).long(), torch.tensor(tl).long()
+
+        return output
+
+
+class RandomAccessTarredAudioToCharDataset(_RandomAccessTarredAudioToTextDataset, AudioToCharDataset):
+    """
+    A similar Dataset to the TarredAudioToCharDataset, but which is map-style and reads the tarred audio files with
+    random access through the indices of the tarballs. Tarballs without an index `<tarball>.index` are scanned on
+    creation. Arguments are the same as for the AudioToCharDataset, in addition to:
+
+    Args:
+        audio_tar_filepaths: Either a list of audio tarball filepaths, or a string (can be brace-expandable).
+            `manifest_filepath` must be the manifest of the tarred dataset.
+    """
+
+    def __init__(
+        self,
+        audio_tar_filepaths: Union[str, List[str]],
+        manifest_filepath: str,
+        labels: List[str],
+        sample_rate: int,
+        int_values: bool = False,
+        augmentor: 'nemo.collections.asr.parts.perturb.AudioAugmentor' = None,
+        max_duration: Optional[float] = None,
+        min_duration: Optional[float] = None,
+        max_utts: int = 0,
+        blank_index: int = -1,
+        unk_index: int = -1,
+        normalize: bool = True,
+        trim: bool = False,
+        bos_id: Optional[int] = None,
+        eos_id: Optional[int] = None,
+        pad_id: int = 0,
+        parser: Union[str, Callable] = 'en',
+        return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
+    ):
+        super().__init__(
+            manifest_filepath=manifest_filepath,
+            labels=labels,
+            sample_rate=sample_rate,
+            int_values=int_values,
+            augmentor=augmentor,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            max_utts=max_utts,
+            blank_index=blank_index,
+            unk_index=unk_index,
+            normalize=normalize,
+            trim=trim,
+            bos_id=bos_id,
+            eos_id=eos_id,
+            pad_id=pad_id,
+            parser=parser,
+            return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
+        )
+        self._setup_tarred_audio_index(audio_tar_filepaths)
+
+
+class RandomAccessTarredAudioToBPEDataset(_RandomAccessTarredAudioToTextDataset, AudioToBPEDataset):
+    """
+    A similar Dataset to the TarredAudioToBPEDataset, but which is map-style and reads the tarred audio files with
+    random access through the indices of the tarballs. Tarballs without an index `<tarball>.index` are scanned on
+    creation. Arguments are the same as for the AudioToBPEDataset, in addition to:
+
+    Args:
+        audio_tar_filepaths: Either a list of audio tarball filepaths, or a string (can be brace-expandable).
+            `manifest_filepath` must be the manifest of the tarred dataset.
+    """
+
+    def __init__(
+        self,
+        audio_tar_filepaths: Union[str, List[str]],
+        manifest_filepath: str,
+        tokenizer: 'nemo.collections.common.tokenizers.TokenizerSpec',
+        sample_rate: int,
+        int_values: bool = False,
+        augmentor: 'nemo.collections.asr.parts.perturb.AudioAugmentor' = None,
+        max_duration: Optional[int] = None,
+        min_duration: Optional[int] = None,
+        max_utts: int = 0,
+        trim: bool = False,
+        use_start_end_token: bool = True,
+        return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
+    ):
+        super().__init__(
+            manifest_filepath=manifest_filepath,
+            tokenizer=tokenizer,
+            sample_rate=sample_rate,
+            int_values=int_values,
+            augmentor=augmentor,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            max_utts=max_utts,
+            trim=trim,
+            use_start_end_token=use_start_end_token,
+            return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
+        )
+        self._setup_tarred_audio_index(audio_tar_filepaths)
 
 
 class _TarredAudioToTextDataset(IterableDataset):
@@ -590,6 +763,9 @@ class _TarredAudioToTextDataset(IterableDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches, see `ASRAudioText`.
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     def __init__(
@@ -612,6 +788,8 @@ class _TarredAudioToTextDataset(IterableDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         self.manifest_processor = ASRManifestProcessor(
             manifest_filepath=manifest_filepath,
@@ -623,9 +801,12 @@ class _TarredAudioToTextDataset(IterableDataset):
             eos_id=eos_id,
             pad_id=pad_id,
             index_by_file_id=True,  # Must set this so the manifest lines can be indexed by file ID
+            manifest_cache_dir=manifest_cache_dir,
         )
 
-        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
+        self.featurizer = WaveformFeaturizer(
+            sample_rate=sample_rate, int_values=int_values, augmentor=augmentor, resample_quality=resample_quality
+        )
         self.trim = trim
         self.eos_id = eos_id
         self.bos_id = bos_id
@@ -855,6 +1036,9 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches, see `ASRAudioText`.
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     def __init__(
@@ -881,6 +1065,8 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         self.labels = labels
 
@@ -907,6 +1093,8 @@ class TarredAudioToCharDataset(_TarredAudioToTextDataset):
             global_rank=global_rank,
             world_size=world_size,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
         )
 
 
@@ -985,6 +1173,9 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
         global_rank (int): Worker rank, used for partitioning shards. Defaults to 0.
         world_size (int): Total number of processes, used for partitioning shards. Defaults to 0.
         return_sample_id (bool): whether to return the sample_id as a part of each sample
+        manifest_cache_dir: Optional directory of binary manifest caches, see `ASRAudioText`.
+        resample_quality: Optional quality of a polyphase resampling of audio to `sample_rate`, one of 'fast',
+            'medium' or 'best'. If None, audio is resampled by librosa.
     """
 
     def __init__(
@@ -1005,6 +1196,8 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
         global_rank: int = 0,
         world_size: int = 0,
         return_sample_id: bool = False,
+        manifest_cache_dir: Optional[str] = None,
+        resample_quality: Optional[str] = None,
     ):
         if use_start_end_token and hasattr(tokenizer, 'bos_token'):
             bos_id = tokenizer.bos_id
@@ -1052,6 +1245,8 @@ class TarredAudioToBPEDataset(_TarredAudioToTextDataset):
             global_rank=global_rank,
             world_size=world_size,
             return_sample_id=return_sample_id,
+            manifest_cache_dir=manifest_cache_dir,
+            resample_quality=resample_quality,
         )
 
 
@@ -1103,6 +1298,131 @@ class BucketingIterator:
         return batches
 
 
+class DurationBucketingDataset(IterableDataset):
+    """
+    A Dataset which wraps a tarred IterableDataset and groups the streamed samples into batches of similar duration.
+
+    Two modes are supported:
+
+    -   Duration budget (``batch_duration`` is set): samples are collected into a buffer of ``buffer_size``
+        samples, the buffer is sorted by duration and split into batches whose padded duration
+        (batch size times longest duration) does not exceed ``batch_duration`` seconds. The batches of every
+        buffer are emitted in random order.
+    -   Adaptive batch sizes (``bucket_boundaries`` and ``bucket_batch_sizes`` are set): every sample is assigned
+        to the duration bin given by ``bucket_boundaries`` (in seconds) and a batch is emitted as soon as its bin
+        holds ``bucket_batch_sizes[bin]`` samples. There must be one more batch size than boundaries.
+
+    Batches are yielded as lists of samples, so the DataLoader has to be created with ``batch_size=1``.
+
+    Args:
+        dataset (IterableDataset): The tarred dataset to get wrapped.
+        sample_rate (int): Sample rate of the audio produced by the wrapped dataset.
+        buffer_size (int): Number of samples sorted together in the duration budget mode.
+        batch_duration (float): Budget of padded audio seconds per batch.
+        bucket_boundaries (list): Sorted duration bin boundaries in seconds.
+        bucket_batch_sizes (list): Batch size of every duration bin.
+        seed (int): Optional seed of the batch shuffling. Every DataLoader worker shuffles with a generator seeded by
+            the seed, the worker id and the epoch set by `set_epoch`. If None, the per-worker seed which the
+            DataLoader draws anew every epoch is used.
+    """
+
+    def __init__(
+        self,
+        dataset: IterableDataset,
+        sample_rate: int,
+        buffer_size: int = 4096,
+        batch_duration: Optional[float] = None,
+        bucket_boundaries: Optional[List[float]] = None,
+        bucket_batch_sizes: Optional[List[int]] = None,
+        seed: Optional[int] = None,
+    ):
+        if (batch_duration is None) == (bucket_boundaries is None):
+            raise ValueError("Exactly one of `batch_duration` or `bucket_boundaries` has to be provided")
+        if bucket_boundaries is not None:
+            bucket_boundaries = list(bucket_boundaries)
+            bucket_batch_sizes = list(bucket_batch_sizes) if bucket_batch_sizes is not None else None
+            if bucket_batch_sizes is None or len(bucket_batch_sizes) != len(bucket_boundaries) + 1:
+                raise ValueError(
+                    "`bucket_batch_sizes` needs one more entry than `bucket_boundaries` "
+                    f"(bucket_boundaries={bucket_boundaries}, bucket_batch_sizes={bucket_batch_sizes})"
+                )
+            if sorted(bucket_boundaries) != bucket_boundaries:
+                raise ValueError(f"`bucket_boundaries` must be sorted, got {bucket_boundaries}")
+
+        self.wrapped_dataset = dataset
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.batch_duration = batch_duration
+        self.bucket_boundaries = bucket_boundaries
+        self.bucket_batch_sizes = bucket_batch_sizes
+        self.seed = seed
+        self.epoch = 0
+        super().__init__()
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _get_rng(self) -> np.random.RandomState:
+        worker_info = torch.utils.data.get_worker_info()
+        if self.seed is None:
+            return np.random.RandomState(worker_info.seed % 2 ** 32 if worker_info is not None else None)
+        worker_id = worker_info.id if worker_info is not None else 0
+        return np.random.RandomState([self.seed, self.epoch, worker_id])
+
+    def _collate_fn(self, batch):
+        return _speech_collate_fn(batch[0], self.wrapped_dataset.pad_id)
+
+    def _duration(self, sample) -> float:
+        return sample[1].item() / self.sample_rate
+
+    def _budget_batches(self, wrapped_iter, rng):
+        buffer = []
+        for sample in wrapped_iter:
+            buffer.append(sample)
+            if len(buffer) >= self.buffer_size:
+                yield from self._pack_buffer(buffer, rng)
+                buffer = []
+        if buffer:
+            yield from self._pack_buffer(buffer, rng)
+
+    def _pack_buffer(self, buffer, rng):
+        buffer.sort(key=self._duration)
+        batches = pack_by_duration([self._duration(sample) for sample in buffer], self.batch_duration)
+        for idx in rng.permutation(len(batches)):
+            yield [buffer[position] for position in batches[idx]]
+
+    def _binned_batches(self, wrapped_iter):
+        bins = [[] for _ in self.bucket_batch_sizes]
+        for sample in wrapped_iter:
+            bin_idx = bisect.bisect_right(self.bucket_boundaries, self._duration(sample))
+            bins[bin_idx].append(sample)
+            if len(bins[bin_idx]) >= self.bucket_batch_sizes[bin_idx]:
+                yield bins[bin_idx]
+                bins[bin_idx] = []
+        for batch in bins:
+            if batch:
+                yield batch
+
+    def __iter__(self):
+        wrapped_iter = self.wrapped_dataset._dataset.__iter__()
+        if self.batch_duration is not None:
+            return self._budget_batches(wrapped_iter, self._get_rng())
+        return self._binned_batches(wrapped_iter)
+
+    def __len__(self):
+        """Estimates the number of batches from the manifest durations."""
+        durations = get_collection_durations(self.wrapped_dataset.manifest_processor.collection)
+        if self.batch_duration is not None:
+            num_batches = 0
+            for start in range(0, len(durations), self.buffer_size):
+                window = np.sort(durations[start : start + self.buffer_size])
+                num_batches += len(pack_by_duration(window.tolist(), self.batch_duration))
+            return num_batches
+        bin_ids = np.searchsorted(self.bucket_boundaries, durations, side='right')
+        counts = np.bincount(bin_ids, minlength=len(self.bucket_batch_sizes))
+        return int(sum(math.ceil(count / size) for count, size in zip(counts, self.bucket_batch_sizes)))
+
+
 class RandomizedChainDataset(ChainDataset):
     def __init__(self, datasets: Iterable[Dataset], rnd_seed=0) -> None:
         super(RandomizedChainDataset, self).__init__(list(datasets))
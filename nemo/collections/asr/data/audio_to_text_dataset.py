@@ -22,7 +22,7 @@ from omegaconf.listconfig import ListConfig
 from pytorch_lightning.callbacks import BasePredictionWriter
 from torch.utils.data import ChainDataset
 
-from nemo.collections.asr.data import audio_to_text, audio_to_text_dali
+from nemo.collections.asr.data import audio_to_text, audio_to_text_dali, audio_to_text_sampler, feature_store
 from nemo.utils import logging
 
 
@@ -69,7 +69,9 @@ def inject_dataloader_value_from_model_config(model_cfg: dict, dataloader_cfg: D
             dataloader_cfg[key] = model_cfg[key]
 
 
-def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None) -> audio_to_text.AudioToCharDataset:
+def get_char_dataset(
+    config: dict, augmentor: Optional['AudioAugmentor'] = None
+) -> Union[audio_to_text.AudioToCharDataset, feature_store.FeatureStoreDataset]:
     """
     Instantiates a Character Encoding based AudioToCharDataset.
 
@@ -78,7 +80,7 @@ def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None)
         augmentor: Optional AudioAugmentor object for augmentations on audio data.
 
     Returns:
-        An instance of AudioToCharDataset.
+        An instance of AudioToCharDataset, wrapped into a FeatureStoreDataset if `feature_store_path` is set.
     """
     if 'labels' not in config:
         logging.warning(f"dataset does not have explicitly defined labels")
@@ -98,13 +100,15 @@ def get_char_dataset(config: dict, augmentor: Optional['AudioAugmentor'] = None)
         trim=config.get('trim_silence', False),
         parser=config.get('parser', 'en'),
         return_sample_id=config.get('return_sample_id', False),
+        resample_quality=config.get('resample_quality', None),
+        manifest_cache_dir=config.get('manifest_cache_dir', None),
     )
-    return dataset
+    return wrap_feature_store(config=config, dataset=dataset, augmentor=augmentor)
 
 
 def get_bpe_dataset(
     config: dict, tokenizer: 'TokenizerSpec', augmentor: Optional['AudioAugmentor'] = None
-) -> audio_to_text.AudioToBPEDataset:
+) -> Union[audio_to_text.AudioToBPEDataset, feature_store.FeatureStoreDataset]:
     """
     Instantiates a Byte Pair Encoding / Word Piece Encoding based AudioToBPEDataset.
 
@@ -114,7 +118,7 @@ def get_bpe_dataset(
         augmentor: Optional AudioAugmentor object for augmentations on audio data.
 
     Returns:
-        An instance of AudioToBPEDataset.
+        An instance of AudioToBPEDataset, wrapped into a FeatureStoreDataset if `feature_store_path` is set.
     """
     dataset = audio_to_text.AudioToBPEDataset(
         manifest_filepath=config['manifest_filepath'],
@@ -128,8 +132,105 @@ def get_bpe_dataset(
         trim=config.get('trim_silence', False),
         use_start_end_token=config.get('use_start_end_token', True),
         return_sample_id=config.get('return_sample_id', False),
+        resample_quality=config.get('resample_quality', None),
+        manifest_cache_dir=config.get('manifest_cache_dir', None),
+    )
+    return wrap_feature_store(config=config, dataset=dataset, augmentor=augmentor)
+
+
+def wrap_feature_store(
+    config: dict, dataset: audio_to_text._AudioTextDataset, augmentor: Optional['AudioAugmentor'] = None
+) -> Union[audio_to_text._AudioTextDataset, feature_store.FeatureStoreDataset]:
+    """
+    Wraps an audio-text dataset into a FeatureStoreDataset if `feature_store_path` is set in the config.
+
+    Args:
+        config: Config of the AudioToCharDataset or AudioToBPEDataset. `feature_store_path` is the directory of a
+            feature store built from `manifest_filepath` with `build_feature_store`.
+        dataset: The audio-text dataset.
+        augmentor: Optional AudioAugmentor of the dataset, which cannot be applied to precomputed features.
+
+    Returns:
+        The wrapped dataset, or the given dataset if no feature store is configured.
+    """
+    store_path = config.get('feature_store_path', None)
+    if store_path is None:
+        return dataset
+
+    if augmentor is not None:
+        raise ValueError("Audio augmentations cannot be applied to features loaded from `feature_store_path`.")
+    return feature_store.FeatureStoreDataset(
+        dataset=dataset, manifest_filepath=config['manifest_filepath'], feature_store=store_path
+    )
+
+
+def get_batch_sampler(
+    config: dict, dataset: torch.utils.data.Dataset, global_rank: int, world_size: int
+) -> Optional[torch.utils.data.Sampler]:
+    """
+    Instantiates the batch sampler requested by an audio-text dataset config, if any.
+
+    Args:
+        config: Config of the dataset. Random-access tarred datasets (`tarred_random_access`) are sampled by a
+            ResumableRandomBatchSampler which starts from `consumed_samples`. Non-tarred datasets are sampled by a
+            DurationBudgetBatchSampler if `batch_duration` is set.
+        dataset: The dataset to sample from.
+        global_rank: Global rank of this device.
+        world_size: Global world size in the training method.
+
+    Returns:
+        An instance of ResumableRandomBatchSampler or DurationBudgetBatchSampler, or None if the default sampler
+        of the DataLoader should be used.
+    """
+    if config.get('is_tarred', False) and config.get('tarred_random_access', False):
+        return audio_to_text_sampler.ResumableRandomBatchSampler(
+            total_samples=len(dataset),
+            batch_size=config['batch_size'],
+            consumed_samples=config.get('consumed_samples', 0),
+            shuffle=config.get('shuffle', False),
+            seed=config.get('seed', 0),
+            global_rank=global_rank,
+            world_size=world_size,
+        )
+    if not config.get('is_tarred', False):
+        return get_duration_budget_batch_sampler(
+            config=config, dataset=dataset, global_rank=global_rank, world_size=world_size
+        )
+    return None
+
+
+def get_duration_budget_batch_sampler(
+    config: dict, dataset: audio_to_text._AudioTextDataset, global_rank: int, world_size: int
+) -> Optional[audio_to_text_sampler.DurationBudgetBatchSampler]:
+    """
+    Instantiates a DurationBudgetBatchSampler for a non-tarred audio-text dataset if `batch_duration` is set.
+
+    Args:
+        config: Config of the AudioToCharDataset or AudioToBPEDataset. The sampler is configured through
+            `batch_duration` (padded audio seconds per batch), `num_duration_buckets`, `max_batch_size`,
+            `drop_last`, `shuffle` and `seed`.
+        dataset: The dataset to sample from.
+        global_rank: Global rank of this device.
+        world_size: Global world size in the training method.
+
+    Returns:
+        An instance of DurationBudgetBatchSampler, or None if `batch_duration` is not set.
+    """
+    if config.get('batch_duration', None) is None:
+        return None
+
+    durations = audio_to_text_sampler.get_collection_durations(dataset.manifest_processor.collection)
+    return audio_to_text_sampler.DurationBudgetBatchSampler(
+        durations=durations,
+        batch_duration=config['batch_duration'],
+        num_buckets=config.get('num_duration_buckets', 30),
+        max_batch_size=config.get('max_batch_size', None),
+        shuffle=config.get('shuffle', False),
+        drop_last=config.get('drop_last', False),
+        seed=config.get('seed', 0),
+        global_rank=global_rank,
+        world_size=world_size,
     )
-    return dataset
 
 
 def get_tarred_dataset(
@@ -155,6 +256,9 @@ def get_tarred_dataset(
 
     Returns:
         An instance of TarredAudioToBPEDataset or TarredAudioToCharDataset.
+        If `tarred_random_access` is set, the tarballs are instead read through their indices by a map-style
+        RandomAccessTarredAudioToBPEDataset or RandomAccessTarredAudioToCharDataset (a ConcatDataset in case of
+        multiple buckets), which must be sampled with the batch sampler returned by `get_batch_sampler`.
     """
     tarred_audio_filepaths = config['tarred_audio_filepaths']
     manifest_filepaths = config['manifest_filepath']
@@ -176,12 +280,52 @@ def get_tarred_dataset(
     if 'labels' not in config:
         logging.warning(f"dataset does not have explicitly defined labels")
 
+    random_access = config.get('tarred_random_access', False)
+
     for dataset_idx, (tarred_audio_filepath, manifest_filepath) in enumerate(
         zip(tarred_audio_filepaths, manifest_filepaths)
     ):
         if len(tarred_audio_filepath) == 1:
             tarred_audio_filepath = tarred_audio_filepath[0]
-        if tokenizer is None:
+        if random_access and tokenizer is None:
+            # Map-style dataset over all shards, sharding across ranks is left to the batch sampler.
+            dataset = audio_to_text.RandomAccessTarredAudioToCharDataset(
+                audio_tar_filepaths=tarred_audio_filepath,
+                manifest_filepath=manifest_filepath,
+                labels=config.get('labels', None),
+                sample_rate=config['sample_rate'],
+                int_values=config.get('int_values', False),
+                augmentor=augmentor,
+                max_duration=config.get('max_duration', None),
+                min_duration=config.get('min_duration', None),
+                max_utts=config.get('max_utts', 0),
+                blank_index=config.get('blank_index', -1),
+                unk_index=config.get('unk_index', -1),
+                normalize=config.get('normalize_transcripts', False),
+                trim=config.get('trim_silence', False),
+                parser=config.get('parser', 'en'),
+                return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                resample_quality=config.get('resample_quality', None),
+            )
+        elif random_access:
+            dataset = audio_to_text.RandomAccessTarredAudioToBPEDataset(
+                audio_tar_filepaths=tarred_audio_filepath,
+                manifest_filepath=manifest_filepath,
+                tokenizer=tokenizer,
+                sample_rate=config['sample_rate'],
+                int_values=config.get('int_values', False),
+                augmentor=augmentor,
+                max_duration=config.get('max_duration', None),
+                min_duration=config.get('min_duration', None),
+                max_utts=config.get('max_utts', 0),
+                trim=config.get('trim_silence', False),
+                use_start_end_token=config.get('use_start_end_token', True),
+                return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                resample_quality=config.get('resample_quality', None),
+            )
+        elif tokenizer is None:
             dataset = audio_to_text.TarredAudioToCharDataset(
                 audio_tar_filepaths=tarred_audio_filepath,
                 manifest_filepath=manifest_filepath,
@@ -202,6 +346,8 @@ def get_tarred_dataset(
                 global_rank=global_rank,
                 world_size=world_size,
                 return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                resample_quality=config.get('resample_quality', None),
             )
         else:
             dataset = audio_to_text.TarredAudioToBPEDataset(
@@ -221,15 +367,58 @@ def get_tarred_dataset(
                 global_rank=global_rank,
                 world_size=world_size,
                 return_sample_id=config.get('return_sample_id', False),
+                manifest_cache_dir=config.get('manifest_cache_dir', None),
+                resample_quality=config.get('resample_quality', None),
             )
+        if not random_access:
+            dataset = wrap_duration_bucketing(config=config, dataset=dataset)
         if bucketing_weights:
             [datasets.append(dataset) for _ in range(bucketing_weights[dataset_idx])]
         else:
             datasets.append(dataset)
 
+    if random_access:
+        return datasets[0] if len(datasets) == 1 else torch.utils.data.ConcatDataset(datasets)
     return get_chain_dataset(datasets=datasets, ds_config=config)
 
 
+def wrap_duration_bucketing(
+    config: dict, dataset: audio_to_text._TarredAudioToTextDataset
+) -> Union[audio_to_text._TarredAudioToTextDataset, audio_to_text.DurationBucketingDataset]:
+    """
+    Wraps a tarred dataset into a DurationBucketingDataset if duration bucketing is enabled in the config.
+
+    Args:
+        config: Config of the TarredAudioToBPEDataset or TarredAudioToCharDataset. Duration bucketing is enabled by
+            either `duration_bucketing_batch_duration` (padded audio seconds per batch) or by
+            `duration_bucketing_boundaries` together with `duration_bucketing_batch_sizes` (per-bin batch sizes).
+            `duration_bucketing_buffer_size` sets the number of samples sorted together.
+            `seed` seeds the shuffling of the batches.
+        dataset: The tarred dataset.
+
+    Returns:
+        The wrapped dataset, or the given dataset if duration bucketing is not enabled.
+    """
+    batch_duration = config.get('duration_bucketing_batch_duration', None)
+    bucket_boundaries = config.get('duration_bucketing_boundaries', None)
+    if batch_duration is None and bucket_boundaries is None:
+        return dataset
+
+    if config['batch_size'] != 1:
+        raise ValueError(
+            f"batch_size should be set to one when duration bucketing is enabled (batch_size={config['batch_size']})!"
+        )
+    return audio_to_text.DurationBucketingDataset(
+        dataset=dataset,
+        sample_rate=config['sample_rate'],
+        buffer_size=config.get('duration_bucketing_buffer_size', 4096),
+        batch_duration=batch_duration,
+        bucket_boundaries=bucket_boundaries,
+        bucket_batch_sizes=config.get('duration_bucketing_batch_sizes', None),
+        seed=config.get('seed', None),
+    )
+
+
 def get_dali_char_dataset(
     config: dict,
     shuffle: bool,
@@ -0,0 +1,258 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from nemo.utils import logging
+
+__all__ = [
+    'DurationBudgetBatchSampler',
+    'ResumableRandomBatchSampler',
+    'get_collection_durations',
+    'pack_by_duration',
+]
+
+
+def get_collection_durations(collection) -> np.ndarray:
+    """Returns the durations (in seconds) of all entries of an `AudioText`-like collection."""
+    data = collection.data
+    if hasattr(data, 'columns') and hasattr(data, 'indices'):
+        # Collection backed by a binary manifest cache, avoid materializing every entry.
+        return np.asarray(data.columns.array('durations')[data.indices], dtype=np.float64)
+    return np.array([entry.duration for entry in collection], dtype=np.float64)
+
+
+def pack_by_duration(
+    durations: Sequence[float], batch_duration: float, max_batch_size: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Greedily splits a sequence of samples into consecutive batches whose padded duration,
+    ``len(batch) * max_duration_in_batch``, does not exceed `batch_duration`.
+    Samples longer than `batch_duration` are placed in batches of size 1.
+
+    Args:
+        durations: Durations of the samples, in the order they should be batched.
+        batch_duration: Budget of padded duration per batch.
+        max_batch_size: Optional upper bound on the number of samples per batch.
+
+    Returns:
+        A list of batches, each being a list of positions in `durations`.
+    """
+    batches, batch, max_duration = [], [], 0.0
+    for position, duration in enumerate(durations):
+        new_max = max(max_duration, duration)
+        full = max_batch_size is not None and len(batch) >= max_batch_size
+        if batch and (full or new_max * (len(batch) + 1) > batch_duration):
+            batches.append(batch)
+            batch, new_max = [], duration
+        batch.append(position)
+        max_duration = new_max
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class DurationBudgetBatchSampler(torch.utils.data.Sampler):
+    """
+    Batch sampler which forms batches under a budget of padded audio seconds instead of a fixed batch size.
+
+    Utterances are assigned to `num_buckets` duration buckets with (approximately) equal number of
+    utterances. Every epoch, each bucket is shuffled and greedily split into batches such that
+    ``len(batch) * max_duration_in_batch <= batch_duration``, i.e. short utterances form large batches and
+    long utterances form small batches with little padding. The resulting batches of all buckets are
+    shuffled together.
+
+    In distributed training, every rank draws the same epoch permutation and takes every `world_size`-th
+    batch. The number of batches is truncated to a multiple of `world_size` so that all ranks execute the
+    same number of steps. Since the sampler already shards the data, PyTorch Lightning must not replace it,
+    i.e. set ``trainer.replace_sampler_ddp=false``.
+
+    Args:
+        durations: Duration of every sample of the dataset, in seconds.
+        batch_duration: Budget of padded audio seconds per batch.
+        num_buckets: Number of duration buckets.
+        max_batch_size: Optional upper bound on the number of samples per batch.
+        shuffle: Whether to shuffle buckets and batches every epoch. If False, batches are formed from
+            samples sorted by duration and returned in order.
+        drop_last: Whether to drop the last, not completely filled, batch of every bucket.
+        seed: Base random seed, the epoch number is added to it.
+        global_rank: Rank of this process.
+        world_size: Number of processes.
+    """
+
+    def __init__(
+        self,
+        durations: np.ndarray,
+        batch_duration: float,
+        num_buckets: int = 30,
+        max_batch_size: Optional[int] = None,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        seed: int = 0,
+        global_rank: int = 0,
+        world_size: int = 1,
+    ):
+        super().__init__(None)
+        if batch_duration <= 0:
+            raise ValueError(f"`batch_duration` must be positive, got {batch_duration}")
+        if num_buckets < 1:
+            raise ValueError(f"`num_buckets` must be at least 1, got {num_buckets}")
+
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.batch_duration = batch_duration
+        self.num_buckets = min(num_buckets, max(len(self.durations), 1))
+        self.max_batch_size = max_batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.global_rank = global_rank
+        self.world_size = world_size
+        self.epoch = 0
+
+        num_too_long = int((self.durations > batch_duration).sum())
+        if num_too_long > 0:
+            logging.warning(
+                f"{num_too_long} samples are longer than `batch_duration`={batch_duration}s "
+                "and will be placed in batches of size 1."
+            )
+
+        # Equal-count buckets over the duration-sorted sample indices.
+        sorted_indices = np.argsort(self.durations, kind='stable')
+        self.buckets = [bucket for bucket in np.array_split(sorted_indices, self.num_buckets) if len(bucket) > 0]
+
+        self._cached_epoch = None
+        self._cached_batches = None
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _split_bucket(self, indices: np.ndarray) -> List[List[int]]:
+        positions = pack_by_duration(self.durations[indices].tolist(), self.batch_duration, self.max_batch_size)
+        if self.drop_last:
+            positions = positions[:-1]
+        return [indices[batch].tolist() for batch in positions]
+
+    def _batches(self, epoch: int) -> List[List[int]]:
+        if self._cached_epoch == epoch:
+            return self._cached_batches
+
+        rng = np.random.RandomState(self.seed + epoch)
+        batches = []
+        for bucket in self.buckets:
+            if self.shuffle:
+                bucket = bucket[rng.permutation(len(bucket))]
+            batches.extend(self._split_bucket(bucket))
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+
+        num_batches = (len(batches) // self.world_size) * self.world_size
+        if num_batches == 0 and len(batches) > 0:
+            raise ValueError(
+                f"Dataset produced only {len(batches)} batches, which is fewer than world_size={self.world_size}"
+            )
+        batches = batches[self.global_rank : num_batches : self.world_size]
+
+        self._cached_epoch, self._cached_batches = epoch, batches
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self._batches(self.epoch))
+
+    def __len__(self) -> int:
+        return len(self._batches(self.epoch))
+
+
+class ResumableRandomBatchSampler(torch.utils.data.Sampler):
+    """
+    Batch sampler over a map-style dataset which can resume in the middle of an epoch, similar to the Megatron
+    pretraining samplers.
+
+    The position in the data is fully described by `consumed_samples`, the number of samples consumed by all ranks
+    since the start of training. It determines the epoch, whose permutation is drawn from ``seed + epoch``, and the
+    offset into that permutation. Every global batch of ``batch_size * world_size`` consecutive permuted indices
+    is split across the ranks. The last incomplete global batch of every epoch is dropped, so that every epoch
+    contains the same samples per rank regardless of where training was resumed.
+
+    Since the sampler already shards the data, PyTorch Lightning must not replace it,
+    i.e. set ``trainer.replace_sampler_ddp=false``.
+
+    Args:
+        total_samples: Number of samples of the dataset.
+        batch_size: Number of samples per batch and rank.
+        consumed_samples: Number of samples consumed by all ranks so far,
+            i.e. ``global_step * batch_size * world_size * accumulate_grad_batches``.
+        shuffle: Whether to draw a new permutation every epoch. If False, samples are returned in dataset order.
+        seed: Base random seed, the epoch number is added to it.
+        global_rank: Rank of this process.
+        world_size: Number of processes.
+    """
+
+    def __init__(
+        self,
+        total_samples: int,
+        batch_size: int,
+        consumed_samples: int = 0,
+        shuffle: bool = True,
+        seed: int = 0,
+        global_rank: int = 0,
+        world_size: int = 1,
+    ):
+        super().__init__(None)
+        self.total_samples = total_samples
+        self.batch_size = batch_size
+        self.consumed_samples = consumed_samples
+        self.shuffle = shuffle
+        self.seed = seed
+        self.global_rank = global_rank
+        self.world_size = world_size
+
+        self.global_batch_size = batch_size * world_size
+        self.samples_per_epoch = (total_samples // self.global_batch_size) * self.global_batch_size
+        if self.samples_per_epoch == 0:
+            raise ValueError(
+                f"Dataset of {total_samples} samples is smaller than the global batch size {self.global_batch_size}"
+            )
+        if consumed_samples % self.global_batch_size != 0:
+            raise ValueError(
+                f"`consumed_samples`={consumed_samples} is not a multiple of the global batch size "
+                f"{self.global_batch_size}"
+            )
+
+        logging.info(
+            f"Instantiating ResumableRandomBatchSampler with total_samples: {total_samples} "
+            f"and consumed_samples: {consumed_samples}"
+        )
+
+    @property
+    def epoch(self) -> int:
+        return self.consumed_samples // self.samples_per_epoch
+
+    def _permutation(self, epoch: int) -> np.ndarray:
+        if self.shuffle:
+            return np.random.RandomState(self.seed + epoch).permutation(self.total_samples)
+        return np.arange(self.total_samples)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        indices = self._permutation(self.epoch)
+        start = self.global_rank * self.batch_size
+        epoch_offset = self.consumed_samples % self.samples_per_epoch
+        for offset in range(epoch_offset, self.samples_per_epoch, self.global_batch_size):
+            self.consumed_samples += self.global_batch_size
+            yield indices[offset + start : offset + start + self.batch_size].tolist()
+
+    def __len__(self) -> int:
+        return (self.samples_per_epoch - self.consumed_samples % self.samples_per_epoch) // self.global_batch_size
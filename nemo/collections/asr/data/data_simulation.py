@@ -20,11 +20,11 @@ from typing import Dict, List, Tuple
 import numpy as np
 import soundfile as sf
 import torch
-from scipy.signal import convolve
 from scipy.signal.windows import cosine, hamming, hann
 from scipy.stats import halfnorm
 from tqdm import trange
 
+from nemo.collections.asr.parts.preprocessing.convolution import FFTConvolver
 from nemo.collections.asr.parts.utils.manifest_utils import (
     create_manifest,
     create_segment_manifest,
@@ -1141,6 +1141,7 @@ class RIRMultiSpeakerSimulator(MultiSpeakerSimulator):
     def __init__(self, cfg):
         super().__init__(cfg)
         self._check_args_rir()
+        self._convolver = FFTConvolver()
 
     def _check_args_rir(self):
         """
@@ -1326,16 +1327,20 @@ class RIRMultiSpeakerSimulator(MultiSpeakerSimulator):
             output_sound (list): List of tensors containing augmented audio
             length (int): Length of output audio channels (or of the longest if they have different lengths)
         """
-        output_sound = []
-        length = 0
+        impulses = []
         for channel in range(self._params.data_simulator.rir_generation.mic_config.num_channels):
             if self._params.data_simulator.rir_generation.toolkit == 'gpuRIR':
-                out_channel = convolve(input, RIR[speaker_turn, channel, : len(input)]).tolist()
+                impulses.append(RIR[speaker_turn, channel, : len(input)])
             elif self._params.data_simulator.rir_generation.toolkit == 'pyroomacoustics':
-                out_channel = convolve(input, RIR[channel][speaker_turn][: len(input)]).tolist()
-            if len(out_channel) > length:
-                length = len(out_channel)
-            output_sound.append(torch.tensor(out_channel))
+                impulses.append(RIR[channel][speaker_turn][: len(input)])
+        # All channels are convolved in one batch, and the RIR spectra are reused for every sentence of the session.
+        input = np.asarray(input, dtype=np.float32)
+        impulses = [np.asarray(impulse, dtype=np.float32) for impulse in impulses]
+        output_sound = [
+            torch.from_numpy(out_channel)
+            for out_channel in self._convolver.convolve([input] * len(impulses), impulses)
+        ]
+        length = max(len(out_channel) for out_channel in output_sound)
         return output_sound, length
 
     def _generate_session(self, idx: int, basepath: str, filename: str, enforce_counter: int = 2):
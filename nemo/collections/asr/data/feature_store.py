@@ -0,0 +1,252 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.data.audio_to_text_dali import DALIOutputs
+from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
+from nemo.collections.common.parts.preprocessing import manifest
+from nemo.collections.common.parts.preprocessing.manifest_cache import _write_atomically, manifest_cache_key
+from nemo.core.classes import Dataset
+from nemo.utils import logging
+
+__all__ = ['FeatureStore', 'FeatureStoreDataset', 'FeatureStoreOutputs', 'build_feature_store']
+
+FEATURE_STORE_VERSION = 1
+
+
+class FeatureStore:
+    """
+    Read-only store of precomputed features of every entry of a list of manifests, created by `build_feature_store`.
+
+    The features of all utterances are concatenated along time in a single memory-mapped float16 array of shape
+    [total frames, feature dim]. The features of the manifest entry with id `i` (its position in the list of
+    manifests) span the frames ``offsets[i]:offsets[i + 1]``.
+
+    Args:
+        store_path: Directory of the feature store.
+    """
+
+    def __init__(self, store_path: str):
+        self.store_path = os.path.expanduser(store_path)
+        with open(os.path.join(self.store_path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FEATURE_STORE_VERSION:
+            raise ValueError(
+                f"Feature store {self.store_path} has version {self.meta.get('version')}, "
+                f"expected {FEATURE_STORE_VERSION}. Please rebuild it."
+            )
+        self.offsets = np.load(os.path.join(self.store_path, 'offsets.npy'))
+        self._features = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_features'] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def features(self) -> np.memmap:
+        if self._features is None:
+            self._features = np.memmap(
+                os.path.join(self.store_path, 'features.bin'),
+                dtype=np.float16,
+                mode='r',
+                shape=(self.meta['num_frames'], self.meta['feat_dim']),
+            )
+        return self._features
+
+    def check_manifests(self, manifests_files: Union[str, List[str]]):
+        """Raises a ValueError if the store was not built from the current version of the given manifests."""
+        if manifest_cache_key(manifests_files) != self.meta['manifest_key']:
+            raise ValueError(
+                f"Feature store {self.store_path} was built from {self.meta['manifests']}, "
+                f"which differ from {manifests_files} or were modified since. Please rebuild the feature store."
+            )
+
+    def __getitem__(self, sample_id: int) -> torch.Tensor:
+        """Returns the float32 features of shape [feature dim, frames] of the manifest entry `sample_id`."""
+        start, end = self.offsets[sample_id], self.offsets[sample_id + 1]
+        return torch.from_numpy(self.features[start:end].astype(np.float32)).t()
+
+
+def build_feature_store(
+    manifest_filepath: Union[str, List[str]],
+    store_path: str,
+    preprocessor: torch.nn.Module,
+    sample_rate: int,
+    int_values: bool = False,
+    device: Optional[torch.device] = None,
+):
+    """
+    Computes the features of every entry of the given manifests with `preprocessor` and writes them into a
+    feature store. Utterances are processed one at a time with the preprocessor in eval mode, i.e. without dither,
+    so that the stored features match the ones computed at evaluation time.
+
+    Args:
+        manifest_filepath: Path to manifest json, can be comma-separated paths or a list of paths.
+        store_path: Output directory of the feature store, which must not exist yet.
+        preprocessor: The audio preprocessor of the model, e.g. AudioToMelSpectrogramPreprocessor.
+        sample_rate: Sample rate to resample loaded audio to.
+        int_values: If true, load samples as 32-bit integers.
+        device: Device to compute the features on, defaults to the device of the preprocessor.
+    """
+    if isinstance(manifest_filepath, str):
+        manifest_filepath = manifest_filepath.split(',')
+    store_path = os.path.expanduser(store_path)
+    if os.path.exists(store_path):
+        raise FileExistsError(f"Feature store {store_path} already exists")
+
+    featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values)
+    if device is None:
+        device = next(iter(preprocessor.buffers()), torch.empty(0)).device
+
+    featurizer_cfg = getattr(preprocessor, 'featurizer', None)
+    pad_to = getattr(featurizer_cfg, 'pad_to', 0)
+    pad_value = getattr(featurizer_cfg, 'pad_value', 0.0)
+
+    def _write(directory):
+        offsets, feat_dim = [0], None
+        mode = preprocessor.training
+        preprocessor.eval()
+        try:
+            with open(os.path.join(directory, 'features.bin'), 'wb') as f:
+                for item in manifest.item_iter(manifest_filepath):
+                    audio = featurizer.process(
+                        item['audio_file'],
+                        offset=item['offset'] or 0,
+                        duration=item['duration'],
+                        orig_sr=item['orig_sr'],
+                    )
+                    with torch.no_grad():
+                        features, features_len = preprocessor(
+                            input_signal=audio.unsqueeze(0).to(device),
+                            length=torch.tensor([audio.shape[0]], device=device),
+                        )
+                    features = features[0, :, : features_len[0]].t().cpu().numpy().astype(np.float16)
+                    feat_dim = features.shape[1]
+                    f.write(np.ascontiguousarray(features).tobytes())
+                    offsets.append(offsets[-1] + features.shape[0])
+        finally:
+            preprocessor.train(mode)
+
+        np.save(os.path.join(directory, 'offsets.npy'), np.asarray(offsets, dtype=np.int64))
+        logging.info(f"Stored {offsets[-1]} frames of {len(offsets) - 1} utterances in {store_path}")
+        return {
+            'version': FEATURE_STORE_VERSION,
+            'manifests': [os.path.abspath(os.path.expanduser(path)) for path in manifest_filepath],
+            'manifest_key': manifest_cache_key(manifest_filepath),
+            'num_frames': offsets[-1],
+            'feat_dim': feat_dim or 0,
+            'pad_to': pad_to if isinstance(pad_to, int) else 0,
+            'pad_value': pad_value,
+            'sample_rate': sample_rate,
+        }
+
+    _write_atomically(store_path, _write)
+
+
+class FeatureStoreOutputs(DALIOutputs):
+    """
+    Batch of precomputed features, returned by `FeatureStoreDataset`. Like the DALI outputs with processed signal,
+    it makes the ASR models skip their preprocessor.
+    """
+
+    def __init__(self, out_dict: Dict[str, torch.Tensor]):
+        super().__init__(out_dict)
+        self._out_dict = out_dict
+        if 'sample_id' in out_dict:
+            self._outs = self._outs + (out_dict['sample_id'],)
+
+    def __iter__(self):
+        # Lets PyTorch Lightning infer the batch size when logging.
+        return iter(self._outs)
+
+    def to(self, *args, **kwargs) -> 'FeatureStoreOutputs':
+        return FeatureStoreOutputs({key: value.to(*args, **kwargs) for key, value in self._out_dict.items()})
+
+    def pin_memory(self) -> 'FeatureStoreOutputs':
+        return FeatureStoreOutputs({key: value.pin_memory() for key, value in self._out_dict.items()})
+
+
+class FeatureStoreDataset(Dataset):
+    """
+    Wraps an `AudioToCharDataset` or `AudioToBPEDataset` and returns the features of its samples from a
+    `FeatureStore` instead of loading and processing their audio. Batches are `FeatureStoreOutputs`, for which the
+    ASR models skip their preprocessor. Spectrogram augmentation of the model is still applied during training.
+    Since batches are not tuples of tensors, the dataset does not declare output types.
+
+    Args:
+        dataset: The audio-text dataset, which provides the manifest and the transcripts.
+        manifest_filepath: Path to the manifest json of the dataset, can be comma-separated paths.
+        feature_store: Path to a feature store built from `manifest_filepath`, or a `FeatureStore`.
+    """
+
+    def __init__(
+        self, dataset: Dataset, manifest_filepath: Union[str, List[str]], feature_store: Union[str, FeatureStore]
+    ):
+        if isinstance(manifest_filepath, str):
+            manifest_filepath = manifest_filepath.split(',')
+
+        self.dataset = dataset
+        self.feature_store = FeatureStore(feature_store) if isinstance(feature_store, str) else feature_store
+        self.feature_store.check_manifests(manifest_filepath)
+        self.pad_to = self.feature_store.meta['pad_to']
+        self.pad_value = self.feature_store.meta['pad_value']
+
+    @property
+    def manifest_processor(self):
+        return self.dataset.manifest_processor
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        sample = self.manifest_processor.collection[index]
+        features = self.feature_store[sample.id]
+        t, tl = self.manifest_processor.process_text_by_sample(sample=sample)
+
+        output = features, torch.tensor(features.shape[1]).long(), torch.tensor(t).long(), torch.tensor(tl).long()
+        if self.dataset.return_sample_id:
+            output = output + (index,)
+        return output
+
+    def _collate_fn(self, batch):
+        features, features_len, tokens, tokens_len = list(zip(*batch))[:4]
+
+        max_len = max(features_len).item()
+        if self.pad_to > 0 and max_len % self.pad_to != 0:
+            max_len += self.pad_to - max_len % self.pad_to
+        max_tokens_len = max(tokens_len).item()
+
+        pad_id = self.manifest_processor.pad_id
+        out_dict = {
+            'processed_signal': torch.stack(
+                [torch.nn.functional.pad(f, (0, max_len - f.shape[1]), value=self.pad_value) for f in features]
+            ),
+            'processed_signal_len': torch.stack(features_len),
+            'transcript': torch.stack(
+                [torch.nn.functional.pad(t, (0, max_tokens_len - t.shape[0]), value=pad_id) for t in tokens]
+            ),
+            'transcript_len': torch.stack(tokens_len),
+        }
+        if len(batch[0]) == 5:
+            out_dict['sample_id'] = torch.tensor([b[4] for b in batch], dtype=torch.int32)
+        return FeatureStoreOutputs(out_dict)
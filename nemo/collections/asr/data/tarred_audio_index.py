@@ -0,0 +1,157 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import os
+import re
+import tarfile
+from typing import Dict, List, Tuple
+
+from nemo.utils import logging
+
+__all__ = [
+    'INDEX_SUFFIX',
+    'get_tar_index_filepath',
+    'build_tar_index',
+    'write_tar_index',
+    'read_tar_index',
+    'TarredAudioIndex',
+]
+
+INDEX_SUFFIX = '.index'
+
+# Manifest entries which point to a different offset of an already tarred file are named `<base>-sub<N><ext>`.
+_SUB_ENTRY_PATTERN = re.compile(r'-sub\d+(\.[^./]*)?$')
+
+
+def get_tar_index_filepath(tar_filepath: str) -> str:
+    """Returns the path of the index sidecar of a tarball, e.g. `audio_0.tar` -> `audio_0.tar.index`."""
+    return tar_filepath + INDEX_SUFFIX
+
+
+def build_tar_index(tar_filepath: str) -> List[Tuple[str, int, int]]:
+    """
+    Scans the member headers of an uncompressed tarball.
+
+    Args:
+        tar_filepath: Path to the tarball.
+
+    Returns:
+        A list of `(member name, byte offset of the member data, member size)` tuples.
+    """
+    entries = []
+    with tarfile.open(tar_filepath, mode='r:') as tar:
+        for member in tar:
+            if member.isfile():
+                entries.append((member.name, member.offset_data, member.size))
+    return entries
+
+
+def write_tar_index(tar_filepath: str, index_filepath: str = None) -> str:
+    """
+    Writes the index sidecar of a tarball. Each line of the index holds the tab separated member name,
+    byte offset and size. The index is written to a temporary file first and renamed into place.
+
+    Args:
+        tar_filepath: Path to the tarball.
+        index_filepath: Optional output path, defaults to `get_tar_index_filepath(tar_filepath)`.
+
+    Returns:
+        Path to the written index.
+    """
+    if index_filepath is None:
+        index_filepath = get_tar_index_filepath(tar_filepath)
+
+    tmp_filepath = f'{index_filepath}.tmp{os.getpid()}'
+    with open(tmp_filepath, 'w') as f:
+        for name, offset, size in build_tar_index(tar_filepath):
+            f.write(f'{name}\t{offset}\t{size}\n')
+    os.replace(tmp_filepath, index_filepath)
+    return index_filepath
+
+
+def read_tar_index(index_filepath: str) -> List[Tuple[str, int, int]]:
+    """Reads an index written by `write_tar_index`."""
+    entries = []
+    with open(index_filepath, 'r') as f:
+        for line in f:
+            name, offset, size = line.rstrip('\n').rsplit('\t', 2)
+            entries.append((name, int(offset), int(size)))
+    return entries
+
+
+class TarredAudioIndex:
+    """
+    Random access to the audio files stored in a set of tarballs through their index sidecars.
+
+    Tarballs without an index are scanned once at construction time. File handles are opened lazily
+    and per process, so an instance can be shared with forked or spawned DataLoader workers.
+
+    Args:
+        audio_tar_filepaths: List of paths to uncompressed tarballs.
+    """
+
+    def __init__(self, audio_tar_filepaths: List[str]):
+        self.audio_tar_filepaths = list(audio_tar_filepaths)
+        self.members: Dict[str, Tuple[int, int, int]] = {}
+
+        for shard_idx, tar_filepath in enumerate(self.audio_tar_filepaths):
+            index_filepath = get_tar_index_filepath(tar_filepath)
+            if os.path.exists(index_filepath):
+                entries = read_tar_index(index_filepath)
+            else:
+                logging.warning(f"Index {index_filepath} not found, scanning {tar_filepath} instead.")
+                entries = build_tar_index(tar_filepath)
+            for name, offset, size in entries:
+                self.members[name] = (shard_idx, offset, size)
+
+        self._handles = {}
+        self._pid = None
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_handles'] = {}
+        state['_pid'] = None
+        return state
+
+    def member_name(self, audio_filepath: str) -> str:
+        """Maps a tarred manifest `audio_filepath` to the name of the tarball member holding its audio."""
+        name = os.path.basename(audio_filepath)
+        if name in self.members:
+            return name
+        return _SUB_ENTRY_PATTERN.sub(r'\1', name)
+
+    def _handle(self, shard_idx: int):
+        if self._pid != os.getpid():
+            # Never share file offsets with the parent process after a fork.
+            self._handles, self._pid = {}, os.getpid()
+        if shard_idx not in self._handles:
+            self._handles[shard_idx] = open(self.audio_tar_filepaths[shard_idx], 'rb')
+        return self._handles[shard_idx]
+
+    def read(self, audio_filepath: str) -> bytes:
+        """Returns the raw bytes of the audio file of a tarred manifest entry."""
+        name = self.member_name(audio_filepath)
+        if name not in self.members:
+            raise KeyError(f"{audio_filepath} was not found in any of the indexed tarballs")
+        shard_idx, offset, size = self.members[name]
+        handle = self._handle(shard_idx)
+        handle.seek(offset)
+        return handle.read(size)
+
+    def open(self, audio_filepath: str) -> io.BytesIO:
+        """Returns the audio file of a tarred manifest entry as an in-memory stream."""
+        return io.BytesIO(self.read(audio_filepath))
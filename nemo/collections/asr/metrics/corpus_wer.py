@@ -0,0 +1,286 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torchmetrics import Metric
+
+__all__ = ['CorpusWER', 'compute_error_counts']
+
+# An alignment op is a tuple of the op, the reference word and the hypothesis word. The ops are 'C' (correct),
+# 'S' (substitution), 'D' (deletion, without hypothesis word) and 'I' (insertion, without reference word).
+AlignmentOp = Tuple[str, Optional[str], Optional[str]]
+
+
+def compute_error_counts(
+    hypotheses: List[str],
+    references: List[str],
+    use_cer: bool = False,
+    return_alignments: bool = False,
+    batch_size: int = 1024,
+) -> Tuple[np.ndarray, Optional[List[List[AlignmentOp]]]]:
+    """
+    Computes the substitutions, deletions and insertions of every hypothesis against its reference.
+
+    Pairs are sorted by length and aligned in batches, with the edit distance dynamic program vectorized over the
+    pairs of a batch and the words of the references. Among the alignments with the minimum number of errors, the
+    one with the most correct words is selected, so the sum of the counts is the Levenshtein distance.
+
+    Args:
+        hypotheses: List of hypotheses.
+        references: List of references, with the same length as the hypotheses.
+        use_cer: Whether to align characters instead of words.
+        return_alignments: Whether to return the alignment ops of every pair.
+        batch_size: Number of pairs which are aligned at once.
+
+    Returns:
+        An integer array of shape [N, 4] with the substitutions, deletions, insertions and reference words of every
+        pair, and the list of the alignment ops of every pair if `return_alignments`, otherwise None.
+    """
+    if len(hypotheses) != len(references):
+        raise ValueError(
+            "In word error rate calculation, hypotheses and reference"
+            " lists must have the same number of elements. But I got:"
+            "{0} and {1} correspondingly".format(len(hypotheses), len(references))
+        )
+
+    counts = np.zeros((len(hypotheses), 4), dtype=np.int64)
+    alignments = [None] * len(hypotheses) if return_alignments else None
+    # Batches of pairs of similar lengths need little padding. The texts are only split within their batch.
+    order = sorted(range(len(hypotheses)), key=lambda idx: (len(references[idx]), len(hypotheses[idx])))
+    for start in range(0, len(order), batch_size):
+        indices = order[start : start + batch_size]
+        if use_cer:
+            hyp_tokens = [list(hypotheses[idx]) for idx in indices]
+            ref_tokens = [list(references[idx]) for idx in indices]
+        else:
+            hyp_tokens = [hypotheses[idx].split() for idx in indices]
+            ref_tokens = [references[idx].split() for idx in indices]
+
+        batch_counts, batch_alignments = _align_batch(hyp_tokens, ref_tokens, return_alignments)
+        counts[indices] = batch_counts
+        if return_alignments:
+            for idx, alignment in zip(indices, batch_alignments):
+                alignments[idx] = alignment
+
+    return counts, alignments
+
+
+def _align_batch(
+    hyp_tokens: List[List[str]], ref_tokens: List[List[str]], return_alignments: bool
+) -> Tuple[np.ndarray, Optional[List[List[AlignmentOp]]]]:
+    batch_size = len(hyp_tokens)
+    hyp_lengths = np.array([len(h) for h in hyp_tokens], dtype=np.int64)
+    ref_lengths = np.array([len(r) for r in ref_tokens], dtype=np.int64)
+    max_hyp, max_ref = int(hyp_lengths.max(initial=0)), int(ref_lengths.max(initial=0))
+
+    # Map the tokens to integers, padding the hypotheses and references with values which never match
+    vocabulary = {}
+    hyps = _pad_token_ids(hyp_tokens, hyp_lengths, max_hyp, vocabulary, -1)
+    refs = _pad_token_ids(ref_tokens, ref_lengths, max_ref, vocabulary, -2)
+
+    # Every error costs `error_cost` and every correct word -1, so that the minimum cost alignment has the fewest
+    # errors, and the most correct words among those
+    error_cost = max_hyp + max_ref + 2
+    ref_positions = error_cost * np.arange(max_ref + 1, dtype=np.int64)
+    rows = np.broadcast_to(ref_positions, (batch_size, max_ref + 1)).copy()
+    costs = rows[np.arange(batch_size), ref_lengths].copy()
+    matrices = [rows] if return_alignments else None
+    for i in range(max_hyp):
+        step_costs = np.where(hyps[:, i : i + 1] == refs, -1, error_cost)
+        candidates = np.empty_like(rows)
+        candidates[:, 0] = rows[:, 0] + error_cost
+        candidates[:, 1:] = np.minimum(rows[:, :-1] + step_costs, rows[:, 1:] + error_cost)
+        # Deletions chain along the row: row[j] = min_k (candidates[k] + error_cost * (j - k))
+        rows = np.minimum.accumulate(candidates - ref_positions, axis=1) + ref_positions
+        finished = hyp_lengths == i + 1
+        costs[finished] = rows[finished, ref_lengths[finished]]
+        if return_alignments:
+            matrices.append(rows)
+
+    errors = -(-costs // error_cost)
+    correct = error_cost * errors - costs
+    substitutions = ref_lengths + hyp_lengths - 2 * correct - errors
+    counts = np.stack(
+        [substitutions, ref_lengths - correct - substitutions, hyp_lengths - correct - substitutions, ref_lengths,],
+        axis=1,
+    )
+
+    alignments = None
+    if return_alignments:
+        matrices = np.stack(matrices, axis=1)
+        alignments = [_backtrace(matrices[b], hyp_tokens[b], ref_tokens[b], error_cost) for b in range(batch_size)]
+    return counts, alignments
+
+
+def _pad_token_ids(
+    tokens: List[List[str]], lengths: np.ndarray, max_length: int, vocabulary: Dict[str, int], pad_value: int
+) -> np.ndarray:
+    ids = [vocabulary.setdefault(token, len(vocabulary)) for sequence in tokens for token in sequence]
+    padded = np.full((len(tokens), max_length), pad_value, dtype=np.int64)
+    padded[np.arange(max_length) < lengths[:, None]] = ids
+    return padded
+
+
+def _backtrace(matrix: np.ndarray, hyp: List[str], ref: List[str], error_cost: int) -> List[AlignmentOp]:
+    matrix = matrix.tolist()
+    ops = []
+    i, j = len(hyp), len(ref)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            correct = hyp[i - 1] == ref[j - 1]
+            if matrix[i][j] == matrix[i - 1][j - 1] + (-1 if correct else error_cost):
+                ops.append(('C' if correct else 'S', ref[j - 1], hyp[i - 1]))
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and matrix[i][j] == matrix[i - 1][j] + error_cost:
+            ops.append(('I', None, hyp[i - 1]))
+            i -= 1
+        else:
+            ops.append(('D', ref[j - 1], None))
+            j -= 1
+    ops.reverse()
+    return ops
+
+
+def _compute_error_counts_star(args):
+    return compute_error_counts(*args)
+
+
+class CorpusWER(Metric):
+    """
+    Accumulates the substitutions, deletions and insertions of pairs of hypothesis and reference texts, to compute
+    the Word Error Rate (or Character Error Rate) of a corpus incrementally, batch by batch.
+
+    Pairs are aligned in `num_workers` worker processes. Only the integer counters are metric states, so that
+    distributed evaluation all-reduces four integers with SUM operations instead of gathering the texts.
+
+    Example:
+        metric = CorpusWER(num_workers=8)
+        for hypotheses, references in batches:
+            metric.update(hypotheses, references)
+        wer, substitutions, deletions, insertions, words = metric.compute()
+
+    Args:
+        use_cer: Whether to use Character Error Rate instead of Word Error Rate.
+        num_workers: Number of worker processes which align the pairs. With 0, pairs are aligned in the current
+            process.
+        keep_alignments: Whether to keep the alignment ops of every pair in `alignments`, in the order of the
+            updates. Alignments are local to every process, and are cleared by `reset()`.
+        batch_size: Number of pairs aligned at once by a process.
+
+    Returns:
+        res: a tuple of 5 zero dimensional float32 ``torch.Tensor` objects: the WER, and the total substitutions,
+            deletions, insertions and number of words in all references.
+    """
+
+    full_state_update: bool = True
+
+    def __init__(
+        self,
+        use_cer: bool = False,
+        num_workers: int = 0,
+        keep_alignments: bool = False,
+        batch_size: int = 1024,
+        dist_sync_on_step=False,
+    ):
+        super().__init__(dist_sync_on_step=dist_sync_on_step)
+
+        self.use_cer = use_cer
+        self.num_workers = num_workers
+        self.keep_alignments = keep_alignments
+        self.batch_size = batch_size
+        self.alignments: List[List[AlignmentOp]] = []
+        self._pool = None
+
+        self.add_state("substitutions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("deletions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("insertions", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+        self.add_state("words", default=torch.tensor(0), dist_reduce_fx='sum', persistent=False)
+
+    def update(self, hypotheses: List[str], references: List[str]):
+        """
+        Updates metric state.
+        Args:
+            hypotheses: list of hypotheses
+            references: list of references
+        """
+        if len(hypotheses) != len(references):
+            raise ValueError(
+                "In word error rate calculation, hypotheses and reference"
+                " lists must have the same number of elements. But I got:"
+                "{0} and {1} correspondingly".format(len(hypotheses), len(references))
+            )
+
+        if self.num_workers > 0 and len(hypotheses) > self.batch_size:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.num_workers)
+            # A few chunks per worker balance the load, and every chunk is sorted by length on its own
+            chunk_size = max(self.batch_size, -(-len(hypotheses) // (4 * self.num_workers)))
+            chunks = [
+                (
+                    hypotheses[start : start + chunk_size],
+                    references[start : start + chunk_size],
+                    self.use_cer,
+                    self.keep_alignments,
+                    self.batch_size,
+                )
+                for start in range(0, len(hypotheses), chunk_size)
+            ]
+            results = self._pool.map(_compute_error_counts_star, chunks)
+            counts = np.concatenate([chunk_counts for chunk_counts, _ in results])
+            alignments = [alignment for _, chunk_alignments in results for alignment in chunk_alignments or []]
+        else:
+            counts, alignments = compute_error_counts(
+                hypotheses, references, self.use_cer, self.keep_alignments, self.batch_size
+            )
+
+        if self.keep_alignments:
+            self.alignments.extend(alignments)
+
+        totals = counts.sum(axis=0).tolist()
+        for name, total in zip(['substitutions', 'deletions', 'insertions', 'words'], totals):
+            state = getattr(self, name)
+            setattr(self, name, state + torch.tensor(total, device=state.device, dtype=state.dtype))
+
+    def compute(self):
+        substitutions = self.substitutions.detach().float()
+        deletions = self.deletions.detach().float()
+        insertions = self.insertions.detach().float()
+        words = self.words.detach().float()
+        return (substitutions + deletions + insertions) / words, substitutions, deletions, insertions, words
+
+    def reset(self):
+        super().reset()
+        self.alignments = []
+
+    def close(self):
+        """Terminates the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __getstate__(self):
+        # Worker processes are not copied along with the metric
+        state = super().__getstate__()
+        state['_pool'] = None
+        return state
+
+    def __del__(self):
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
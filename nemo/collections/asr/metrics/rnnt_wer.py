@@ -120,6 +120,9 @@ class AbstractRNNTDecoding(ABC):
 
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
+                prediction_cache_size: Maximum number of label sequences whose prediction network outputs are
+                    cached during beam search. None for an unbounded cache.
+
         decoder: The Decoder/Prediction network module.
         joint: The Joint network module.
         blank_id: The id of the RNNT blank token.
@@ -194,6 +197,7 @@ class AbstractRNNTDecoding(ABC):
                 score_norm=self.cfg.beam.get('score_norm', True),
                 softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
                 preserve_alignments=self.preserve_alignments,
+                prediction_cache_size=self.cfg.beam.get('prediction_cache_size', 10000),
             )
 
         elif self.cfg.strategy == 'tsd':
@@ -208,6 +212,7 @@ class AbstractRNNTDecoding(ABC):
                 tsd_max_sym_exp_per_step=self.cfg.beam.get('tsd_max_sym_exp', 10),
                 softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
                 preserve_alignments=self.preserve_alignments,
+                prediction_cache_size=self.cfg.beam.get('prediction_cache_size', 10000),
             )
 
         elif self.cfg.strategy == 'alsd':
@@ -222,6 +227,7 @@ class AbstractRNNTDecoding(ABC):
                 alsd_max_target_len=self.cfg.beam.get('alsd_max_target_len', 2),
                 softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
                 preserve_alignments=self.preserve_alignments,
+                prediction_cache_size=self.cfg.beam.get('prediction_cache_size', 10000),
             )
 
         elif self.cfg.strategy == 'maes':
@@ -239,6 +245,7 @@ class AbstractRNNTDecoding(ABC):
                 maes_expansion_beta=self.cfg.beam.get('maes_expansion_beta', 2.0),
                 softmax_temperature=self.cfg.beam.get('softmax_temperature', 1.0),
                 preserve_alignments=self.preserve_alignments,
+                prediction_cache_size=self.cfg.beam.get('prediction_cache_size', 10000),
             )
 
         else:
@@ -780,6 +787,9 @@ class RNNTDecoding(AbstractRNNTDecoding):
 
                 softmax_temperature: Scales the logits of the joint prior to computing log_softmax.
 
+                prediction_cache_size: Maximum number of label sequences whose prediction network outputs are
+                    cached during beam search. None for an unbounded cache.
+
         decoder: The Decoder/Prediction network module.
         joint: The Joint network module.
         vocabulary: The vocabulary (excluding the RNNT blank token) which will be used for decoding.
@@ -14,7 +14,7 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, is_dataclass
-from typing import Callable, Dict, List, Optional, Union
+from typing import List, Optional, Union
 
 import editdistance
 import numpy as np
@@ -23,6 +23,7 @@ from omegaconf import DictConfig, OmegaConf
 from torchmetrics import Metric
 
 from nemo.collections.asr.parts.submodules import ctc_greedy_decoding
+from nemo.collections.asr.parts.utils.ctc_timestamp_utils import CTCTimestamps, CTCTokenTable, compute_ctc_offsets
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses
 from nemo.utils import logging
 
@@ -190,6 +191,11 @@ class AbstractCTCDecoding(ABC):
         if isinstance(decoder_outputs, torch.Tensor):
             decoder_outputs = move_dimension_to_the_front(decoder_outputs, self.batch_dim_index)
 
+            if isinstance(self.decoding, ctc_greedy_decoding.GreedyCTCInfer):
+                with torch.inference_mode():
+                    batched_hypotheses = self.decoding.batched_decode(decoder_outputs, decoder_lengths)
+                return self.decode_batched_hypotheses(batched_hypotheses, fold_consecutive, return_hypotheses)
+
         with torch.inference_mode():
             # Resolve the forward step of the decoding strategy
             hypotheses_list = self.decoding(
@@ -212,8 +218,7 @@ class AbstractCTCDecoding(ABC):
                 # If computing timestamps
                 if self.compute_timestamps is True:
                     timestamp_type = self.cfg.get('ctc_timestamp_type', 'all')
-                    for hyp_idx in range(len(decoded_hyps)):
-                        decoded_hyps[hyp_idx] = self.compute_ctc_timestamps(decoded_hyps[hyp_idx], timestamp_type)
+                    decoded_hyps = self.compute_batch_ctc_timestamps(decoded_hyps, timestamp_type)
 
                 hypotheses.append(decoded_hyps[0])  # best hypothesis
                 all_hypotheses.append(decoded_hyps)
@@ -233,8 +238,7 @@ class AbstractCTCDecoding(ABC):
             # If computing timestamps
             if self.compute_timestamps is True:
                 timestamp_type = self.cfg.get('ctc_timestamp_type', 'all')
-                for hyp_idx in range(len(hypotheses)):
-                    hypotheses[hyp_idx] = self.compute_ctc_timestamps(hypotheses[hyp_idx], timestamp_type)
+                hypotheses = self.compute_batch_ctc_timestamps(hypotheses, timestamp_type)
 
             if return_hypotheses:
                 return hypotheses, None
@@ -304,6 +308,41 @@ class AbstractCTCDecoding(ABC):
 
         return hypotheses_list
 
+    def decode_batched_hypotheses(
+        self,
+        batched_hypotheses: ctc_greedy_decoding.BatchedCTCHypotheses,
+        fold_consecutive: bool,
+        return_hypotheses: bool = False,
+    ) -> (List[str], None):
+        """
+        Decodes the greedy predictions of a whole batch. The CTC collapse is applied to all samples at once, and
+        `Hypothesis` objects (and time stamps) are only built if they are returned.
+
+        Args:
+            batched_hypotheses: The greedy predictions of the batch.
+            fold_consecutive: Whether to collapse the ctc blank tokens or not.
+            return_hypotheses: Return Hypothesis objects instead of strings.
+
+        Returns:
+            A list of str or Hypothesis objects, one per sample, and None in place of all the hypotheses.
+        """
+        decoded_predictions, token_repetitions = batched_hypotheses.collapse(fold_consecutive)
+        if not return_hypotheses:
+            # Time stamps are only returned with the hypotheses
+            return [self.decode_tokens_to_str(tokens.tolist()) for tokens in decoded_predictions], None
+
+        hypotheses = list(batched_hypotheses)
+        if self.compute_timestamps is True:
+            timestamp_type = self.cfg.get('ctc_timestamp_type', 'all')
+            hypotheses = self.compute_batch_ctc_timestamps(
+                hypotheses, timestamp_type, decoded_predictions, token_repetitions
+            )
+        else:
+            for hypothesis, tokens in zip(hypotheses, decoded_predictions):
+                hypothesis.text = self.decode_tokens_to_str(tokens.tolist())
+
+        return hypotheses, None
+
     @abstractmethod
     def decode_tokens_to_str(self, tokens: List[int]) -> str:
         """
@@ -349,232 +388,62 @@ class AbstractCTCDecoding(ABC):
             A Hypothesis object with a modified `timestep` value, which is now a dictionary containing
             the time stamp information.
         """
-        assert timestamp_type in ['char', 'word', 'all']
-
-        # Unpack the temporary storage, and set the decoded predictions
-        decoded_prediction, token_repetitions = hypothesis.text
-        hypothesis.text = decoded_prediction
-
-        # Retrieve offsets
-        char_offsets = word_offsets = None
-        char_offsets = self._compute_offsets(hypothesis, token_repetitions, self.blank_id)
-
-        # Assert number of offsets and hypothesis tokens are 1:1 match.
-        if len(char_offsets) != len(hypothesis.text):
-            raise ValueError(
-                f"`char_offsets`: {char_offsets} and `processed_tokens`: {hypothesis.text}"
-                " have to be of the same length, but are: "
-                f"`len(offsets)`: {len(char_offsets)} and `len(processed_tokens)`:"
-                f" {len(hypothesis.text)}"
-            )
-
-        # Correctly process the token ids to chars/subwords.
-        for i, char in enumerate(hypothesis.text):
-            char_offsets[i]["char"] = self.decode_tokens_to_str([char])
-
-        # detect char vs subword models
-        lens = [len(list(v["char"])) > 1 for v in char_offsets]
-        if any(lens):
-            text_type = 'subword'
-        else:
-            text_type = 'char'
-
-        # retrieve word offsets from character offsets
-        word_offsets = None
-        if timestamp_type in ['word', 'all']:
-            if text_type == 'char':
-                word_offsets = self._get_word_offsets_chars(char_offsets, word_delimiter_char=self.word_seperator)
-            else:
-                word_offsets = self._get_word_offsets_subwords_sentencepiece(
-                    char_offsets,
-                    hypothesis,
-                    decode_ids_to_tokens=self.decode_ids_to_tokens,
-                    decode_tokens_to_str=self.decode_tokens_to_str,
-                )
-
-        # attach results
-        if len(hypothesis.timestep) > 0:
-            timestep_info = hypothesis.timestep
-        else:
-            timestep_info = []
-
-        # Setup defaults
-        hypothesis.timestep = {"timestep": timestep_info}
-
-        # Add char / subword time stamps
-        if char_offsets is not None and timestamp_type in ['char', 'all']:
-            hypothesis.timestep['char'] = char_offsets
-
-        # Add word time stamps
-        if word_offsets is not None and timestamp_type in ['word', 'all']:
-            hypothesis.timestep['word'] = word_offsets
-
-        # Convert the token indices to text
-        hypothesis.text = self.decode_tokens_to_str(hypothesis.text)
-
-        return hypothesis
-
-    @staticmethod
-    def _compute_offsets(
-        hypothesis: Hypothesis, token_repetitions: List[int], ctc_token: int
-    ) -> List[Dict[str, Union[str, int]]]:
-        """
-        Utility method that calculates the indidual time indices where a token starts and ends.
-
-        Args:
-            hypothesis: A Hypothesis object that contains `text` field that holds the character / subword token
-                emitted at every time step after ctc collapse.
-            token_repetitions: A list of ints representing the number of repetitions of each emitted token.
-            ctc_token: The integer of the ctc blank token used during ctc collapse.
-
-        Returns:
-
-        """
-        start_index = 0
+        return self.compute_batch_ctc_timestamps([hypothesis], timestamp_type)[0]
 
-        # If the exact timestep information is available, utilize the 1st non-ctc blank token timestep
-        # as the start index.
-        if hypothesis.timestep is not None and len(hypothesis.timestep) > 0:
-            start_index = max(0, hypothesis.timestep[0] - 1)
-
-        # Construct the start and end indices brackets
-        end_indices = np.asarray(token_repetitions).cumsum()
-        start_indices = np.concatenate(([start_index], end_indices[:-1]))
-
-        # Merge the results per token into a list of dictionaries
-        offsets = [
-            {"char": t, "start_offset": s, "end_offset": e}
-            for t, s, e in zip(hypothesis.text, start_indices, end_indices)
-        ]
-
-        # Filter out CTC token
-        offsets = list(filter(lambda offsets: offsets["char"] != ctc_token, offsets))
-        return offsets
-
-    @staticmethod
-    def _get_word_offsets_chars(
-        offsets: Dict[str, Union[str, float]], word_delimiter_char: str = " "
-    ) -> Dict[str, Union[str, float]]:
+    def compute_batch_ctc_timestamps(
+        self,
+        hypotheses: List[Hypothesis],
+        timestamp_type: str = "all",
+        decoded_predictions: Optional[List[np.ndarray]] = None,
+        token_repetitions: Optional[List[np.ndarray]] = None,
+    ) -> List[Hypothesis]:
         """
-        Utility method which constructs word time stamps out of character time stamps.
+        Computes the time stamps of a batch of hypotheses at once. Offsets are computed for the whole batch from the
+        run-length encoded predictions, see `ctc_timestamp_utils.compute_ctc_offsets`.
 
-        References:
-            This code is a port of the Hugging Face code for word time stamp construction.
+        The `timestep` field of every hypothesis is set to a `CTCTimestamps` dictionary, which holds the same
+        information as with `compute_ctc_timestamps`. Its char and word lists of dictionaries are only built when
+        they are accessed; the offsets are also available as arrays in its `offsets` attribute.
 
         Args:
-            offsets: A list of dictionaries, each containing "char", "start_offset" and "end_offset".
-            word_delimiter_char: Character token that represents the word delimiter. By default, " ".
+            hypotheses: A list of Hypothesis objects. If `decoded_predictions` is not provided, their `text` field
+                must be a tuple of the ctc collapsed integer ids and the number of repetitions of each token.
+            timestamp_type: A str value that represents the type of time stamp calculated.
+                Can be one of "char", "word" or "all"
+            decoded_predictions: Optional, the ctc collapsed integer ids of every hypothesis.
+            token_repetitions: Optional, the number of repetitions of each token of every hypothesis.
 
         Returns:
-            A list of dictionaries containing the word offsets. Each item contains "word", "start_offset" and
-            "end_offset".
+            The list of Hypothesis objects, with their text decoded and their `timestep` set.
         """
-        word_offsets = []
-
-        last_state = "SPACE"
-        word = ""
-        start_offset = 0
-        end_offset = 0
-        for i, offset in enumerate(offsets):
-            char = offset["char"]
-            state = "SPACE" if char == word_delimiter_char else "WORD"
-
-            if state == last_state:
-                # If we are in the same state as before, we simply repeat what we've done before
-                end_offset = offset["end_offset"]
-                word += char
-            else:
-                # Switching state
-                if state == "SPACE":
-                    # Finishing a word
-                    word_offsets.append({"word": word, "start_offset": start_offset, "end_offset": end_offset})
-                else:
-                    # Starting a new word
-                    start_offset = offset["start_offset"]
-                    end_offset = offset["end_offset"]
-                    word = char
-
-            last_state = state
-        if last_state == "WORD":
-            word_offsets.append({"word": word, "start_offset": start_offset, "end_offset": end_offset})
-
-        return word_offsets
-
-    @staticmethod
-    def _get_word_offsets_subwords_sentencepiece(
-        offsets: Dict[str, Union[str, float]],
-        hypothesis: Hypothesis,
-        decode_ids_to_tokens: Callable[[List[int]], str],
-        decode_tokens_to_str: Callable[[List[int]], str],
-    ) -> Dict[str, Union[str, float]]:
-        """
-        Utility method which constructs word time stamps out of sub-word time stamps.
+        assert timestamp_type in ['char', 'word', 'all']
 
-        **Note**: Only supports Sentencepiece based tokenizers !
+        if decoded_predictions is None:
+            # Unpack the temporary storage
+            decoded_predictions, token_repetitions = zip(*[hypothesis.text for hypothesis in hypotheses])
 
-        Args:
-            offsets: A list of dictionaries, each containing "char", "start_offset" and "end_offset".
-            hypothesis: Hypothesis object that contains `text` field, where each token is a sub-word id
-                after ctc collapse.
-            decode_ids_to_tokens: A Callable function that accepts a list of integers and maps it to a sub-word.
-            decode_tokens_to_str: A Callable function that accepts a list of integers and maps it to text / str.
+        # If the exact timestep information is available, utilize the 1st non-ctc blank token timestep
+        # as the start index.
+        timesteps = [hypothesis.timestep if hypothesis.timestep is not None else [] for hypothesis in hypotheses]
+        start_indices = [max(0, timestep[0] - 1) if len(timestep) > 0 else 0 for timestep in timesteps]
 
-        Returns:
-            A list of dictionaries containing the word offsets. Each item contains "word", "start_offset" and
-            "end_offset".
-        """
-        word_offsets = []
-        built_token = []
-        previous_token_index = 0
-        # For every collapsed sub-word token
-        for i, char in enumerate(hypothesis.text):
-            # Compute the sub-word text representation, and the decoded text (stripped of sub-word markers).
-            token = decode_ids_to_tokens([char])[0]
-            token_text = decode_tokens_to_str([char])
-
-            # It is a sub-word token, or contains an identifier at the beginning such as _ or ## that was stripped
-            # after forcing partial text conversion of the token.
-            if token != token_text:
-                # If there are any partially or fully built sub-word token ids, construct to text.
-                # Note: This is "old" subword, that occurs *after* current sub-word has started.
-                if len(built_token) > 0:
-                    word_offsets.append(
-                        {
-                            "word": decode_tokens_to_str(built_token),
-                            "start_offset": offsets[previous_token_index]["start_offset"],
-                            "end_offset": offsets[i]["start_offset"],
-                        }
-                    )
-
-                # Prepare list of new sub-word ids
-                built_token.clear()
-                built_token.append(char)
-                previous_token_index = i
-            else:
-                # If the token does not contain any sub-word start mark, then the sub-word has not completed yet
-                # Append to current sub-word list.
-                built_token.append(char)
-
-        # Inject the start offset of the first token to word offsets
-        # This is because we always skip the delay the injection of the first sub-word due to the loop
-        # condition and check whether built token is ready or not.
-        # Therefore without this forced injection, the start_offset appears as off by 1.
-        word_offsets[0]["start_offset"] = offsets[0]["start_offset"]
-
-        # If there are any remaining tokens left, inject them all into the final word offset.
-        # Note: The start offset of this token is the start time of the first token inside build_token.
-        # Note: The end offset of this token is the end time of the last token inside build_token
-        if len(built_token) > 0:
-            word_offsets.append(
-                {
-                    "word": decode_tokens_to_str(built_token),
-                    "start_offset": offsets[-(len(built_token))]["start_offset"],
-                    "end_offset": offsets[-1]["end_offset"],
-                }
+        offsets = compute_ctc_offsets(
+            decoded_predictions, token_repetitions, start_indices, self._get_token_table(), self.blank_id
+        )
+        for hypothesis, tokens, timestep, hyp_offsets in zip(hypotheses, decoded_predictions, timesteps, offsets):
+            hypothesis.timestep = CTCTimestamps(timestep, hyp_offsets, timestamp_type)
+            # Convert the token indices to text
+            hypothesis.text = self.decode_tokens_to_str(np.asarray(tokens).tolist())
+
+        return hypotheses
+
+    def _get_token_table(self) -> CTCTokenTable:
+        """Returns the cache of the token strings and word boundaries used to compute the time stamps."""
+        if getattr(self, '_token_table', None) is None:
+            self._token_table = CTCTokenTable(
+                self.decode_tokens_to_str, self.decode_ids_to_tokens, word_delimiter=self.word_seperator
             )
-        built_token.clear()
-
-        return word_offsets
+        return self._token_table
 
     @property
     def preserve_alignments(self):
@@ -17,6 +17,8 @@ from typing import List, Optional, Union
 
 import torch
 
+from nemo.collections.asr.data.audio_to_text import DurationBucketingDataset
+from nemo.collections.asr.data.audio_to_text_sampler import ResumableRandomBatchSampler
 from nemo.core.classes import ModelPT
 from nemo.core.classes.exportable import Exportable
 from nemo.core.classes.mixins import AccessMixin
@@ -113,6 +115,32 @@ class ASRModel(ModelPT, ABC):
         if "skip_nan_grad" in self._cfg and self._cfg["skip_nan_grad"]:
             self._skip_nan_grad = self._cfg["skip_nan_grad"]
 
+    def on_train_start(self):
+        """
+        When resuming from a checkpoint, fast-forwards a ResumableRandomBatchSampler of the training data to the
+        number of samples consumed before the checkpoint was saved.
+        """
+        super().on_train_start()
+
+        batch_sampler = getattr(self._train_dl, 'batch_sampler', None)
+        if isinstance(batch_sampler, ResumableRandomBatchSampler) and self.trainer.global_step > 0:
+            batch_sampler.consumed_samples = (
+                self.trainer.global_step * self.trainer.accumulate_grad_batches * batch_sampler.global_batch_size
+            )
+            logging.info(f"Resuming training data from consumed_samples: {batch_sampler.consumed_samples}")
+
+    def on_train_epoch_start(self):
+        """
+        Sets the epoch of DurationBucketingDatasets of the training data, which shuffle their batches per epoch.
+        """
+        super().on_train_epoch_start()
+
+        dataset = getattr(self._train_dl, 'dataset', None)
+        datasets = dataset.datasets if isinstance(dataset, torch.utils.data.ChainDataset) else [dataset]
+        for dataset in datasets:
+            if isinstance(dataset, DurationBucketingDataset):
+                dataset.set_epoch(self.trainer.current_epoch)
+
     def on_after_backward(self):
         """
         zero-out the gradients which any of them is NAN or INF
@@ -56,6 +56,8 @@ class ASRDatasetConfig(nemo.core.classes.dataset.DatasetConfig):
     pad_id: int = 0
     use_start_end_token: bool = False
     return_sample_id: Optional[bool] = False
+    manifest_cache_dir: Optional[str] = None
+    resample_quality: Optional[str] = None
 
     # bucketing params
     bucketing_strategy: str = "synced_randomized"
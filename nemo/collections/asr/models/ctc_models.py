@@ -28,7 +28,7 @@ from nemo.collections.asr.data.audio_to_text_dali import DALIOutputs
 from nemo.collections.asr.losses.ctc import CTCLoss
 from nemo.collections.asr.metrics.wer import WER, CTCDecoding, CTCDecodingConfig
 from nemo.collections.asr.models.asr_model import ASRModel, ExportableEncDecModel
-from nemo.collections.asr.parts.mixins import ASRModuleMixin
+from nemo.collections.asr.parts.mixins import ASRModuleMixin, TranscriptionMixin
 from nemo.collections.asr.parts.preprocessing.perturb import process_augmentations
 from nemo.core.classes.common import PretrainedModelInfo, typecheck
 from nemo.core.classes.mixins import AccessMixin
@@ -38,7 +38,7 @@ from nemo.utils import logging
 __all__ = ['EncDecCTCModel']
 
 
-class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
+class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin, TranscriptionMixin):
     """Base class for encoder decoder CTC-based models."""
 
     def __init__(self, cfg: DictConfig, trainer: Trainer = None):
@@ -223,6 +223,21 @@ class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
 
         return hypotheses
 
+    def _transcribe_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List[Union[str, 'Hypothesis']]:
+        logits, logits_len, _ = self.forward(input_signal=input_signal, input_signal_length=input_signal_length)
+        hypotheses, _ = self.decoding.ctc_decoder_predictions_tensor(
+            logits, decoder_lengths=logits_len, return_hypotheses=return_hypotheses,
+        )
+        if return_hypotheses:
+            logits = logits.cpu()
+            for idx in range(logits.shape[0]):
+                hypotheses[idx].y_sequence = logits[idx][: logits_len[idx]]
+                if hypotheses[idx].alignments is None:
+                    hypotheses[idx].alignments = hypotheses[idx].y_sequence
+        return hypotheses
+
     def change_vocabulary(self, new_vocabulary: List[str], decoding_cfg: Optional[DictConfig] = None):
         """
         Changes vocabulary used during CTC decoding process. Use this method when fine-tuning on from pre-trained model.
@@ -381,6 +396,18 @@ class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
         else:
             collate_fn = dataset.datasets[0].collate_fn
 
+        batch_sampler = audio_to_text_dataset.get_batch_sampler(
+            config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+        )
+        if batch_sampler is not None:
+            return torch.utils.data.DataLoader(
+                dataset=dataset,
+                batch_sampler=batch_sampler,
+                collate_fn=collate_fn,
+                num_workers=config.get('num_workers', 0),
+                pin_memory=config.get('pin_memory', False),
+            )
+
         return torch.utils.data.DataLoader(
             dataset=dataset,
             batch_size=config['batch_size'],
@@ -422,10 +449,14 @@ class EncDecCTCModel(ASRModel, ExportableEncDecModel, ASRModuleMixin):
             # If it's an int, we assume that the user has set it to something sane, i.e. <= # training batches,
             # and don't change it. Otherwise, adjust batches accordingly if it's a float (including 1.0).
             if self._trainer is not None and isinstance(self._trainer.limit_train_batches, float):
-                self._trainer.limit_train_batches = int(
-                    self._trainer.limit_train_batches
-                    * ceil((len(self._train_dl.dataset) / self.world_size) / train_data_config['batch_size'])
-                )
+                if self._train_dl.batch_size is None:
+                    # The batch sampler already shards the data, its length is the number of batches per rank.
+                    num_train_batches = len(self._train_dl.batch_sampler)
+                else:
+                    num_train_batches = ceil(
+                        (len(self._train_dl.dataset) / self.world_size) / train_data_config['batch_size']
+                    )
+                self._trainer.limit_train_batches = int(self._trainer.limit_train_batches * num_train_batches)
             elif self._trainer is None:
                 logging.warning(
                     "Model Trainer was not set before constructing the dataset, incorrect number of "
@@ -447,6 +447,18 @@ class EncDecRNNTBPEModel(EncDecRNNTModel, ASRBPEMixin):
         else:
             collate_fn = dataset.datasets[0].collate_fn
 
+        batch_sampler = audio_to_text_dataset.get_batch_sampler(
+            config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+        )
+        if batch_sampler is not None:
+            return torch.utils.data.DataLoader(
+                dataset=dataset,
+                batch_sampler=batch_sampler,
+                collate_fn=collate_fn,
+                num_workers=config.get('num_workers', 0),
+                pin_memory=config.get('pin_memory', False),
+            )
+
         return torch.utils.data.DataLoader(
             dataset=dataset,
             batch_size=config['batch_size'],
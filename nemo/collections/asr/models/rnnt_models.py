@@ -30,7 +30,7 @@ from nemo.collections.asr.losses.rnnt import RNNTLoss, resolve_rnnt_default_loss
 from nemo.collections.asr.metrics.rnnt_wer import RNNTWER, RNNTDecoding, RNNTDecodingConfig
 from nemo.collections.asr.models.asr_model import ASRModel
 from nemo.collections.asr.modules.rnnt import RNNTDecoderJoint
-from nemo.collections.asr.parts.mixins import ASRModuleMixin
+from nemo.collections.asr.parts.mixins import ASRModuleMixin, TranscriptionMixin
 from nemo.collections.asr.parts.preprocessing.perturb import process_augmentations
 from nemo.core.classes import Exportable
 from nemo.core.classes.common import PretrainedModelInfo, typecheck
@@ -39,7 +39,7 @@ from nemo.core.neural_types import AcousticEncodedRepresentation, AudioSignal, L
 from nemo.utils import logging
 
 
-class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
+class EncDecRNNTModel(ASRModel, ASRModuleMixin, TranscriptionMixin, Exportable):
     """Base class for encoder decoder RNNT-based models."""
 
     def __init__(self, cfg: DictConfig, trainer: Trainer = None):
@@ -303,6 +303,15 @@ class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
                 self.joint.unfreeze()
         return hypotheses, all_hypotheses
 
+    def _transcribe_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List[Union[str, 'Hypothesis']]:
+        encoded, encoded_len = self.forward(input_signal=input_signal, input_signal_length=input_signal_length)
+        best_hyp, _ = self.decoding.rnnt_decoder_predictions_tensor(
+            encoded, encoded_len, return_hypotheses=return_hypotheses
+        )
+        return best_hyp
+
     def change_vocabulary(self, new_vocabulary: List[str], decoding_cfg: Optional[DictConfig] = None):
         """
         Changes vocabulary used during RNNT decoding process. Use this method when fine-tuning a pre-trained model.
@@ -489,6 +498,18 @@ class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
         else:
             collate_fn = dataset.datasets[0].collate_fn
 
+        batch_sampler = audio_to_text_dataset.get_batch_sampler(
+            config=config, dataset=dataset, global_rank=self.global_rank, world_size=self.world_size
+        )
+        if batch_sampler is not None:
+            return torch.utils.data.DataLoader(
+                dataset=dataset,
+                batch_sampler=batch_sampler,
+                collate_fn=collate_fn,
+                num_workers=config.get('num_workers', 0),
+                pin_memory=config.get('pin_memory', False),
+            )
+
         return torch.utils.data.DataLoader(
             dataset=dataset,
             batch_size=config['batch_size'],
@@ -530,10 +551,14 @@ class EncDecRNNTModel(ASRModel, ASRModuleMixin, Exportable):
             # If it's an int, we assume that the user has set it to something sane, i.e. <= # training batches,
             # and don't change it. Otherwise, adjust batches accordingly if it's a float (including 1.0).
             if self._trainer is not None and isinstance(self._trainer.limit_train_batches, float):
-                self._trainer.limit_train_batches = int(
-                    self._trainer.limit_train_batches
-                    * ceil((len(self._train_dl.dataset) / self.world_size) / train_data_config['batch_size'])
-                )
+                if self._train_dl.batch_size is None:
+                    # The batch sampler already shards the data, its length is the number of batches per rank.
+                    num_train_batches = len(self._train_dl.batch_sampler)
+                else:
+                    num_train_batches = ceil(
+                        (len(self._train_dl.dataset) / self.world_size) / train_data_config['batch_size']
+                    )
+                self._trainer.limit_train_batches = int(self._trainer.limit_train_batches * num_train_batches)
             elif self._trainer is None:
                 logging.warning(
                     "Model Trainer was not set before constructing the dataset, incorrect number of "
@@ -14,6 +14,7 @@
 
 import torch
 
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import CTCPrefixBeamSearch
 from nemo.core.classes import NeuralModule, typecheck
 from nemo.core.neural_types import LengthsType, LogprobsType, NeuralType, PredictionsType
 
@@ -39,6 +40,11 @@ class BeamSearchDecoderWithLM(NeuralModule):
             vocabulary will be used in beam search, default 40.
         input_tensor (bool): Set to True if you intend to pass PyTorch Tensors, set to False if you intend to pass
             NumPy arrays.
+        decoder_type (str): The implementation of the beam search. 'ctc_decoders' uses the external ctc_decoders
+            package. 'nemo' uses the built-in CTCPrefixBeamSearch, which needs no external decoder and loads ARPA
+            models without KenLM.
+        blank_skip_threshold (float): Only used by the 'nemo' decoder. Frames whose blank probability is at least
+            this threshold do not extend the beams with new tokens, default 1.0, no pruning.
     """
 
     @property
@@ -57,24 +63,53 @@ class BeamSearchDecoderWithLM(NeuralModule):
         return {"predictions": NeuralType(('B', 'T'), PredictionsType())}
 
     def __init__(
-        self, vocab, beam_width, alpha, beta, lm_path, num_cpus, cutoff_prob=1.0, cutoff_top_n=40, input_tensor=False
+        self,
+        vocab,
+        beam_width,
+        alpha,
+        beta,
+        lm_path,
+        num_cpus,
+        cutoff_prob=1.0,
+        cutoff_top_n=40,
+        input_tensor=False,
+        decoder_type='ctc_decoders',
+        blank_skip_threshold=1.0,
     ):
+        if decoder_type not in ['ctc_decoders', 'nemo']:
+            raise ValueError(f"Unsupported decoder_type '{decoder_type}', must be 'ctc_decoders' or 'nemo'.")
 
-        try:
-            from ctc_decoders import Scorer, ctc_beam_search_decoder_batch
-        except ModuleNotFoundError:
-            raise ModuleNotFoundError(
-                "BeamSearchDecoderWithLM requires the installation of ctc_decoders "
-                "from scripts/asr_language_modeling/ngram_lm/install_beamsearch_decoders.sh"
-            )
+        if decoder_type == 'ctc_decoders':
+            try:
+                from ctc_decoders import Scorer, ctc_beam_search_decoder_batch
+            except ModuleNotFoundError:
+                raise ModuleNotFoundError(
+                    "BeamSearchDecoderWithLM requires the installation of ctc_decoders "
+                    "from scripts/asr_language_modeling/ngram_lm/install_beamsearch_decoders.sh, "
+                    "or decoder_type='nemo'"
+                )
 
         super().__init__()
 
-        if lm_path is not None:
-            self.scorer = Scorer(alpha, beta, model_path=lm_path, vocabulary=vocab)
+        self.scorer = None
+        self.beam_search_func = None
+        self.prefix_beam_search = None
+        if decoder_type == 'nemo':
+            self.prefix_beam_search = CTCPrefixBeamSearch(
+                vocabulary=vocab,
+                beam_width=beam_width,
+                alpha=alpha,
+                beta=beta,
+                language_model=lm_path,
+                cutoff_prob=cutoff_prob,
+                cutoff_top_n=cutoff_top_n,
+                blank_skip_threshold=blank_skip_threshold,
+            )
         else:
-            self.scorer = None
-        self.beam_search_func = ctc_beam_search_decoder_batch
+            if lm_path is not None:
+                self.scorer = Scorer(alpha, beta, model_path=lm_path, vocabulary=vocab)
+            self.beam_search_func = ctc_beam_search_decoder_batch
+        self.decoder_type = decoder_type
         self.vocab = vocab
         self.beam_width = beam_width
         self.num_cpus = num_cpus
@@ -91,6 +126,9 @@ class BeamSearchDecoderWithLM(NeuralModule):
             probs_list = []
             for i, prob in enumerate(probs):
                 probs_list.append(prob[: log_probs_length[i], :])
+        if self.prefix_beam_search is not None:
+            probs_list = [probs.cpu().numpy() if torch.is_tensor(probs) else probs for probs in probs_list]
+            return self.prefix_beam_search.decode_batch(probs_list, num_processes=self.num_cpus)
         res = self.beam_search_func(
             probs_list,
             self.vocab,
@@ -367,6 +367,35 @@ class StatelessTransducerDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable):
 
         return state_list
 
+    def batch_gather_states(self, batch_states: List[List[torch.Tensor]], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather decoder states at certain indices of one or more packed states.
+
+        Args:
+            batch_states (list): list of packed decoder states, which are concatenated along the batch dimension
+                N x [(B x C)]
+
+            indices (torch.Tensor): 1D tensor of indices into the concatenated batch.
+
+        Returns:
+            (tuple): packed decoder states of the gathered indices
+                [(len(indices) x C)]
+        """
+        if len(batch_states) == 1:
+            return [batch_states[0][0][indices]]
+
+        # States hold the label history, which is shorter at the start of a sequence. Left pad with blank labels.
+        context = max(states[0].size(1) for states in batch_states)
+        padded = []
+        for states in batch_states:
+            state = states[0]
+            if state.size(1) < context:
+                pad = torch.full(
+                    [state.size(0), context - state.size(1)], self.blank_idx, dtype=state.dtype, device=state.device
+                )
+                state = torch.cat([pad, state], dim=1)
+            padded.append(state)
+        return [torch.cat(padded, dim=0)[indices]]
+
     def batch_copy_states(
         self,
         old_states: List[torch.Tensor],
@@ -1013,6 +1042,28 @@ class RNNTDecoder(rnnt_abstract.AbstractRNNTDecoder, Exportable, AdapterModuleMi
 
         return state_list
 
+    def batch_gather_states(self, batch_states: List[List[torch.Tensor]], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather decoder states at certain indices of one or more packed states.
+
+        Args:
+            batch_states (list): list of packed decoder states, which are concatenated along the batch dimension
+                N x (L x B x H, L x B x H)
+
+            indices (torch.Tensor): 1D tensor of indices into the concatenated batch.
+
+        Returns:
+            (tuple): packed decoder states of the gathered indices
+                (L x len(indices) x H, L x len(indices) x H)
+        """
+        state_list = []
+        for state_id in range(len(batch_states[0])):
+            if len(batch_states) == 1:
+                state = batch_states[0][state_id]
+            else:
+                state = torch.cat([states[state_id] for states in batch_states], dim=1)
+            state_list.append(state[:, indices])
+        return state_list
+
     def batch_copy_states(
         self,
         old_states: List[torch.Tensor],
@@ -248,6 +248,21 @@ class AbstractRNNTDecoder(NeuralModule, ABC):
         """
         raise NotImplementedError()
 
+    def batch_gather_states(self, batch_states: List[List[torch.Tensor]], indices: torch.Tensor) -> List[torch.Tensor]:
+        """Gather decoder states at certain indices of one or more packed states.
+
+        Args:
+            batch_states (list): list of packed decoder states, which are concatenated along the batch dimension
+                [N x ([L x (B, H)], [L x (B, H)])]
+
+            indices (torch.Tensor): 1D tensor of indices into the concatenated batch.
+
+        Returns:
+            (tuple): packed decoder states of the gathered indices
+                ([L x (len(indices), H)], [L x (len(indices), H)])
+        """
+        raise NotImplementedError()
+
     def batch_copy_states(
         self,
         old_states: List[torch.Tensor],
@@ -394,6 +394,26 @@ class ASRModuleMixin(ASRAdapterModelMixin):
             self, context_window=context_window, update_config=update_config
         )
 
+    def prepare_for_cpu_inference(
+        self, dtype: torch.dtype = torch.qint8, fold_batch_norm: bool = True, quantize_pointwise_conv: bool = True
+    ):
+        """
+        Converts the model, in place, into an inference variant optimized for CPU if the model contains an `encoder`
+        which is an instance of `ConformerEncoder` or `ConvASREncoder`.
+
+        The batch normalizations of the encoder are folded into the preceding convolutions, and its linear layers and
+        pointwise convolutions are dynamically quantized. The decoding stack is unchanged. The converted model only
+        runs on CPU, and should not be trained or saved over the original checkpoint.
+
+        Args:
+            dtype: The type of the quantized weights, `torch.qint8` or `torch.float16`.
+            fold_batch_norm: Whether to fold the batch normalizations into the convolutions.
+            quantize_pointwise_conv: Whether to quantize the pointwise convolutions along with the linear layers.
+        """
+        asr_module_utils.prepare_for_cpu_inference(
+            self, dtype=dtype, fold_batch_norm=fold_batch_norm, quantize_pointwise_conv=quantize_pointwise_conv
+        )
+
     def conformer_stream_step(
         self,
         processed_signal: torch.Tensor,
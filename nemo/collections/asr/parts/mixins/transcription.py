@@ -0,0 +1,232 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union
+
+import librosa
+import numpy as np
+import soundfile as sf
+import torch
+from tqdm.auto import tqdm
+
+from nemo.collections.asr.parts.preprocessing.features import WaveformFeaturizer
+from nemo.utils import logging
+
+__all__ = ['TranscriptionMixin', 'TranscriptionAudioDataset', 'get_audio_duration', 'length_sorted_batches']
+
+AudioInput = Union[str, np.ndarray, torch.Tensor]
+
+
+def get_audio_duration(audio: AudioInput, sample_rate: int) -> float:
+    """
+    Returns the duration in seconds of an audio file or of mono samples at `sample_rate`. The duration of a file is
+    read from its header, without decoding the audio.
+    """
+    if not isinstance(audio, str):
+        return len(audio) / sample_rate
+    try:
+        return sf.info(audio).duration
+    except RuntimeError:
+        # Formats which libsndfile cannot read, e.g. mp3
+        return librosa.get_duration(filename=audio)
+
+
+def length_sorted_batches(durations: Sequence[float], batch_size: int) -> List[List[int]]:
+    """
+    Groups the indices of `durations` into batches of at most `batch_size` inputs of similar duration, which
+    minimizes padding. The longest inputs come first, so that running out of memory happens early.
+    """
+    order = np.argsort(-np.asarray(durations, dtype=np.float64), kind='stable')
+    return [order[i : i + batch_size].tolist() for i in range(0, len(order), batch_size)]
+
+
+class TranscriptionAudioDataset(torch.utils.data.Dataset):
+    """
+    Dataset of audio inputs for transcription. Inputs are paths to audio files, which are loaded and resampled to
+    `sample_rate`, or mono samples at `sample_rate` as numpy arrays or tensors. Items are tuples of the signal, its
+    length and the index of the input.
+
+    Args:
+        audio: List of audio inputs.
+        sample_rate: Sample rate of the model.
+    """
+
+    def __init__(self, audio: Sequence[AudioInput], sample_rate: int):
+        self.audio = audio
+        self.featurizer = WaveformFeaturizer(sample_rate=sample_rate)
+
+    def __len__(self):
+        return len(self.audio)
+
+    def __getitem__(self, index):
+        audio = self.audio[index]
+        if isinstance(audio, str):
+            signal = self.featurizer.process(audio)
+        else:
+            signal = torch.as_tensor(audio, dtype=torch.float32)
+            if signal.dim() != 1:
+                raise ValueError(f"Expected mono audio samples of shape [time], got shape {tuple(signal.shape)}")
+        return signal, torch.tensor(signal.shape[0]).long(), index
+
+    @staticmethod
+    def collate_fn(batch):
+        signals, signal_lens, indices = zip(*batch)
+        max_len = max(signal_len.item() for signal_len in signal_lens)
+        padded = torch.zeros(len(signals), max_len)
+        for i, signal in enumerate(signals):
+            padded[i, : signal.shape[0]] = signal
+        return padded, torch.stack(signal_lens), list(indices)
+
+
+def _prefetch(iterable: Iterable, depth: int) -> Iterator:
+    """Iterates over `iterable` in a background thread, with up to `depth` items ready ahead of the consumer."""
+    items = queue.Queue(maxsize=depth)
+    sentinel = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put((sentinel, None))
+        except Exception as e:
+            items.put((sentinel, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class TranscriptionMixin(ABC):
+    """
+    Adds `transcribe_audio` to ASR models, which transcribes paths to audio files as well as in-memory audio in
+    length-sorted batches. Models implement `_transcribe_batch`.
+    """
+
+    @abstractmethod
+    def _transcribe_batch(
+        self, input_signal: torch.Tensor, input_signal_length: torch.Tensor, return_hypotheses: bool
+    ) -> List[Any]:
+        """Returns the transcript, or the hypothesis if `return_hypotheses`, of every input of a batch."""
+        pass
+
+    @contextlib.contextmanager
+    def _transcription_mode(self):
+        """Puts the model in evaluation mode without dither and padding, and restores it afterwards."""
+        mode = self.training
+        dither_value = self.preprocessor.featurizer.dither
+        pad_to_value = self.preprocessor.featurizer.pad_to
+        logging_level = logging.get_verbosity()
+        try:
+            self.preprocessor.featurizer.dither = 0.0
+            self.preprocessor.featurizer.pad_to = 0
+            self.eval()
+            logging.set_verbosity(logging.WARNING)
+            with torch.no_grad():
+                yield
+        finally:
+            self.train(mode=mode)
+            self.preprocessor.featurizer.dither = dither_value
+            self.preprocessor.featurizer.pad_to = pad_to_value
+            logging.set_verbosity(logging_level)
+
+    def transcribe_audio(
+        self,
+        audio: Sequence[AudioInput],
+        batch_size: int = 16,
+        return_hypotheses: bool = False,
+        num_workers: int = 0,
+        prefetch_batches: int = 2,
+        sort_by_duration: bool = True,
+        verbose: bool = True,
+    ) -> List[Any]:
+        """
+        Transcribes audio files and in-memory audio with the current decoding strategy of the model.
+
+        Unlike `transcribe`, inputs are batched by duration: they are sorted by their real duration (read from the
+        file headers), so that every batch holds inputs of similar length and little compute is spent on padding.
+        Audio is loaded ahead of the model, by `num_workers` DataLoader workers or, without workers, by a background
+        thread, so that loading overlaps with the forward pass.
+
+        Args:
+            audio: List of paths to audio files, or of mono samples at the sample rate of the model as 1D numpy
+                arrays or tensors. Both can be mixed.
+            batch_size: Maximum number of inputs per batch.
+            return_hypotheses: Return `Hypothesis` objects instead of transcripts.
+            num_workers: Number of DataLoader workers which load the audio.
+            prefetch_batches: Number of batches loaded ahead of the model.
+            sort_by_duration: Batch inputs of similar duration together. If False, inputs are batched in order.
+            verbose: Display a progress bar.
+
+        Returns:
+            A list with the transcript (or hypothesis) of every input, in the order of `audio`.
+        """
+        if audio is None or len(audio) == 0:
+            return []
+        if isinstance(audio, (str, np.ndarray, torch.Tensor)):
+            raise ValueError("`audio` must be a list of audio inputs")
+
+        sample_rate = self.preprocessor._sample_rate
+        if sort_by_duration:
+            batches = length_sorted_batches([get_audio_duration(a, sample_rate) for a in audio], batch_size)
+        else:
+            batches = [list(range(i, min(i + batch_size, len(audio)))) for i in range(0, len(audio), batch_size)]
+
+        device = next(self.parameters()).device
+        loader_kwargs = {}
+        if num_workers > 0:
+            # The prefetch factor of the DataLoader counts batches per worker.
+            loader_kwargs['prefetch_factor'] = max(1, -(-prefetch_batches // num_workers))
+        dataloader = torch.utils.data.DataLoader(
+            TranscriptionAudioDataset(audio, sample_rate),
+            batch_sampler=batches,
+            collate_fn=TranscriptionAudioDataset.collate_fn,
+            num_workers=num_workers,
+            pin_memory=device.type == 'cuda',
+            **loader_kwargs,
+        )
+        batch_iterator = dataloader if num_workers > 0 else _prefetch(dataloader, depth=max(prefetch_batches, 1))
+
+        results: List[Optional[Any]] = [None] * len(audio)
+        with self._transcription_mode():
+            for signal, signal_len, indices in tqdm(
+                batch_iterator, total=len(batches), desc="Transcribing", disable=not verbose
+            ):
+                outputs = self._transcribe_batch(
+                    input_signal=signal.to(device, non_blocking=True),
+                    input_signal_length=signal_len.to(device, non_blocking=True),
+                    return_hypotheses=return_hypotheses,
+                )
+                for index, output in zip(indices, outputs):
+                    results[index] = output
+        return results
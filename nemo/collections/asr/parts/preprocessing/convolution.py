@@ -0,0 +1,137 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import hashlib
+from typing import List, Sequence, Union
+
+import numpy as np
+from scipy import fft as sp_fft
+
+__all__ = ['FFTConvolver', 'fft_convolve']
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+class FFTConvolver:
+    """
+    Overlap-add FFT convolution of audio with impulse responses, e.g. RIRs.
+
+    Signals are cut into blocks which, convolved with the longest impulse response of a call, fit a power-of-two
+    FFT. The spectra of the impulse responses are cached by content and FFT size, so convolving many signals with
+    the same RIR, e.g. the RIRs of a pool or of a simulated room, transforms the RIR only once. All blocks of
+    all signals of a call are transformed together.
+
+    Args:
+        cache_size: Maximum number of cached impulse response spectra.
+    """
+
+    def __init__(self, cache_size: int = 64):
+        self.cache_size = cache_size
+        self._spectra = collections.OrderedDict()
+
+    @staticmethod
+    def fft_size(signal_len: int, impulse_len: int) -> int:
+        """
+        Returns the FFT size for the given lengths: the smallest power of two which holds the whole convolution,
+        capped at eight times the impulse response length. It is never smaller than twice the impulse response
+        length, so that the output of a block only overlaps with the next block.
+        """
+        return min(_next_pow2(8 * impulse_len), _next_pow2(max(signal_len + impulse_len - 1, 2 * impulse_len)))
+
+    def spectrum(self, impulse: np.ndarray, n_fft: int) -> np.ndarray:
+        """Returns the (cached) real FFT of size `n_fft` of `impulse`."""
+        key = (hashlib.blake2b(impulse.tobytes(), digest_size=16).digest(), impulse.dtype.str, n_fft)
+        spectrum = self._spectra.get(key)
+        if spectrum is None:
+            spectrum = sp_fft.rfft(impulse, n=n_fft)
+            self._spectra[key] = spectrum
+            if len(self._spectra) > self.cache_size:
+                self._spectra.popitem(last=False)
+        else:
+            self._spectra.move_to_end(key)
+        return spectrum
+
+    def convolve(
+        self, signals: Sequence[np.ndarray], impulses: Union[np.ndarray, Sequence[np.ndarray]], mode: str = 'full',
+    ) -> List[np.ndarray]:
+        """
+        Convolves a batch of signals with impulse responses.
+
+        Args:
+            signals: List of 1D signals of any length.
+            impulses: A single 1D impulse response for all signals, or a list with one impulse response per signal.
+            mode: 'full' returns the whole convolution of length ``len(signal) + len(impulse) - 1``, 'same' returns
+                its center of length ``len(signal)``, like `scipy.signal.convolve`.
+
+        Returns:
+            List of the convolved signals, float32 unless an input is float64.
+        """
+        if mode not in ('full', 'same'):
+            raise ValueError(f"Unsupported mode `{mode}`, supported: ('full', 'same')")
+        signals = [np.asarray(signal) for signal in signals]
+        if isinstance(impulses, np.ndarray) and impulses.ndim == 1:
+            impulses = [impulses] * len(signals)
+        impulses = [np.asarray(impulse) for impulse in impulses]
+        if len(impulses) != len(signals):
+            raise ValueError(f"Got {len(impulses)} impulse responses for {len(signals)} signals")
+        if len(signals) == 0:
+            return []
+
+        dtype = np.result_type(*signals, *impulses, np.float32)
+        max_impulse_len = max(len(impulse) for impulse in impulses)
+        n_fft = self.fft_size(max(len(signal) for signal in signals), max_impulse_len)
+        block = n_fft - max_impulse_len + 1
+        tail = n_fft - block
+
+        num_blocks = [max(-(-len(signal) // block), 1) for signal in signals]
+        frames = np.zeros((sum(num_blocks), block), dtype=dtype)
+        flat_frames = frames.reshape(-1)
+        start = 0
+        for signal, signal_blocks in zip(signals, num_blocks):
+            flat_frames[start * block : start * block + len(signal)] = signal
+            start += signal_blocks
+
+        spectra = sp_fft.rfft(frames, n=n_fft, axis=-1)
+        start = 0
+        for impulse, signal_blocks in zip(impulses, num_blocks):
+            spectra[start : start + signal_blocks] *= self.spectrum(impulse.astype(dtype, copy=False), n_fft)
+            start += signal_blocks
+        blocks = sp_fft.irfft(spectra, n=n_fft, axis=-1)
+
+        outputs, start = [], 0
+        for signal, impulse, signal_blocks in zip(signals, impulses, num_blocks):
+            signal_out = blocks[start : start + signal_blocks]
+            start += signal_blocks
+
+            # Overlap-add: the last `tail` samples of every block spill over into the next block.
+            output = np.zeros((signal_blocks + 1) * block, dtype=dtype)
+            output[: signal_blocks * block] = signal_out[:, :block].reshape(-1)
+            output[block:].reshape(signal_blocks, block)[:, :tail] += signal_out[:, block:]
+
+            output = output[: len(signal) + len(impulse) - 1]
+            if mode == 'same':
+                offset = (len(impulse) - 1) // 2
+                output = output[offset : offset + len(signal)]
+            outputs.append(output)
+        return outputs
+
+
+_default_convolver = FFTConvolver()
+
+
+def fft_convolve(signal: np.ndarray, impulse: np.ndarray, mode: str = 'full') -> np.ndarray:
+    """Convolves a single signal with an impulse response through the process-wide `FFTConvolver` and its cache."""
+    return _default_convolver.convolve([signal], impulse, mode=mode)[0]
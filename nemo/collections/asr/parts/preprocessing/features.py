@@ -34,6 +34,8 @@
 # This file contains code artifacts adapted from https://github.com/ryanleary/patter
 import math
 import random
+from dataclasses import dataclass
+from typing import Optional
 
 import librosa
 import numpy as np
@@ -100,10 +102,11 @@ def splice_frames(x, frame_splicing):
 
 
 class WaveformFeaturizer(object):
-    def __init__(self, sample_rate=16000, int_values=False, augmentor=None):
+    def __init__(self, sample_rate=16000, int_values=False, augmentor=None, resample_quality=None):
         self.augmentor = augmentor if augmentor is not None else AudioAugmentor()
         self.sample_rate = sample_rate
         self.int_values = int_values
+        self.resample_quality = resample_quality
 
     def max_augmentation_length(self, length):
         return self.augmentor.max_augmentation_length(length)
@@ -132,6 +135,7 @@ class WaveformFeaturizer(object):
             trim_frame_length=trim_frame_length,
             trim_hop_length=trim_hop_length,
             orig_sr=orig_sr,
+            resample_quality=self.resample_quality,
         )
         return self.process_segment(audio)
 
@@ -148,8 +152,9 @@ class WaveformFeaturizer(object):
 
         sample_rate = input_config.get("sample_rate", 16000)
         int_values = input_config.get("int_values", False)
+        resample_quality = input_config.get("resample_quality", None)
 
-        return cls(sample_rate=sample_rate, int_values=int_values, augmentor=aa)
+        return cls(sample_rate=sample_rate, int_values=int_values, augmentor=aa, resample_quality=resample_quality)
 
 
 class FeaturizerFactory(object):
@@ -161,6 +166,32 @@ class FeaturizerFactory(object):
         return WaveformFeaturizer.from_config(input_cfg, perturbation_configs=perturbation_configs)
 
 
+@dataclass
+class FilterbankStreamingState:
+    """
+    State of the streaming mode of `FilterbankFeatures` for a batch of audio streams.
+
+    Every field is None before the first chunk of the streams.
+    """
+
+    # Samples which were received but are not covered by an emitted frame yet, after pre-emphasis [B, S]
+    samples: Optional[torch.Tensor] = None
+    # The last samples of the padded signal, which are reflected at the end of the streams
+    tail: Optional[torch.Tensor] = None
+    # The last raw sample of the streams, for the pre-emphasis of the next chunk [B]
+    last_sample: Optional[torch.Tensor] = None
+    # Number of frames emitted since the beginning of the streams
+    num_frames: int = 0
+    # Running sums of the log mel features and of their squares, for `per_feature` normalization [B, D],
+    # or `all_features` normalization [B, 1]
+    feature_sum: Optional[torch.Tensor] = None
+    feature_sq_sum: Optional[torch.Tensor] = None
+    # The normalization statistics of all the frames emitted so far, computed like `normalize_batch`
+    mean: Optional[torch.Tensor] = None
+    std: Optional[torch.Tensor] = None
+    finished: bool = False
+
+
 class FilterbankFeatures(nn.Module):
     """Featurizer that converts wavs to Mel Spectrograms.
     See AudioToMelSpectrogramPreprocessor for args.
@@ -329,26 +360,8 @@ class FilterbankFeatures(nn.Module):
     def filter_banks(self):
         return self.fb
 
-    def forward(self, x, seq_len):
-        seq_len = self.get_seq_len(seq_len.float())
-
-        if self.stft_pad_amount is not None:
-            x = torch.nn.functional.pad(
-                x.unsqueeze(1), (self.stft_pad_amount, self.stft_pad_amount), "reflect"
-            ).squeeze(1)
-
-        # dither (only in training mode for eval determinism)
-        if self.training and self.dither > 0:
-            x += self.dither * torch.randn_like(x)
-
-        # do preemphasis
-        if self.preemph is not None:
-            x = torch.cat((x[:, 0].unsqueeze(1), x[:, 1:] - self.preemph * x[:, :-1]), dim=1)
-
-        # disable autocast to get full range of stft values
-        with torch.cuda.amp.autocast(enabled=False):
-            x = self.stft(x)
-
+    def _stft_to_features(self, x):
+        """Computes the log mel features, with frame splicing, from the output of the STFT."""
         # torch returns real, imag; so convert to magnitude
         # guard is needed for sqrt if grads are passed through
         guard = 0 if not self.use_grads else CONSTANT
@@ -380,6 +393,155 @@ class FilterbankFeatures(nn.Module):
         # frame splicing if required
         if self.frame_splicing > 1:
             x = splice_frames(x, self.frame_splicing)
+        return x
+
+    @torch.no_grad()
+    def stream(self, x, state=None, last=False):
+        """
+        Computes the features of a batch of audio streams incrementally, one chunk of samples at a time.
+
+        Only the frames which are complete with the samples received so far are computed, so every sample goes
+        through the STFT once. The samples of the window overlap are kept in the state until the next chunk.
+        After the last chunk, the frames are the same as the frames of `forward` on the whole streams.
+
+        `per_feature` and `all_features` normalization use the running statistics of all the frames emitted since
+        the beginning of the streams, computed like `normalize_batch`. They are stored in `state.mean` and
+        `state.std`, so the frames emitted earlier can be normalized again with the statistics of the whole
+        streams. Dither, narrowband augmentation and padding to `pad_to` are not applied.
+
+        Args:
+            x: Chunk of samples of every stream [B, T]. All the streams of the batch receive chunks of the same
+                length, and the first chunk must be longer than the padding of the STFT.
+            state: The state returned by the previous call, or None for the first chunk.
+            last: Whether this is the last chunk of the streams.
+
+        Returns:
+            A tuple of the new frames [B, D, N], where N may be 0, and of the state for the next chunk.
+        """
+        if state is None:
+            state = FilterbankStreamingState()
+        if state.finished:
+            raise ValueError(f"{self} received a chunk after the last chunk of the streams.")
+
+        x = x.to(dtype=torch.float)
+        pad_amount = self.stft_pad_amount if self.stft_pad_amount is not None else self.n_fft // 2
+        first = state.samples is None
+        if first and x.shape[1] <= pad_amount:
+            raise ValueError(
+                f"{self} received a first chunk of {x.shape[1]} samples, but it must be longer than the "
+                f"{pad_amount} samples of padding of the STFT."
+            )
+
+        # The signal is padded before pre-emphasis with exact_pad, and after pre-emphasis otherwise (by torch.stft)
+        if self.stft_pad_amount is not None:
+            if first:
+                x = torch.cat([x[:, 1 : pad_amount + 1].flip(1), x], dim=1)
+            x, state.tail = self._append_tail(x, state.tail, pad_amount, last)
+            x = self._stream_preemphasis(x, state)
+        else:
+            x = self._stream_preemphasis(x, state)
+            if first:
+                x = torch.cat([x[:, 1 : pad_amount + 1].flip(1), x], dim=1)
+            x, state.tail = self._append_tail(x, state.tail, pad_amount, last)
+
+        samples = x if first else torch.cat([state.samples, x], dim=1)
+        num_frames = (samples.shape[1] - self.n_fft) // self.hop_length + 1 if samples.shape[1] >= self.n_fft else 0
+        if num_frames > 0:
+            with torch.cuda.amp.autocast(enabled=False):
+                x = torch.stft(
+                    samples[:, : (num_frames - 1) * self.hop_length + self.n_fft],
+                    n_fft=self.n_fft,
+                    hop_length=self.hop_length,
+                    win_length=self.win_length,
+                    center=False,
+                    window=self.window.to(dtype=torch.float),
+                    return_complex=False,
+                )
+            x = self._stft_to_features(x)
+        else:
+            num_features = self.nfilt * self.frame_splicing
+            x = torch.zeros(samples.shape[0], num_features, 0, dtype=samples.dtype, device=samples.device)
+        state.samples = samples[:, num_frames * self.hop_length :]
+        state.num_frames += num_frames
+        state.finished = last
+
+        if self.normalize in ("per_feature", "all_features"):
+            x = self._stream_normalize(x, state)
+        elif self.normalize:
+            seq_len = torch.full((x.shape[0],), x.shape[2], dtype=torch.long, device=x.device)
+            x, _, _ = normalize_batch(x, seq_len, normalize_type=self.normalize)
+        return x, state
+
+    def _stream_preemphasis(self, x, state):
+        if self.preemph is None or x.shape[1] == 0:
+            return x
+        if state.last_sample is None:
+            previous = x[:, :-1]
+            y = torch.cat((x[:, :1], x[:, 1:] - self.preemph * previous), dim=1)
+        else:
+            previous = torch.cat((state.last_sample.unsqueeze(1), x[:, :-1]), dim=1)
+            y = x - self.preemph * previous
+        state.last_sample = x[:, -1]
+        return y
+
+    @staticmethod
+    def _append_tail(x, tail, pad_amount, last):
+        """Keeps the last samples of the signal, and appends their reflection at the end of the last chunk."""
+        tail = x if tail is None else torch.cat([tail, x], dim=1)
+        tail = tail[:, -(pad_amount + 1) :]
+        if last:
+            x = torch.cat([x, tail[:, :-1].flip(1)], dim=1)
+        return x, tail
+
+    def _stream_normalize(self, x, state):
+        x64 = x.double()
+        if self.normalize == "per_feature":
+            frame_sum, frame_sq_sum = x64.sum(dim=2), x64.pow(2).sum(dim=2)
+            count = state.num_frames
+        else:
+            frame_sum, frame_sq_sum = x64.sum(dim=(1, 2)).unsqueeze(1), x64.pow(2).sum(dim=(1, 2)).unsqueeze(1)
+            count = state.num_frames * x.shape[1]
+        if state.feature_sum is None:
+            state.feature_sum, state.feature_sq_sum = frame_sum, frame_sq_sum
+        else:
+            state.feature_sum = state.feature_sum + frame_sum
+            state.feature_sq_sum = state.feature_sq_sum + frame_sq_sum
+
+        if count == 0:
+            return x
+        if count < 2:
+            raise ValueError(
+                f"{self} with `{self.normalize}` normalization emitted a single value so far. This will result in an "
+                "undefined standard deviation. Make sure the first chunks have enough samples for several features."
+            )
+        # Unbiased standard deviation, like torch.std() in normalize_batch
+        mean = state.feature_sum / count
+        variance = (state.feature_sq_sum - count * mean.pow(2)) / (count - 1)
+        state.mean = mean.to(dtype=x.dtype)
+        state.std = variance.clamp(min=0.0).sqrt().to(dtype=x.dtype) + CONSTANT
+        return (x - state.mean.unsqueeze(2)) / state.std.unsqueeze(2)
+
+    def forward(self, x, seq_len):
+        seq_len = self.get_seq_len(seq_len.float())
+
+        if self.stft_pad_amount is not None:
+            x = torch.nn.functional.pad(
+                x.unsqueeze(1), (self.stft_pad_amount, self.stft_pad_amount), "reflect"
+            ).squeeze(1)
+
+        # dither (only in training mode for eval determinism)
+        if self.training and self.dither > 0:
+            x += self.dither * torch.randn_like(x)
+
+        # do preemphasis
+        if self.preemph is not None:
+            x = torch.cat((x[:, 0].unsqueeze(1), x[:, 1:] - self.preemph * x[:, :-1]), dim=1)
+
+        # disable autocast to get full range of stft values
+        with torch.cuda.amp.autocast(enabled=False):
+            x = self.stft(x)
+
+        x = self._stft_to_features(x)
 
         # normalize if required
         if self.normalize:
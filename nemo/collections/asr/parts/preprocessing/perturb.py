@@ -34,18 +34,20 @@
 # This file contains code artifacts adapted from https://github.com/ryanleary/patter
 import copy
 import io
+import mmap
 import os
 import random
 import subprocess
 from tempfile import NamedTemporaryFile
-from typing import List, Optional, Union
+from typing import Callable, List, Optional, Union
 
 import librosa
 import numpy as np
 import soundfile as sf
-from scipy import signal
 from torch.utils.data import IterableDataset
 
+from nemo.collections.asr.parts.preprocessing.convolution import fft_convolve
+from nemo.collections.asr.parts.preprocessing.resample import resample
 from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
 from nemo.collections.common.parts.preprocessing import collections, parsers
 from nemo.utils import logging
@@ -69,7 +71,7 @@ except (ImportError, ModuleNotFoundError):
     HAVE_NUMBA = False
 
 
-def read_one_audiosegment(manifest, target_sr, rng, tarred_audio=False, audio_dataset=None):
+def read_one_audiosegment(manifest, target_sr, rng, tarred_audio=False, audio_dataset=None, resample_quality=None):
 
     if tarred_audio:
         if audio_dataset is None:
@@ -87,7 +89,93 @@ def read_one_audiosegment(manifest, target_sr, rng, tarred_audio=False, audio_da
         offset = 0 if audio_record.offset is None else audio_record.offset
         duration = 0 if audio_record.duration is None else audio_record.duration
 
-    return AudioSegment.from_file(audio_file, target_sr=target_sr, offset=offset, duration=duration)
+    return AudioSegment.from_file(
+        audio_file, target_sr=target_sr, offset=offset, duration=duration, resample_quality=resample_quality
+    )
+
+
+class AudioPool:
+    """
+    Pool of decoded recordings, e.g. noise or RIRs, which serves random recordings and crops without disk I/O.
+
+    `pool_size` recordings are decoded once with `load_fn` at the sample rate of the pool and concatenated into
+    a single anonymous shared memory map. A pool built before the DataLoader workers are forked, i.e. when
+    `sample_rate` is given, is shared by all workers without copies. After `refresh_every` draws, the drawing
+    process replaces its pool by a newly decoded random subset, so that all recordings of a large manifest are
+    eventually used.
+
+    Args:
+        load_fn: Callable which takes a sample rate and returns a random `AudioSegment` at that sample rate.
+        pool_size: Number of recordings in the pool.
+        sample_rate: Sample rate of the pool. If None, the pool is built on first use at the sample rate of the data.
+        refresh_every: Number of draws after which the pool is rebuilt. 0 disables refreshing.
+        rng: Random number generator.
+    """
+
+    def __init__(
+        self,
+        load_fn: Callable[[int], AudioSegment],
+        pool_size: int,
+        sample_rate: Optional[int] = None,
+        refresh_every: int = 0,
+        rng: Optional[random.Random] = None,
+    ):
+        if pool_size < 1:
+            raise ValueError(f"`pool_size` must be at least 1, got {pool_size}")
+        self._load_fn = load_fn
+        self._pool_size = pool_size
+        self._refresh_every = refresh_every
+        self._rng = random.Random() if rng is None else rng
+
+        self._sample_rate = None
+        self._samples = None
+        self._offsets = None
+        self._num_draws = 0
+        if sample_rate is not None:
+            self._build(sample_rate)
+
+    def __len__(self) -> int:
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self._sample_rate
+
+    def _build(self, sample_rate: int):
+        recordings = [self._load_fn(sample_rate)._samples for _ in range(self._pool_size)]
+        offsets = np.cumsum([0] + [len(recording) for recording in recordings])
+
+        # Anonymous shared mapping, inherited by forked processes without copying.
+        buffer = mmap.mmap(-1, max(int(offsets[-1]), 1) * np.dtype(np.float32).itemsize)
+        samples = np.frombuffer(buffer, dtype=np.float32, count=int(offsets[-1]))
+        for recording, start, end in zip(recordings, offsets[:-1], offsets[1:]):
+            samples[start:end] = recording
+        samples.flags.writeable = False
+
+        self._sample_rate, self._samples, self._offsets = sample_rate, samples, offsets
+        self._num_draws = 0
+        logging.debug(f"Decoded {self._pool_size} recordings ({offsets[-1] / sample_rate:.1f}s) into an audio pool")
+
+    def sample(self, sample_rate: int, num_samples: Optional[int] = None) -> AudioSegment:
+        """
+        Returns a random recording of the pool as a new `AudioSegment`, which can be modified in place.
+
+        Args:
+            sample_rate: Required sample rate. The pool is rebuilt if it was decoded at a different sample rate.
+            num_samples: If set, a random crop of at most `num_samples` samples of the recording is returned.
+        """
+        refresh = self._refresh_every > 0 and self._num_draws >= self._refresh_every
+        if self._samples is None or self._sample_rate != sample_rate or refresh:
+            self._build(sample_rate)
+        self._num_draws += 1
+
+        index = self._rng.randrange(len(self))
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        if num_samples is not None and end - start > num_samples:
+            start = self._rng.randint(start, end - num_samples)
+            end = start + num_samples
+        # The float32 conversion of AudioSegment copies the samples out of the shared buffer.
+        return AudioSegment(self._samples[start:end], self._sample_rate)
 
 
 class Perturbation(object):
@@ -112,6 +200,7 @@ class SpeedPerturbation(Perturbation):
             For better speed using `resampy`'s fast resampling method, use `resample_type='kaiser_fast'`.
             For high-quality resampling, set `resample_type='kaiser_best'`.
             To use `scipy.signal.resample`, set `resample_type='fft'` or `resample_type='scipy'`
+            To resample with a cached polyphase filter of `resample_quality`, set `resample_type='polyphase'`.
         min_speed_rate: Minimum sampling rate modifier.
         max_speed_rate: Maximum sampling rate modifier.
         num_rates: Number of discrete rates to allow. Can be a positive or negative
@@ -127,16 +216,21 @@ class SpeedPerturbation(Perturbation):
             in such a case is = `prob * (num_rates - 1 / num_rates) * 100`% chance
             where `prob` is the global probability of a sample being augmented.
         rng: Random seed number.
+        resample_quality: Quality of the polyphase resampling, one of 'fast', 'medium' or 'best'.
     """
 
-    def __init__(self, sr, resample_type, min_speed_rate=0.9, max_speed_rate=1.1, num_rates=5, rng=None):
+    def __init__(
+        self, sr, resample_type, min_speed_rate=0.9, max_speed_rate=1.1, num_rates=5, rng=None, resample_quality=None,
+    ):
 
         min_rate = min(min_speed_rate, max_speed_rate)
         if min_rate < 0.0:
             raise ValueError("Minimum sampling rate modifier must be > 0.")
 
-        if resample_type not in ('kaiser_best', 'kaiser_fast', 'fft', 'scipy'):
-            raise ValueError("Supported `resample_type` values are ('kaiser_best', 'kaiser_fast', 'fft', 'scipy')")
+        if resample_type not in ('polyphase', 'kaiser_best', 'kaiser_fast', 'fft', 'scipy'):
+            raise ValueError(
+                "Supported `resample_type` values are ('polyphase', 'kaiser_best', 'kaiser_fast', 'fft', 'scipy')"
+            )
 
         self._sr = sr
         self._min_rate = min_speed_rate
@@ -145,6 +239,7 @@ class SpeedPerturbation(Perturbation):
         if num_rates > 0:
             self._rates = np.linspace(self._min_rate, self._max_rate, self._num_rates, endpoint=True)
         self._res_type = resample_type
+        self._resample_quality = resample_quality
         self._rng = random.Random() if rng is None else rng
 
     def max_augmentation_length(self, length):
@@ -161,10 +256,16 @@ class SpeedPerturbation(Perturbation):
         if speed_rate == 1.0:
             return
 
-        new_sr = int(self._sr * speed_rate)
-        data._samples = librosa.core.resample(
-            data._samples, orig_sr=self._sr, target_sr=new_sr, res_type=self._res_type
-        )
+        if self._res_type == 'polyphase':
+            # Round instead of truncating, so that e.g. 0.95 * 16000 maps to 15200 and not to 15199, which would
+            # need a polyphase filter with a much larger upsampling factor.
+            new_sr = int(round(self._sr * speed_rate))
+            data._samples = resample(data._samples, orig_sr=self._sr, target_sr=new_sr, quality=self._resample_quality)
+        else:
+            new_sr = int(self._sr * speed_rate)
+            data._samples = librosa.core.resample(
+                data._samples, orig_sr=self._sr, target_sr=new_sr, res_type=self._res_type
+            )
 
 
 class TimeStretchPerturbation(Perturbation):
@@ -305,13 +406,32 @@ class ImpulsePerturbation(Perturbation):
         audio_tar_filepaths (list): Tar files, if RIR audio files are tarred
         shuffle_n (int): Shuffle parameter for shuffling buffered files from the tar files
         shift_impulse (bool): Shift impulse response to adjust for delay at the beginning
+        pool_size (int): If positive, this number of RIRs is decoded once into an `AudioPool`, which serves
+            the RIRs without disk I/O. Defaults to 0, which reads a RIR file for every sample.
+        pool_refresh_every (int): Number of draws after which the pool is replaced by a new random subset of RIRs.
+        pool_sample_rate (int): Sample rate of the pool. If set, the pool is built at construction time and shared
+            with the DataLoader workers, otherwise it is built by every worker at the sample rate of the data.
+        resample_quality (str): Optional quality of a polyphase resampling of the RIRs, one of 'fast', 'medium' or
+            'best'. If None, RIRs are resampled by librosa.
     """
 
-    def __init__(self, manifest_path=None, rng=None, audio_tar_filepaths=None, shuffle_n=128, shift_impulse=False):
+    def __init__(
+        self,
+        manifest_path=None,
+        rng=None,
+        audio_tar_filepaths=None,
+        shuffle_n=128,
+        shift_impulse=False,
+        pool_size=0,
+        pool_refresh_every=10000,
+        pool_sample_rate=None,
+        resample_quality=None,
+    ):
         self._manifest = collections.ASRAudioText(manifest_path, parser=parsers.make_parser([]), index_by_file_id=True)
         self._audiodataset = None
         self._tarred_audio = False
         self._shift_impulse = shift_impulse
+        self._resample_quality = resample_quality
         self._data_iterator = None
 
         if audio_tar_filepaths:
@@ -321,17 +441,34 @@ class ImpulsePerturbation(Perturbation):
 
         self._rng = random.Random() if rng is None else rng
 
-    def perturb(self, data):
-        impulse = read_one_audiosegment(
+        self._pool = None
+        if pool_size > 0:
+            self._pool = AudioPool(
+                self._read_one_impulse,
+                pool_size=pool_size,
+                sample_rate=pool_sample_rate,
+                refresh_every=pool_refresh_every,
+                rng=self._rng,
+            )
+
+    def _read_one_impulse(self, target_sr):
+        return read_one_audiosegment(
             self._manifest,
-            data.sample_rate,
+            target_sr,
             self._rng,
             tarred_audio=self._tarred_audio,
             audio_dataset=self._data_iterator,
+            resample_quality=self._resample_quality,
         )
+
+    def perturb(self, data):
+        if self._pool is not None:
+            impulse = self._pool.sample(data.sample_rate)
+        else:
+            impulse = self._read_one_impulse(data.sample_rate)
         if not self._shift_impulse:
             impulse_norm = (impulse.samples - min(impulse.samples)) / (max(impulse.samples) - min(impulse.samples))
-            data._samples = signal.fftconvolve(data._samples, impulse_norm, "same")
+            data._samples = fft_convolve(data._samples, impulse_norm, mode='same')
             data._samples = data._samples / max(
                 abs(data._samples)
             )  # normalize data samples to [-1,1] after rir convolution to avoid nans with fp16 training
@@ -342,7 +479,7 @@ class ImpulsePerturbation(Perturbation):
 
             impulse_resp = impulse_norm[max_ind:]
             delay_after = len(impulse_resp)
-            data._samples = signal.fftconvolve(data._samples, impulse_resp, "full")[:-delay_after]
+            data._samples = fft_convolve(data._samples, impulse_resp, mode='full')[:-delay_after]
             data._samples = data._samples / max(
                 abs(data._samples)
             )  # normalize data samples to [-1,1] after rir convolution to avoid nans with fp16 training
@@ -393,6 +530,13 @@ class NoisePerturbation(Perturbation):
         shuffle_n (int): Shuffle parameter for shuffling buffered files from the tar files
         orig_sr (int): Original sampling rate of the noise files
         rng: Random number generator
+        pool_size (int): If positive, this number of noise files is decoded once into an `AudioPool`, which serves
+            random noise crops without disk I/O. Defaults to 0, which reads a noise file for every sample.
+        pool_refresh_every (int): Number of draws after which the pool is replaced by a new random subset of files.
+        pool_sample_rate (int): Sample rate of the pool. If set, the pool is built at construction time and shared
+            with the DataLoader workers, otherwise it is built by every worker at the sample rate of the data.
+        resample_quality (str): Optional quality of a polyphase resampling of the noise files, one of 'fast',
+            'medium' or 'best'. If None, noise files are resampled by librosa.
     """
 
     def __init__(
@@ -405,11 +549,16 @@ class NoisePerturbation(Perturbation):
         audio_tar_filepaths=None,
         shuffle_n=100,
         orig_sr=16000,
+        pool_size=0,
+        pool_refresh_every=10000,
+        pool_sample_rate=None,
+        resample_quality=None,
     ):
         self._manifest = collections.ASRAudioText(manifest_path, parser=parsers.make_parser([]), index_by_file_id=True)
         self._audiodataset = None
         self._tarred_audio = False
         self._orig_sr = orig_sr
+        self._resample_quality = resample_quality
         self._data_iterator = None
 
         if audio_tar_filepaths:
@@ -422,23 +571,41 @@ class NoisePerturbation(Perturbation):
         self._max_snr_db = max_snr_db
         self._max_gain_db = max_gain_db
 
+        self._pool = None
+        if pool_size > 0:
+            self._pool = AudioPool(
+                self._read_one_noise,
+                pool_size=pool_size,
+                sample_rate=pool_sample_rate,
+                refresh_every=pool_refresh_every,
+                rng=self._rng,
+            )
+
     @property
     def orig_sr(self):
         return self._orig_sr
 
-    def get_one_noise_sample(self, target_sr):
+    def _read_one_noise(self, target_sr):
         return read_one_audiosegment(
-            self._manifest, target_sr, self._rng, tarred_audio=self._tarred_audio, audio_dataset=self._data_iterator
-        )
-
-    def perturb(self, data):
-        noise = read_one_audiosegment(
             self._manifest,
-            data.sample_rate,
+            target_sr,
             self._rng,
             tarred_audio=self._tarred_audio,
             audio_dataset=self._data_iterator,
+            resample_quality=self._resample_quality,
         )
+
+    def get_one_noise_sample(self, target_sr):
+        if self._pool is not None:
+            return self._pool.sample(target_sr)
+        return self._read_one_noise(target_sr)
+
+    def perturb(self, data):
+        if self._pool is not None:
+            # Only a crop of the length of the data is used.
+            noise = self._pool.sample(data.sample_rate, num_samples=data.num_samples)
+        else:
+            noise = self._read_one_noise(data.sample_rate)
         self.perturb_with_input_noise(data, noise)
 
     def perturb_with_input_noise(self, data, noise, data_rms=None):
@@ -538,6 +705,11 @@ class RirAndNoisePerturbation(Perturbation):
             bg_max_snr_db: Max SNR for background noise
             bg_noise_tar_filepaths: Tar files, if noise files are tarred
             bg_orig_sample_rate: Original sampling rate of background noise audio
+            pool_size: If positive, number of RIRs and noise files decoded into an `AudioPool` per perturber
+            pool_refresh_every: Number of draws after which the pools are replaced by new random subsets
+            pool_sample_rate: Sample rate of the pools, if they should be built at construction time
+            resample_quality: Optional quality of a polyphase resampling of the RIRs and noise files, one of 'fast',
+                'medium' or 'best'. If None, they are resampled by librosa.
 
     """
 
@@ -560,6 +732,10 @@ class RirAndNoisePerturbation(Perturbation):
         bg_max_snr_db=50,
         bg_noise_tar_filepaths=None,
         bg_orig_sample_rate=None,
+        pool_size=0,
+        pool_refresh_every=10000,
+        pool_sample_rate=None,
+        resample_quality=None,
     ):
 
         logging.info("Called Rir aug init")
@@ -570,6 +746,10 @@ class RirAndNoisePerturbation(Perturbation):
             audio_tar_filepaths=rir_tar_filepaths,
             shuffle_n=rir_shuffle_n,
             shift_impulse=True,
+            pool_size=pool_size,
+            pool_refresh_every=pool_refresh_every,
+            pool_sample_rate=pool_sample_rate,
+            resample_quality=resample_quality,
         )
         self._fg_noise_perturbers = {}
         self._bg_noise_perturbers = {}
@@ -585,6 +765,10 @@ class RirAndNoisePerturbation(Perturbation):
                     max_snr_db=max_snr_db[i],
                     audio_tar_filepaths=noise_tar_filepaths[i],
                     orig_sr=orig_sr,
+                    pool_size=pool_size,
+                    pool_refresh_every=pool_refresh_every,
+                    pool_sample_rate=pool_sample_rate,
+                    resample_quality=resample_quality,
                 )
         self._max_additions = max_additions
         self._max_duration = max_duration
@@ -600,6 +784,10 @@ class RirAndNoisePerturbation(Perturbation):
                     max_snr_db=bg_max_snr_db[i],
                     audio_tar_filepaths=bg_noise_tar_filepaths[i],
                     orig_sr=orig_sr,
+                    pool_size=pool_size,
+                    pool_refresh_every=pool_refresh_every,
+                    pool_sample_rate=pool_sample_rate,
+                    resample_quality=resample_quality,
                 )
 
         self._apply_noise_rir = apply_noise_rir
@@ -0,0 +1,99 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import math
+from typing import Optional, Tuple
+
+import librosa
+import numpy as np
+from scipy import signal
+
+__all__ = ['RESAMPLE_QUALITIES', 'DEFAULT_RESAMPLE_QUALITY', 'get_resample_filter', 'resample']
+
+# Parameters of the windowed-sinc low-pass filter of every quality level: number of zero crossings of the sinc
+# on each side, cutoff relative to the Nyquist frequency of the lower rate and beta of the Kaiser window.
+# `fast` and `best` follow the `kaiser_fast` and `kaiser_best` filters of resampy.
+RESAMPLE_QUALITIES = {
+    'fast': (16, 0.85, 8.555),
+    'medium': (32, 0.9, 11.0),
+    'best': (64, 0.9475, 14.77),
+}
+DEFAULT_RESAMPLE_QUALITY = 'medium'
+
+# Rate pairs whose reduced up/down factors exceed this value, e.g. random speed perturbation rates, would need
+# very long polyphase filters. They are resampled by librosa instead.
+_MAX_POLYPHASE_FACTOR = 1024
+
+_LIBROSA_RES_TYPES = {'fast': 'kaiser_fast', 'medium': 'kaiser_best', 'best': 'kaiser_best'}
+
+
+@functools.lru_cache(maxsize=64)
+def get_resample_filter(
+    orig_sr: int, target_sr: int, quality: str = DEFAULT_RESAMPLE_QUALITY
+) -> Tuple[int, int, np.ndarray]:
+    """
+    Designs the polyphase low-pass filter which resamples from `orig_sr` to `target_sr`.
+    Filters are cached per (orig_sr, target_sr, quality), so they are designed once per process.
+
+    Args:
+        orig_sr: Original sample rate.
+        target_sr: Target sample rate.
+        quality: One of the keys of `RESAMPLE_QUALITIES`.
+
+    Returns:
+        A tuple of the upsampling factor, the downsampling factor and the float32 filter coefficients.
+    """
+    if quality not in RESAMPLE_QUALITIES:
+        raise ValueError(f"Unsupported resample quality `{quality}`, supported: {list(RESAMPLE_QUALITIES)}")
+    num_zeros, rolloff, beta = RESAMPLE_QUALITIES[quality]
+
+    gcd = math.gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // gcd, int(orig_sr) // gcd
+    max_rate = max(up, down)
+    half_len = num_zeros * max_rate
+    taps = signal.firwin(2 * half_len + 1, rolloff / max_rate, window=('kaiser', beta))
+    taps = taps.astype(np.float32)
+    taps.setflags(write=False)
+    return up, down, taps
+
+
+def resample(samples: np.ndarray, orig_sr: int, target_sr: int, quality: Optional[str] = None) -> np.ndarray:
+    """
+    Resamples the last axis of `samples` from `orig_sr` to `target_sr` with a cached polyphase filter.
+    The output has ``ceil(num_samples * target_sr / orig_sr)`` samples along the last axis, like `librosa.resample`.
+
+    Args:
+        samples: Audio samples, resampled along the last axis.
+        orig_sr: Original sample rate.
+        target_sr: Target sample rate.
+        quality: One of the keys of `RESAMPLE_QUALITIES`, defaults to `DEFAULT_RESAMPLE_QUALITY`.
+
+    Returns:
+        The resampled samples with the dtype of the input.
+    """
+    quality = quality or DEFAULT_RESAMPLE_QUALITY
+    if orig_sr == target_sr:
+        return samples
+
+    gcd = math.gcd(int(orig_sr), int(target_sr))
+    if max(orig_sr, target_sr) // gcd > _MAX_POLYPHASE_FACTOR:
+        if quality not in RESAMPLE_QUALITIES:
+            raise ValueError(f"Unsupported resample quality `{quality}`, supported: {list(RESAMPLE_QUALITIES)}")
+        return librosa.core.resample(
+            samples, orig_sr=orig_sr, target_sr=target_sr, res_type=_LIBROSA_RES_TYPES[quality]
+        )
+
+    up, down, taps = get_resample_filter(int(orig_sr), int(target_sr), quality)
+    resampled = signal.resample_poly(samples, up, down, axis=-1, window=taps)
+    return resampled.astype(samples.dtype, copy=False)
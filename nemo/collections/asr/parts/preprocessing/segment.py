@@ -33,13 +33,16 @@
 # SOFTWARE.
 # This file contains code artifacts adapted from https://github.com/ryanleary/patter
 
+import io
 import os
 import random
+import struct
 
 import librosa
 import numpy as np
 import soundfile as sf
 
+from nemo.collections.asr.parts.preprocessing.resample import resample
 from nemo.utils import logging
 
 # TODO @blisc: Perhaps refactor instead of import guarding
@@ -54,6 +57,108 @@ except ModuleNotFoundError:
 available_formats = sf.available_formats()
 sf_supported_formats = ["." + i.lower() for i in available_formats.keys()]
 
+# WAV sample formats which can be read directly from the data chunk, keyed by (format tag, bits per sample).
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_WAV_DTYPES = {
+    (_WAVE_FORMAT_PCM, 16): np.dtype('<i2'),
+    (_WAVE_FORMAT_PCM, 32): np.dtype('<i4'),
+    (_WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype('<f4'),
+}
+
+
+def _parse_wav_header(f):
+    """Walks the RIFF chunks of a WAV file up to the data chunk.
+
+    Returns:
+        A tuple (format tag, channels, sample rate, bits per sample, data offset, data size) or None if
+        the file is not a RIFF/WAVE file.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt_chunk = f.read(chunk_size)
+            if len(fmt_chunk) < 16:
+                return None
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt_chunk[:16])
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+                # The first two bytes of the sub-format GUID hold the actual format tag.
+                format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+            f.seek(chunk_size & 1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            return fmt + (f.tell(), chunk_size)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def _read_wav_window(audio_file, offset=0, duration=0, int_values=False):
+    """Reads a window of a mono 16/32-bit PCM or 32-bit float WAV file without decoding the rest of the file.
+
+    Samples of files on disk are memory-mapped, samples of in-memory files (`io.BytesIO`) are viewed in place.
+    The returned samples are such a view with the dtype of the file, i.e. they are converted to float32 by the
+    AudioSegment constructor in a single pass.
+
+    Args:
+        audio_file: Path to a `.wav` file or an `io.BytesIO` holding a WAV file.
+        offset: Offset of the window in seconds.
+        duration: Duration of the window in seconds, 0 reads until the end of the file.
+        int_values: Whether integer samples are requested. Float files are then left to soundfile.
+
+    Returns:
+        A tuple (samples, sample rate), or None if the file is not supported by this fast path.
+    """
+    if isinstance(audio_file, io.BytesIO):
+        position = audio_file.tell()
+        audio_file.seek(0)
+        try:
+            header = _parse_wav_header(audio_file)
+        finally:
+            audio_file.seek(position)
+        file_size = audio_file.getbuffer().nbytes
+    elif isinstance(audio_file, str) and audio_file.lower().endswith('.wav'):
+        with open(audio_file, 'rb') as f:
+            header = _parse_wav_header(f)
+        file_size = os.path.getsize(audio_file)
+    else:
+        return None
+
+    if header is None:
+        return None
+    format_tag, channels, sample_rate, bits, data_offset, data_size = header
+    dtype = _WAV_DTYPES.get((format_tag, bits))
+    if dtype is None or channels != 1 or (int_values and dtype.kind == 'f'):
+        return None
+
+    # Streamed files may have a placeholder data size, never read past the end of the file.
+    num_frames = min(data_size, file_size - data_offset) // dtype.itemsize
+    start = int(offset * sample_rate) if offset > 0 else 0
+    count = int(duration * sample_rate) if duration > 0 else num_frames - start
+    count = min(count, num_frames - start)
+    if count <= 0:
+        return None
+
+    if isinstance(audio_file, io.BytesIO):
+        samples = np.frombuffer(
+            audio_file.getbuffer(), dtype=dtype, count=count, offset=data_offset + start * dtype.itemsize
+        )
+    else:
+        samples = np.memmap(
+            audio_file, dtype=dtype, mode='r', offset=data_offset + start * dtype.itemsize, shape=(count,)
+        )
+    return samples, sample_rate
+
 
 class AudioSegment(object):
     """Monaural audio segment abstraction.
@@ -75,13 +180,19 @@ class AudioSegment(object):
         trim_frame_length=2048,
         trim_hop_length=512,
         orig_sr=None,
+        resample_quality=None,
     ):
         """Create audio segment from samples.
         Samples are convert float32 internally, with int scaled to [-1, 1].
+        Samples are resampled to `target_sr` by librosa, or with a cached polyphase filter if `resample_quality`
+        is set, see `nemo.collections.asr.parts.preprocessing.resample.RESAMPLE_QUALITIES`.
         """
         samples = self._convert_samples_to_float32(samples)
         if target_sr is not None and target_sr != sample_rate:
-            samples = librosa.core.resample(samples, orig_sr=sample_rate, target_sr=target_sr)
+            if resample_quality is None:
+                samples = librosa.core.resample(samples, orig_sr=sample_rate, target_sr=target_sr)
+            else:
+                samples = resample(samples, orig_sr=sample_rate, target_sr=target_sr, quality=resample_quality)
             sample_rate = target_sr
         if trim:
             samples, _ = librosa.effects.trim(
@@ -126,12 +237,12 @@ class AudioSegment(object):
         Audio sample type is usually integer or float-point.
         Integers will be scaled to [-1, 1] in float32.
         """
-        float32_samples = samples.astype('float32')
         if samples.dtype in np.sctypes['int']:
             bits = np.iinfo(samples.dtype).bits
-            float32_samples *= 1.0 / 2 ** (bits - 1)
+            # Convert and scale in a single pass
+            float32_samples = np.multiply(samples, 1.0 / 2 ** (bits - 1), dtype='float32')
         elif samples.dtype in np.sctypes['float']:
-            pass
+            float32_samples = samples.astype('float32')
         else:
             raise TypeError("Unsupported sample type: %s." % samples.dtype)
         return float32_samples
@@ -150,6 +261,7 @@ class AudioSegment(object):
         trim_frame_length=2048,
         trim_hop_length=512,
         orig_sr=None,
+        resample_quality=None,
     ):
         """
         Load a file supported by librosa and return as an AudioSegment.
@@ -165,10 +277,20 @@ class AudioSegment(object):
         :param trim_frame_length: the number of samples per analysis frame
         :param trim_hop_length: the number of samples between analysis frames
         :param orig_sr: the original sample rate
+        :param resample_quality: optional quality of a polyphase resampling to `target_sr`, one of 'fast', 'medium'
+            or 'best'. If None, the audio is resampled by librosa
         :return: numpy array of samples
+
+        Mono PCM WAV files are read through a fast path which only maps the requested window of the file.
         """
         samples = None
-        if not isinstance(audio_file, str) or os.path.splitext(audio_file)[-1] in sf_supported_formats:
+        window = _read_wav_window(audio_file, offset=offset, duration=duration, int_values=int_values)
+        if window is not None:
+            samples, sample_rate = window
+
+        if samples is None and (
+            not isinstance(audio_file, str) or os.path.splitext(audio_file)[-1] in sf_supported_formats
+        ):
             try:
                 with sf.SoundFile(audio_file, 'r') as f:
                     dtype = 'int32' if int_values else 'float32'
@@ -215,10 +337,13 @@ class AudioSegment(object):
             trim_frame_length=trim_frame_length,
             trim_hop_length=trim_hop_length,
             orig_sr=orig_sr,
+            resample_quality=resample_quality,
         )
 
     @classmethod
-    def segment_from_file(cls, audio_file, target_sr=None, n_segments=0, trim=False, orig_sr=None):
+    def segment_from_file(
+        cls, audio_file, target_sr=None, n_segments=0, trim=False, orig_sr=None, resample_quality=None
+    ):
         """Grabs n_segments number of samples from audio_file randomly from the
         file as opposed to at a specified offset.
 
@@ -239,7 +364,9 @@ class AudioSegment(object):
             logging.error(f"Loading {audio_file} via SoundFile raised RuntimeError: `{e}`.")
 
         samples = samples.transpose()
-        return cls(samples, sample_rate, target_sr=target_sr, trim=trim, orig_sr=orig_sr)
+        return cls(
+            samples, sample_rate, target_sr=target_sr, trim=trim, orig_sr=orig_sr, resample_quality=resample_quality
+        )
 
     @property
     def samples(self):
@@ -0,0 +1,322 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import math
+import multiprocessing
+import multiprocessing.pool
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from nemo.collections.asr.parts.utils.ngram_lm_utils import NGramLanguageModel, load_ngram_lm
+
+__all__ = ['CTCPrefixBeamSearch']
+
+LN_10 = math.log(10.0)
+NEG_INF = float('-inf')
+
+
+def _logaddexp(a: float, b: float) -> float:
+    if a == NEG_INF:
+        return b
+    if b == NEG_INF:
+        return a
+    if a > b:
+        return a + math.log1p(math.exp(b - a))
+    return b + math.log1p(math.exp(a - b))
+
+
+class _Prefix:
+    """A prefix of the beam, with its CTC and language model scores."""
+
+    __slots__ = ['labels', 'p_blank', 'p_non_blank', 'lm_score', 'lm_state', 'word']
+
+    def __init__(self, labels: Tuple[int, ...], lm_score: float, lm_state: Hashable, word: str):
+        self.labels = labels
+        # Log probabilities of the prefix ending with a blank and with a non-blank label
+        self.p_blank = NEG_INF
+        self.p_non_blank = NEG_INF
+        # Weighted language model score of the completed words, including the word insertion bonus
+        self.lm_score = lm_score
+        self.lm_state = lm_state
+        # The characters of the word which is not completed yet
+        self.word = word
+
+    @property
+    def p_total(self) -> float:
+        return _logaddexp(self.p_blank, self.p_non_blank)
+
+    @property
+    def score(self) -> float:
+        return self.p_total + self.lm_score
+
+
+class CTCPrefixBeamSearch:
+    """
+    CTC prefix beam search with an optional N-gram language model, implemented in Python without external decoders.
+
+    The vocabulary and the inputs follow the conventions of `ctc_decoders`: the blank is the token after the last
+    token of the vocabulary, and the inputs are probabilities. When the vocabulary contains the word delimiter, the
+    language model scores the words made of the characters between delimiters. Otherwise, every token is scored as a
+    word, such as for sub-word models whose tokens were encoded as characters to train the language model.
+
+    The score of a prefix is the log probability of its alignments plus, for every word,
+    `alpha * ln(P_lm(word | context)) + beta`.
+
+    The worker processes of `decode_batch` are started on the first parallel call and kept for the following calls,
+    together with their copy of the decoder and its language model cache. They are stopped by `close()`, or when
+    the decoder is used as a context manager. Attributes changed after the first parallel call only take effect in
+    the worker processes after `close()`.
+
+    Args:
+        vocabulary: List of the tokens of the model, without the blank.
+        beam_width: Number of prefixes kept after every frame.
+        alpha: Weight of the language model.
+        beta: Bonus added for every word, which counters the preference of the language model for short sequences.
+        language_model: Optional N-gram language model, or path to an ARPA or binary KenLM model.
+        cutoff_prob: Only the most probable tokens of every frame whose cumulative probability reaches
+            `cutoff_prob` are used to extend the prefixes. 1.0 disables this pruning.
+        cutoff_top_n: Only the `cutoff_top_n` most probable tokens of every frame are used to extend the prefixes.
+        blank_skip_threshold: Frames whose blank probability is at least `blank_skip_threshold` do not extend the
+            prefixes with new tokens. 1.0 disables this pruning.
+        lm_cache_size: Maximum number of language model queries which are cached. The cache is emptied when it
+            is full. 0 disables the cache.
+        word_delimiter: The token which separates words.
+    """
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        beam_width: int,
+        alpha: float = 1.0,
+        beta: float = 0.0,
+        language_model: Optional[Union[str, NGramLanguageModel]] = None,
+        cutoff_prob: float = 1.0,
+        cutoff_top_n: int = 40,
+        blank_skip_threshold: float = 1.0,
+        lm_cache_size: int = 100000,
+        word_delimiter: str = ' ',
+    ):
+        if beam_width < 1:
+            raise ValueError("`beam_width` must be a positive integer.")
+
+        if isinstance(language_model, str):
+            language_model = load_ngram_lm(language_model)
+
+        self.vocabulary = list(vocabulary)
+        self.blank_id = len(self.vocabulary)
+        self.beam_width = beam_width
+        self.alpha = alpha
+        self.beta = beta
+        self.language_model = language_model
+        self.cutoff_prob = cutoff_prob
+        self.cutoff_top_n = cutoff_top_n
+        self.blank_skip_threshold = blank_skip_threshold
+        self.lm_cache_size = lm_cache_size
+        self.word_delimiter = word_delimiter
+        self.delimiter_id = self.vocabulary.index(word_delimiter) if word_delimiter in self.vocabulary else None
+
+        self._lm_cache: Dict[Tuple[Hashable, str], Tuple[float, Hashable]] = {}
+        self.lm_cache_hits = 0
+        self.lm_cache_misses = 0
+
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        self._pool_processes = 0
+
+    def __getstate__(self):
+        # The worker processes are not sent to other processes
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_pool_processes'] = 0
+        return state
+
+    def __enter__(self) -> 'CTCPrefixBeamSearch':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __call__(self, probs: np.ndarray) -> List[Tuple[float, str]]:
+        """
+        Decodes the probabilities of a single utterance.
+
+        Args:
+            probs: Array of shape [T, V + 1] with the probabilities of the tokens and the blank for every frame.
+
+        Returns:
+            The list of the (score, text) of the `beam_width` best hypotheses, from the best to the worst.
+        """
+        probs = np.asarray(probs, dtype=np.float32)
+        if probs.ndim != 2 or probs.shape[1] != self.blank_id + 1:
+            raise ValueError(
+                f"Expected probabilities of shape [T, {self.blank_id + 1}], but got an array of shape {probs.shape}."
+            )
+        with np.errstate(divide='ignore'):
+            log_probs = np.log(probs)
+        candidates = self._prune_frames(probs)
+
+        root = _Prefix((), 0.0, self._lm_begin_state(), '')
+        root.p_blank = 0.0
+        beam = [root]
+
+        for t in range(len(probs)):
+            frame_log_probs = log_probs[t].tolist()
+            blank_log_prob = frame_log_probs[self.blank_id]
+            next_beam: Dict[Tuple[int, ...], _Prefix] = {}
+
+            for prefix in beam:
+                # The prefix is unchanged by a blank, or by a repetition of its last label
+                extended = next_beam.get(prefix.labels)
+                if extended is None:
+                    extended = self._copy_prefix(prefix)
+                    next_beam[prefix.labels] = extended
+                extended.p_blank = _logaddexp(extended.p_blank, prefix.p_total + blank_log_prob)
+                last = prefix.labels[-1] if prefix.labels else None
+                if last is not None:
+                    extended.p_non_blank = _logaddexp(extended.p_non_blank, prefix.p_non_blank + frame_log_probs[last])
+
+                for label in candidates[t]:
+                    labels = prefix.labels + (label,)
+                    extended = next_beam.get(labels)
+                    if extended is None:
+                        extended = self._extend_prefix(prefix, label)
+                        next_beam[labels] = extended
+                    # A repeated label is only a new label after a blank
+                    p_prev = prefix.p_blank if label == last else prefix.p_total
+                    extended.p_non_blank = _logaddexp(extended.p_non_blank, p_prev + frame_log_probs[label])
+
+            beam = heapq.nlargest(self.beam_width, next_beam.values(), key=lambda p: p.score)
+
+        results = []
+        for prefix in beam:
+            score = prefix.p_total + prefix.lm_score
+            if prefix.word:
+                score += self._word_score(prefix.lm_state, prefix.word)[0]
+            results.append((score, ''.join(self.vocabulary[label] for label in prefix.labels)))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results
+
+    def decode_batch(self, probs_list: List[np.ndarray], num_processes: int = 1) -> List[List[Tuple[float, str]]]:
+        """
+        Decodes the probabilities of a batch of utterances, in parallel across several processes.
+
+        Args:
+            probs_list: List of arrays of shape [T, V + 1] with the probabilities of every utterance.
+            num_processes: Number of processes which decode the utterances. With 1, the utterances are decoded in
+                the current process. The processes are kept for the following calls with the same `num_processes`.
+
+        Returns:
+            The list of the (score, text) of the best hypotheses of every utterance.
+        """
+        if num_processes <= 1 or len(probs_list) <= 1:
+            return [self(probs) for probs in probs_list]
+
+        if self._pool is None or self._pool_processes != num_processes:
+            self.close()
+            self._pool = multiprocessing.Pool(num_processes, initializer=_init_worker, initargs=(self,))
+            self._pool_processes = num_processes
+        return self._pool.map(_decode_in_worker, probs_list, chunksize=max(1, len(probs_list) // (4 * num_processes)))
+
+    def close(self):
+        """Stops the worker processes of `decode_batch`, if any."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._pool_processes = 0
+
+    def reset_lm_cache(self):
+        """Empties the cache of the language model queries and resets its statistics."""
+        self._lm_cache.clear()
+        self.lm_cache_hits = 0
+        self.lm_cache_misses = 0
+
+    def _prune_frames(self, probs: np.ndarray) -> List[List[int]]:
+        """Returns the tokens which may extend the prefixes at every frame, from the most to the least probable."""
+        token_probs = probs[:, : self.blank_id]
+        top_n = min(self.cutoff_top_n, self.blank_id)
+        if top_n < self.blank_id:
+            top = np.argpartition(-token_probs, top_n - 1, axis=1)[:, :top_n]
+        else:
+            top = np.broadcast_to(np.arange(self.blank_id), token_probs.shape)
+        top_probs = np.take_along_axis(token_probs, top, axis=1)
+        order = np.argsort(-top_probs, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_probs = np.take_along_axis(top_probs, order, axis=1)
+
+        keep = np.ones(top.shape, dtype=bool)
+        if self.cutoff_prob < 1.0:
+            # Keep the tokens until (and including) the one which reaches the cumulative probability
+            cumulative = np.cumsum(top_probs, axis=1)
+            keep[:, 1:] = cumulative[:, :-1] < self.cutoff_prob
+        if self.blank_skip_threshold < 1.0:
+            keep[probs[:, self.blank_id] >= self.blank_skip_threshold] = False
+
+        return [frame_top[frame_keep].tolist() for frame_top, frame_keep in zip(top, keep)]
+
+    def _copy_prefix(self, prefix: _Prefix) -> _Prefix:
+        return _Prefix(prefix.labels, prefix.lm_score, prefix.lm_state, prefix.word)
+
+    def _extend_prefix(self, prefix: _Prefix, label: int) -> _Prefix:
+        labels = prefix.labels + (label,)
+        if self.language_model is None:
+            return _Prefix(labels, prefix.lm_score, None, '')
+
+        token = self.vocabulary[label]
+        if self.delimiter_id is None:
+            # Every token is a word
+            score, state = self._word_score(prefix.lm_state, token)
+            return _Prefix(labels, prefix.lm_score + score, state, '')
+        if label == self.delimiter_id:
+            if not prefix.word:
+                return _Prefix(labels, prefix.lm_score, prefix.lm_state, '')
+            score, state = self._word_score(prefix.lm_state, prefix.word)
+            return _Prefix(labels, prefix.lm_score + score, state, '')
+        return _Prefix(labels, prefix.lm_score, prefix.lm_state, prefix.word + token)
+
+    def _lm_begin_state(self) -> Optional[Hashable]:
+        return self.language_model.begin_state() if self.language_model is not None else None
+
+    def _word_score(self, state: Hashable, word: str) -> Tuple[float, Hashable]:
+        """Returns the weighted language model score of a word, with the word bonus, and the next state."""
+        if self.language_model is None:
+            return 0.0, None
+
+        key = (state, word)
+        result = self._lm_cache.get(key)
+        if result is None:
+            self.lm_cache_misses += 1
+            log10_prob, next_state = self.language_model.score(state, word)
+            result = self.alpha * log10_prob * LN_10 + self.beta, next_state
+            if self.lm_cache_size > 0:
+                if len(self._lm_cache) >= self.lm_cache_size:
+                    self._lm_cache.clear()
+                self._lm_cache[key] = result
+        else:
+            self.lm_cache_hits += 1
+        return result
+
+
+# The decoder of the worker processes of `CTCPrefixBeamSearch.decode_batch`, sent once to every process
+_worker_decoder: Optional[CTCPrefixBeamSearch] = None
+
+
+def _init_worker(decoder: CTCPrefixBeamSearch):
+    global _worker_decoder
+    _worker_decoder = decoder
+
+
+def _decode_in_worker(probs: np.ndarray) -> List[Tuple[float, str]]:
+    return _worker_decoder(probs)
@@ -12,14 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Tuple
 
+import numpy as np
 import torch
 
 from nemo.collections.asr.parts.utils import rnnt_utils
-from nemo.core.classes import Typing, typecheck
+from nemo.core.classes import Serialization, Typing, typecheck
 from nemo.core.neural_types import HypothesisType, LengthsType, LogprobsType, NeuralType
+from nemo.utils import logging
 
 
 def pack_hypotheses(hypotheses: List[rnnt_utils.Hypothesis], logitlen: torch.Tensor,) -> List[rnnt_utils.Hypothesis]:
@@ -52,6 +55,101 @@ def _states_to_device(dec_state, device='cpu'):
     return dec_state
 
 
+class BatchedCTCHypotheses(Sequence):
+    """
+    The greedy CTC predictions of a batch, as arrays. Behaves like a list of `Hypothesis`, which are only built when
+    they are accessed.
+
+    Args:
+        labels: Integer array of shape [B, T] with the label of every frame.
+        lengths: Integer array of shape [B] with the number of valid frames of every sample.
+        blank_id: The id of the CTC blank token.
+        scores: Optional float array of shape [B] with the sum of the log probabilities of the non-blank frames.
+            If None, the score of every hypothesis is -1.0.
+        logprobs: Optional tensor of shape [B, T, V] with the log probabilities, preserved in the alignments.
+        has_lengths: Whether the lengths were provided, in which case they are stored in `Hypothesis.length`.
+        compute_timestamps: Whether to store the frames of the non-blank labels in `Hypothesis.timestep`.
+    """
+
+    def __init__(
+        self,
+        labels: np.ndarray,
+        lengths: np.ndarray,
+        blank_id: int,
+        scores: Optional[np.ndarray] = None,
+        logprobs: Optional[torch.Tensor] = None,
+        has_lengths: bool = True,
+        compute_timestamps: bool = False,
+    ):
+        self.labels = labels
+        self.lengths = lengths
+        self.blank_id = blank_id
+        self.scores = scores
+        self.logprobs = logprobs
+        self.has_lengths = has_lengths
+        self.compute_timestamps = compute_timestamps
+        self._hypotheses = [None] * len(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if self._hypotheses[idx] is None:
+            self._hypotheses[idx] = self._build_hypothesis(idx)
+        return self._hypotheses[idx]
+
+    def _build_hypothesis(self, idx: int) -> rnnt_utils.Hypothesis:
+        length = int(self.lengths[idx])
+        labels = self.labels[idx, :length]
+        hypothesis = rnnt_utils.Hypothesis(
+            score=torch.tensor(self.scores[idx]) if self.scores is not None else -1.0,
+            y_sequence=torch.from_numpy(labels.copy()),
+            dec_state=None,
+            timestep=[],
+            last_token=None,
+        )
+        if self.has_lengths:
+            hypothesis.length = torch.tensor(length)
+        if self.logprobs is not None:
+            hypothesis.alignments = (self.logprobs[idx, :length].clone(), hypothesis.y_sequence.clone())
+        if self.compute_timestamps:
+            hypothesis.timestep = np.nonzero(labels != self.blank_id)[0].tolist()
+        return hypothesis
+
+    def collapse(self, fold_consecutive: bool = True) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Applies the CTC collapse to all samples at once: removes the blanks and, if `fold_consecutive`, merges the
+        repetitions of a label.
+
+        Returns:
+            A tuple of two lists with one array per sample: the collapsed labels, and the number of frames from
+            the previous emitted label (or from the first frame) to every emitted label.
+        """
+        valid = np.arange(self.labels.shape[1])[None, :] < self.lengths[:, None]
+        keep = valid & (self.labels != self.blank_id)
+        if fold_consecutive:
+            keep[:, 1:] &= self.labels[:, 1:] != self.labels[:, :-1]
+
+        rows, frames = np.nonzero(keep)
+        if not fold_consecutive:
+            # Every label is counted as a single repetition
+            repetitions = np.ones_like(frames)
+        else:
+            repetitions = frames.copy()
+            repetitions[1:] -= frames[:-1]
+            # The first label of every sample counts from the first frame
+            is_first = np.ones(len(rows), dtype=bool)
+            is_first[1:] = rows[1:] != rows[:-1]
+            repetitions[is_first] = frames[is_first]
+
+        splits = np.cumsum(keep.sum(axis=1))[:-1]
+        return np.split(self.labels[rows, frames], splits), np.split(repetitions, splits)
+
+
 class GreedyCTCInfer(Typing):
     """A greedy CTC decoder.
 
@@ -110,89 +208,238 @@ class GreedyCTCInfer(Typing):
         Returns:
             packed list containing batch number of sentences (Hypotheses).
         """
-        with torch.inference_mode():
-            hypotheses = []
-            # Process each sequence independently
-            prediction_cpu_tensor = decoder_output.cpu()
-
-            if prediction_cpu_tensor.ndim < 2 or prediction_cpu_tensor.ndim > 3:
-                raise ValueError(
-                    f"`decoder_output` must be a tensor of shape [B, T] (labels, int) or "
-                    f"[B, T, V] (log probs, float). Provided shape = {prediction_cpu_tensor.shape}"
-                )
+        return (list(self.batched_decode(decoder_output, decoder_lengths)),)
 
-            # determine type of input - logprobs or labels
-            if prediction_cpu_tensor.ndim == 2:  # labels
-                greedy_decode = self._greedy_decode_labels
-            else:
-                greedy_decode = self._greedy_decode_logprobs
+    @torch.no_grad()
+    def batched_decode(
+        self, decoder_output: torch.Tensor, decoder_lengths: Optional[torch.Tensor]
+    ) -> BatchedCTCHypotheses:
+        """
+        Decodes a whole batch at once: the argmax is computed on the device of `decoder_output`, and only the labels
+        and scores of the batch are transferred to the host, with a single copy each.
 
-            for ind in range(prediction_cpu_tensor.shape[0]):
-                out_len = decoder_lengths[ind] if decoder_lengths is not None else None
-                hypothesis = greedy_decode(prediction_cpu_tensor[ind], out_len)
-                hypotheses.append(hypothesis)
+        Args:
+            decoder_output: A tensor of size (batch, timesteps, features) or (batch, timesteps) (each timestep is a label).
+            decoder_lengths: Optional tensor with the length of each sequence.
 
-            # Pack results into Hypotheses
-            packed_result = pack_hypotheses(hypotheses, decoder_lengths)
+        Returns:
+            A `BatchedCTCHypotheses`, which builds the hypotheses of the batch when they are accessed.
+        """
+        if decoder_output.ndim < 2 or decoder_output.ndim > 3:
+            raise ValueError(
+                f"`decoder_output` must be a tensor of shape [B, T] (labels, int) or "
+                f"[B, T, V] (log probs, float). Provided shape = {decoder_output.shape}"
+            )
+
+        batch_size, max_time = decoder_output.shape[:2]
+        if decoder_lengths is not None:
+            lengths = torch.as_tensor(decoder_lengths, device=decoder_output.device).long()
+        else:
+            lengths = torch.full((batch_size,), max_time, dtype=torch.long, device=decoder_output.device)
 
-        return (packed_result,)
+        logprobs = None
+        if decoder_output.ndim == 2:  # labels
+            if self.preserve_alignments:
+                raise ValueError(
+                    "Requested for alignments, but predictions provided were labels, not log probabilities."
+                )
+            labels = decoder_output.long()
+            scores = None
+        else:
+            prediction_logprobs, labels = decoder_output.detach().max(dim=-1)
+            valid = torch.arange(max_time, device=labels.device)[None, :] < lengths[:, None]
+            non_blank = valid & (labels != self.blank_id)
+            scores = torch.where(non_blank, prediction_logprobs, torch.zeros_like(prediction_logprobs)).sum(dim=-1)
+            scores = scores.cpu().numpy()
+            if self.preserve_alignments:
+                logprobs = decoder_output.detach().cpu()
+
+        return BatchedCTCHypotheses(
+            labels=labels.cpu().numpy(),
+            lengths=lengths.cpu().numpy(),
+            blank_id=self.blank_id,
+            scores=scores,
+            logprobs=logprobs,
+            has_lengths=decoder_lengths is not None,
+            compute_timestamps=self.compute_timestamps,
+        )
 
-    @torch.no_grad()
-    def _greedy_decode_logprobs(self, x: torch.Tensor, out_len: torch.Tensor):
-        # x: [T, D]
-        # out_len: [seq_len]
+    def __call__(self, *args, **kwargs):
+        return self.forward(*args, **kwargs)
 
-        # Initialize blank state and empty label set in Hypothesis
-        hypothesis = rnnt_utils.Hypothesis(score=0.0, y_sequence=[], dec_state=None, timestep=[], last_token=None)
-        prediction = x.detach().cpu()
 
-        if out_len is not None:
-            prediction = prediction[:out_len]
+@dataclass
+class GreedyCTCInferConfig:
+    preserve_alignments: bool = False
+    compute_timestamps: bool = False
 
-        prediction_logprobs, prediction_labels = prediction.max(dim=-1)
 
-        non_blank_ids = prediction_labels != self.blank_id
-        hypothesis.y_sequence = prediction_labels.numpy().tolist()
-        hypothesis.score = (prediction_logprobs[non_blank_ids]).sum()
+class ONNXGreedyBatchedCTCInfer:
+    """
+    Greedy CTC inference with a CTC model (encoder and decoder) exported to ONNX with `Exportable.export`, run with
+    onnxruntime. No PyTorch model weights are required at runtime: the encoder and decoder run in an onnxruntime
+    session, the optional preprocessor only computes the features, and the predictions are decoded with the batched
+    greedy decoding of `GreedyCTCInfer`.
 
-        if self.preserve_alignments:
-            # Preserve the logprobs, as well as labels after argmax
-            hypothesis.alignments = (prediction.clone(), prediction_labels.clone())
+    The returned `BatchedCTCHypotheses` can be converted to text and time stamps with
+    `CTCDecoding.decode_batched_hypotheses` (or `CTCBPEDecoding.decode_batched_hypotheses`), which only require the
+    vocabulary (or tokenizer) of the model.
 
-        if self.compute_timestamps:
-            hypothesis.timestep = torch.nonzero(non_blank_ids, as_tuple=False)[:, 0].numpy().tolist()
+    Args:
+        model: Path to the exported ONNX model, with inputs `audio_signal` [B, D, T] and `length` [B], and the
+            log probabilities [B, T, V + 1] as output.
+        preprocessor_cfg: Optional config of the preprocessor of the model (`cfg.preprocessor`), required to
+            transcribe audio signals with `preprocess`.
+        providers: Optional list of execution providers of onnxruntime. Defaults to the providers available.
+        subsampling_factor: Optional subsampling factor of the encoder, used to compute the lengths of the encoded
+            sequences. If None, it is estimated from the output of the model on a random input.
+        preserve_alignments: Bool flag which preserves the history of logprobs generated during decoding.
+        compute_timestamps: Bool flag which stores the frames of the non-blank labels in the hypotheses, to compute
+            the time stamps.
+    """
 
-        return hypothesis
+    # Types of the inputs of onnxruntime sessions
+    _ONNX_TO_NUMPY_DTYPE = {
+        'tensor(float)': np.float32,
+        'tensor(float16)': np.float16,
+        'tensor(double)': np.float64,
+        'tensor(int32)': np.int32,
+        'tensor(int64)': np.int64,
+    }
 
-    @torch.no_grad()
-    def _greedy_decode_labels(self, x: torch.Tensor, out_len: torch.Tensor):
-        # x: [T]
-        # out_len: [seq_len]
+    def __init__(
+        self,
+        model: str,
+        preprocessor_cfg=None,
+        providers: Optional[List[str]] = None,
+        subsampling_factor: Optional[int] = None,
+        preserve_alignments: bool = False,
+        compute_timestamps: bool = False,
+    ):
+        try:
+            import onnx
+            import onnxruntime
+        except (ModuleNotFoundError, ImportError):
+            raise ImportError(f"`onnx` or `onnxruntime` could not be imported, please install the libraries.\n")
+
+        onnx_model = onnx.load(model)
+        onnx.checker.check_model(onnx_model, full_check=True)
+        self.model = onnx_model
+        if providers is None:
+            providers = onnxruntime.get_available_providers()
+        self.session = onnxruntime.InferenceSession(onnx_model.SerializeToString(), providers=providers)
+        self.device = 'cuda' if 'CUDAExecutionProvider' in self.session.get_providers() else 'cpu'
+
+        logging.info(f"Successfully loaded the onnx model, with the providers {self.session.get_providers()} !")
+
+        self.preprocessor = None
+        if preprocessor_cfg is not None:
+            self._setup_preprocessor(preprocessor_cfg)
+
+        # Will be populated at runtime
+        self._blank_index = None
+        self.decoding = None
+        self.subsampling_factor = subsampling_factor
+        self.preserve_alignments = preserve_alignments
+        self.compute_timestamps = compute_timestamps
 
-        # Initialize blank state and empty label set in Hypothesis
-        hypothesis = rnnt_utils.Hypothesis(score=0.0, y_sequence=[], dec_state=None, timestep=[], last_token=None)
-        prediction_labels = x.detach().cpu()
+        self._setup_input_output_keys()
+        self._setup_blank_index()
+
+    def _setup_preprocessor(self, preprocessor_cfg):
+        self.preprocessor = Serialization.from_config_dict(preprocessor_cfg)
+        self.preprocessor.eval()
+
+    def _setup_input_output_keys(self):
+        self.inputs = self.session.get_inputs()
+        self.outputs = self.session.get_outputs()
+        if len(self.inputs) != 2:
+            raise ValueError(
+                f"The onnx model must have the inputs `audio_signal` and `length`, but has the inputs "
+                f"{[node.name for node in self.inputs]}. Export the CTC model with the length input enabled."
+            )
+
+    def _setup_blank_index(self):
+        # ASSUME: Dynamic batch and time axes, with a static number of features
+        feat_in = self.inputs[0].shape[1]
+        dynamic_dim = 1024
+        audio_signal = np.random.randn(1, feat_in, dynamic_dim)
+        log_probs = self.run_encoder_decoder(audio_signal=audio_signal, length=np.array([dynamic_dim]))
+
+        self._blank_index = log_probs.shape[-1] - 1  # last token of vocab size is blank token
+        self.decoding = GreedyCTCInfer(
+            blank_id=self._blank_index,
+            preserve_alignments=self.preserve_alignments,
+            compute_timestamps=self.compute_timestamps,
+        )
+        if self.subsampling_factor is None:
+            self.subsampling_factor = int(round(dynamic_dim / log_probs.shape[1]))
+        logging.info(
+            f"Enc-Dec step was evaluated, blank token id = {self._blank_index}; vocab size = {log_probs.shape[-1]}; "
+            f"subsampling factor = {self.subsampling_factor}"
+        )
+
+    def preprocess(self, input_signal: torch.Tensor, length: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Computes the features of a batch of audio signals with the preprocessor of the model.
 
-        if out_len is not None:
-            prediction_labels = prediction_labels[:out_len]
+        Args:
+            input_signal: A tensor of size (batch, samples).
+            length: A tensor with the number of samples of every signal.
 
-        non_blank_ids = prediction_labels != self.blank_id
-        hypothesis.y_sequence = prediction_labels.numpy().tolist()
-        hypothesis.score = -1.0
+        Returns:
+            The features, a tensor of size (batch, features, timesteps), and their lengths.
+        """
+        if self.preprocessor is None:
+            raise ValueError("`preprocessor_cfg` must be provided to compute the features of audio signals.")
 
-        if self.preserve_alignments:
-            raise ValueError("Requested for alignments, but predictions provided were labels, not log probabilities.")
+        with torch.no_grad():
+            return self.preprocessor(input_signal=input_signal, length=length)
 
-        if self.compute_timestamps:
-            hypothesis.timestep = torch.nonzero(non_blank_ids, as_tuple=False)[:, 0].numpy().tolist()
+    def run_encoder_decoder(self, audio_signal, length) -> np.ndarray:
+        """
+        Runs the onnx model on a batch of features, with IO binding: the inputs are bound once and the log
+        probabilities are only copied to the host after the run.
 
-        return hypothesis
+        Args:
+            audio_signal: An array or tensor of size (batch, features, timesteps).
+            length: An array or tensor with the number of valid timesteps of every sample.
 
-    def __call__(self, *args, **kwargs):
-        return self.forward(*args, **kwargs)
+        Returns:
+            The log probabilities, an array of size (batch, encoded timesteps, vocabulary + 1).
+        """
+        if hasattr(audio_signal, 'cpu'):
+            audio_signal = audio_signal.cpu().numpy()
+
+        if hasattr(length, 'cpu'):
+            length = length.cpu().numpy()
+
+        binding = self.session.io_binding()
+        for node, value in zip(self.inputs, (audio_signal, length)):
+            value = np.ascontiguousarray(value, dtype=self._ONNX_TO_NUMPY_DTYPE.get(node.type, value.dtype))
+            binding.bind_cpu_input(node.name, value)
+        binding.bind_output(self.outputs[0].name, self.device)
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()[0]
+
+    def get_encoded_lengths(self, length, max_time: int) -> torch.Tensor:
+        """Returns the lengths of the encoded sequences, given the lengths of the features."""
+        length = torch.as_tensor(length, dtype=torch.long)
+        encoded_lengths = torch.div(
+            length + self.subsampling_factor - 1, self.subsampling_factor, rounding_mode='floor'
+        )
+        return encoded_lengths.clamp(max=max_time)
+
+    def __call__(self, audio_signal, length) -> BatchedCTCHypotheses:
+        """Returns the greedy predictions of a batch of features.
 
+        Args:
+            audio_signal: A tensor of size (batch, features, timesteps).
+            length: A tensor with the number of valid timesteps of every sample.
 
-@dataclass
-class GreedyCTCInferConfig:
-    preserve_alignments: bool = False
-    compute_timestamps: bool = False
+        Returns:
+            A `BatchedCTCHypotheses`, which builds the hypotheses of the batch when they are accessed.
+        """
+        log_probs = torch.from_numpy(self.run_encoder_decoder(audio_signal=audio_signal, length=length))
+        encoded_lengths = self.get_encoded_lengths(length, max_time=log_probs.shape[1])
+        return self.decoding.batched_decode(log_probs, encoded_lengths)
@@ -35,11 +35,20 @@ import torch
 from tqdm import tqdm
 
 from nemo.collections.asr.modules import rnnt_abstract
-from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis, NBestHypotheses, is_prefix, select_k_expansions
+from nemo.collections.asr.parts.utils.rnnt_utils import (
+    Hypothesis,
+    NBestHypotheses,
+    PredictionCache,
+    is_prefix,
+    select_k_expansions,
+)
 from nemo.core.classes import Typing, typecheck
 from nemo.core.neural_types import AcousticEncodedRepresentation, HypothesisType, LengthsType, NeuralType
 from nemo.utils import logging
 
+# Base of the polynomial hash of label sequences, used to find identical hypotheses in batched beam search
+_SEQUENCE_HASH_BASE = 1000003
+
 
 def pack_hypotheses(hypotheses: List[Hypothesis]) -> List[Hypothesis]:
     for idx, hyp in enumerate(hypotheses):  # type: rnnt_utils.Hypothesis
@@ -172,6 +181,11 @@ class BeamRNNTInfer(Typing):
 
             NOTE: `preserve_alignments` is an invalid argument for any `search_type`
             other than basic beam search.
+
+        prediction_cache_size: Maximum number of label sequences whose prediction network outputs and states
+            are cached during the beam search of a batch. The cache is shared by all hypotheses of all samples,
+            and evicts the least recently used sequences. None for an unbounded cache. The statistics of the cache
+            are available in `prediction_cache.stats()`.
     """
 
     @property
@@ -209,6 +223,7 @@ class BeamRNNTInfer(Typing):
         language_model: Optional[Dict[str, Any]] = None,
         softmax_temperature: float = 1.0,
         preserve_alignments: bool = False,
+        prediction_cache_size: Optional[int] = 10000,
     ):
         self.decoder = decoder_model
         self.joint = joint_model
@@ -291,6 +306,7 @@ class BeamRNNTInfer(Typing):
             self.softmax_temperature = softmax_temperature
         self.language_model = language_model
         self.preserve_alignments = preserve_alignments
+        self.prediction_cache = PredictionCache(max_size=prediction_cache_size)
 
     @typecheck()
     def __call__(
@@ -321,52 +337,80 @@ class BeamRNNTInfer(Typing):
             self.decoder.eval()
             self.joint.eval()
 
+            # Cached outputs are only valid for the current weights of the decoder
+            self.prediction_cache.clear()
+
             hypotheses = []
-            with tqdm(
-                range(encoder_output.size(0)),
-                desc='Beam search progress:',
-                total=encoder_output.size(0),
-                unit='sample',
-            ) as idx_gen:
-
-                # Freeze the decoder and joint to prevent recording of gradients
-                # during the beam loop.
+            if self.search_algorithm == self.time_sync_decoding and partial_hypotheses is None:
+                # Decode all samples in the batch at once.
                 with self.decoder.as_frozen(), self.joint.as_frozen():
-
                     _p = next(self.joint.parameters())
                     dtype = _p.dtype
 
-                    # Decode every sample in the batch independently.
-                    for batch_idx in idx_gen:
-                        inseq = encoder_output[batch_idx : batch_idx + 1, : encoded_lengths[batch_idx], :]  # [1, T, D]
-                        logitlen = encoded_lengths[batch_idx]
+                    if encoder_output.dtype != dtype:
+                        encoder_output = encoder_output.to(dtype=dtype)
 
-                        if inseq.dtype != dtype:
-                            inseq = inseq.to(dtype=dtype)
+                    batch_nbest_hyps = self.batched_time_sync_decoding(encoder_output, encoded_lengths)
 
-                        # Extract partial hypothesis if exists
-                        partial_hypothesis = partial_hypotheses[batch_idx] if partial_hypotheses is not None else None
+                for nbest_hyps in batch_nbest_hyps:
+                    hypotheses.append(self._pack_nbest(nbest_hyps))
 
-                        # Execute the specific search strategy
-                        nbest_hyps = self.search_algorithm(
-                            inseq, logitlen, partial_hypotheses=partial_hypothesis
-                        )  # sorted list of hypothesis
+            else:
+                with tqdm(
+                    range(encoder_output.size(0)),
+                    desc='Beam search progress:',
+                    total=encoder_output.size(0),
+                    unit='sample',
+                ) as idx_gen:
+
+                    # Freeze the decoder and joint to prevent recording of gradients
+                    # during the beam loop.
+                    with self.decoder.as_frozen(), self.joint.as_frozen():
+
+                        _p = next(self.joint.parameters())
+                        dtype = _p.dtype
+
+                        # Decode every sample in the batch independently.
+                        for batch_idx in idx_gen:
+                            inseq = encoder_output[batch_idx : batch_idx + 1, : encoded_lengths[batch_idx], :]
+                            logitlen = encoded_lengths[batch_idx]
+
+                            if inseq.dtype != dtype:
+                                inseq = inseq.to(dtype=dtype)
+
+                            # Extract partial hypothesis if exists
+                            partial_hypothesis = (
+                                partial_hypotheses[batch_idx] if partial_hypotheses is not None else None
+                            )
 
-                        # Prepare the list of hypotheses
-                        nbest_hyps = pack_hypotheses(nbest_hyps)
+                            # Label sequences continue the decoder state of a partial hypothesis, which differs
+                            # between samples
+                            if partial_hypothesis is not None:
+                                self.prediction_cache.clear()
 
-                        # Pack the result
-                        if self.return_best_hypothesis:
-                            best_hypothesis = nbest_hyps[0]  # type: Hypothesis
-                        else:
-                            best_hypothesis = NBestHypotheses(nbest_hyps)  # type: NBestHypotheses
-                        hypotheses.append(best_hypothesis)
+                            # Execute the specific search strategy
+                            nbest_hyps = self.search_algorithm(
+                                inseq, logitlen, partial_hypotheses=partial_hypothesis
+                            )  # sorted list of hypothesis
+
+                            hypotheses.append(self._pack_nbest(nbest_hyps))
 
         self.decoder.train(decoder_training_state)
         self.joint.train(joint_training_state)
 
         return (hypotheses,)
 
+    def _pack_nbest(self, nbest_hyps: List[Hypothesis]) -> Union[Hypothesis, NBestHypotheses]:
+        """Packs the sorted N-best hypotheses of a sample into the returned hypothesis."""
+        # Prepare the list of hypotheses
+        nbest_hyps = pack_hypotheses(nbest_hyps)
+
+        # Pack the result
+        if self.return_best_hypothesis:
+            return nbest_hyps[0]  # type: Hypothesis
+        else:
+            return NBestHypotheses(nbest_hyps)  # type: NBestHypotheses
+
     def sort_nbest(self, hyps: List[Hypothesis]) -> List[Hypothesis]:
         """Sort hypotheses by score or score given sequence length.
 
@@ -414,7 +458,7 @@ class BeamRNNTInfer(Typing):
                 hyp.dec_state = partial_hypotheses.dec_state
                 hyp.dec_state = _states_to_device(hyp.dec_state, h.device)
 
-        cache = {}
+        cache = self.prediction_cache
 
         # Initialize state and first token
         y, state, _ = self.decoder.score_hypothesis(hyp, cache)
@@ -502,7 +546,7 @@ class BeamRNNTInfer(Typing):
 
         # Initialize first hypothesis for the beam (blank)
         kept_hyps = [Hypothesis(score=0.0, y_sequence=[self.blank], dec_state=dec_state, timestep=[-1], length=0)]
-        cache = {}
+        cache = self.prediction_cache
 
         if partial_hypotheses is not None:
             if len(partial_hypotheses.y_sequence) > 0:
@@ -651,7 +695,7 @@ class BeamRNNTInfer(Typing):
                 length=0,
             )
         ]
-        cache = {}
+        cache = self.prediction_cache
 
         for i in range(int(encoded_lengths)):
             hi = h[:, i : i + 1, :]
@@ -727,6 +771,232 @@ class BeamRNNTInfer(Typing):
 
         return self.sort_nbest(B)
 
+    def batched_time_sync_decoding(
+        self, encoder_output: torch.Tensor, encoded_lengths: torch.Tensor
+    ) -> List[List[Hypothesis]]:
+        """Time synchronous beam search over a whole batch.
+        Performs the same search as `time_sync_decoding`, but evaluates the prediction network and the joint for
+        the hypotheses of all samples at once. Beams are padded to the beam size with invalid hypotheses (whose
+        score is -inf), and samples leave the batch as soon as all of their frames are decoded.
+        Hypotheses with the same label sequence are found by comparing hashes of their sequences, and the labels of
+        the hypotheses whose hashes match, so that a hash collision never merges different hypotheses.
+
+        Note: The `dec_state` of the returned hypotheses is the decoder state after their last label.
+
+        Args:
+            encoder_output: Encoded speech features (B, T_max, D_enc)
+            encoded_lengths: Lengths of the encoder outputs (B)
+
+        Returns:
+            nbest_hyps: N-best decoding results of every sample
+        """
+        if self.preserve_alignments:
+            raise NotImplementedError("`preseve_alignments` is not implemented for Time-Synchronous Decoding.")
+
+        batch_size = encoder_output.size(0)
+        device = encoder_output.device
+        beam = min(self.beam_size, self.vocab_size)
+        max_expansions = self.tsd_max_symmetric_expansion_per_step
+        num_slots = beam * max(max_expansions, 0)
+
+        # Precompute some constants for blank position
+        ids = [idx for idx in range(self.vocab_size + 1) if idx != self.blank]
+        ids = torch.tensor(ids, device=device, dtype=torch.long)
+
+        # Used when blank token is first vs last token
+        if self.blank == 0:
+            index_incr = 1
+        else:
+            index_incr = 0
+
+        # Decode the longest samples first, so that the samples which are still decoded are a prefix of the batch
+        order = torch.argsort(encoded_lengths.to('cpu').long(), descending=True)
+        lengths = encoded_lengths.to('cpu').long()[order].tolist()
+        encoder_output = encoder_output[order.to(device)]
+        order = order.tolist()
+
+        # Beams of all samples, where the first hypothesis of every beam is the blank one
+        rows = batch_size
+        capacity = 16 + max(max_expansions, 0)
+        scores = torch.full([rows, beam], float('-inf'), dtype=torch.float64, device=device)
+        scores[:, 0] = 0.0
+        tokens = torch.full([rows, beam, capacity], self.blank, dtype=torch.long, device=device)
+        timesteps = torch.full([rows, beam, capacity], -1, dtype=torch.long, device=device)
+        seq_lens = torch.ones([rows, beam], dtype=torch.long, device=device)
+        hashes = torch.full([rows, beam], self.blank + 1, dtype=torch.long, device=device)
+
+        # Decoder output and state after the last label of every hypothesis
+        beam_y, beam_state = self.decoder.predict(
+            tokens[:, :, 0].reshape(-1, 1), state=None, add_sos=False, batch_size=rows * beam
+        )  # [B * beam, 1, H]
+
+        results = [None] * batch_size
+
+        def finalize(start: int, end: int):
+            # Construct the hypotheses of the samples start to end, which are fully decoded
+            for row, (scores_row, tokens_row, timesteps_row, lens_row) in enumerate(
+                zip(
+                    scores[start:end].tolist(),
+                    tokens[start:end].tolist(),
+                    timesteps[start:end].tolist(),
+                    seq_lens[start:end].tolist(),
+                ),
+                start=start,
+            ):
+                batch_idx = order[row]
+                nbest_hyps = []
+                for k in range(beam):
+                    if scores_row[k] == float('-inf'):
+                        continue
+                    nbest_hyps.append(
+                        Hypothesis(
+                            score=scores_row[k],
+                            y_sequence=tokens_row[k][: lens_row[k]],
+                            dec_state=self.decoder.batch_select_state(beam_state, row * beam + k),
+                            timestep=timesteps_row[k][: lens_row[k]],
+                            length=encoded_lengths[batch_idx] if lengths[row] > 0 else 0,
+                        )
+                    )
+                results[batch_idx] = self.sort_nbest(nbest_hyps)
+
+        for i in range(lengths[0] if batch_size > 0 else 0):
+            # Remove the samples which are fully decoded from the batch
+            active = rows
+            while active > 0 and lengths[active - 1] <= i:
+                active -= 1
+            if active < rows:
+                finalize(active, rows)
+                rows = active
+                scores, tokens, timesteps = scores[:rows], tokens[:rows], timesteps[:rows]
+                seq_lens, hashes, beam_y = seq_lens[:rows], hashes[:rows], beam_y[: rows * beam]
+                beam_state = self.decoder.batch_gather_states([beam_state], torch.arange(rows * beam, device=device))
+
+            # Every expansion adds at most one label to the hypotheses
+            required = int(seq_lens.max()) + max_expansions
+            if required > capacity:
+                extra = max(capacity, required - capacity)
+                tokens = torch.nn.functional.pad(tokens, [0, extra], value=self.blank)
+                timesteps = torch.nn.functional.pad(timesteps, [0, extra], value=-1)
+                capacity += extra
+
+            h_enc = encoder_output[:rows, i].repeat_interleave(beam, dim=0).unsqueeze(1)  # [B * beam, 1, D]
+
+            # Hypotheses which end with a blank at this frame (A), with one spare slot for padded writes
+            a_scores = torch.full([rows, num_slots + 1], float('-inf'), dtype=torch.float64, device=device)
+            a_hashes = torch.zeros([rows, num_slots + 1], dtype=torch.long, device=device)
+            a_tokens = torch.full([rows, num_slots + 1, capacity], self.blank, dtype=torch.long, device=device)
+            a_lens = torch.zeros([rows, num_slots + 1], dtype=torch.long, device=device)
+            a_sources = torch.zeros([rows, num_slots + 1], dtype=torch.long, device=device)
+            a_counts = torch.zeros([rows], dtype=torch.long, device=device)
+            slot_ids = torch.arange(num_slots + 1, device=device)
+            beam_ids = torch.arange(beam, device=device).expand(rows, beam)
+            row_ids = torch.arange(rows, device=device).unsqueeze(1)
+
+            # Hypotheses expanded at every step (C), starting from the current beams
+            c_scores, c_tokens, c_timesteps, c_lens, c_hashes = scores, tokens, timesteps, seq_lens, hashes
+            c_y, c_state = beam_y, beam_state
+            expansions = []
+
+            # For a limited number of symmetric expansions per timestep "i"
+            for v in range(max_expansions):
+                if v > 0:
+                    # Decode the last label of the expanded hypotheses
+                    labels = c_tokens.gather(2, (c_lens - 1).unsqueeze(-1)).view(-1, 1)
+                    c_y, c_state = self.decoder.predict(labels, state=c_state, add_sos=False, batch_size=rows * beam)
+                expansions.append((c_tokens, c_timesteps, c_lens, c_hashes, c_y, c_state))
+
+                # Extract the log probabilities
+                beam_logp = torch.log_softmax(
+                    self.joint.joint(h_enc, c_y) / self.softmax_temperature, dim=-1
+                )  # [B * beam, 1, 1, V + 1]
+                beam_logp = beam_logp[:, 0, 0, :].view(rows, beam, -1)  # [B, beam, V + 1]
+
+                # Add the blank token to every hypothesis. Merge the score of hypotheses which are already in A,
+                # and append the others to A.
+                blank_scores = c_scores + beam_logp[:, :, self.blank].double()
+                valid = torch.isfinite(c_scores)
+                match = (
+                    (a_hashes.unsqueeze(1) == c_hashes.unsqueeze(2))
+                    & (a_lens.unsqueeze(1) == c_lens.unsqueeze(2))
+                    & (slot_ids < a_counts.unsqueeze(1)).unsqueeze(1)
+                )  # [B, beam, slots + 1]
+                # Compare the labels of the hypotheses whose hashes match, labels past the length are blank
+                row_idx, beam_idx, slot_idx = match.nonzero(as_tuple=True)
+                same_tokens = a_tokens[row_idx, slot_idx] == c_tokens[row_idx, beam_idx]
+                match[row_idx, beam_idx, slot_idx] = same_tokens.all(dim=-1)
+                merged = match.any(dim=-1) & valid
+                merge_slots = torch.where(merged, match.float().argmax(dim=-1), torch.full_like(c_lens, num_slots))
+                merge_scores = torch.full_like(a_scores, float('-inf')).scatter(
+                    1, merge_slots, torch.where(merged, blank_scores, torch.full_like(blank_scores, float('-inf')))
+                )
+                a_scores = torch.logaddexp(a_scores, merge_scores)
+
+                added = valid & ~merged
+                add_slots = a_counts.unsqueeze(1) + added.long().cumsum(dim=1) - 1
+                add_slots = torch.where(added, add_slots, torch.full_like(add_slots, num_slots))
+                a_scores.scatter_(1, add_slots, blank_scores)
+                a_hashes.scatter_(1, add_slots, c_hashes)
+                a_tokens.scatter_(1, add_slots.unsqueeze(-1).expand(-1, -1, capacity), c_tokens)
+                a_lens.scatter_(1, add_slots, c_lens)
+                a_sources.scatter_(1, add_slots, v * beam + beam_ids)
+                a_counts += added.sum(dim=1)
+                # The spare slot may have been written to, keep it invalid
+                a_scores[:, num_slots] = float('-inf')
+
+                if v == max_expansions - 1:
+                    break
+
+                # Expand every hypothesis with its top tokens (excluding blank), and prune to the beam
+                topk_logp, topk_ids = beam_logp[:, :, ids].topk(beam, dim=-1)  # [B, beam, beam]
+                candidate_scores = (c_scores.unsqueeze(-1) + topk_logp.double()).view(rows, -1)
+                c_scores, candidates = candidate_scores.topk(beam, dim=-1)  # [B, beam]
+                parents = torch.div(candidates, beam, rounding_mode='floor')
+                labels = topk_ids.view(rows, -1).gather(1, candidates) + index_incr
+
+                parent_lens = c_lens.gather(1, parents)
+                c_tokens = c_tokens.gather(1, parents.unsqueeze(-1).expand(-1, -1, capacity))
+                c_tokens = c_tokens.scatter(2, parent_lens.unsqueeze(-1), labels.unsqueeze(-1))
+                c_timesteps = c_timesteps.gather(1, parents.unsqueeze(-1).expand(-1, -1, capacity))
+                c_timesteps = c_timesteps.scatter(
+                    2, parent_lens.unsqueeze(-1), torch.full_like(parent_lens, i)[..., None]
+                )
+                c_lens = parent_lens + 1
+                c_hashes = c_hashes.gather(1, parents) * _SEQUENCE_HASH_BASE + labels + 1
+                c_state = self.decoder.batch_gather_states([c_state], (row_ids * beam + parents).view(-1))
+
+            if not expansions:
+                # No hypothesis was expanded, so that A is empty and so are the beams
+                scores = torch.full_like(scores, float('-inf'))
+                continue
+
+            # Prune beam
+            scores, selected = a_scores.topk(beam, dim=-1)  # [B, beam]
+            sources = a_sources.gather(1, selected)
+            num_expansions = len(expansions)
+
+            def gather_expansions(position: int) -> torch.Tensor:
+                fields = torch.stack([expansion[position] for expansion in expansions], dim=1)
+                fields = fields.view(rows, num_expansions * beam, *fields.shape[3:])
+                index = sources.view(rows, beam, *([1] * (fields.dim() - 2))).expand(rows, beam, *fields.shape[2:])
+                return fields.gather(1, index)
+
+            tokens = gather_expansions(0)
+            timesteps = gather_expansions(1)
+            seq_lens = gather_expansions(2)
+            hashes = gather_expansions(3)
+            beam_y = torch.stack([expansion[4].view(rows, beam, -1) for expansion in expansions], dim=1)
+            beam_y = beam_y.view(rows, num_expansions * beam, -1)
+            beam_y = beam_y.gather(1, sources.unsqueeze(-1).expand(-1, -1, beam_y.size(-1))).view(rows * beam, 1, -1)
+            flat_sources = (
+                torch.div(sources, beam, rounding_mode='floor') * (rows * beam) + row_ids * beam + sources % beam
+            )
+            beam_state = self.decoder.batch_gather_states(
+                [expansion[5] for expansion in expansions], flat_sources.view(-1)
+            )
+
+        finalize(0, rows)
+        return results
+
     def align_length_sync_decoding(
         self, h: torch.Tensor, encoded_lengths: torch.Tensor, partial_hypotheses: Optional[Hypothesis] = None
     ) -> List[Hypothesis]:
@@ -785,7 +1055,7 @@ class BeamRNNTInfer(Typing):
         ]
 
         final = []
-        cache = {}
+        cache = self.prediction_cache
 
         # ALSD runs for T + U_max steps
         for i in range(h_length + u_max):
@@ -950,7 +1220,7 @@ class BeamRNNTInfer(Typing):
             )
         ]
 
-        cache = {}
+        cache = self.prediction_cache
 
         # Decode a batch of beam states and scores
         beam_dec_out, beam_state, beam_lm_tokens = self.decoder.batch_score_hypothesis(init_tokens, cache, beam_state)
@@ -1205,3 +1475,4 @@ class BeamRNNTInferConfig:
     language_model: Optional[Dict[str, Any]] = None
     softmax_temperature: float = 1.0
     preserve_alignments: bool = False
+    prediction_cache_size: Optional[int] = 10000
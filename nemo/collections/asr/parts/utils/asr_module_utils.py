@@ -14,10 +14,12 @@
 
 from typing import Optional
 
+import torch
 from omegaconf import DictConfig, open_dict
 
-from nemo.collections.asr.modules import conv_asr
+from nemo.collections.asr.modules import conformer_encoder, conv_asr
 from nemo.collections.asr.parts.submodules import jasper
+from nemo.collections.asr.parts.utils import quantization_utils
 from nemo.utils import logging
 
 
@@ -80,3 +82,47 @@ def _update_se_context_window(model: 'ASRModel', context_window: int, cfg: Optio
             # update config
             if cfg is not None:
                 cfg.jasper[jasper_block_counter].se_context_size = context_window
+
+
+def prepare_for_cpu_inference(
+    model: 'ASRModel',
+    dtype: torch.dtype = torch.qint8,
+    fold_batch_norm: bool = True,
+    quantize_pointwise_conv: bool = True,
+):
+    """
+    Converts, in place, a model with an `encoder` which is an instance of `ConformerEncoder` or `ConvASREncoder`
+    into an inference variant optimized for CPU.
+
+    The batch normalizations of the encoder are folded into the preceding convolutions, and its linear layers and
+    pointwise convolutions are dynamically quantized. The preprocessor and the decoding stack (decoder, joint and
+    decoding strategy) are unchanged.
+
+    The model is moved to CPU and set in inference mode. Quantized modules only run on CPU and can not be trained,
+    so the converted model should not be saved over the original checkpoint.
+
+    Args:
+        model: A subclass of `ASRModel`, itself a subclass of `ModelPT`.
+        dtype: The type of the quantized weights, `torch.qint8` or `torch.float16`.
+        fold_batch_norm: Whether to fold the batch normalizations into the convolutions.
+        quantize_pointwise_conv: Whether to quantize the pointwise convolutions along with the linear layers.
+    """
+    if not isinstance(model.encoder, (conformer_encoder.ConformerEncoder, conv_asr.ConvASREncoder)):
+        logging.info(
+            f"Could not prepare the model for CPU inference "
+            f"since the `encoder` module is not an instance of `ConformerEncoder` or `ConvASREncoder`.\n"
+            f"Provided encoder class = {model.encoder.__class__.__name__}"
+        )
+        return
+
+    model.eval()
+    model.to(torch.device('cpu'))
+
+    num_folded = quantization_utils.fold_batch_norm(model.encoder) if fold_batch_norm else 0
+    num_quantized = quantization_utils.quantize_dynamic(
+        model.encoder, dtype=dtype, quantize_pointwise_conv=quantize_pointwise_conv
+    )
+    logging.info(
+        f"Prepared the model for CPU inference: folded {num_folded} batch normalizations and dynamically quantized "
+        f"{num_quantized} layers of the encoder to {dtype}."
+    )
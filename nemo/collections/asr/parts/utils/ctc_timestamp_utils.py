@@ -0,0 +1,327 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+__all__ = ['CTCOffsets', 'CTCTimestamps', 'CTCTokenTable', 'compute_ctc_offsets']
+
+
+class CTCTokenTable:
+    """
+    Caches the properties of the tokens of a vocabulary which are needed for timestamps, as arrays indexed by token
+    id. Tokens are decoded the first time they are seen.
+
+    Args:
+        decode_tokens_to_str: Callable which maps a list of token ids to text.
+        decode_ids_to_tokens: Callable which maps a list of token ids to their string representation.
+        word_delimiter: The string of the token which separates words, for character vocabularies.
+    """
+
+    def __init__(
+        self,
+        decode_tokens_to_str: Callable[[List[int]], str],
+        decode_ids_to_tokens: Callable[[List[int]], List[str]],
+        word_delimiter: str = ' ',
+    ):
+        self.decode_tokens_to_str = decode_tokens_to_str
+        self.decode_ids_to_tokens = decode_ids_to_tokens
+        self.word_delimiter = word_delimiter
+
+        self.strings: List[Optional[str]] = []
+        self.known = np.zeros(0, dtype=bool)
+        self.is_multichar = np.zeros(0, dtype=bool)
+        self.is_delimiter = np.zeros(0, dtype=bool)
+        self.is_word_start = np.zeros(0, dtype=bool)
+
+    def update(self, token_ids: np.ndarray):
+        """Decodes the tokens of `token_ids` which have not been seen yet."""
+        if len(token_ids) == 0:
+            return
+        size = int(token_ids.max()) + 1
+        if size > len(self.known):
+            extra = size - len(self.known)
+            self.strings.extend([None] * extra)
+            self.known = np.concatenate((self.known, np.zeros(extra, dtype=bool)))
+            self.is_multichar = np.concatenate((self.is_multichar, np.zeros(extra, dtype=bool)))
+            self.is_delimiter = np.concatenate((self.is_delimiter, np.zeros(extra, dtype=bool)))
+            self.is_word_start = np.concatenate((self.is_word_start, np.zeros(extra, dtype=bool)))
+
+        for token_id in np.unique(token_ids[~self.known[token_ids]]).tolist():
+            text = self.decode_tokens_to_str([token_id])
+            self.strings[token_id] = text
+            self.is_multichar[token_id] = len(text) > 1
+            self.is_delimiter[token_id] = text == self.word_delimiter
+            # Sub-word tokens which start a word carry a marker, such as _ or ##, which is stripped from the text.
+            self.is_word_start[token_id] = self.decode_ids_to_tokens([token_id])[0] != text
+            self.known[token_id] = True
+
+
+@dataclass
+class CTCOffsets:
+    """
+    Char (or sub-word) and word offsets of a hypothesis, in frames, as arrays.
+
+    Words span the tokens from `word_token_start` to `word_token_end` (exclusive). Use `char_offsets()` and
+    `word_offsets()` for the lists of dictionaries returned by `AbstractCTCDecoding.compute_ctc_timestamps`.
+    """
+
+    token_ids: np.ndarray
+    start_offsets: np.ndarray
+    end_offsets: np.ndarray
+    word_token_start: np.ndarray
+    word_token_end: np.ndarray
+    word_start_offsets: np.ndarray
+    word_end_offsets: np.ndarray
+    is_subword: bool
+    token_table: CTCTokenTable
+
+    def char_offsets(self) -> List[Dict]:
+        strings = self.token_table.strings
+        return [
+            {"char": strings[t], "start_offset": s, "end_offset": e}
+            for t, s, e in zip(self.token_ids.tolist(), self.start_offsets.tolist(), self.end_offsets.tolist())
+        ]
+
+    def word_offsets(self) -> List[Dict]:
+        token_ids = self.token_ids.tolist()
+        strings = self.token_table.strings
+        word_offsets = []
+        for start, end, start_offset, end_offset in zip(
+            self.word_token_start.tolist(),
+            self.word_token_end.tolist(),
+            self.word_start_offsets.tolist(),
+            self.word_end_offsets.tolist(),
+        ):
+            if self.is_subword:
+                word = self.token_table.decode_tokens_to_str(token_ids[start:end])
+            else:
+                word = ''.join(strings[t] for t in token_ids[start:end])
+            word_offsets.append({"word": word, "start_offset": start_offset, "end_offset": end_offset})
+        return word_offsets
+
+
+class CTCTimestamps(dict):
+    """
+    The timestamps of a hypothesis, stored in `Hypothesis.timestep`. A dictionary with the keys "timestep", "char"
+    and "word" (depending on the timestamp type), whose char and word lists of dictionaries are only built when the
+    dictionary is first accessed past its "timestep" key. The arrays are available in `offsets`.
+    """
+
+    def __init__(self, timestep: List[int], offsets: CTCOffsets, timestamp_type: str = 'all'):
+        super().__init__(timestep=timestep)
+        self.offsets = offsets
+        self._pending = []
+        if timestamp_type in ['char', 'all']:
+            self._pending.append('char')
+        if timestamp_type in ['word', 'all']:
+            self._pending.append('word')
+
+    def _materialize(self):
+        """Builds the char and word offsets which have not been built (or set) yet."""
+        pending, self._pending = self._pending, []
+        for key in pending:
+            if key == 'char':
+                super().__setitem__(key, self.offsets.char_offsets())
+            else:
+                super().__setitem__(key, self.offsets.word_offsets())
+
+    def __missing__(self, key):
+        if key not in self._pending:
+            raise KeyError(key)
+        self._materialize()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key in self._pending:
+            self._pending.remove(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._materialize()
+        super().__delitem__(key)
+
+    def __contains__(self, key):
+        return key in self._pending or super().__contains__(key)
+
+    def __iter__(self):
+        self._materialize()
+        return super().__iter__()
+
+    def __len__(self):
+        return super().__len__() + len(self._pending)
+
+    def __eq__(self, other):
+        self._materialize()
+        if isinstance(other, CTCTimestamps):
+            other._materialize()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self._materialize()
+        return super().__repr__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        self._materialize()
+        return super().keys()
+
+    def values(self):
+        self._materialize()
+        return super().values()
+
+    def items(self):
+        self._materialize()
+        return super().items()
+
+    def copy(self):
+        self._materialize()
+        return dict(super().items())
+
+    def pop(self, key, *args):
+        self._materialize()
+        return super().pop(key, *args)
+
+    def popitem(self):
+        self._materialize()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._materialize()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._materialize()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._pending = []
+        super().clear()
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+
+def compute_ctc_offsets(
+    token_ids: Sequence[np.ndarray],
+    token_repetitions: Sequence[np.ndarray],
+    start_indices: Sequence[int],
+    token_table: CTCTokenTable,
+    blank_id: int,
+) -> List[CTCOffsets]:
+    """
+    Computes the char (or sub-word) and word offsets of a batch of CTC collapsed hypotheses at once.
+
+    The hypotheses are given in run-length form: the collapsed labels, and the number of frames from the previous
+    label to every label. A label ends at the cumulative sum of the repetitions, and starts where the previous label
+    ends, or at `start_index` for the first label. Hypotheses with a token of more than one character are treated
+    as sub-word hypotheses, whose words start at the tokens with a word start marker. Otherwise, words are the runs
+    of tokens between word delimiters.
+
+    Args:
+        token_ids: One array of collapsed token ids per hypothesis.
+        token_repetitions: One array with the number of repetitions of every token per hypothesis.
+        start_indices: The start offset of the first token of every hypothesis.
+        token_table: Table of the tokens of the vocabulary.
+        blank_id: The id of the CTC blank token, which is dropped from the offsets.
+
+    Returns:
+        A list with the offsets of every hypothesis.
+    """
+    batch_size = len(token_ids)
+    if batch_size == 0:
+        return []
+    counts = np.array([len(t) for t in token_ids], dtype=np.int64)
+    tokens = np.concatenate([np.asarray(t, dtype=np.int64) for t in token_ids])
+    repetitions = np.concatenate([np.asarray(r, dtype=np.int64) for r in token_repetitions])
+    first = np.cumsum(counts) - counts
+
+    # Segmented cumulative sum of the repetitions
+    cumsum = np.cumsum(repetitions)
+    base = np.concatenate(([0], cumsum))[first]
+    end_offsets = cumsum - np.repeat(base, counts)
+    start_offsets = np.empty_like(end_offsets)
+    start_offsets[1:] = end_offsets[:-1]
+    non_empty = counts > 0
+    start_offsets[first[non_empty]] = np.asarray(start_indices, dtype=np.int64)[non_empty]
+
+    # Drop the blank tokens
+    keep = tokens != blank_id
+    if not keep.all():
+        sample_idx = np.repeat(np.arange(batch_size), counts)
+        tokens, start_offsets, end_offsets = tokens[keep], start_offsets[keep], end_offsets[keep]
+        counts = np.bincount(sample_idx[keep], minlength=batch_size)
+        first = np.cumsum(counts) - counts
+
+    token_table.update(tokens)
+    num_tokens = len(tokens)
+    sample_idx = np.repeat(np.arange(batch_size), counts)
+    is_first = np.zeros(num_tokens, dtype=bool)
+    is_first[first[counts > 0]] = True
+    is_last = np.zeros(num_tokens, dtype=bool)
+    is_last[(first + counts - 1)[counts > 0]] = True
+
+    is_subword = np.bincount(sample_idx, weights=token_table.is_multichar[tokens], minlength=batch_size) > 0
+    subword = is_subword[sample_idx]
+
+    # Char hypotheses: words are the runs of tokens which are not word delimiters
+    in_word = ~token_table.is_delimiter[tokens]
+    prev_in_word = np.zeros(num_tokens, dtype=bool)
+    prev_in_word[1:] = in_word[:-1]
+    next_in_word = np.zeros(num_tokens, dtype=bool)
+    next_in_word[:-1] = in_word[1:]
+    char_word_start = in_word & (is_first | ~prev_in_word)
+    char_word_last = in_word & (is_last | ~next_in_word)
+
+    # Sub-word hypotheses: words start at the tokens with a word start marker, and at the first token
+    subword_start = is_first | token_table.is_word_start[tokens]
+    next_subword_start = np.ones(num_tokens, dtype=bool)
+    next_subword_start[:-1] = subword_start[1:]
+    subword_last = is_last | next_subword_start
+
+    word_start = np.nonzero(np.where(subword, subword_start, char_word_start))[0]
+    word_last = np.nonzero(np.where(subword, subword_last, char_word_last))[0]
+    word_start_offsets = start_offsets[word_start]
+    # Sub-words end where the next word starts, except for the last word
+    next_start = np.minimum(word_last + 1, max(num_tokens - 1, 0))
+    word_end_offsets = np.where(
+        subword[word_last] & ~is_last[word_last], start_offsets[next_start], end_offsets[word_last]
+    )
+    word_counts = np.bincount(sample_idx[word_start], minlength=batch_size)
+    word_first = np.cumsum(word_counts) - word_counts
+
+    offsets = []
+    for idx in range(batch_size):
+        token_slice = slice(first[idx], first[idx] + counts[idx])
+        word_slice = slice(word_first[idx], word_first[idx] + word_counts[idx])
+        offsets.append(
+            CTCOffsets(
+                token_ids=tokens[token_slice],
+                start_offsets=start_offsets[token_slice],
+                end_offsets=end_offsets[token_slice],
+                word_token_start=word_start[word_slice] - first[idx],
+                word_token_end=word_last[word_slice] + 1 - first[idx],
+                word_start_offsets=word_start_offsets[word_slice],
+                word_end_offsets=word_end_offsets[word_slice],
+                is_subword=bool(is_subword[idx]),
+                token_table=token_table,
+            )
+        )
+    return offsets
@@ -0,0 +1,195 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gzip
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, Tuple
+
+from nemo.utils import logging
+
+__all__ = ['NGramLanguageModel', 'ARPALanguageModel', 'KenLMLanguageModel', 'load_ngram_lm']
+
+# Log10 probability of the words which are not in the vocabulary of an ARPA model without <unk>
+OOV_LOG10_PROB = -10.0
+
+
+class NGramLanguageModel(ABC):
+    """
+    Interface of the N-gram language models used by the CTC prefix beam search.
+
+    A language model is queried one word at a time. The state of a query holds the context of the word, and is
+    returned along with the score of the word so that it can be used to score the next word. States must be hashable,
+    so that queries can be cached.
+    """
+
+    order: int
+
+    @abstractmethod
+    def begin_state(self) -> Hashable:
+        """Returns the state of the beginning of a sentence."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def score(self, state: Hashable, word: str) -> Tuple[float, Hashable]:
+        """
+        Scores a word in the context of a state.
+
+        Args:
+            state: The state of the context, from `begin_state()` or a previous call to `score()`.
+            word: The word to score.
+
+        Returns:
+            A tuple of the log10 probability of the word, and the state with the word appended to the context.
+        """
+        raise NotImplementedError()
+
+
+class ARPALanguageModel(NGramLanguageModel):
+    """
+    Pure Python back-off N-gram language model loaded from an ARPA file, which may be gzipped.
+
+    States are the tuples of the last words of the context, shortened to the longest suffix known to the model, so
+    that contexts which share the same probabilities share the same state.
+
+    Args:
+        path: Path to the ARPA file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Maps every N-gram to a tuple of its log10 probability and log10 back-off weight
+        self.ngrams: Dict[Tuple[str, ...], Tuple[float, float]] = {}
+        self.order = 0
+
+        open_fn = gzip.open if path.endswith('.gz') else open
+        with open_fn(path, 'rt', encoding='utf-8') as f:
+            self._read(f)
+
+        unk = self.ngrams.get(('<unk>',))
+        self.unk_log10_prob = unk[0] if unk is not None else OOV_LOG10_PROB
+        logging.info(f"Loaded a {self.order}-gram ARPA language model with {len(self.ngrams)} N-grams from '{path}'.")
+
+    def _read(self, lines):
+        order = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('ngram ') or line == '\\data\\':
+                continue
+            if line == '\\end\\':
+                break
+            match = re.match(r'^\\(\d+)-grams:$', line)
+            if match:
+                order = int(match.group(1))
+                self.order = max(self.order, order)
+                continue
+            if order == 0:
+                continue
+
+            fields = line.split()
+            words = tuple(fields[1 : order + 1])
+            if len(words) != order:
+                raise ValueError(f"Invalid {order}-gram in ARPA file '{self.path}': {line}")
+            backoff = float(fields[order + 1]) if len(fields) > order + 1 else 0.0
+            self.ngrams[words] = (float(fields[0]), backoff)
+
+    def begin_state(self) -> Tuple[str, ...]:
+        return ('<s>',) if ('<s>',) in self.ngrams else ()
+
+    def score(self, state: Tuple[str, ...], word: str) -> Tuple[float, Tuple[str, ...]]:
+        ngrams = self.ngrams
+        log10_prob = 0.0
+        context = state
+        while True:
+            entry = ngrams.get(context + (word,))
+            if entry is not None:
+                log10_prob += entry[0]
+                break
+            if not context:
+                log10_prob += self.unk_log10_prob
+                break
+            entry = ngrams.get(context)
+            if entry is not None:
+                log10_prob += entry[1]
+            context = context[1:]
+
+        # The next state is the longest suffix of the context and the word which is known to the model
+        next_state = (state + (word,))[-(self.order - 1) :] if self.order > 1 else ()
+        while next_state and next_state not in ngrams:
+            next_state = next_state[1:]
+        return log10_prob, next_state
+
+
+class KenLMLanguageModel(NGramLanguageModel):
+    """
+    N-gram language model backed by the KenLM library, which loads both ARPA and binary models.
+
+    Args:
+        path: Path to the ARPA or binary KenLM model.
+    """
+
+    def __init__(self, path: str):
+        try:
+            import kenlm
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(
+                "KenLMLanguageModel requires the installation of kenlm "
+                "from scripts/asr_language_modeling/ngram_lm/install_beamsearch_decoders.sh"
+            )
+
+        self._kenlm = kenlm
+        self.path = path
+        self.model = kenlm.Model(path)
+        self.order = self.model.order
+
+    def begin_state(self):
+        state = self._kenlm.State()
+        self.model.BeginSentenceWrite(state)
+        return state
+
+    def score(self, state, word: str):
+        next_state = self._kenlm.State()
+        log10_prob = self.model.BaseScore(state, word, next_state)
+        return log10_prob, next_state
+
+    def __getstate__(self):
+        # KenLM models are reloaded from their path when the language model is sent to another process
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+
+def load_ngram_lm(path: str) -> NGramLanguageModel:
+    """
+    Loads an N-gram language model. KenLM is used when it is installed. Otherwise, ARPA files (with the extension
+    .arpa or .arpa.gz) are loaded by the pure Python `ARPALanguageModel`.
+
+    Args:
+        path: Path to the ARPA or binary KenLM model.
+
+    Returns:
+        The language model.
+    """
+    try:
+        import kenlm  # noqa: F401
+
+        return KenLMLanguageModel(path)
+    except ModuleNotFoundError:
+        if path.endswith('.arpa') or path.endswith('.arpa.gz'):
+            return ARPALanguageModel(path)
+        raise ModuleNotFoundError(
+            f"Loading the binary language model '{path}' requires the installation of kenlm "
+            f"from scripts/asr_language_modeling/ngram_lm/install_beamsearch_decoders.sh. "
+            f"Language models in the ARPA format can be loaded without it."
+        )
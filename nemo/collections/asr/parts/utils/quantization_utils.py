@@ -0,0 +1,165 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import torch
+import torch.nn as nn
+
+from nemo.collections.asr.parts.submodules.conformer_modules import ConformerConvolution
+from nemo.collections.asr.parts.submodules.jasper import MaskedConv1d
+
+__all__ = ['PointwiseConv1dAsLinear', 'fold_batch_norm', 'is_pointwise_conv', 'quantize_dynamic']
+
+
+class PointwiseConv1dAsLinear(nn.Module):
+    """
+    A pointwise (kernel size 1) convolution computed as a linear layer over the channels of every time step, so that
+    it can be dynamically quantized with the optimized kernels of `torch.nn.quantized.dynamic.Linear`.
+
+    Args:
+        conv: The pointwise convolution, without groups, stride or padding.
+    """
+
+    def __init__(self, conv: nn.Conv1d):
+        super().__init__()
+        if not is_pointwise_conv(conv):
+            raise ValueError(f"{conv} is not a pointwise convolution without groups, stride or padding.")
+
+        self.linear = nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight[:, :, 0])
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+        # Attributes of the convolution which are read by the modules which wrap it, such as MaskedConv1d
+        self.in_channels = conv.in_channels
+        self.out_channels = conv.out_channels
+        self.kernel_size = conv.kernel_size
+        self.stride = conv.stride
+        self.padding = conv.padding
+        self.dilation = conv.dilation
+        self.groups = conv.groups
+
+    def forward(self, x):
+        # [B, C, T] -> [B, T, C] -> [B, C', T]
+        return self.linear(x.transpose(1, 2)).transpose(1, 2)
+
+
+def is_pointwise_conv(conv: nn.Module) -> bool:
+    return (
+        isinstance(conv, nn.Conv1d)
+        and conv.kernel_size == (1,)
+        and conv.stride == (1,)
+        and conv.padding == (0,)
+        and conv.groups == 1
+        and conv.padding_mode == 'zeros'
+    )
+
+
+def _fold_batch_norm_into_conv(conv: nn.Conv1d, bn: nn.BatchNorm1d):
+    """Folds the affine transform of a batch normalization in inference mode into the preceding convolution."""
+    with torch.no_grad():
+        scale = torch.rsqrt(bn.running_var + bn.eps)
+        if bn.affine:
+            scale = scale * bn.weight
+        shift = -bn.running_mean * scale
+        if bn.affine:
+            shift = shift + bn.bias
+        if conv.bias is None:
+            conv.bias = nn.Parameter(
+                torch.zeros(conv.out_channels, dtype=conv.weight.dtype, device=conv.weight.device)
+            )
+        conv.weight.mul_(scale.view(-1, 1, 1))
+        conv.bias.copy_(conv.bias * scale + shift)
+
+
+def _foldable_conv(module: nn.Module):
+    """Returns the convolution of a layer whose output is exactly the output of the convolution, or None."""
+    if isinstance(module, MaskedConv1d):
+        # Heads share the weights of the convolution between groups of channels
+        return module.conv if module.heads == -1 and isinstance(module.conv, nn.Conv1d) else None
+    return module if isinstance(module, nn.Conv1d) else None
+
+
+def _foldable_batch_norm(module: nn.Module) -> bool:
+    return isinstance(module, nn.BatchNorm1d) and module.track_running_stats and module.running_var is not None
+
+
+def fold_batch_norm(module: nn.Module) -> int:
+    """
+    Folds the batch normalizations which directly follow a convolution into the weights and bias of the convolution,
+    and replaces them with `nn.Identity`. The outputs of the module in inference mode are unchanged.
+
+    Convolutions are followed by batch normalizations in the `nn.Sequential` and `nn.ModuleList` of the blocks of
+    `ConvASREncoder`, and in the `ConformerConvolution` of every layer of `ConformerEncoder`.
+
+    Args:
+        module: The module whose submodules are folded in place.
+
+    Returns:
+        The number of batch normalizations which were folded.
+    """
+    num_folded = 0
+    for submodule in module.modules():
+        if isinstance(submodule, (nn.Sequential, nn.ModuleList)):
+            layers = list(submodule)
+            for idx in range(1, len(layers)):
+                conv = _foldable_conv(layers[idx - 1])
+                if conv is not None and _foldable_batch_norm(layers[idx]):
+                    _fold_batch_norm_into_conv(conv, layers[idx])
+                    submodule[idx] = nn.Identity()
+                    num_folded += 1
+        elif isinstance(submodule, ConformerConvolution):
+            if submodule.norm_type == 'batch_norm' and _foldable_batch_norm(submodule.batch_norm):
+                _fold_batch_norm_into_conv(submodule.depthwise_conv, submodule.batch_norm)
+                submodule.batch_norm = nn.Identity()
+                num_folded += 1
+    return num_folded
+
+
+def quantize_dynamic(module: nn.Module, dtype: torch.dtype = torch.qint8, quantize_pointwise_conv: bool = True) -> int:
+    """
+    Dynamically quantizes the linear layers of a module in place, for inference on CPU. The weights are quantized
+    once, and the activations are quantized on the fly with the range of every batch.
+
+    Pointwise convolutions, such as the pointwise convolutions of the separable convolutions of `ConvASREncoder`
+    and of the convolution modules of `ConformerEncoder`, are replaced by `PointwiseConv1dAsLinear` and quantized
+    like linear layers. The other convolutions stay in floating point: they are depthwise or have few channels, and
+    the dynamically quantized convolutions of PyTorch are slower than their floating point counterparts on CPU.
+
+    Args:
+        module: The module to quantize, in inference mode.
+        dtype: The type of the quantized weights, `torch.qint8` or `torch.float16`.
+        quantize_pointwise_conv: Whether to quantize the pointwise convolutions.
+
+    Returns:
+        The number of quantized layers.
+    """
+    if quantize_pointwise_conv:
+        for submodule in list(module.modules()):
+            if isinstance(submodule, MaskedConv1d):
+                if is_pointwise_conv(submodule.conv):
+                    submodule.conv = PointwiseConv1dAsLinear(submodule.conv)
+            elif isinstance(submodule, (nn.Sequential, nn.ModuleList)):
+                # Convolutions without masks of ConvASREncoder
+                for idx, layer in enumerate(submodule):
+                    if is_pointwise_conv(layer):
+                        submodule[idx] = PointwiseConv1dAsLinear(layer)
+            elif isinstance(submodule, ConformerConvolution):
+                for name in ['pointwise_conv1', 'pointwise_conv2']:
+                    if is_pointwise_conv(getattr(submodule, name)):
+                        setattr(submodule, name, PointwiseConv1dAsLinear(getattr(submodule, name)))
+
+    num_linear = sum(type(submodule) == nn.Linear for submodule in module.modules())
+    torch.quantization.quantize_dynamic(module, {nn.Linear}, dtype=dtype, inplace=True)
+    return num_linear
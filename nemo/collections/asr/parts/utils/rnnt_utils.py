@@ -26,6 +26,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -153,3 +154,77 @@ def select_k_expansions(
             k_expansions.append([(k_best_exp_idx, k_best_exp)])
 
     return k_expansions
+
+
+class PredictionCache:
+    """
+    Least recently used cache of the prediction network outputs and states of label sequences, used by beam search.
+
+    The prediction network output of a hypothesis only depends on its labels, so hypotheses which share a label
+    sequence (across beams, time steps, expansion steps and utterances) can share the same output and state.
+    Entries are keyed by the tuple of labels of the sequence, and behave like the dictionary caches accepted by
+    `AbstractRNNTDecoder.score_hypothesis` and `AbstractRNNTDecoder.batch_score_hypothesis`.
+
+    Args:
+        max_size: Maximum number of cached label sequences. The least recently used sequences are evicted first.
+            If None, the cache is unbounded.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        if max_size is not None and max_size < 1:
+            raise ValueError("`max_size` of the prediction cache must be a positive integer or None.")
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, sequence: Tuple[int]) -> bool:
+        return sequence in self._entries
+
+    def __getitem__(self, sequence: Tuple[int]) -> Any:
+        value = self._entries[sequence]
+        self._entries.move_to_end(sequence)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, sequence: Tuple[int], value: Any):
+        if sequence in self._entries:
+            self._entries.move_to_end(sequence)
+        else:
+            self.misses += 1
+        self._entries[sequence] = value
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups which were served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def clear(self):
+        """Removes all the entries, but keeps the statistics."""
+        self._entries.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns the size of the cache, and the number of hits, misses and evictions since the last reset."""
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
@@ -14,6 +14,7 @@
 
 import copy
 import os
+from typing import List
 
 import numpy as np
 import soundfile as sf
@@ -23,7 +24,8 @@ from torch.utils.data import DataLoader
 
 from nemo.collections.asr.models.ctc_bpe_models import EncDecCTCModelBPE
 from nemo.collections.asr.parts.mixins.streaming import StreamingEncoder
-from nemo.collections.asr.parts.preprocessing.features import normalize_batch
+from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures, normalize_batch
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.core.classes import IterableDataset
 from nemo.core.neural_types import LengthsType, NeuralType
 
@@ -66,6 +68,35 @@ def write_lcs_alignment_to_pickle(alignment, filepath, extras=None):
     torch.save(extras, filepath)
 
 
+def lcs_suffix_lengths(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Computes the Longest Common Suffix table used by the LCS merge, for a batch of pairs of token sequences at once.
+
+    The cell (i, j) holds the length of the longest common suffix of X[:i] and Y[:j]. It only depends on the cell
+    (i - 1, j - 1), so every row is computed from the previous one with a single vectorized operation over all the
+    tokens of Y and all the pairs of the batch.
+
+    Args:
+        X: Integer array of shape [B, m] with the tokens of the previous chunks. Padded values must not match any
+            token of Y.
+        Y: Integer array of shape [B, n] with the tokens of the current chunks. Padded values must not match any
+            token of X.
+
+    Returns:
+        An integer array of shape [B, m + 1, n + 1]. For a pair with m_b and n_b tokens, the slice
+        [:m_b + 1, :n_b + 1] is the table of the pair on its own.
+    """
+    batch_size, m = X.shape
+    n = Y.shape[1]
+    # Rows are the leading dimension, so that every row of the batch is contiguous
+    lengths = np.zeros((m + 1, batch_size, n + 1), dtype=np.int32)
+    if m > 0 and n > 0:
+        matches = X.T[:, :, None] == Y[None, :, :]
+        for i in range(1, m + 1):
+            np.add(lengths[i - 1, :, :-1], 1, out=lengths[i, :, 1:], where=matches[i - 1])
+    return lengths.transpose(1, 0, 2)
+
+
 def longest_common_subsequence_merge(X, Y, filepath=None):
     """
     Longest Common Subsequence merge algorithm for aligning two consecutive buffers.
@@ -87,6 +118,8 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         lcs_delay = math.floor(((total_buffer_in_secs - chunk_len_in_sec)) / model_stride_in_secs)
 
     Total cost of the model is O(m_{i-1} * n_{i}) where (m, n) represents the number of subword ids of the buffer.
+    The alignment table is computed with vectorized NumPy operations by `lcs_suffix_lengths`. Use
+    `batched_longest_common_subsequence_merge` to merge the chunks of several streams at once.
 
     Args:
         X: The subset of the previous chunk i-1, sliced such X = X[-(lcs_delay * max_steps_per_timestep):]
@@ -99,34 +132,73 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
             - i: Start index of alignment along the i-1 chunk.
             - j: Start index of alignment along the ith chunk.
             - slice_len: number of tokens to slice off from the ith chunk.
-        The LCS alignment matrix itself (shape m + 1, n + 1)
+        The LCS alignment matrix itself (integer array of shape m + 1, n + 1)
     """
-    # LCSuff is the table with zero
-    # value initially in each cell
-    m = len(X)
-    n = len(Y)
-    LCSuff = [[0 for k in range(n + 1)] for l in range(m + 1)]
-
-    # To store the length of
-    # longest common substring
-    result = 0
-    result_idx = [0, 0, 0]  # Contains (i, j, slice_len)
+    return batched_longest_common_subsequence_merge([X], [Y], filepaths=[filepath])[0]
 
-    # Following steps to build
-    # LCSuff[m+1][n+1] in bottom up fashion
-    for i in range(m + 1):
-        for j in range(n + 1):
-            if i == 0 or j == 0:
-                LCSuff[i][j] = 0
-            elif X[i - 1] == Y[j - 1]:
-                LCSuff[i][j] = LCSuff[i - 1][j - 1] + 1
 
-                if result <= LCSuff[i][j]:
-                    result = LCSuff[i][j]  # max(result, LCSuff[i][j])
-                    result_idx = [i, j, result]
+def batched_longest_common_subsequence_merge(Xs, Ys, filepaths=None):
+    """
+    Longest Common Subsequence merge of a batch of pairs of consecutive buffers, whose alignment tables are computed
+    at once. See `longest_common_subsequence_merge` for the details of the algorithm.
 
-            else:
-                LCSuff[i][j] = 0
+    Args:
+        Xs: List of the subsets of the previous chunks.
+        Ys: List of the current chunks.
+        filepaths: Optional list of filepaths (or None) to save the LCS alignment matrices for later introspection.
+
+    Returns:
+        A list with the tuple of the slice indices and the LCS alignment matrix of every pair, as returned by
+        `longest_common_subsequence_merge`.
+    """
+    if filepaths is None:
+        filepaths = [None] * len(Xs)
+
+    X_lengths = [len(X) for X in Xs]
+    Y_lengths = [len(Y) for Y in Ys]
+    # Pad with values which never match
+    X_batch = np.full((len(Xs), max(X_lengths, default=0)), -1, dtype=np.int64)
+    Y_batch = np.full((len(Ys), max(Y_lengths, default=0)), -2, dtype=np.int64)
+    for idx, (X, Y) in enumerate(zip(Xs, Ys)):
+        X_batch[idx, : len(X)] = X
+        Y_batch[idx, : len(Y)] = Y
+    alignments = lcs_suffix_lengths(X_batch, Y_batch)
+
+    results = []
+    for idx, (X, Y, filepath) in enumerate(zip(Xs, Ys, filepaths)):
+        LCSuff = alignments[idx, : len(X) + 1, : len(Y) + 1]
+        result_idx, is_complete_merge = _lcs_merge_slice(LCSuff)
+
+        if filepath is not None:
+            extras = {
+                "is_complete_merge": is_complete_merge,
+                "X": X,
+                "Y": Y,
+                "slice_idx": result_idx,
+            }
+            write_lcs_alignment_to_pickle(LCSuff, filepath=filepath, extras=extras)
+            print("Wrote alignemnt to :", filepath)
+
+        results.append((result_idx, LCSuff))
+    return results
+
+
+def _lcs_merge_slice(LCSuff: np.ndarray):
+    """
+    Finds the slice of the current chunk to merge, given the LCS alignment table of shape [m + 1, n + 1].
+
+    Returns:
+        The list of (i, j, slice_len), and whether a complete merge was found.
+    """
+    m = LCSuff.shape[0] - 1
+    n = LCSuff.shape[1] - 1
+
+    # The last cell (in row-major order) with the longest common substring
+    result = int(LCSuff.max(initial=0))
+    result_idx = [0, 0, 0]  # Contains (i, j, slice_len)
+    if result > 0:
+        flat_idx = LCSuff.size - 1 - int(np.argmax(LCSuff.ravel()[::-1] == result))
+        result_idx = [flat_idx // (n + 1), flat_idx % (n + 1), result]
 
     # Check if perfect alignment was found or not
     # Perfect alignment is found if :
@@ -143,7 +215,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         # Perform backtrack to find the origin point of the slice (j) and how many tokens should be sliced
         while length >= 0 and i > 0 and j > 0:
             # Alignment exists at the required diagonal
-            if LCSuff[i - 1][j - 1] > 0:
+            if LCSuff[i - 1, j - 1] > 0:
                 length -= 1
                 i, j = i - 1, j - 1
 
@@ -176,17 +248,20 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
         j_skip = 0  # Number of tokens that were skipped along the diagonal
         slice_count = 0  # Number of tokens that should be sliced
 
-        # Select leftmost LCS
-        for i_idx in range(m, -1, -1):  # start from last timestep of old buffer
-            for j_idx in range(0, n + 1):  # start from first token from new buffer
-                # Select the longest LCSuff, while minimizing the index of j (token index for new buffer)
-                if LCSuff[i_idx][j_idx] > max_j and j_idx <= max_j_idx:
-                    max_j = LCSuff[i_idx][j_idx]
-                    max_j_idx = j_idx
-
-                    # Update the starting indices of the partial merge
-                    i_partial = i_idx
-                    j_partial = j_idx
+        # Select leftmost LCS, starting from the last timestep of the old buffer and the first token of the new
+        # buffer. Only the non-zero cells can be selected, so they are visited in the same order.
+        rows_reversed, cols = np.nonzero(LCSuff[::-1])
+        for i_idx, j_idx, value in zip(
+            (m - rows_reversed).tolist(), cols.tolist(), LCSuff[m - rows_reversed, cols].tolist()
+        ):
+            # Select the longest LCSuff, while minimizing the index of j (token index for new buffer)
+            if value > max_j and j_idx <= max_j_idx:
+                max_j = value
+                max_j_idx = j_idx
+
+                # Update the starting indices of the partial merge
+                i_partial = i_idx
+                j_partial = j_idx
 
         # EARLY EXIT (if max subsequence length <= MIN merge length)
         # Important case where there is long silence
@@ -218,6 +293,9 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
             j_exp = 0  # number of tokens to expand along the diagonal
             j_skip = 0  # how many diagonals didnt have the token. Incremented by 1 for every row i
 
+            # One byte per cell of the alignment, 1 where a common suffix exists, to search the diagonals quickly
+            aligned = (LCSuff > 0).astype(np.uint8).tobytes()
+
             for i_idx in range(i_temp, m + 1):  # walk from i_partial + 1 => m + 1
                 j_any_skip = 0  # If the diagonal element at this location is not found, set to 1
                 # j_any_skip expands the search space one place to the right
@@ -226,12 +304,14 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
                 # walk along the diagonal corresponding to i_idx, plus allowing diagonal skips to occur
                 # diagonal elements may not be aligned due to ASR model predicting
                 # incorrect token in between correct tokens
-                for j_idx in range(j_temp, j_temp + j_skip + 1):
-                    if j_idx < n + 1:
-                        if LCSuff[i_idx][j_idx] == 0:
-                            j_any_skip = 1
-                        else:
-                            j_exp = 1 + j_skip + j_any_skip
+                row_start = i_idx * (n + 1)
+                window = aligned[row_start + j_temp : row_start + min(j_temp + j_skip + 1, n + 1)]
+                last = window.rfind(b'\x01')
+                if last >= 0:
+                    # The skip flag is set if a diagonal element is missing before the last one found
+                    j_exp = 1 + j_skip + int(b'\x00' in window[:last])
+                if b'\x00' in window:
+                    j_any_skip = 1
 
                 # If the diagonal element existed, dont expand the search space,
                 # otherwise expand the search space 1 token to the right
@@ -250,7 +330,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
 
             # Partial backward trace to find start of slice
             while i_partial > 0 and j_partial > 0:
-                if LCSuff[i_partial][j_partial] == 0:
+                if LCSuff[i_partial, j_partial] == 0:
                     # diagonal skip occured, move j to left 1 extra time
                     j_partial -= 1
                     j_skip += 1
@@ -272,17 +352,7 @@ def longest_common_subsequence_merge(X, Y, filepath=None):
     result_idx[0] = i
     result_idx[1] = j
 
-    if filepath is not None:
-        extras = {
-            "is_complete_merge": is_complete_merge,
-            "X": X,
-            "Y": Y,
-            "slice_idx": result_idx,
-        }
-        write_lcs_alignment_to_pickle(LCSuff, filepath=filepath, extras=extras)
-        print("Wrote alignemnt to :", filepath)
-
-    return result_idx, LCSuff
+    return result_idx, is_complete_merge
 
 
 def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timestep: int = 5, filepath: str = None):
@@ -293,31 +363,47 @@ def lcs_alignment_merge_buffer(buffer, data, delay, model, max_steps_per_timeste
     the notion that the chunk size is >= the context window. In case this assumptio is violated, the results of the merge
     will be incorrect (or at least obtain worse WER overall).
     """
-    # If delay timesteps is 0, that means no future context was used. Simply concatenate the buffer with new data.
-    if delay < 1:
-        buffer += data
-        return buffer
+    return batched_lcs_alignment_merge_buffer(
+        [buffer], [data], delay, model, max_steps_per_timestep=max_steps_per_timestep, filepaths=[filepath]
+    )[0]
+
+
+def batched_lcs_alignment_merge_buffer(
+    buffers, datas, delay, model, max_steps_per_timestep: int = 5, filepaths: List[str] = None
+):
+    """
+    Merges the new text from the current frame of every stream with the previous text contained in its buffer, as
+    `lcs_alignment_merge_buffer` does, with the alignments of all the streams computed at once.
+
+    Returns:
+        The list of the merged buffers. The buffers are extended in place.
+    """
+    if filepaths is None:
+        filepaths = [None] * len(buffers)
 
+    # If delay timesteps is 0, that means no future context was used. Simply concatenate the buffer with new data.
     # If buffer is empty, simply concatenate the buffer and data.
-    if len(buffer) == 0:
-        buffer += data
-        return buffer
+    to_merge = [idx for idx, buffer in enumerate(buffers) if delay >= 1 and len(buffer) > 0]
 
     # Prepare a subset of the buffer that will be LCS Merged with new data
     search_size = int(delay * max_steps_per_timestep)
-    buffer_slice = buffer[-search_size:]
-
-    # Perform LCS Merge
-    lcs_idx, lcs_alignment = longest_common_subsequence_merge(buffer_slice, data, filepath=filepath)
-
-    # Slice off new data
-    # i, j, slice_len = lcs_idx
-    slice_idx = lcs_idx[1] + lcs_idx[-1]  # slice = j + slice_len
-    data = data[slice_idx:]
+    merges = batched_longest_common_subsequence_merge(
+        [buffers[idx][-search_size:] for idx in to_merge],
+        [datas[idx] for idx in to_merge],
+        filepaths=[filepaths[idx] for idx in to_merge],
+    )
+
+    datas = list(datas)
+    for idx, (lcs_idx, _) in zip(to_merge, merges):
+        # Slice off new data
+        # i, j, slice_len = lcs_idx
+        slice_idx = lcs_idx[1] + lcs_idx[-1]  # slice = j + slice_len
+        datas[idx] = datas[idx][slice_idx:]
 
     # Concat data to buffer
-    buffer += data
-    return buffer
+    for buffer, data in zip(buffers, datas):
+        buffer += data
+    return buffers
 
 
 def inplace_buffer_merge(buffer, data, timesteps, model):
@@ -344,6 +430,15 @@ def inplace_buffer_merge(buffer, data, timesteps, model):
 
 
 class AudioFeatureIterator(IterableDataset):
+    """
+    Iterates over the features of an audio signal, frame_len seconds at a time.
+
+    With a mel spectrogram preprocessor without dither and without normalization, such as the raw preprocessors of
+    the buffered inference classes, the features are computed incrementally with the streaming mode of
+    `FilterbankFeatures`, so that only the samples of the next frame go through the preprocessor at every step.
+    Otherwise, the features of the whole signal are computed up front.
+    """
+
     def __init__(self, samples, frame_len, preprocessor, device):
         self._samples = samples
         self._frame_len = frame_len
@@ -352,10 +447,24 @@ class AudioFeatureIterator(IterableDataset):
         self.count = 0
         timestep_duration = preprocessor._cfg['window_stride']
         self._feature_frame_len = frame_len / timestep_duration
-        audio_signal = torch.from_numpy(self._samples).unsqueeze_(0).to(device)
-        audio_signal_len = torch.Tensor([self._samples.shape[0]]).to(device)
-        self._features, self._features_len = preprocessor(input_signal=audio_signal, length=audio_signal_len,)
-        self._features = self._features.squeeze()
+        self._device = device
+
+        featurizer = getattr(preprocessor, 'featurizer', None)
+        if (
+            isinstance(featurizer, FilterbankFeatures)
+            and featurizer.normalize not in ("per_feature", "all_features")
+            and not (featurizer.training and featurizer.dither > 0)
+        ):
+            self._featurizer = featurizer
+            self._stream_state = None
+            self._sample_offset = 0
+            self._features = torch.zeros(featurizer.nfilt * featurizer.frame_splicing, 0, device=device)
+        else:
+            self._featurizer = None
+            audio_signal = torch.from_numpy(self._samples).unsqueeze_(0).to(device)
+            audio_signal_len = torch.Tensor([self._samples.shape[0]]).to(device)
+            self._features, self._features_len = preprocessor(input_signal=audio_signal, length=audio_signal_len,)
+            self._features = self._features.squeeze()
 
     def __iter__(self):
         return self
@@ -363,6 +472,9 @@ class AudioFeatureIterator(IterableDataset):
     def __next__(self):
         if not self.output:
             raise StopIteration
+        if self._featurizer is not None:
+            return self._next_streaming_frame()
+
         last = int(self._start + self._feature_frame_len)
         if last <= self._features_len[0]:
             frame = self._features[:, self._start : last].cpu()
@@ -375,6 +487,32 @@ class AudioFeatureIterator(IterableDataset):
         self.count += 1
         return frame
 
+    def _next_streaming_frame(self):
+        frame_len = int(self._feature_frame_len)
+        chunk_len = frame_len * self._featurizer.hop_length
+        # Feed the samples until the features of the next frame are complete, or the signal ends
+        while self._features.shape[1] < frame_len and self._sample_offset < self._samples.shape[0]:
+            # The first chunk must be longer than the padding of the STFT, which is less than a window
+            chunk_len = max(chunk_len, self._featurizer.n_fft) if self._stream_state is None else chunk_len
+            chunk = self._samples[self._sample_offset : self._sample_offset + chunk_len]
+            self._sample_offset += chunk.shape[0]
+            audio_signal = torch.from_numpy(chunk).unsqueeze_(0).to(self._device)
+            features, self._stream_state = self._featurizer.stream(
+                audio_signal, self._stream_state, last=self._sample_offset >= self._samples.shape[0]
+            )
+            self._features = torch.cat([self._features, features.squeeze(0)], dim=1)
+
+        if self._features.shape[1] >= frame_len:
+            frame = self._features[:, :frame_len].cpu()
+            self._features = self._features[:, frame_len:]
+        else:
+            frame = np.zeros([self._features.shape[0], frame_len], dtype='float32')
+            frame[:, : self._features.shape[1]] = self._features.cpu()
+            self.output = False
+        self._start += frame_len
+        self.count += 1
+        return frame
+
 
 def speech_collate_fn(batch):
     """collate batch of audio sig, audio len, tokens, tokens len
@@ -503,6 +641,19 @@ class FeatureFrameBufferer:
         self.feature_buffer = (
             np.ones([self.n_feat, self.feature_buffer_len], dtype=np.float32) * self.ZERO_LEVEL_SPEC_DB_VAL
         )
+        self._reset_feature_buffer_sums()
+
+    def _reset_feature_buffer_sums(self):
+        # Running sums of the feature buffer and of its squares along time, so that the normalization constants
+        # only require the frames which enter and leave the buffer
+        feature_buffer = self.feature_buffer.astype(np.float64)
+        self.feature_buffer_sum = feature_buffer.sum(axis=-1)
+        self.feature_buffer_sq_sum = np.square(feature_buffer).sum(axis=-1)
+
+    def _get_feature_buffer_mean_std(self):
+        mean = self.feature_buffer_sum / self.feature_buffer_len
+        variance = np.maximum(self.feature_buffer_sq_sum / self.feature_buffer_len - np.square(mean), 0.0)
+        return mean.astype(np.float32), np.sqrt(variance).astype(np.float32)
 
     def get_batch_frames(self):
         if self.signal_end:
@@ -531,16 +682,23 @@ class FeatureFrameBufferer:
         self.signal_end = False
 
     def _update_feature_buffer(self, feat_frame):
-        self.feature_buffer[:, : -feat_frame.shape[1]] = self.feature_buffer[:, feat_frame.shape[1] :]
-        self.feature_buffer[:, -feat_frame.shape[1] :] = feat_frame
-        self.buffered_features_size += feat_frame.shape[1]
+        num_frames = feat_frame.shape[1]
+        if num_frames < self.feature_buffer_len:
+            evicted = self.feature_buffer[:, :num_frames].astype(np.float64)
+            added = np.asarray(feat_frame, dtype=np.float64)
+            self.feature_buffer_sum += added.sum(axis=-1) - evicted.sum(axis=-1)
+            self.feature_buffer_sq_sum += np.square(added).sum(axis=-1) - np.square(evicted).sum(axis=-1)
+        self.feature_buffer[:, :-num_frames] = self.feature_buffer[:, num_frames:]
+        self.feature_buffer[:, -num_frames:] = feat_frame
+        if num_frames >= self.feature_buffer_len:
+            self._reset_feature_buffer_sums()
+        self.buffered_features_size += num_frames
 
     def get_norm_consts_per_frame(self, batch_frames):
         norm_consts = []
         for i, frame in enumerate(batch_frames):
             self._update_feature_buffer(frame)
-            mean_from_buffer = np.mean(self.feature_buffer, axis=1)
-            stdev_from_buffer = np.std(self.feature_buffer, axis=1)
+            mean_from_buffer, stdev_from_buffer = self._get_feature_buffer_mean_std()
             norm_consts.append((mean_from_buffer.reshape(self.n_feat, 1), stdev_from_buffer.reshape(self.n_feat, 1)))
         return norm_consts
 
@@ -724,6 +882,7 @@ class BatchedFeatureFrameBufferer(FeatureFrameBufferer):
             np.ones([self.batch_size, self.n_feat, self.feature_buffer_len], dtype=np.float32)
             * self.ZERO_LEVEL_SPEC_DB_VAL
         )
+        self._reset_feature_buffer_sums()
         self.all_frame_reader = [None for _ in range(self.batch_size)]
         self.signal_end = [False for _ in range(self.batch_size)]
         self.signal_end_index = [None for _ in range(self.batch_size)]
@@ -786,20 +945,31 @@ class BatchedFeatureFrameBufferer(FeatureFrameBufferer):
     def _update_feature_buffer(self, feat_frame, idx):
         # Update the feature buffer for given sample, or reset if the sample has finished processing
         if feat_frame is not None:
-            self.feature_buffer[idx, :, : -feat_frame.shape[1]] = self.feature_buffer[idx, :, feat_frame.shape[1] :]
-            self.feature_buffer[idx, :, -feat_frame.shape[1] :] = feat_frame
+            num_frames = feat_frame.shape[1]
+            if num_frames < self.feature_buffer_len:
+                evicted = self.feature_buffer[idx, :, :num_frames].astype(np.float64)
+                added = np.asarray(feat_frame, dtype=np.float64)
+                self.feature_buffer_sum[idx] += added.sum(axis=-1) - evicted.sum(axis=-1)
+                self.feature_buffer_sq_sum[idx] += np.square(added).sum(axis=-1) - np.square(evicted).sum(axis=-1)
+            self.feature_buffer[idx, :, :-num_frames] = self.feature_buffer[idx, :, num_frames:]
+            self.feature_buffer[idx, :, -num_frames:] = feat_frame
+            if num_frames >= self.feature_buffer_len:
+                feature_buffer = self.feature_buffer[idx].astype(np.float64)
+                self.feature_buffer_sum[idx] = feature_buffer.sum(axis=-1)
+                self.feature_buffer_sq_sum[idx] = np.square(feature_buffer).sum(axis=-1)
             # self.buffered_features_size += feat_frame.shape[1]
         else:
             self.feature_buffer[idx, :, :] *= 0.0
+            self.feature_buffer_sum[idx] = 0.0
+            self.feature_buffer_sq_sum[idx] = 0.0
 
     def get_norm_consts_per_frame(self, batch_frames):
         for idx, frame in enumerate(batch_frames):
             self._update_feature_buffer(frame, idx)
 
-        mean_from_buffer = np.mean(self.feature_buffer, axis=2, keepdims=True)  # [B, self.n_feat, 1]
-        stdev_from_buffer = np.std(self.feature_buffer, axis=2, keepdims=True)  # [B, self.n_feat, 1]
-
-        return (mean_from_buffer, stdev_from_buffer)
+        mean_from_buffer, stdev_from_buffer = self._get_feature_buffer_mean_std()
+        # [B, self.n_feat, 1]
+        return (mean_from_buffer[..., None], stdev_from_buffer[..., None])
 
     def normalize_frame_buffers(self, frame_buffers, norm_consts):
         CONSTANT = 1e-8
@@ -1120,20 +1290,27 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
 
         self.infer_logits()
 
-        self.unmerged = [[] for _ in range(self.batch_size)]
-        for idx, alignments in enumerate(self.all_alignments):
-
-            signal_end_idx = self.frame_bufferer.signal_end_index[idx]
-            if signal_end_idx is None:
+        for idx in range(len(self.all_alignments)):
+            if self.frame_bufferer.signal_end_index[idx] is None:
                 raise ValueError("Signal did not end")
 
-            for a_idx, alignment in enumerate(alignments):
+        self.unmerged = [[] for _ in range(self.batch_size)]
+        num_chunks = max([len(alignments) for alignments in self.all_alignments], default=0)
+        for a_idx in range(num_chunks):
+            # The chunks of all the streams at this step are merged at once
+            merge_indices, merge_ids, filepaths = [], [], []
+            for idx, alignments in enumerate(self.all_alignments):
+                if a_idx >= len(alignments):
+                    continue
+
+                signal_end_idx = self.frame_bufferer.signal_end_index[idx]
+                alignment = alignments[a_idx]
 
                 # Middle token first chunk
                 if a_idx == 0:
                     # len(alignment) - 1 - delay + tokens_per_chunk
                     alignment = alignment[len(alignment) - 1 - delay :]
-                    ids, toks = self._alignment_decoder(alignment, self.asr_model.tokenizer, self.blank_id)
+                    ids, _ = self._alignment_decoder(alignment, self.asr_model.tokenizer, self.blank_id)
 
                     if len(ids) > 0:
                         self.unmerged[idx] = inplace_buffer_merge(
@@ -1141,7 +1318,7 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
                         )
 
                 else:
-                    ids, toks = self._alignment_decoder(alignment, self.asr_model.tokenizer, self.blank_id)
+                    ids, _ = self._alignment_decoder(alignment, self.asr_model.tokenizer, self.blank_id)
                     if len(ids) > 0 and a_idx < signal_end_idx:
 
                         if self.alignment_basepath is not None:
@@ -1157,14 +1334,19 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
                         else:
                             filepath = None
 
-                        self.unmerged[idx] = lcs_alignment_merge_buffer(
-                            self.unmerged[idx],
-                            ids,
-                            self.lcs_delay,
-                            model=self.asr_model,
-                            max_steps_per_timestep=self.max_steps_per_timestep,
-                            filepath=filepath,
-                        )
+                        merge_indices.append(idx)
+                        merge_ids.append(ids)
+                        filepaths.append(filepath)
+
+            if len(merge_indices) > 0:
+                batched_lcs_alignment_merge_buffer(
+                    [self.unmerged[idx] for idx in merge_indices],
+                    merge_ids,
+                    self.lcs_delay,
+                    model=self.asr_model,
+                    max_steps_per_timestep=self.max_steps_per_timestep,
+                    filepaths=filepaths,
+                )
 
         output = []
         for idx in range(self.batch_size):
@@ -1172,6 +1354,185 @@ class LongestCommonSubsequenceBatchedFrameASRRNNT(BatchedFrameASRRNNT):
         return output
 
 
+class _FrameBufferState:
+    """Feature buffer and merge state of one audio file during batched buffered inference."""
+
+    def __init__(self, index, frame_reader):
+        self.index = index
+        self.frame_reader = frame_reader
+        self.num_chunks = 0
+        # Frame-level predictions of the middle of every buffer, for 'middle' merge
+        self.unmerged = []
+        # Tokens and their timesteps, for 'timestamp' merge
+        self.tokens = []
+        self.timesteps = []
+
+
+class BatchedFrameASRCTC:
+    """
+    Batched buffered inference for CTC models over many audio files.
+
+    `FrameBatchASR` batches the buffers of a single audio file. Here every slot of the batch holds one file with its
+    own feature buffer and merge state, so that a single forward pass processes the next buffer of `batch_size`
+    different files. Whenever a file ends, its slot is filled with the next file, and the batch stays full until
+    fewer than `batch_size` files are left.
+
+    Two merge algorithms are supported:
+
+    - 'middle': keeps the frame-level predictions of the middle `tokens_per_chunk` frames of every buffer,
+      concatenates them and collapses the result, like `FrameBatchASR`.
+    - 'timestamp': collapses the predictions of every whole buffer into tokens, and keeps the tokens whose first
+      frame falls into the middle `tokens_per_chunk` frames of the buffer. A token which straddles the border of two
+      chunks is emitted once, by the buffer in which it starts.
+
+    The timestep of every token, in model frames from the start of the audio, is returned in `Hypothesis.timestep`.
+    """
+
+    def __init__(
+        self, asr_model, frame_len=1.6, total_buffer=4.0, batch_size=32, merge_algo='middle',
+    ):
+        '''
+        Args:
+            asr_model: A CTC model.
+            frame_len: frame's duration, seconds.
+            total_buffer: duration of total audio chunk size, in seconds.
+            batch_size: Number of independent audio files to process at each step.
+            merge_algo: How the predictions of consecutive buffers are merged, 'middle' or 'timestamp'.
+        '''
+        if merge_algo not in ('middle', 'timestamp'):
+            raise ValueError(f"Invalid merge_algo `{merge_algo}`, supported: ('middle', 'timestamp')")
+        self.ZERO_LEVEL_SPEC_DB_VAL = -16.635  # Log-Melspectrogram value for zero signal
+        self.asr_model = asr_model
+        self.frame_len = frame_len
+        self.batch_size = batch_size
+        self.merge_algo = merge_algo
+        self.blank_id = len(asr_model.decoder.vocabulary)
+
+        timestep_duration = asr_model._cfg.preprocessor.window_stride
+        self.n_frame_len = int(frame_len / timestep_duration)
+        self.total_buffer_len = int(total_buffer / timestep_duration)
+        self.n_feat = asr_model._cfg.preprocessor.features
+
+        cfg = copy.deepcopy(asr_model._cfg)
+        OmegaConf.set_struct(cfg.preprocessor, False)
+
+        # some changes for streaming scenario
+        cfg.preprocessor.dither = 0.0
+        cfg.preprocessor.pad_to = 0
+        cfg.preprocessor.normalize = "None"
+        self.raw_preprocessor = asr_model.from_config_dict(cfg.preprocessor)
+        self.raw_preprocessor.to(asr_model.device)
+
+    def read_audio_file(self, audio_filepath: str, delay, model_stride_in_secs):
+        samples = get_samples(audio_filepath)
+        samples = np.pad(samples, (0, int(delay * model_stride_in_secs * self.asr_model._cfg.sample_rate)))
+        return AudioFeatureIterator(samples, self.frame_len, self.raw_preprocessor, self.asr_model.device)
+
+    @torch.no_grad()
+    def transcribe(
+        self,
+        audio_filepaths: List[str],
+        tokens_per_chunk: int,
+        delay: int,
+        model_stride_in_secs: float,
+        return_hypotheses: bool = False,
+    ):
+        """
+        Transcribes audio files with buffered inference.
+
+        Args:
+            audio_filepaths: List of paths to audio files.
+            tokens_per_chunk: Number of model frames of every chunk.
+            delay: Offset of the end of the middle of a buffer from the end of the buffer, in model frames.
+            model_stride_in_secs: Duration of a model frame, in seconds.
+            return_hypotheses: Return `Hypothesis` objects with the token timesteps instead of transcripts.
+
+        Returns:
+            A list with the transcript (or hypothesis) of every file, in the order of `audio_filepaths`.
+        """
+        device = self.asr_model.device
+        buffers = torch.full(
+            (self.batch_size, self.n_feat, self.total_buffer_len), self.ZERO_LEVEL_SPEC_DB_VAL, device=device
+        )
+        slots = [None] * self.batch_size
+        results = [None] * len(audio_filepaths)
+        next_file = 0
+
+        while True:
+            for slot in range(self.batch_size):
+                if slots[slot] is None and next_file < len(audio_filepaths):
+                    frame_reader = self.read_audio_file(audio_filepaths[next_file], delay, model_stride_in_secs)
+                    slots[slot] = _FrameBufferState(next_file, frame_reader)
+                    buffers[slot] = self.ZERO_LEVEL_SPEC_DB_VAL
+                    next_file += 1
+            active = [slot for slot in range(self.batch_size) if slots[slot] is not None]
+            if not active:
+                break
+
+            # Shift in the next frame of every active file.
+            active_idx = torch.tensor(active, device=device)
+            frames = torch.stack([torch.as_tensor(next(slots[slot].frame_reader)) for slot in active]).to(device)
+            shifted = torch.cat((buffers[active_idx, :, self.n_frame_len :], frames), dim=-1)
+            buffers[active_idx] = shifted
+
+            # Normalize every buffer with its own statistics
+            mean = shifted.mean(dim=-1, keepdim=True)
+            std = shifted.std(dim=-1, unbiased=False, keepdim=True)
+            feat_signal = (shifted - mean) / (std + 1e-5)
+            feat_signal_len = torch.full((len(active),), self.total_buffer_len, dtype=torch.long, device=device)
+
+            _, _, predictions = self.asr_model(processed_signal=feat_signal, processed_signal_length=feat_signal_len)
+            predictions = predictions.cpu().numpy()
+
+            for pred, slot in zip(predictions, active):
+                state = slots[slot]
+                self._merge(state, pred, tokens_per_chunk, delay)
+                state.num_chunks += 1
+                if not state.frame_reader.output:
+                    results[state.index] = self._finalize(state, tokens_per_chunk, delay, return_hypotheses)
+                    slots[slot] = None
+        return results
+
+    def _merge(self, state, pred, tokens_per_chunk, delay):
+        start = len(pred) - 1 - delay
+        if self.merge_algo == 'middle':
+            state.unmerged += pred[start : start + tokens_per_chunk].tolist()
+            return
+
+        # Start frames of the tokens of the whole buffer
+        is_start = pred != self.blank_id
+        is_start[1:] &= pred[1:] != pred[:-1]
+        token_frames = np.nonzero(is_start)[0]
+        token_frames = token_frames[(token_frames >= start) & (token_frames < start + tokens_per_chunk)]
+        state.tokens += pred[token_frames].tolist()
+        state.timesteps += (state.num_chunks * tokens_per_chunk + token_frames - start).tolist()
+
+    def _finalize(self, state, tokens_per_chunk, delay, return_hypotheses):
+        if self.merge_algo == 'middle':
+            tokens, timesteps = [], []
+            previous = self.blank_id
+            for t, p in enumerate(state.unmerged):
+                if p != previous and p != self.blank_id:
+                    tokens.append(p)
+                    timesteps.append(t)
+                previous = p
+        else:
+            tokens, timesteps = state.tokens, state.timesteps
+
+        text = self.asr_model.decoding.decode_tokens_to_str(tokens)
+        if not return_hypotheses:
+            return text
+        # The middle of the first buffer ends `delay + 1 - tokens_per_chunk` frames before the end of the first chunk.
+        lag = delay + 1 - tokens_per_chunk
+        return Hypothesis(
+            score=0.0,
+            y_sequence=torch.tensor(tokens, dtype=torch.long),
+            text=text,
+            timestep=[max(t - lag, 0) for t in timesteps],
+            length=state.num_chunks * tokens_per_chunk,
+        )
+
+
 class FramewiseStreamingAudioBuffer:
     """
     A buffer to be used for frame-wise streaming. It can load a single or multiple audio files/processed signals, split them in chunks and return one on one.
@@ -1381,3 +1742,194 @@ class FramewiseStreamingAudioBuffer:
                 normalize_type=self.model_normalize_type,
             )
         return processed_signal, self.streams_length
+
+
+class CacheAwareStreamingSessionManager:
+    """
+    Runs cache-aware streaming inference for many independent streams which start and stop at any time, e.g. the
+    connections of a streaming server.
+
+    `ASRModuleMixin.conformer_stream_step` processes one batch of streams which start and stop together. This class
+    keeps the encoder caches of every stream in a pooled slab of `max_streams` slots, and the decoder state of every
+    stream (the previous predictions for CTC models, the previous hypothesis for Transducer models) next to it.
+    Every call of `step` gathers the caches of the streams with a new chunk into one batch, runs
+    `conformer_stream_step` and scatters the updated caches back into their slots, so that streams can join with
+    `add_stream` and leave with `remove_stream` between any two steps.
+
+    The attention cache of a stream grows with every chunk until it reaches the left context of the model, and the
+    cached frames are not masked, so streams whose caches have different lengths can not share a batch. They are
+    batched separately until their caches are full, after which all streams are processed in a single batch.
+
+    Args:
+        model: A cache-aware streaming ASR model, whose encoder is a `StreamingEncoder`.
+        max_streams: Number of slots of the slab, i.e. the maximum number of concurrent streams.
+    """
+
+    def __init__(self, model, max_streams: int = 64):
+        if not isinstance(model.encoder, StreamingEncoder):
+            raise ValueError(
+                "The model's encoder is not inherited from StreamingEncoder, and likely not to support streaming!"
+            )
+        if model.encoder.streaming_cfg is None:
+            model.encoder.setup_streaming_params()
+        self.model = model
+        self.max_streams = max_streams
+        self.streaming_cfg = model.encoder.streaming_cfg
+
+        # The slab of the attention caches starts empty and grows with the longest cache, up to the left context.
+        # The cache of a stream is right-aligned in its slot.
+        self.cache_last_channel, self.cache_last_time = model.encoder.get_initial_cache_state(
+            batch_size=max_streams, device=model.device
+        )
+        self.cache_lengths = [0] * max_streams
+        self.num_steps = [0] * max_streams
+        self.previous_pred_out = [None] * max_streams
+        self.previous_hypotheses = [None] * max_streams
+        self.outputs = [None] * max_streams
+
+        self._free_slots = list(range(max_streams - 1, -1, -1))
+        self._slots = {}
+        self._next_stream_id = 0
+
+    @property
+    def stream_ids(self):
+        """The ids of the active streams."""
+        return list(self._slots)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add_stream(self, stream_id=None):
+        """
+        Starts a new stream with empty caches.
+
+        Args:
+            stream_id: Hashable id of the stream. If None, a new integer id is assigned.
+
+        Returns:
+            The id of the stream.
+        """
+        if stream_id is None:
+            while self._next_stream_id in self._slots:
+                self._next_stream_id += 1
+            stream_id = self._next_stream_id
+            self._next_stream_id += 1
+        elif stream_id in self._slots:
+            raise ValueError(f"Stream {stream_id} already exists!")
+        if not self._free_slots:
+            raise RuntimeError(f"All {self.max_streams} stream slots are in use!")
+
+        slot = self._free_slots.pop()
+        self.cache_last_channel[:, slot].zero_()
+        self.cache_last_time[:, slot].zero_()
+        self.cache_lengths[slot] = 0
+        self.num_steps[slot] = 0
+        self.previous_pred_out[slot] = None
+        self.previous_hypotheses[slot] = None
+        self.outputs[slot] = None
+        self._slots[stream_id] = slot
+        return stream_id
+
+    def remove_stream(self, stream_id):
+        """
+        Ends a stream and frees its slot.
+
+        Returns:
+            The last output of the stream: its transcription for CTC models, its hypothesis for Transducer models.
+        """
+        slot = self._slots.pop(stream_id)
+        output = self.outputs[slot]
+        self.previous_pred_out[slot] = None
+        self.previous_hypotheses[slot] = None
+        self.outputs[slot] = None
+        self._free_slots.append(slot)
+        return output
+
+    def reset(self):
+        """Removes all streams."""
+        for stream_id in self.stream_ids:
+            self.remove_stream(stream_id)
+
+    def get_output(self, stream_id):
+        """Returns the last output of a stream."""
+        return self.outputs[self._slots[stream_id]]
+
+    def _grow_cache_last_channel(self, cache_len: int):
+        extra = cache_len - self.cache_last_channel.size(2)
+        if extra > 0:
+            self.cache_last_channel = torch.nn.functional.pad(self.cache_last_channel, pad=(0, 0, extra, 0))
+
+    def step(self, chunks: dict, last_chunks=None) -> dict:
+        """
+        Processes one chunk of every stream in `chunks`. Streams without a chunk keep their state.
+
+        Args:
+            chunks: Dictionary from stream id to the processed signal of the chunk, of shape [features, time],
+                including the pre-encoder cache like the chunks of `FramewiseStreamingAudioBuffer`.
+            last_chunks: Ids of the streams whose chunk is their last one. All outputs of these chunks are kept,
+                like `keep_all_outputs` of `conformer_stream_step`.
+
+        Returns:
+            Dictionary from stream id to the output of the stream after the chunk: its transcription for CTC
+            models, its hypothesis for Transducer models.
+        """
+        last_chunks = set(last_chunks) if last_chunks is not None else set()
+        groups = {}
+        for stream_id, chunk in chunks.items():
+            slot = self._slots[stream_id]
+            key = (self.cache_lengths[slot], self.num_steps[slot] == 0, stream_id in last_chunks)
+            groups.setdefault(key, []).append((stream_id, slot, chunk))
+
+        results = {}
+        for (cache_len, is_first_step, keep_all_outputs), group in groups.items():
+            stream_ids, slots, signals = zip(*group)
+            slot_idx = torch.tensor(slots, dtype=torch.long, device=self.cache_last_time.device)
+
+            lengths = torch.tensor([signal.size(-1) for signal in signals], device=signals[0].device)
+            processed_signal = signals[0].new_zeros((len(signals), signals[0].size(0), int(lengths.max())))
+            for i, signal in enumerate(signals):
+                processed_signal[i, :, : signal.size(-1)] = signal
+
+            cache_start = self.cache_last_channel.size(2) - cache_len
+            cache_last_channel = self.cache_last_channel[:, :, cache_start:].index_select(1, slot_idx)
+            cache_last_time = self.cache_last_time.index_select(1, slot_idx)
+
+            if is_first_step:
+                previous_pred_out = previous_hypotheses = None
+            else:
+                previous_pred_out = [self.previous_pred_out[slot] for slot in slots]
+                previous_hypotheses = [self.previous_hypotheses[slot] for slot in slots]
+
+            (
+                greedy_predictions,
+                all_hyp_or_transcribed_texts,
+                cache_last_channel_next,
+                cache_last_time_next,
+                best_hyp,
+            ) = self.model.conformer_stream_step(
+                processed_signal=processed_signal,
+                processed_signal_length=lengths,
+                cache_last_channel=cache_last_channel,
+                cache_last_time=cache_last_time,
+                keep_all_outputs=keep_all_outputs,
+                previous_hypotheses=previous_hypotheses,
+                previous_pred_out=previous_pred_out,
+                # There is no cache to drop extra pre-encoded frames for on the first step.
+                drop_extra_pre_encoded=0 if is_first_step else self.streaming_cfg.drop_extra_pre_encoded,
+                return_transcription=True,
+            )
+
+            next_cache_len = cache_last_channel_next.size(2)
+            self._grow_cache_last_channel(next_cache_len)
+            cache_start = self.cache_last_channel.size(2) - next_cache_len
+            self.cache_last_channel[:, :, cache_start:].index_copy_(1, slot_idx, cache_last_channel_next)
+            self.cache_last_time.index_copy_(1, slot_idx, cache_last_time_next)
+
+            for i, (stream_id, slot) in enumerate(zip(stream_ids, slots)):
+                self.cache_lengths[slot] = next_cache_len
+                self.num_steps[slot] += 1
+                self.previous_pred_out[slot] = greedy_predictions[i]
+                self.previous_hypotheses[slot] = best_hyp[i] if best_hyp is not None else None
+                self.outputs[slot] = all_hyp_or_transcribed_texts[i]
+                results[stream_id] = self.outputs[slot]
+        return results
@@ -15,13 +15,15 @@
 import collections
 import json
 import os
+from collections.abc import Sequence
 from itertools import combinations
 from typing import Any, Dict, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from nemo.collections.asr.parts.utils.speaker_utils import get_rttm_speaker_index, rttm_to_labels
-from nemo.collections.common.parts.preprocessing import manifest, parsers
+from nemo.collections.common.parts.preprocessing import manifest, manifest_cache, parsers
 from nemo.utils import logging
 
 
@@ -30,6 +32,63 @@ class _Collection(collections.UserList):
 
     OUTPUT_TYPE = None  # Single element output type.
 
+    def __getitem__(self, idx):
+        # A slice is a list of entities, since collections cannot be re-created from their entities
+        return self.data[idx]
+
+
+class _CachedEntries(Sequence):
+    """Read-only sequence of collection entities materialized on access from a `ColumnarManifest`.
+
+    Used as the `data` of collections loaded from a manifest cache, so that no per-utterance Python
+    objects are kept in memory.
+
+    Args:
+        columns: Memory-mapped manifest columns.
+        indices: Positions in `columns` of the entries of the collection, in collection order.
+        make_entity: Callable mapping `(columns, position)` to an `OUTPUT_TYPE` entity.
+    """
+
+    def __init__(self, columns: manifest_cache.ColumnarManifest, indices: np.ndarray, make_entity):
+        self.columns = columns
+        self.indices = indices
+        self._make_entity = make_entity
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._make_entity(self.columns, int(position)) for position in self.indices[idx]]
+        return self._make_entity(self.columns, int(self.indices[idx]))
+
+
+def _filter_cached_indices(
+    durations: np.ndarray,
+    valid: Optional[np.ndarray],
+    min_duration: Optional[float],
+    max_duration: Optional[float],
+    max_number: Optional[int],
+    do_sort_by_duration: bool,
+    index_by_file_id: bool,
+) -> np.ndarray:
+    """Vectorized equivalent of the per-entry filters of `AudioText` and `SpeechLabel`."""
+    keep = np.ones(len(durations), dtype=bool) if valid is None else np.array(valid, dtype=bool)
+    if min_duration is not None:
+        keep &= durations >= min_duration
+    if max_duration is not None:
+        keep &= durations <= max_duration
+    indices = np.flatnonzero(keep)
+    if max_number:
+        indices = indices[:max_number]
+
+    if do_sort_by_duration:
+        if index_by_file_id:
+            logging.warning("Tried to sort dataset by duration, but cannot since index_by_file_id is set.")
+        else:
+            indices = indices[np.argsort(durations[indices], kind='stable')]
+    return indices
+
 
 class Text(_Collection):
     """Simple list of preprocessed text entries, result in list of tokens."""
@@ -200,15 +259,20 @@ class AudioText(_Collection):
 class ASRAudioText(AudioText):
     """`AudioText` collector from asr structured json files."""
 
-    def __init__(self, manifests_files: Union[str, List[str]], *args, **kwargs):
+    def __init__(self, manifests_files: Union[str, List[str]], *args, cache_dir: Optional[str] = None, **kwargs):
         """Parse lists of audio files, durations and transcripts texts.
 
         Args:
             manifests_files: Either single string file or list of such -
                 manifests to yield items from.
             *args: Args to pass to `AudioText` constructor.
+            cache_dir: Optional directory of binary manifest caches. If set, the parsed manifest is
+                stored there as memory-mapped columns on first use and entries are materialized lazily.
             **kwargs: Kwargs to pass to `AudioText` constructor.
         """
+        if cache_dir is not None:
+            self._init_from_cache(manifests_files, cache_dir, *args, **kwargs)
+            return
 
         ids, audio_files, durations, texts, offsets, = (
             [],
@@ -232,6 +296,65 @@ class ASRAudioText(AudioText):
             ids, audio_files, durations, texts, offsets, speakers, orig_srs, token_labels, langs, *args, **kwargs
         )
 
+    def _init_from_cache(
+        self,
+        manifests_files: Union[str, List[str]],
+        cache_dir: str,
+        parser: parsers.CharParser,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+        do_sort_by_duration: bool = False,
+        index_by_file_id: bool = False,
+    ):
+        """Same as `AudioText.__init__`, but backed by a binary manifest cache."""
+        columns = manifest_cache.load_or_build(
+            cache_dir=cache_dir,
+            manifests_files=manifests_files,
+            key_extra={'type': 'audio_text', 'parser': manifest_cache.parser_fingerprint(parser)},
+            build_fn=lambda path: manifest_cache.build_audio_text_cache(
+                manifest.item_iter(manifests_files), parser, path
+            ),
+        )
+        durations = columns.array('durations')
+        valid = columns.array('valid')
+        indices = _filter_cached_indices(
+            durations, valid, min_duration, max_duration, max_number, do_sort_by_duration, index_by_file_id
+        )
+
+        if index_by_file_id:
+            self.mapping = {}
+            audio_files = columns.strings('audio_files')
+            for position, idx in enumerate(indices):
+                file_id, _ = os.path.splitext(os.path.basename(audio_files[idx]))
+                self.mapping.setdefault(file_id, []).append(position)
+
+        total_duration = float(durations[indices].sum())
+        duration_filtered = float(durations.sum()) - total_duration
+        logging.info("Dataset loaded with %d files totalling %.2f hours", len(indices), total_duration / 3600)
+        logging.info(
+            "%d files were filtered totalling %.2f hours", len(durations) - len(indices), duration_filtered / 3600
+        )
+
+        super(AudioText, self).__init__()
+        self.data = _CachedEntries(columns, indices, self._make_cached_entity)
+
+    @classmethod
+    def _make_cached_entity(cls, columns: manifest_cache.ColumnarManifest, idx: int):
+        offset = float(columns.array('offsets')[idx])
+        orig_sr = int(columns.array('orig_srs')[idx])
+        return cls.OUTPUT_TYPE(
+            int(columns.array('ids')[idx]),
+            columns.strings('audio_files')[idx],
+            float(columns.array('durations')[idx]),
+            columns.ragged('tokens')[idx].tolist(),
+            None if np.isnan(offset) else offset,
+            columns.strings('texts')[idx],
+            json.loads(columns.strings('speakers')[idx]),
+            None if orig_sr < 0 else orig_sr,
+            json.loads(columns.strings('langs')[idx]),
+        )
+
 
 class SpeechLabel(_Collection):
     """List of audio-label correspondence with preprocessing."""
@@ -306,7 +429,14 @@ class SpeechLabel(_Collection):
 class ASRSpeechLabel(SpeechLabel):
     """`SpeechLabel` collector from structured json files."""
 
-    def __init__(self, manifests_files: Union[str, List[str]], is_regression_task=False, *args, **kwargs):
+    def __init__(
+        self,
+        manifests_files: Union[str, List[str]],
+        is_regression_task=False,
+        *args,
+        cache_dir: Optional[str] = None,
+        **kwargs,
+    ):
         """Parse lists of audio files, durations and transcripts texts.
 
         Args:
@@ -314,8 +444,14 @@ class ASRSpeechLabel(SpeechLabel):
                 manifests to yield items from.
             is_regression_task: It's a regression task
             *args: Args to pass to `SpeechLabel` constructor.
+            cache_dir: Optional directory of binary manifest caches. If set, the parsed manifest is
+                stored there as memory-mapped columns on first use and entries are materialized lazily.
             **kwargs: Kwargs to pass to `SpeechLabel` constructor.
         """
+        if cache_dir is not None:
+            self._init_from_cache(manifests_files, cache_dir, is_regression_task, *args, **kwargs)
+            return
+
         audio_files, durations, labels, offsets = [], [], [], []
 
         for item in manifest.item_iter(manifests_files, parse_func=self.__parse_item):
@@ -330,6 +466,58 @@ class ASRSpeechLabel(SpeechLabel):
 
         super().__init__(audio_files, durations, labels, offsets, *args, **kwargs)
 
+    def _init_from_cache(
+        self,
+        manifests_files: Union[str, List[str]],
+        cache_dir: str,
+        is_regression_task: bool,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_number: Optional[int] = None,
+        do_sort_by_duration: bool = False,
+        index_by_file_id: bool = False,
+    ):
+        """Same as `SpeechLabel.__init__`, but backed by a binary manifest cache."""
+        columns = manifest_cache.load_or_build(
+            cache_dir=cache_dir,
+            manifests_files=manifests_files,
+            key_extra={'type': 'speech_label', 'is_regression_task': is_regression_task},
+            build_fn=lambda path: manifest_cache.build_speech_label_cache(
+                manifest.item_iter(manifests_files, parse_func=self.__parse_item), path, is_regression_task
+            ),
+        )
+        durations = columns.array('durations')
+        indices = _filter_cached_indices(
+            durations, None, min_duration, max_duration, max_number, do_sort_by_duration, index_by_file_id
+        )
+
+        if index_by_file_id:
+            self.mapping = {}
+            audio_files = columns.strings('audio_files')
+            for position, idx in enumerate(indices):
+                file_id, _ = os.path.splitext(os.path.basename(audio_files[idx]))
+                self.mapping[file_id] = position
+
+        logging.info(
+            "Filtered duration for loading collection is %f.", float(durations.sum() - durations[indices].sum()),
+        )
+        vocabulary = columns.meta['labels']
+        self.uniq_labels = sorted(vocabulary[i] for i in np.unique(columns.array('label_ids')[indices]))
+        logging.info("# {} files loaded accounting to # {} labels".format(len(indices), len(self.uniq_labels)))
+
+        super(SpeechLabel, self).__init__()
+        self.data = _CachedEntries(columns, indices, self._make_cached_entity)
+
+    @classmethod
+    def _make_cached_entity(cls, columns: manifest_cache.ColumnarManifest, idx: int):
+        offset = float(columns.array('offsets')[idx])
+        return cls.OUTPUT_TYPE(
+            columns.strings('audio_files')[idx],
+            float(columns.array('durations')[idx]),
+            columns.meta['labels'][int(columns.array('label_ids')[idx])],
+            None if np.isnan(offset) else offset,
+        )
+
     def __parse_item(self, line: str, manifest_file: str) -> Dict[str, Any]:
         item = json.loads(line)
 
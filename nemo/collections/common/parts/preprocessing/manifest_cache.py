@@ -0,0 +1,388 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Binary columnar cache for parsed JSONL manifests.
+
+Parsing a manifest requires one ``json.loads`` and one text parser call per line, and the resulting
+collection keeps one Python object per utterance. For manifests with tens of millions of lines this
+dominates dataset construction time and memory of every DataLoader worker.
+
+The cache stores the parsed manifest as a directory of ``.npy`` files:
+
+* numeric columns (ids, durations, offsets, original sampling rates, validity mask),
+* ragged integer columns (token ids) as a flat value array plus an ``N + 1`` offsets array,
+* string columns (audio paths, raw texts, json-encoded speakers / languages / labels) as a flat
+  utf-8 byte array plus an ``N + 1`` offsets array.
+
+All arrays are opened with ``mmap_mode='r'`` on first access. Forked DataLoader workers therefore share
+the same page cache pages and nothing is copied; spawned workers re-open the memory maps after unpickling.
+
+The cache directory name is a hash of the manifest paths, their size and modification time, the parser
+configuration and the cache format version, so a cache is invalidated whenever any of those change.
+Duration / count filters and sorting are *not* part of the key - they are applied when the cache is loaded.
+"""
+
+import array
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from nemo.utils import logging
+
+__all__ = [
+    'CACHE_VERSION',
+    'parser_fingerprint',
+    'manifest_cache_key',
+    'StringColumn',
+    'RaggedColumn',
+    'ColumnarManifest',
+    'build_audio_text_cache',
+    'build_speech_label_cache',
+    'load_or_build',
+]
+
+CACHE_VERSION = 1
+
+# Sentinel used for missing integer values (e.g. `orig_sample_rate` not present in the manifest).
+_MISSING_INT = -1
+
+
+def parser_fingerprint(parser: Any, max_depth: int = 4) -> str:
+    """Computes a stable fingerprint of a text parser / tokenizer configuration.
+
+    Objects may provide their own fingerprint through a ``cache_fingerprint()`` method. Otherwise the
+    fingerprint is built from the class name and all primitive attributes found recursively in the
+    object's ``__dict__``. Objects exposing ``serialized_model_proto()`` (e.g. SentencePiece processors)
+    contribute a hash of the serialized model.
+
+    Args:
+        parser: A callable text parser, e.g. `CharParser` or a tokenizer wrapper.
+        max_depth: Maximum recursion depth into nested attributes.
+
+    Returns:
+        A hex digest string.
+    """
+    hasher = hashlib.sha1()
+
+    def _visit(obj, depth):
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            hasher.update(repr(obj).encode('utf-8'))
+            return
+        if isinstance(obj, bytes):
+            hasher.update(hashlib.sha1(obj).digest())
+            return
+        if isinstance(obj, (list, tuple)):
+            hasher.update(b'[')
+            for item in obj:
+                _visit(item, depth)
+            hasher.update(b']')
+            return
+        if isinstance(obj, (set, frozenset)):
+            hasher.update(b'{')
+            for item in sorted(obj, key=repr):
+                _visit(item, depth)
+            hasher.update(b'}')
+            return
+        if isinstance(obj, dict) or hasattr(obj, 'items') and not hasattr(obj, '__dict__'):
+            hasher.update(b'{')
+            for key in sorted(obj.keys(), key=repr):
+                _visit(key, depth)
+                _visit(obj[key], depth)
+            hasher.update(b'}')
+            return
+
+        hasher.update(type(obj).__qualname__.encode('utf-8'))
+        if hasattr(obj, 'cache_fingerprint'):
+            hasher.update(str(obj.cache_fingerprint()).encode('utf-8'))
+            return
+        if hasattr(obj, 'serialized_model_proto'):
+            hasher.update(hashlib.sha1(obj.serialized_model_proto()).digest())
+            return
+        if depth >= max_depth or not hasattr(obj, '__dict__'):
+            return
+        for key in sorted(vars(obj)):
+            hasher.update(key.encode('utf-8'))
+            _visit(vars(obj)[key], depth + 1)
+
+    _visit(parser, 0)
+    return hasher.hexdigest()
+
+
+def manifest_cache_key(manifests_files: Union[str, Sequence[str]], extra: Optional[Dict[str, Any]] = None) -> str:
+    """Computes the cache key of a list of manifests.
+
+    The key covers the absolute path, size and modification time of every manifest, the cache format
+    version and an arbitrary json-serializable ``extra`` dict (parser fingerprint, collection type, ...).
+    """
+    if isinstance(manifests_files, str):
+        manifests_files = [manifests_files]
+
+    description = {'version': CACHE_VERSION, 'manifests': [], 'extra': extra or {}}
+    for manifest_file in manifests_files:
+        path = os.path.abspath(os.path.expanduser(manifest_file))
+        stat = os.stat(path)
+        description['manifests'].append([path, stat.st_size, stat.st_mtime_ns])
+
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class _StringColumnBuilder:
+    """Accumulates strings into a flat utf-8 byte buffer and an offsets array."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array.array('q', [0])
+
+    def append(self, value: str):
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def save(self, directory: str, name: str):
+        np.save(os.path.join(directory, f'{name}.data.npy'), np.frombuffer(bytes(self.data), dtype=np.uint8))
+        np.save(os.path.join(directory, f'{name}.offsets.npy'), np.frombuffer(self.offsets, dtype=np.int64))
+
+
+class _RaggedColumnBuilder:
+    """Accumulates integer sequences into a flat int32 buffer and an offsets array."""
+
+    def __init__(self):
+        self.data = array.array('i')
+        self.offsets = array.array('q', [0])
+
+    def append(self, values: Iterable[int]):
+        self.data.extend(values)
+        self.offsets.append(len(self.data))
+
+    def save(self, directory: str, name: str):
+        np.save(os.path.join(directory, f'{name}.data.npy'), np.frombuffer(self.data, dtype=np.int32))
+        np.save(os.path.join(directory, f'{name}.offsets.npy'), np.frombuffer(self.offsets, dtype=np.int64))
+
+
+class StringColumn:
+    """Read-only view over a memory-mapped string column."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        return self._data[start:end].tobytes().decode('utf-8')
+
+
+class RaggedColumn:
+    """Read-only view over a memory-mapped ragged int32 column."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self._data[self._offsets[idx] : self._offsets[idx + 1]]
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self._offsets)
+
+
+class ColumnarManifest:
+    """Lazily memory-mapped columns of a cached manifest.
+
+    Arrays are only opened on first access, which keeps the object cheap to create in the main process
+    and to pickle into spawned DataLoader workers.
+
+    Args:
+        cache_path: Directory produced by one of the ``build_*_cache`` functions.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        with open(os.path.join(cache_path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        self._columns = {}
+
+    def __len__(self) -> int:
+        return self.meta['num_entries']
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.cache_path, f'{name}.npy'), mmap_mode='r')
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = self._load(name)
+        return self._columns[name]
+
+    def strings(self, name: str) -> StringColumn:
+        if name not in self._columns:
+            self._columns[name] = StringColumn(self._load(f'{name}.data'), self._load(f'{name}.offsets'))
+        return self._columns[name]
+
+    def ragged(self, name: str) -> RaggedColumn:
+        if name not in self._columns:
+            self._columns[name] = RaggedColumn(self._load(f'{name}.data'), self._load(f'{name}.offsets'))
+        return self._columns[name]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_columns'] = {}
+        return state
+
+
+def _write_atomically(cache_path: str, write_fn: Callable[[str], Dict[str, Any]]):
+    """Writes a cache into a temporary sibling directory and renames it into place."""
+    parent = os.path.dirname(cache_path)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp_', dir=parent)
+    try:
+        meta = write_fn(tmp_dir)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp_dir, cache_path)
+        except OSError:
+            # Another process (e.g. a different rank) finished the same cache first.
+            if not os.path.exists(os.path.join(cache_path, 'meta.json')):
+                raise
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def build_audio_text_cache(items: Iterable[Dict[str, Any]], parser: Callable, cache_path: str):
+    """Parses manifest items and writes an audio-text columnar cache.
+
+    Args:
+        items: Items yielded by `manifest.item_iter`.
+        parser: Text parser used to convert transcripts into token ids.
+        cache_path: Output cache directory.
+    """
+
+    def _write(directory):
+        ids, durations, offsets, orig_srs = array.array('q'), array.array('d'), array.array('d'), array.array('q')
+        valid = bytearray()
+        audio_files, texts, speakers, langs = (_StringColumnBuilder() for _ in range(4))
+        tokens = _RaggedColumnBuilder()
+        is_aggregate = hasattr(parser, "is_aggregate") and parser.is_aggregate
+
+        for item in items:
+            text, lang = item['text'], item['lang']
+            if item['token_labels'] is not None:
+                text_tokens = item['token_labels']
+            elif text != '':
+                if is_aggregate:
+                    if lang is None:
+                        raise ValueError("lang required in manifest when using aggregate tokenizers")
+                    text_tokens = parser(text, lang)
+                else:
+                    text_tokens = parser(text)
+            else:
+                text_tokens = []
+
+            ids.append(item['id'])
+            durations.append(item['duration'])
+            offsets.append(np.nan if item['offset'] is None else item['offset'])
+            orig_srs.append(_MISSING_INT if item['orig_sr'] is None else item['orig_sr'])
+            valid.append(text_tokens is not None)
+            tokens.append(text_tokens if text_tokens is not None else [])
+            audio_files.append(item['audio_file'])
+            texts.append(text)
+            speakers.append(json.dumps(item['speaker']))
+            langs.append(json.dumps(lang))
+
+        np.save(os.path.join(directory, 'ids.npy'), np.frombuffer(ids, dtype=np.int64))
+        np.save(os.path.join(directory, 'durations.npy'), np.frombuffer(durations, dtype=np.float64))
+        np.save(os.path.join(directory, 'offsets.npy'), np.frombuffer(offsets, dtype=np.float64))
+        np.save(os.path.join(directory, 'orig_srs.npy'), np.frombuffer(orig_srs, dtype=np.int64))
+        np.save(os.path.join(directory, 'valid.npy'), np.frombuffer(bytes(valid), dtype=np.bool_))
+        tokens.save(directory, 'tokens')
+        audio_files.save(directory, 'audio_files')
+        texts.save(directory, 'texts')
+        speakers.save(directory, 'speakers')
+        langs.save(directory, 'langs')
+        return {'type': 'audio_text', 'num_entries': len(ids)}
+
+    _write_atomically(cache_path, _write)
+
+
+def build_speech_label_cache(items: Iterable[Dict[str, Any]], cache_path: str, is_regression_task: bool = False):
+    """Parses manifest items and writes a speech-label columnar cache.
+
+    Labels are stored as indices into a vocabulary kept in ``meta.json``, so that the set of unique labels
+    of a filtered subset can be computed without decoding every label.
+
+    Args:
+        items: Items yielded by `manifest.item_iter`.
+        cache_path: Output cache directory.
+        is_regression_task: Whether labels should be stored as floats.
+    """
+
+    def _write(directory):
+        durations, offsets, label_ids = array.array('d'), array.array('d'), array.array('q')
+        audio_files = _StringColumnBuilder()
+        vocabulary = {}
+
+        for item in items:
+            label = float(item['label']) if is_regression_task else item['label']
+            durations.append(item['duration'])
+            offsets.append(np.nan if item['offset'] is None else item['offset'])
+            audio_files.append(item['audio_file'])
+            key = json.dumps(label)
+            if key not in vocabulary:
+                vocabulary[key] = len(vocabulary)
+            label_ids.append(vocabulary[key])
+
+        np.save(os.path.join(directory, 'durations.npy'), np.frombuffer(durations, dtype=np.float64))
+        np.save(os.path.join(directory, 'offsets.npy'), np.frombuffer(offsets, dtype=np.float64))
+        np.save(os.path.join(directory, 'label_ids.npy'), np.frombuffer(label_ids, dtype=np.int64))
+        audio_files.save(directory, 'audio_files')
+        return {
+            'type': 'speech_label',
+            'num_entries': len(durations),
+            'labels': [json.loads(key) for key in vocabulary],
+        }
+
+    _write_atomically(cache_path, _write)
+
+
+def load_or_build(
+    cache_dir: str, manifests_files: Union[str, List[str]], key_extra: Dict[str, Any], build_fn: Callable[[str], None],
+) -> ColumnarManifest:
+    """Returns the cached columns of the given manifests, building the cache first if required.
+
+    Args:
+        cache_dir: Root directory of manifest caches.
+        manifests_files: Manifest path or list of paths.
+        key_extra: Extra json-serializable values that must match for a cache to be reused.
+        build_fn: Callable receiving the cache path and writing the cache into it.
+
+    Returns:
+        A `ColumnarManifest`.
+    """
+    cache_path = os.path.join(os.path.expanduser(cache_dir), manifest_cache_key(manifests_files, key_extra))
+    if not os.path.exists(os.path.join(cache_path, 'meta.json')):
+        logging.info(f"Building manifest cache at {cache_path}")
+        build_fn(cache_path)
+    else:
+        logging.info(f"Loading manifest cache from {cache_path}")
+    return ColumnarManifest(cache_path)
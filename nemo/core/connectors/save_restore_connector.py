@@ -13,11 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import mmap
 import os
+import pickle
 import shutil
+import struct
 import tarfile
 import tempfile
 import uuid
+import zipfile
 from typing import Optional, Union
 
 import torch
@@ -31,11 +36,113 @@ from nemo.utils.get_rank import is_global_rank_zero
 from nemo.utils.model_utils import inject_model_parallel_rank
 
 
+class _MmapStorage:
+    """The storage of a tensor of a checkpoint, as a 1-D tensor over a memory mapped file."""
+
+    def __init__(self, data: torch.Tensor):
+        self.data = data
+
+
+def _rebuild_mmap_tensor(
+    storage, storage_offset, size, stride, requires_grad=False, backward_hooks=None, metadata=None
+):
+    tensor = storage.data.as_strided(size, stride, storage_offset)
+    tensor.requires_grad = requires_grad
+    return tensor
+
+
+class _MmapUnpickler(pickle.Unpickler):
+    """
+    Unpickles a state dict saved by `torch.save` (zip format), with the tensors created over the records of the
+    memory mapped archive instead of being read into memory. Raises `pickle.UnpicklingError` for the objects which
+    can not be memory mapped, such as quantized or sparse tensors.
+    """
+
+    # Functions of `torch._utils` which rebuild tensors from a storage and its metadata
+    _supported_rebuild_functions = {'_rebuild_tensor_v2': _rebuild_mmap_tensor}
+    _supported_torch_utils = {'_rebuild_parameter'}
+
+    def __init__(self, data_file, load_record):
+        super().__init__(data_file)
+        self._load_record = load_record
+        self._storages = {}
+
+    def find_class(self, mod_name, name):
+        if mod_name == 'torch' and name.endswith('Storage'):
+            return getattr(torch, name)
+        if mod_name == 'torch._utils':
+            if name in self._supported_rebuild_functions:
+                return self._supported_rebuild_functions[name]
+            if name not in self._supported_torch_utils:
+                raise pickle.UnpicklingError(f"`torch._utils.{name}` is not supported with memory mapping")
+        if mod_name == 'torch.tensor':
+            mod_name = 'torch._tensor'
+        return super().find_class(mod_name, name)
+
+    def persistent_load(self, saved_id):
+        typename, storage_type, key, location, numel = saved_id
+        if typename != 'storage':
+            raise pickle.UnpicklingError(f"Unknown typename for persistent_load: {typename}")
+        if key not in self._storages:
+            dtype = torch.uint8 if storage_type is getattr(torch, 'UntypedStorage', None) else storage_type.dtype
+            self._storages[key] = _MmapStorage(self._load_record(key, dtype, numel))
+        return self._storages[key]
+
+
+def _load_mmap_state_dict(path2file: str, member: tarfile.TarInfo, member_file):
+    """
+    Loads a state dict saved by `torch.save` and stored uncompressed in a tar file, with its tensors memory mapped
+    from the tar file: they are only read from the disk when they are copied into the parameters of a model.
+
+    Args:
+        path2file: Path to the tar file.
+        member: The member of the state dict in the tar file.
+        member_file: A seekable file object of the member.
+
+    Returns:
+        The state dict, with CPU tensors backed by a copy-on-write mapping of the tar file.
+
+    Raises:
+        pickle.UnpicklingError or zipfile.BadZipFile if the state dict can not be memory mapped.
+    """
+    with zipfile.ZipFile(member_file) as zip_file:
+        records = {}
+        pickle_file = None
+        for info in zip_file.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise zipfile.BadZipFile(f"Record {info.filename} of the checkpoint is compressed")
+            # The record starts after its local file header, whose name and extra field may differ from the
+            # central directory
+            member_file.seek(info.header_offset)
+            header = member_file.read(30)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            records[info.filename] = info.header_offset + 30 + name_length + extra_length
+            if info.filename.endswith('/data.pkl'):
+                pickle_file = info.filename
+        if pickle_file is None:
+            raise zipfile.BadZipFile("The checkpoint has no data.pkl record")
+        data_pkl = zip_file.read(pickle_file)
+    prefix = pickle_file[: -len('data.pkl')]
+
+    # Copy-on-write mapping: the tensors are writable without modifying the file
+    with open(path2file, 'rb') as f:
+        mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def load_record(key, dtype, numel):
+        if numel == 0:
+            return torch.empty(0, dtype=dtype)
+        offset = member.offset_data + records[f'{prefix}data/{key}']
+        return torch.frombuffer(mapped_file, dtype=dtype, count=numel, offset=offset)
+
+    return _MmapUnpickler(io.BytesIO(data_pkl), load_record).load()
+
+
 class SaveRestoreConnector:
     def __init__(self) -> None:
         self._model_config_yaml = "model_config.yaml"
         self._model_weights_ckpt = "model_weights.ckpt"
         self._model_extracted_dir = None
+        self._lazy_restore = False
 
     def save_to(self, model, save_path: str):
         """
@@ -108,6 +215,15 @@ class SaveRestoreConnector:
                 map_location = torch.device('cpu')
 
         app_state = AppState()
+        if (
+            self.lazy_restore
+            and not (self.model_extracted_dir is not None and os.path.isdir(self.model_extracted_dir))
+            and not (app_state.model_parallel_size is not None and app_state.model_parallel_size > 1)
+        ):
+            return self._lazy_load_config_and_state_dict(
+                calling_cls, restore_path, override_config_path, map_location, return_config, trainer,
+            )
+
         with tempfile.TemporaryDirectory() as tmpdir:
             try:
                 # Check if self.model_extracted_dir is set, and is a valid path
@@ -166,6 +282,73 @@ class SaveRestoreConnector:
 
         return (conf, instance, state_dict)
 
+    def _lazy_load_config_and_state_dict(
+        self,
+        calling_cls,
+        restore_path: str,
+        override_config_path: Optional[Union[OmegaConf, str]],
+        map_location: torch.device,
+        return_config: bool,
+        trainer: Trainer,
+    ):
+        """
+        Same as `load_config_and_state_dict`, without extracting the whole .nemo file: the config is read from the
+        archive, only the artifacts are extracted, and the weights are memory mapped from uncompressed archives.
+        """
+        with self._open_nemo_file(restore_path) as tar:
+            if override_config_path is None:
+                conf = OmegaConf.load(tar.extractfile(self._get_nemo_file_member(tar, self.model_config_yaml)))
+            elif not isinstance(override_config_path, (OmegaConf, DictConfig)):
+                conf = OmegaConf.load(override_config_path)
+            else:
+                # Resolve the override config
+                conf = OmegaConf.to_container(override_config_path, resolve=True)
+                conf = OmegaConf.create(conf)
+            # If override is top level config, extract just `model` from it
+            if 'model' in conf:
+                conf = conf.model
+
+            if return_config:
+                return conf
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                # The artifacts are opened by their path in the constructors of the models
+                weights_member = self._get_nemo_file_member(tar, self.model_weights_ckpt)
+                artifacts = [
+                    member
+                    for member in tar.getmembers()
+                    if os.path.normpath(member.name) not in (self.model_config_yaml, self.model_weights_ckpt)
+                ]
+                tar.extractall(path=tmpdir, members=artifacts)
+
+                OmegaConf.set_struct(conf, True)
+                calling_cls._set_model_restore_state(is_being_restored=True, folder=tmpdir)
+                instance = calling_cls.from_config_dict(config=conf, trainer=trainer)
+                instance = instance.to(map_location)
+                state_dict = self._load_state_dict_from_nemo_file(
+                    restore_path, tar, weights_member, tmpdir, map_location=map_location
+                )
+
+        return (conf, instance, state_dict)
+
+    def _load_state_dict_from_nemo_file(self, restore_path, tar, member, tmpdir, map_location=None):
+        """
+        Loads the weights of a .nemo file from its tar member. The weights of an uncompressed archive are memory
+        mapped, and are only read when they are copied into the parameters of the model. The weights of a
+        compressed archive are extracted and loaded from the disk.
+        """
+        if not self._is_compressed_nemo_file(restore_path):
+            member_file = tar.extractfile(member)
+            try:
+                return _load_mmap_state_dict(restore_path, member, member_file)
+            except (pickle.UnpicklingError, zipfile.BadZipFile, ValueError) as e:
+                logging.info(f"The weights of {restore_path} can not be memory mapped ({e}), loading them in memory.")
+                member_file.seek(0)
+                return torch.load(member_file, map_location=map_location)
+
+        tar.extractall(path=tmpdir, members=[member])
+        return self._load_state_dict_from_disk(os.path.join(tmpdir, member.name), map_location=map_location)
+
     def modify_state_dict(self, conf, state_dict):
         """
         Utility method that allows to modify the state dict before loading parameters into a model.
@@ -477,19 +660,37 @@ class SaveRestoreConnector:
         if not os.path.exists(path2file):
             raise FileNotFoundError(f"{path2file} does not exist")
 
+        with SaveRestoreConnector._open_nemo_file(path2file) as tar:
+            tar.extractall(path=out_folder)
+        return out_folder
+
+    @staticmethod
+    def _is_compressed_nemo_file(path2file: str) -> bool:
         # we start with an assumption of uncompressed tar,
         # which should be true for versions 1.7.0 and above
-        tar_header = "r:"
         try:
-            tar_test = tarfile.open(path2file, tar_header)
+            tar_test = tarfile.open(path2file, "r:")
             tar_test.close()
+            return False
         except tarfile.ReadError:
             # can be older checkpoint => try compressed tar
-            tar_header = "r:gz"
-        tar = tarfile.open(path2file, tar_header)
-        tar.extractall(path=out_folder)
-        tar.close()
-        return out_folder
+            return True
+
+    @staticmethod
+    def _open_nemo_file(path2file: str) -> tarfile.TarFile:
+        if not os.path.exists(path2file):
+            raise FileNotFoundError(f"{path2file} does not exist")
+
+        tar_header = "r:gz" if SaveRestoreConnector._is_compressed_nemo_file(path2file) else "r:"
+        return tarfile.open(path2file, tar_header)
+
+    @staticmethod
+    def _get_nemo_file_member(tar: tarfile.TarFile, name: str) -> tarfile.TarInfo:
+        # Members are stored relative to "." by `_make_nemo_file_from_folder`
+        for member in tar.getmembers():
+            if os.path.normpath(member.name) == name:
+                return member
+        raise FileNotFoundError(f"{name} was not found in the .nemo file {tar.name}")
 
     @staticmethod
     def _save_state_dict_to_disk(state_dict, filepath):
@@ -522,3 +723,11 @@ class SaveRestoreConnector:
     @model_extracted_dir.setter
     def model_extracted_dir(self, path: Optional[str]):
         self._model_extracted_dir = path
+
+    @property
+    def lazy_restore(self) -> bool:
+        return self._lazy_restore
+
+    @lazy_restore.setter
+    def lazy_restore(self, value: bool):
+        self._lazy_restore = value
@@ -863,18 +863,22 @@ def prepare_lr_scheduler(
 
         # Compute effective num max_steps
         num_samples = len(train_dataloader.dataset)
+        drop_last = train_dataloader.drop_last
         # TODO: not sure if this will be the correct LR schedule for Megatron
         # we may need to override ModelPT setup_optimization
         if train_dataloader.batch_size is not None:
             batch_size = train_dataloader.batch_size
         elif hasattr(train_dataloader, 'batch_sampler') and train_dataloader.batch_sampler is not None:
-            if train_dataloader.batch_sampler.micro_batch_size is not None:
+            if getattr(train_dataloader.batch_sampler, 'micro_batch_size', None) is not None:
                 batch_size = train_dataloader.batch_sampler.micro_batch_size
+            elif hasattr(train_dataloader.batch_sampler, '__len__'):
+                # Batch samplers with variable batch sizes shard the data themselves,
+                # so their length is already the number of steps per epoch of each process.
+                num_samples, batch_size, num_workers, drop_last = len(train_dataloader.batch_sampler), 1, 1, False
             else:
                 raise ValueError(f'Could not find batch_size from batch_sampler: {train_dataloader.batch_sampler}')
         else:
             raise ValueError(f'Could not find batch_size from train_dataloader: {train_dataloader}')
-        drop_last = train_dataloader.drop_last
 
         max_steps = compute_max_steps(
             max_epochs=max_epochs,
@@ -67,6 +67,8 @@ def beam_search_eval(
     beam_width=128,
     beam_batch_size=128,
     progress_bar=True,
+    decoder_type='ctc_decoders',
+    blank_skip_threshold=1.0,
 ):
     # creating the beam search decoder
     beam_search_lm = nemo_asr.modules.BeamSearchDecoderWithLM(
@@ -77,6 +79,8 @@ def beam_search_eval(
         lm_path=lm_path,
         num_cpus=max(os.cpu_count(), 1),
         input_tensor=False,
+        decoder_type=decoder_type,
+        blank_skip_threshold=blank_skip_threshold,
     )
 
     wer_dist_first = cer_dist_first = 0
@@ -134,6 +138,10 @@ def beam_search_eval(
             cer_dist_best += cer_dist_min
         sample_idx += len(probs_batch)
 
+    if beam_search_lm.prefix_beam_search is not None:
+        # Stops the worker processes which were kept across the batches
+        beam_search_lm.prefix_beam_search.close()
+
     if preds_output_file:
         out_file.close()
         logging.info(f"Stored the predictions of beam search decoding at '{preds_output_file}'.")
@@ -169,7 +177,11 @@ def main():
         help="The path of the '.nemo' file of the ASR model or name of a pretrained model",
     )
     parser.add_argument(
-        "--kenlm_model_file", required=False, default=None, type=str, help="The path of the KenLM binary model file"
+        "--kenlm_model_file",
+        required=False,
+        default=None,
+        type=str,
+        help="The path of the KenLM binary model file, or of an ARPA file with the 'nemo' decoder",
     )
     parser.add_argument("--input_manifest", required=True, type=str, help="The manifest file of the evaluation set")
     parser.add_argument(
@@ -218,6 +230,19 @@ def main():
     parser.add_argument(
         "--beam_batch_size", default=128, type=int, help="The batch size to be used for beam search decoding"
     )
+    parser.add_argument(
+        "--decoder_type",
+        choices=["ctc_decoders", "nemo"],
+        default="ctc_decoders",
+        type=str,
+        help="The beam search implementation: the external ctc_decoders package or NeMo's built-in decoder.",
+    )
+    parser.add_argument(
+        "--blank_skip_threshold",
+        default=1.0,
+        type=float,
+        help="Frames with a blank probability of at least this threshold are not expanded by the 'nemo' decoder",
+    )
     args = parser.parse_args()
 
     if args.nemo_model_file.endswith('.nemo'):
@@ -355,6 +380,8 @@ def main():
                 beam_beta=hp["beam_beta"],
                 beam_batch_size=args.beam_batch_size,
                 progress_bar=True,
+                decoder_type=args.decoder_type,
+                blank_skip_threshold=args.blank_skip_threshold,
             )
 
 
@@ -0,0 +1,134 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the LCS merge of buffered RNNT inference (`longest_common_subsequence_merge`).
+
+Synthetic streams of sub-word ids are split into overlapping chunks, like the buffers of
+`LongestCommonSubsequenceBatchedFrameASRRNNT`, and the chunks of every step are merged:
+    - per stream with `longest_common_subsequence_merge`,
+    - for all the streams at once with `batched_longest_common_subsequence_merge`,
+    - and, as a reference, with a pure Python computation of the alignment tables.
+
+The alignment tables of the reference and the vectorized engine, and the slices of the per-stream and batched
+merges, must be identical. The script exits with an error if they are not, or if the batched merge takes longer than
+`--max_batched_ms` per step.
+
+python benchmark_lcs_merge.py --num_streams 32 --search_size 200 --chunk_tokens 60 --num_steps 20
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    batched_longest_common_subsequence_merge,
+    longest_common_subsequence_merge,
+)
+
+
+def reference_lcs_suffix_lengths(X, Y):
+    """Alignment table of the LCS merge computed with nested Python loops."""
+    m, n = len(X), len(Y)
+    table = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if X[i - 1] == Y[j - 1]:
+                table[i][j] = table[i - 1][j - 1] + 1
+    return table
+
+
+def make_steps(rng, num_streams, num_steps, search_size, chunk_tokens, vocab_size, error_rate):
+    """Returns, for every step, the list of (previous buffer subset, current chunk) of every stream."""
+    steps = []
+    streams = [rng.randint(0, vocab_size, size=search_size + num_steps * chunk_tokens) for _ in range(num_streams)]
+    for step in range(num_steps):
+        pairs = []
+        for stream in streams:
+            end = search_size + step * chunk_tokens
+            X = stream[end - search_size : end].tolist()
+            # The current chunk overlaps with the end of the previous buffer, with some recognition errors
+            Y = stream[end - search_size // 2 : end + chunk_tokens].tolist()
+            Y = [t if rng.rand() > error_rate else int(rng.randint(0, vocab_size)) for t in Y]
+            pairs.append((X, Y))
+        steps.append(pairs)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the LCS merge of buffered RNNT inference.")
+    parser.add_argument("--num_streams", default=32, type=int, help="Number of streams merged at every step")
+    parser.add_argument("--num_steps", default=20, type=int, help="Number of chunks of every stream")
+    parser.add_argument("--search_size", default=200, type=int, help="Tokens of the previous buffer to align")
+    parser.add_argument("--chunk_tokens", default=60, type=int, help="New tokens of every chunk")
+    parser.add_argument("--vocab_size", default=128, type=int, help="Size of the sub-word vocabulary")
+    parser.add_argument("--error_rate", default=0.1, type=float, help="Rate of mismatched tokens in the overlap")
+    parser.add_argument("--skip_reference", action="store_true", help="Do not run the pure Python reference")
+    parser.add_argument(
+        "--max_batched_ms", default=None, type=float, help="Fail if a batched merge step takes longer than this"
+    )
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    steps = make_steps(
+        rng, args.num_streams, args.num_steps, args.search_size, args.chunk_tokens, args.vocab_size, args.error_rate,
+    )
+
+    start = time.perf_counter()
+    per_stream = [[longest_common_subsequence_merge(X, Y) for X, Y in pairs] for pairs in steps]
+    per_stream_ms = (time.perf_counter() - start) * 1000 / len(steps)
+
+    start = time.perf_counter()
+    batched = [
+        batched_longest_common_subsequence_merge([X for X, _ in pairs], [Y for _, Y in pairs]) for pairs in steps
+    ]
+    batched_ms = (time.perf_counter() - start) * 1000 / len(steps)
+
+    failures = []
+    for step_results, step_batched in zip(per_stream, batched):
+        for (slice_idx, table), (batched_slice_idx, batched_table) in zip(step_results, step_batched):
+            if slice_idx != batched_slice_idx or not np.array_equal(table, batched_table):
+                failures.append("The batched merge does not match the per-stream merge.")
+                break
+
+    chunk_size = len(steps[0][0][1]) if steps and steps[0] else 0
+    print(f"Streams: {args.num_streams}, steps: {args.num_steps}, alignment size: {args.search_size} x {chunk_size}")
+    if not args.skip_reference:
+        start = time.perf_counter()
+        reference = [[reference_lcs_suffix_lengths(X, Y) for X, Y in pairs] for pairs in steps]
+        reference_ms = (time.perf_counter() - start) * 1000 / len(steps)
+        print(f"Python alignment tables   : {reference_ms:9.3f} ms / step")
+
+        for step_reference, step_batched in zip(reference, batched):
+            if any(not np.array_equal(table, result[1]) for table, result in zip(step_reference, step_batched)):
+                failures.append("The vectorized alignment tables do not match the reference.")
+                break
+
+    print(f"Per-stream merge          : {per_stream_ms:9.3f} ms / step")
+    print(f"Batched merge             : {batched_ms:9.3f} ms / step")
+
+    if args.max_batched_ms is not None and batched_ms > args.max_batched_ms:
+        failures.append(f"The batched merge took {batched_ms:.3f} ms / step, more than {args.max_batched_ms} ms.")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
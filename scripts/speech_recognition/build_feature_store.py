@@ -0,0 +1,95 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+from dataclasses import dataclass, is_dataclass
+from typing import Optional
+
+import torch
+from omegaconf import MISSING, OmegaConf
+
+from nemo.collections.asr.data.feature_store import build_feature_store
+from nemo.collections.asr.models import ASRModel
+from nemo.core.config import hydra_runner
+from nemo.utils import logging
+
+"""
+Precomputes the features of every entry of a manifest with the preprocessor of an ASR model and stores them in a
+memory-mapped feature store, which can be used instead of the audio by setting `feature_store_path` in the
+(non-augmented) dataset config of the model.
+
+# Arguments
+  model_path: path to .nemo ASR checkpoint
+  pretrained_name: name of pretrained ASR model (from NGC registry)
+  dataset_manifest: path to dataset JSON manifest file (in NeMo format), can be comma-separated paths
+  store_path: output directory of the feature store
+  cuda: Optional int to select the CUDA device. Negative values select the CPU.
+  overwrite: whether to replace an existing feature store
+
+# Usage
+python build_feature_store.py \
+    model_path=<path to .nemo file> \
+    dataset_manifest=<path to the manifest file> \
+    store_path=<path to output directory>
+"""
+
+
+@dataclass
+class FeatureStoreConfig:
+    model_path: Optional[str] = None  # Path to a .nemo file
+    pretrained_name: Optional[str] = None  # Name of a pretrained model
+    dataset_manifest: str = MISSING  # Path to dataset's JSON manifest
+    store_path: str = MISSING  # Output directory of the feature store
+    cuda: Optional[int] = None
+    overwrite: bool = False
+
+
+@hydra_runner(config_name="FeatureStoreConfig", schema=FeatureStoreConfig)
+def main(cfg: FeatureStoreConfig):
+    logging.info(f'Hydra config: {OmegaConf.to_yaml(cfg)}')
+
+    if is_dataclass(cfg):
+        cfg = OmegaConf.structured(cfg)
+
+    if cfg.model_path is None and cfg.pretrained_name is None:
+        raise ValueError("Both cfg.model_path and cfg.pretrained_name cannot be None!")
+
+    if cfg.cuda is None:
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    else:
+        device = torch.device(f'cuda:{cfg.cuda}' if cfg.cuda >= 0 else 'cpu')
+
+    if cfg.model_path is not None:
+        asr_model = ASRModel.restore_from(restore_path=cfg.model_path, map_location=device)
+    else:
+        asr_model = ASRModel.from_pretrained(model_name=cfg.pretrained_name, map_location=device)
+
+    if os.path.exists(cfg.store_path):
+        if not cfg.overwrite:
+            raise FileExistsError(f"Feature store {cfg.store_path} already exists, set overwrite=true to replace it")
+        shutil.rmtree(cfg.store_path)
+
+    build_feature_store(
+        manifest_filepath=cfg.dataset_manifest,
+        store_path=cfg.store_path,
+        preprocessor=asr_model.preprocessor,
+        sample_rate=asr_model.cfg.sample_rate,
+        device=device,
+    )
+    logging.info(f"Finished building the feature store at {cfg.store_path}")
+
+
+if __name__ == '__main__':
+    main()
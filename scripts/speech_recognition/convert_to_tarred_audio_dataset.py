@@ -31,6 +31,18 @@
 # supplied to the config in order to utilize webdataset for efficient large dataset handling.
 # NOTE: DALI + Webdataset is NOT compatible with Bucketing support !
 
+# Every tarball is written together with an index `audio_{shard_id}.tar.index` that maps the tarred files to their
+# byte offsets. It is required to read the tarred dataset with random access (`tarred_random_access=true`).
+# Indices of existing tarred datasets can be created with `create_tarred_audio_index.py`.
+
+# The manifest is not loaded into memory: only the byte offsets and durations of its lines are kept, and the shards
+# read their entries from the manifest themselves. Shards are written by a pool of `--workers` processes, with a
+# bounded number of shards in flight. Audio files are copied verbatim into the tarballs unless `--target_sr` or
+# `--audio_format` is set, in which case they are downmixed to mono, resampled to `--target_sr` (if set) and
+# transcoded to FLAC or 16-bit PCM WAV. Besides the manifest and the metadata, the number of samples and the
+# durations of every shard are written to `shard_durations.json`. All outputs are written to temporary files first
+# and renamed into place once complete.
+
 # Usage:
 1) Creating a new tarfile dataset
 
@@ -42,7 +54,9 @@ python convert_to_tarred_audio_dataset.py \
     --min_duration=<float representing minimum duration of audio samples> \
     --shuffle --shuffle_seed=1 \
     --sort_in_shards \
-    --workers=-1
+    --workers=-1 \
+    --target_sr=16000 \
+    --audio_format=flac
 
 
 2) Concatenating more tarfiles to a pre-existing tarred dataset
@@ -75,19 +89,27 @@ python convert_to_tarred_audio_dataset.py \
 
 """
 import argparse
+import array
+import collections
+import contextlib
 import copy
+import hashlib
+import io
 import json
 import os
-import random
 import tarfile
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from joblib import Parallel, delayed
+import numpy as np
+import soundfile as sf
 from omegaconf import DictConfig, OmegaConf, open_dict
 
+from nemo.collections.asr.data.tarred_audio_index import get_tar_index_filepath, write_tar_index
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+
 try:
     import create_dali_tarred_dataset_index as dali_index
 
@@ -174,9 +196,25 @@ parser.add_argument(
         "and it must be filled out by the user."
     ),
 )
+parser.add_argument(
+    '--target_sr',
+    type=int,
+    default=None,
+    help="Resample the audio to this sample rate. Implies transcoding, to FLAC unless `--audio_format` is set.",
+)
+parser.add_argument(
+    '--audio_format',
+    type=str,
+    default=None,
+    choices=['flac', 'wav'],
+    help="Transcode the audio to FLAC or 16-bit PCM WAV (mono). By default audio files are copied verbatim.",
+)
 parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
 args = parser.parse_args()
 
+# Transcoded audio formats, as (extension, soundfile format, soundfile subtype).
+AUDIO_FORMATS = {'flac': ('.flac', 'FLAC', 'PCM_16'), 'wav': ('.wav', 'WAV', 'PCM_16')}
+
 
 @dataclass
 class ASRTarredDatasetConfig:
@@ -187,6 +225,8 @@ class ASRTarredDatasetConfig:
     shuffle_seed: Optional[int] = None
     sort_in_shards: bool = True
     keep_files_together: bool = False
+    target_sr: Optional[int] = None
+    audio_format: Optional[str] = None
 
 
 @dataclass
@@ -217,6 +257,100 @@ class ASRTarredDatasetMetadata:
         return ASRTarredDatasetMetadata.from_config(config=config)
 
 
+@dataclass
+class ManifestIndex:
+    """Byte offsets and durations of the (filtered) lines of one or more manifests."""
+
+    manifest_paths: List[str]
+    source_ids: np.ndarray  # index into `manifest_paths` of every line
+    offsets: np.ndarray  # byte offset of every line in its manifest
+    durations: np.ndarray
+    file_keys: Optional[np.ndarray] = None  # hash of the `audio_filepath` of every line, if requested
+    num_filtered: int = 0
+    filtered_duration: float = 0.0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def total_duration(self) -> float:
+        return float(self.durations.sum())
+
+
+def iter_manifest_entries(
+    manifest_paths: List[str], source_ids: Iterable[int], offsets: Iterable[int]
+) -> Iterator[Dict]:
+    """Reads the manifest lines at the given byte offsets."""
+    handles = {}
+    try:
+        for source_id, offset in zip(source_ids, offsets):
+            if source_id not in handles:
+                handles[source_id] = open(manifest_paths[source_id], 'rb')
+            handles[source_id].seek(offset)
+            yield json.loads(handles[source_id].readline())
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+
+@contextlib.contextmanager
+def atomic_output(filepath: str):
+    """Yields a temporary path which is renamed to `filepath` if the block completes, and removed otherwise."""
+    tmp_filepath = f'{filepath}.tmp{os.getpid()}'
+    try:
+        yield tmp_filepath
+        os.replace(tmp_filepath, filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+
+
+def write_shard_durations(entries: Iterable[Dict], filepath: str):
+    """Writes the number of samples and the total, min and max duration of every shard, one JSON line per shard."""
+    stats = collections.OrderedDict()
+    for entry in entries:
+        shard_stats = stats.setdefault(
+            entry['shard_id'], {'num_samples': 0, 'duration': 0.0, 'min_duration': None, 'max_duration': None}
+        )
+        duration = entry['duration']
+        shard_stats['num_samples'] += 1
+        shard_stats['duration'] += duration
+        if shard_stats['min_duration'] is None or duration < shard_stats['min_duration']:
+            shard_stats['min_duration'] = duration
+        if shard_stats['max_duration'] is None or duration > shard_stats['max_duration']:
+            shard_stats['max_duration'] = duration
+
+    with atomic_output(filepath) as tmp_filepath:
+        with open(tmp_filepath, 'w') as f:
+            for shard_id in sorted(stats):
+                json.dump({'shard_id': shard_id, **stats[shard_id]}, f)
+                f.write('\n')
+
+
+def run_shards(create_shard, tasks: Iterable[Tuple], num_workers: int) -> Iterator[List[Dict]]:
+    """
+    Runs `create_shard(*task)` for every task and yields the results in order. With more than one worker, the tasks
+    are run by a process pool with at most two pending tasks per worker, so that neither the tasks nor the results
+    accumulate in memory.
+    """
+    if num_workers < 0:
+        # Same convention as joblib: -1 uses all CPUs, -2 all but one, ...
+        num_workers = max(os.cpu_count() + 1 + num_workers, 1)
+    if num_workers <= 1:
+        for task in tasks:
+            yield create_shard(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(create_shard, *task))
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class ASRTarredDatasetBuilder:
     """
     Helper class that constructs a tarred dataset from scratch, or concatenates tarred datasets
@@ -263,77 +397,52 @@ class ASRTarredDatasetBuilder:
         if not os.path.exists(target_dir):
             os.makedirs(target_dir)
 
-        # Read the existing manifest
-        entries, total_duration, filtered_entries, filtered_duration = self._read_manifest(manifest_path, config)
+        # Index the existing manifest
+        index = self._index_manifest(
+            [manifest_path], config, with_file_keys=config.shuffle and config.keep_files_together
+        )
 
-        if len(filtered_entries) > 0:
-            print(f"Filtered {len(filtered_entries)} files which amounts to {filtered_duration} seconds of audio.")
+        if index.num_filtered > 0:
+            print(f"Filtered {index.num_filtered} files which amounts to {index.filtered_duration} seconds of audio.")
         print(
-            f"After filtering, manifest has {len(entries)} files which amounts to {total_duration} seconds of audio."
+            f"After filtering, manifest has {len(index)} files which amounts to {index.total_duration} seconds of audio."
         )
 
-        if len(entries) == 0:
+        if len(index) == 0:
             print("No tarred dataset was created as there were 0 valid samples after filtering!")
             return
+
+        order = np.arange(len(index))
         if config.shuffle:
-            random.seed(config.shuffle_seed)
             print("Shuffling...")
-            if config.keep_files_together:
-                filename_entries = defaultdict(list)
-                for ent in entries:
-                    filename_entries[ent["audio_filepath"]].append(ent)
-                filenames = list(filename_entries.keys())
-                random.shuffle(filenames)
-                shuffled_entries = []
-                for filename in filenames:
-                    shuffled_entries += filename_entries[filename]
-                entries = shuffled_entries
-            else:
-                random.shuffle(entries)
+            order = self._shuffle(index, config)
 
         # Create shards and updated manifest entries
-        print(f"Number of samples added : {len(entries)}")
-        print(f"Remainder: {len(entries) % config.num_shards}")
-
-        start_indices = []
-        end_indices = []
-        # Build indices
-        for i in range(config.num_shards):
-            start_idx = (len(entries) // config.num_shards) * i
-            end_idx = start_idx + (len(entries) // config.num_shards)
-            print(f"Shard {i} has entries {start_idx} ~ {end_idx}")
-            files = set()
-            for ent_id in range(start_idx, end_idx):
-                files.add(entries[ent_id]["audio_filepath"])
-            print(f"Shard {i} contains {len(files)} files")
-            if i == config.num_shards - 1:
-                # We discard in order to have the same number of entries per shard.
-                print(f"Have {len(entries) - end_idx} entries left over that will be discarded.")
-
-            start_indices.append(start_idx)
-            end_indices.append(end_idx)
+        num_samples_per_shard = len(index) // config.num_shards
+        print(f"Number of samples added : {len(index)}")
+        print(f"Remainder: {len(index) % config.num_shards}")
+        print(
+            f"Have {len(index) - num_samples_per_shard * config.num_shards} entries left over that will be discarded."
+        )
 
         manifest_folder, _ = os.path.split(manifest_path)
-
-        with Parallel(n_jobs=num_workers, verbose=config.num_shards) as parallel:
-            # Call parallel tarfile construction
-            new_entries_list = parallel(
-                delayed(self._create_shard)(entries[start_idx:end_idx], target_dir, i, manifest_folder)
-                for i, (start_idx, end_idx) in enumerate(zip(start_indices, end_indices))
-            )
-
-        # Flatten the list of list of entries to a list of entries
-        new_entries = [sample for manifest in new_entries_list for sample in manifest]
-        del new_entries_list
-
-        print("Total number of entries in manifest :", len(new_entries))
-
-        # Write manifest
         new_manifest_path = os.path.join(target_dir, 'tarred_audio_manifest.json')
-        with open(new_manifest_path, 'w') as m2:
-            for entry in new_entries:
-                json.dump(entry, m2)
-                m2.write('\n')
+        num_entries = self._write_shards(
+            index,
+            order,
+            range(config.num_shards),
+            num_samples_per_shard,
+            target_dir,
+            manifest_folder,
+            num_workers,
+            new_manifest_path,
+            base_manifest_path=None,
+        )
+
+        print("Total number of entries in manifest :", num_entries)
+        write_shard_durations(
+            self._read_entries(new_manifest_path), os.path.join(target_dir, 'shard_durations.json'),
+        )
 
         # Write metadata (default metadata for new datasets)
         new_metadata_path = os.path.join(target_dir, 'metadata.yaml')
@@ -341,11 +450,10 @@ class ASRTarredDatasetBuilder:
 
         # Update metadata
         metadata.dataset_config = config
-        metadata.num_samples_per_shard = len(new_entries) // config.num_shards
+        metadata.num_samples_per_shard = num_entries // config.num_shards
 
         # Write metadata
-        metadata_yaml = OmegaConf.structured(metadata)
-        OmegaConf.save(metadata_yaml, new_metadata_path, resolve=True)
+        self._save_metadata(metadata, new_metadata_path)
 
     def create_concatenated_dataset(
         self,
@@ -384,14 +492,15 @@ class ASRTarredDatasetBuilder:
             raise FileNotFoundError("List of additional manifest filepaths cannot be None !")
 
         config = ASRTarredDatasetConfig(**(metadata.dataset_config))
+        self.config = config
 
-        # Read the existing manifest (no filtering here)
-        base_entries, _, _, _ = self._read_manifest(base_manifest_path, config)
-        print(f"Read base manifest containing {len(base_entries)} samples.")
+        # Index the existing manifest
+        base_index = self._index_manifest([base_manifest_path], config)
+        print(f"Read base manifest containing {len(base_index)} samples.")
 
         # Precompute number of samples per shard
         if metadata.num_samples_per_shard is None:
-            num_samples_per_shard = len(base_entries) // config.num_shards
+            num_samples_per_shard = len(base_index) // config.num_shards
         else:
             num_samples_per_shard = metadata.num_samples_per_shard
 
@@ -401,75 +510,36 @@ class ASRTarredDatasetBuilder:
         print(f"Selected max duration : {config.max_duration}")
         print(f"Selected min duration : {config.min_duration}")
 
-        entries = []
-        for new_manifest_idx in range(len(manifest_paths)):
-            new_entries, total_duration, filtered_new_entries, filtered_duration = self._read_manifest(
-                manifest_paths[new_manifest_idx], config
-            )
-
-            if len(filtered_new_entries) > 0:
-                print(
-                    f"Filtered {len(filtered_new_entries)} files which amounts to {filtered_duration:0.2f}"
-                    f" seconds of audio from manifest {manifest_paths[new_manifest_idx]}."
-                )
+        index = self._index_manifest(manifest_paths, config)
+        if index.num_filtered > 0:
             print(
-                f"After filtering, manifest has {len(entries)} files which amounts to {total_duration} seconds of audio."
+                f"Filtered {index.num_filtered} files which amounts to {index.filtered_duration:0.2f}"
+                f" seconds of audio from manifests {manifest_paths}."
             )
+        print(
+            f"After filtering, manifests have {len(index)} files which amounts to {index.total_duration} seconds of audio."
+        )
 
-            entries.extend(new_entries)
-
-        if len(entries) == 0:
+        if len(index) == 0:
             print("No tarred dataset was created as there were 0 valid samples after filtering!")
             return
 
+        order = np.arange(len(index))
         if config.shuffle:
-            random.seed(config.shuffle_seed)
             print("Shuffling...")
-            random.shuffle(entries)
+            order = np.random.RandomState(config.shuffle_seed).permutation(len(index))
 
         # Drop last section of samples that cannot be added onto a chunk
-        drop_count = len(entries) % num_samples_per_shard
-        total_new_entries = len(entries)
-        entries = entries[:-drop_count]
+        drop_count = len(index) % num_samples_per_shard
+        num_added_shards = len(index) // num_samples_per_shard
 
         print(
-            f"Dropping {drop_count} samples from total new samples {total_new_entries} since they cannot "
+            f"Dropping {drop_count} samples from total new samples {len(index)} since they cannot "
             f"be added into a uniformly sized chunk."
         )
-
-        # Create shards and updated manifest entries
-        num_added_shards = len(entries) // num_samples_per_shard
-
-        print(f"Number of samples in base dataset : {len(base_entries)}")
-        print(f"Number of samples in additional datasets : {len(entries)}")
+        print(f"Number of samples in base dataset : {len(base_index)}")
+        print(f"Number of samples in additional datasets : {len(index) - drop_count}")
         print(f"Number of added shards : {num_added_shards}")
-        print(f"Remainder: {len(entries) % num_samples_per_shard}")
-
-        start_indices = []
-        end_indices = []
-        shard_indices = []
-        for i in range(num_added_shards):
-            start_idx = (len(entries) // num_added_shards) * i
-            end_idx = start_idx + (len(entries) // num_added_shards)
-            shard_idx = i + config.num_shards
-            print(f"Shard {shard_idx} has entries {start_idx + len(base_entries)} ~ {end_idx + len(base_entries)}")
-
-            start_indices.append(start_idx)
-            end_indices.append(end_idx)
-            shard_indices.append(shard_idx)
-
-        manifest_folder, _ = os.path.split(base_manifest_path)
-
-        with Parallel(n_jobs=num_workers, verbose=num_added_shards) as parallel:
-            # Call parallel tarfile construction
-            new_entries_list = parallel(
-                delayed(self._create_shard)(entries[start_idx:end_idx], target_dir, shard_idx, manifest_folder)
-                for i, (start_idx, end_idx, shard_idx) in enumerate(zip(start_indices, end_indices, shard_indices))
-            )
-
-        # Flatten the list of list of entries to a list of entries
-        new_entries = [sample for manifest in new_entries_list for sample in manifest]
-        del new_entries_list
 
         # Write manifest
         if metadata is None:
@@ -477,19 +547,26 @@ class ASRTarredDatasetBuilder:
         else:
             new_version = metadata.version + 1
 
-        print("Total number of entries in manifest :", len(base_entries) + len(new_entries))
-
+        manifest_folder, _ = os.path.split(base_manifest_path)
         new_manifest_path = os.path.join(target_dir, f'tarred_audio_manifest_version_{new_version}.json')
-        with open(new_manifest_path, 'w') as m2:
-            # First write all the entries of base manifest
-            for entry in base_entries:
-                json.dump(entry, m2)
-                m2.write('\n')
+        num_entries = self._write_shards(
+            index,
+            order,
+            range(config.num_shards, config.num_shards + num_added_shards),
+            num_samples_per_shard,
+            target_dir,
+            manifest_folder,
+            num_workers,
+            new_manifest_path,
+            base_manifest_path=base_manifest_path,
+            base_index=base_index,
+        )
 
-            # Finally write the new entries
-            for entry in new_entries:
-                json.dump(entry, m2)
-                m2.write('\n')
+        print("Total number of entries in manifest :", num_entries)
+        write_shard_durations(
+            self._read_entries(new_manifest_path),
+            os.path.join(target_dir, f'shard_durations_version_{new_version}.json'),
+        )
 
         # Preserve historical metadata
         base_metadata = metadata
@@ -513,85 +590,220 @@ class ASRTarredDatasetBuilder:
         metadata.history = current_metadata
 
         # Write metadata
-        metadata_yaml = OmegaConf.structured(metadata)
-        OmegaConf.save(metadata_yaml, new_metadata_path, resolve=True)
-
-    def _read_manifest(self, manifest_path: str, config: ASRTarredDatasetConfig):
-        """Read and filters data from the manifest"""
-        # Read the existing manifest
-        entries = []
-        total_duration = 0.0
-        filtered_entries = []
-        filtered_duration = 0.0
+        self._save_metadata(metadata, new_metadata_path)
+
+    def _index_manifest(
+        self, manifest_paths: List[str], config: ASRTarredDatasetConfig, with_file_keys: bool = False
+    ) -> ManifestIndex:
+        """
+        Streams the manifests and keeps the byte offset and the duration of every line which passes the duration
+        filter, and optionally a hash of its `audio_filepath`.
+        """
+        source_ids, offsets, durations = array.array('i'), array.array('q'), array.array('d')
+        file_keys = array.array('q')
+        num_filtered, filtered_duration = 0, 0.0
+        for source_id, manifest_path in enumerate(manifest_paths):
+            with open(manifest_path, 'rb') as m:
+                offset = 0
+                for line in m:
+                    line_offset, offset = offset, offset + len(line)
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if (config.max_duration is None or entry['duration'] < config.max_duration) and (
+                        config.min_duration is None or entry['duration'] >= config.min_duration
+                    ):
+                        source_ids.append(source_id)
+                        offsets.append(line_offset)
+                        durations.append(entry['duration'])
+                        if with_file_keys:
+                            digest = hashlib.blake2b(entry['audio_filepath'].encode(), digest_size=8).digest()
+                            file_keys.append(int.from_bytes(digest, 'little', signed=True))
+                    else:
+                        num_filtered += 1
+                        filtered_duration += entry['duration']
+
+        return ManifestIndex(
+            manifest_paths=list(manifest_paths),
+            source_ids=np.frombuffer(source_ids, dtype=np.int32),
+            offsets=np.frombuffer(offsets, dtype=np.int64),
+            durations=np.frombuffer(durations, dtype=np.float64),
+            file_keys=np.frombuffer(file_keys, dtype=np.int64) if with_file_keys else None,
+            num_filtered=num_filtered,
+            filtered_duration=filtered_duration,
+        )
+
+    @staticmethod
+    def _read_entries(manifest_path: str) -> Iterator[Dict]:
+        """Streams the entries of a manifest."""
         with open(manifest_path, 'r') as m:
             for line in m:
-                entry = json.loads(line)
-                if (config.max_duration is None or entry['duration'] < config.max_duration) and (
-                    config.min_duration is None or entry['duration'] >= config.min_duration
-                ):
-                    entries.append(entry)
-                    total_duration += entry["duration"]
-                else:
-                    filtered_entries.append(entry)
-                    filtered_duration += entry['duration']
-
-        return entries, total_duration, filtered_entries, filtered_duration
-
-    def _create_shard(self, entries, target_dir, shard_id, manifest_folder):
-        """Creates a tarball containing the audio files from `entries`.
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def _shuffle(index: ManifestIndex, config: ASRTarredDatasetConfig) -> np.ndarray:
+        """
+        Returns a random order of the indexed entries. With `keep_files_together`, the entries of every audio file
+        are kept together in their manifest order, and the files are shuffled.
+        """
+        rng = np.random.RandomState(config.shuffle_seed)
+        if not config.keep_files_together:
+            return rng.permutation(len(index))
+
+        _, first_idx, group = np.unique(index.file_keys, return_index=True, return_inverse=True)
+        # Number the files in order of appearance, then shuffle them.
+        group_rank = np.empty(len(first_idx), dtype=np.int64)
+        group_rank[np.argsort(first_idx, kind='stable')] = np.arange(len(first_idx))
+        group_position = rng.permutation(len(first_idx))[group_rank]
+        return np.lexsort((np.arange(len(index)), group_position[group]))
+
+    def _write_shards(
+        self,
+        index: ManifestIndex,
+        order: np.ndarray,
+        shard_ids: range,
+        num_samples_per_shard: int,
+        target_dir: str,
+        manifest_folder: str,
+        num_workers: int,
+        new_manifest_path: str,
+        base_manifest_path: Optional[str] = None,
+        base_index: Optional[ManifestIndex] = None,
+    ) -> int:
         """
+        Writes a shard of `num_samples_per_shard` entries of `order` for every shard id, and the manifest of the
+        tarred dataset, which starts with the entries of the base manifest if given. The entries of every shard are
+        appended to the manifest as soon as it is written. Returns the number of entries in the manifest.
+        """
+        num_entries = 0
+        with atomic_output(new_manifest_path) as tmp_manifest_path:
+            with open(tmp_manifest_path, 'w') as m2:
+                if base_manifest_path is not None:
+                    # First write all the entries of base manifest
+                    for entry in iter_manifest_entries(
+                        [base_manifest_path], base_index.source_ids, base_index.offsets
+                    ):
+                        json.dump(entry, m2)
+                        m2.write('\n')
+                        num_entries += 1
+
+                num_base_entries = num_entries
+
+                def tasks():
+                    for i, shard_id in enumerate(shard_ids):
+                        start_idx, end_idx = i * num_samples_per_shard, (i + 1) * num_samples_per_shard
+                        shard = order[start_idx:end_idx]
+                        print(
+                            f"Shard {shard_id} has entries {num_base_entries + start_idx} ~ {num_base_entries + end_idx}"
+                        )
+                        yield (
+                            index.manifest_paths,
+                            index.source_ids[shard],
+                            index.offsets[shard],
+                            target_dir,
+                            shard_id,
+                            manifest_folder,
+                        )
+
+                for new_entries in run_shards(self._create_shard, tasks(), num_workers):
+                    for entry in new_entries:
+                        json.dump(entry, m2)
+                        m2.write('\n')
+                    num_entries += len(new_entries)
+                    print(f"Wrote shard {new_entries[0]['shard_id']} with {len(new_entries)} entries.")
+        return num_entries
+
+    @staticmethod
+    def _save_metadata(metadata: ASRTarredDatasetMetadata, metadata_path: str):
+        metadata_yaml = OmegaConf.structured(metadata)
+        with atomic_output(metadata_path) as tmp_metadata_path:
+            OmegaConf.save(metadata_yaml, tmp_metadata_path, resolve=True)
+
+    def _create_shard(self, manifest_paths, source_ids, offsets, target_dir, shard_id, manifest_folder):
+        """Creates a tarball containing the audio files of the manifest entries at the given offsets.
+        """
+        entries = list(iter_manifest_entries(manifest_paths, source_ids, offsets))
         if self.config.sort_in_shards:
             entries.sort(key=lambda x: x["duration"], reverse=False)
 
+        audio_format = self.config.audio_format
+        if audio_format is None and self.config.target_sr is not None:
+            audio_format = 'flac'
+
         new_entries = []
-        tar = tarfile.open(os.path.join(target_dir, f'audio_{shard_id}.tar'), mode='w', dereference=True)
-
-        count = dict()
-        for entry in entries:
-            # We squash the filename since we do not preserve directory structure of audio files in the tarball.
-            if os.path.exists(entry["audio_filepath"]):
-                audio_filepath = entry["audio_filepath"]
-            else:
-                audio_filepath = os.path.join(manifest_folder, entry["audio_filepath"])
-                if not os.path.exists(audio_filepath):
-                    raise FileNotFoundError(f"Could not find {entry['audio_filepath']}!")
-
-            base, ext = os.path.splitext(audio_filepath)
-            base = base.replace('/', '_')
-            # Need the following replacement as long as WebDataset splits on first period
-            base = base.replace('.', '_')
-            squashed_filename = f'{base}{ext}'
-            if squashed_filename not in count:
-                tar.add(audio_filepath, arcname=squashed_filename)
-                to_write = squashed_filename
-                count[squashed_filename] = 1
-            else:
-                to_write = base + "-sub" + str(count[squashed_filename]) + ext
-                count[squashed_filename] += 1
-
-            new_entry = {
-                'audio_filepath': to_write,
-                'duration': entry['duration'],
-                'shard_id': shard_id,  # Keep shard ID for recordkeeping
-            }
-
-            if 'label' in entry:
-                new_entry['label'] = entry['label']
-
-            if 'text' in entry:
-                new_entry['text'] = entry['text']
-
-            if 'offset' in entry:
-                new_entry['offset'] = entry['offset']
-
-            if 'lang' in entry:
-                new_entry['lang'] = entry['lang']
-
-            new_entries.append(new_entry)
-
-        tar.close()
+        tar_filepath = os.path.join(target_dir, f'audio_{shard_id}.tar')
+        with atomic_output(tar_filepath) as tmp_tar_filepath:
+            with tarfile.open(tmp_tar_filepath, mode='w', dereference=True) as tar:
+                count = dict()
+                for entry in entries:
+                    # We squash the filename since we do not preserve directory structure of audio files in the tarball.
+                    if os.path.exists(entry["audio_filepath"]):
+                        audio_filepath = entry["audio_filepath"]
+                    else:
+                        audio_filepath = os.path.join(manifest_folder, entry["audio_filepath"])
+                        if not os.path.exists(audio_filepath):
+                            raise FileNotFoundError(f"Could not find {entry['audio_filepath']}!")
+
+                    base, ext = os.path.splitext(audio_filepath)
+                    base = base.replace('/', '_')
+                    # Need the following replacement as long as WebDataset splits on first period
+                    base = base.replace('.', '_')
+                    if audio_format is not None:
+                        ext = AUDIO_FORMATS[audio_format][0]
+                    squashed_filename = f'{base}{ext}'
+                    if squashed_filename not in count:
+                        if audio_format is None:
+                            tar.add(audio_filepath, arcname=squashed_filename)
+                        else:
+                            self._add_transcoded(tar, audio_filepath, squashed_filename, audio_format)
+                        to_write = squashed_filename
+                        count[squashed_filename] = 1
+                    else:
+                        to_write = base + "-sub" + str(count[squashed_filename]) + ext
+                        count[squashed_filename] += 1
+
+                    new_entry = {
+                        'audio_filepath': to_write,
+                        'duration': entry['duration'],
+                        'shard_id': shard_id,  # Keep shard ID for recordkeeping
+                    }
+
+                    if 'label' in entry:
+                        new_entry['label'] = entry['label']
+
+                    if 'text' in entry:
+                        new_entry['text'] = entry['text']
+
+                    if 'offset' in entry:
+                        new_entry['offset'] = entry['offset']
+
+                    if 'lang' in entry:
+                        new_entry['lang'] = entry['lang']
+
+                    new_entries.append(new_entry)
+
+            # The index is written before the tarball is renamed into place, the byte offsets are the same.
+            write_tar_index(tmp_tar_filepath, index_filepath=get_tar_index_filepath(tar_filepath))
         return new_entries
 
+    def _add_transcoded(self, tar: tarfile.TarFile, audio_filepath: str, arcname: str, audio_format: str):
+        """
+        Adds the whole audio file to the tarball as mono audio in `audio_format`, resampled to `target_sr` if set.
+        Timing is preserved, so offsets and durations of the manifest entries remain valid.
+        """
+        audio = AudioSegment.from_file(audio_filepath, target_sr=self.config.target_sr, resample_quality='best')
+        _, sf_format, sf_subtype = AUDIO_FORMATS[audio_format]
+        buffer = io.BytesIO()
+        sf.write(buffer, np.clip(audio.samples, -1.0, 1.0), audio.sample_rate, format=sf_format, subtype=sf_subtype)
+
+        tar_info = tarfile.TarInfo(name=arcname)
+        # soundfile seeks back to finalize the header, so the position of the buffer is not its size.
+        tar_info.size = buffer.getbuffer().nbytes
+        tar_info.mtime = int(os.path.getmtime(audio_filepath))
+        buffer.seek(0)
+        tar.addfile(tar_info, fileobj=buffer)
+
     @classmethod
     def setup_history(cls, base_metadata: ASRTarredDatasetMetadata, history: List[Any]):
         if 'history' in base_metadata.keys():
@@ -636,6 +848,8 @@ def create_tar_datasets(min_duration: float, max_duration: float, target_dir: st
             shuffle_seed=args.shuffle_seed,
             sort_in_shards=args.sort_in_shards,
             keep_files_together=args.keep_files_together,
+            target_sr=args.target_sr,
+            audio_format=args.audio_format,
         )
         metadata.dataset_config = dataset_cfg
 
@@ -656,6 +870,8 @@ def create_tar_datasets(min_duration: float, max_duration: float, target_dir: st
             shuffle_seed=args.shuffle_seed,
             sort_in_shards=args.sort_in_shards,
             keep_files_together=args.keep_files_together,
+            target_sr=args.target_sr,
+            audio_format=args.audio_format,
         )
         builder.configure(config)
         builder.create_new_dataset(manifest_path=args.manifest_path, target_dir=target_dir, num_workers=args.workers)
@@ -0,0 +1,63 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import logging
+import os
+from dataclasses import dataclass
+
+import hydra
+from hydra.core.config_store import ConfigStore
+from joblib import Parallel, delayed
+from omegaconf import MISSING
+
+from nemo.collections.asr.data.tarred_audio_index import get_tar_index_filepath, write_tar_index
+
+"""
+Creates the random-access index `audio_{shard_id}.tar.index` of every tarball of an existing tarred dataset.
+Tarballs which already have an index are skipped unless `overwrite=true`.
+
+python create_tarred_audio_index.py \
+    tar_dir=<path to the directory which contains tarred dataset> \
+    workers=-1
+
+"""
+
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class TarredAudioIndexConfig:
+    tar_dir: str = MISSING  # Path to the directory which contains the tarballs
+    workers: int = -1  # number of worker processes
+    overwrite: bool = False  # whether to recreate existing indices
+
+
+@hydra.main(config_path=None, config_name='index_config')
+def main(cfg: TarredAudioIndexConfig):
+    tar_files = sorted(glob.glob(os.path.join(cfg.tar_dir, "*.tar")))
+    if not cfg.overwrite:
+        tar_files = [path for path in tar_files if not os.path.exists(get_tar_index_filepath(path))]
+
+    with Parallel(n_jobs=cfg.workers, verbose=len(tar_files)) as parallel:
+        _ = parallel(delayed(write_tar_index)(tarpath) for tarpath in tar_files)
+
+    logging.info(f"Finished constructing {len(tar_files)} index files !")
+
+
+ConfigStore.instance().store(name='index_config', node=TarredAudioIndexConfig)
+
+
+if __name__ == '__main__':
+    main()
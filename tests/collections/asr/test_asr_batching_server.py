@@ -0,0 +1,196 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import importlib.util
+import io
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+
+_SERVER_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'tools', 'asr_webapp', 'batching_server.py')
+_spec = importlib.util.spec_from_file_location('batching_server', _SERVER_PATH)
+batching_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(batching_server)
+
+SAMPLE_RATE = 16000
+
+
+class _StubModel:
+    """Stands in for an ASR model, transcribes every signal to its length with `transcribe`."""
+
+    def __init__(self, transcribe=None):
+        self.preprocessor = SimpleNamespace(
+            _sample_rate=SAMPLE_RATE, featurizer=SimpleNamespace(dither=1e-5, pad_to=16)
+        )
+        self.transcribe = transcribe or (lambda lengths: [f'len{length}' for length in lengths])
+        self.batches = []
+
+    def eval(self):
+        return self
+
+    def _transcribe_batch(self, input_signal, input_signal_length, return_hypotheses):
+        lengths = input_signal_length.tolist()
+        self.batches.append(lengths)
+        return self.transcribe(lengths)
+
+
+def _batcher(model, **kwargs):
+    return batching_server.DynamicBatcher(model, device=torch.device('cpu'), **kwargs)
+
+
+async def _transcribe_all(batcher, lengths):
+    return await asyncio.gather(
+        *[batcher.transcribe(np.zeros(length, dtype=np.float32)) for length in lengths], return_exceptions=True
+    )
+
+
+class TestDynamicBatcher:
+    @pytest.mark.unit
+    def test_max_batch_size(self):
+        model = _StubModel()
+        batcher = _batcher(model, max_batch_size=2, max_latency_ms=50)
+
+        async def run():
+            await batcher.start()
+            results = await _transcribe_all(batcher, [100, 200, 300, 400, 500])
+            await batcher.stop()
+            return results
+
+        results = asyncio.run(run())
+        assert model.batches == [[100, 200], [300, 400], [500]]
+        assert results == ['len100', 'len200', 'len300', 'len400', 'len500']
+        assert model.preprocessor.featurizer.dither == 0.0
+        assert model.preprocessor.featurizer.pad_to == 0
+
+    @pytest.mark.unit
+    def test_max_latency(self):
+        model = _StubModel()
+        batcher = _batcher(model, max_batch_size=10, max_latency_ms=20)
+
+        async def run():
+            await batcher.start()
+            first = asyncio.ensure_future(_transcribe_all(batcher, [100, 200]))
+            # The first batch is closed on its latency, before the next requests arrive
+            await asyncio.sleep(0.3)
+            assert model.batches == [[100, 200]]
+            results = await _transcribe_all(batcher, [300])
+            results = await first + results
+            await batcher.stop()
+            return results
+
+        results = asyncio.run(run())
+        assert model.batches == [[100, 200], [300]]
+        assert results == ['len100', 'len200', 'len300']
+
+    @pytest.mark.unit
+    def test_max_batch_audio_seconds(self):
+        model = _StubModel()
+        batcher = _batcher(model, max_batch_size=10, max_latency_ms=50, max_batch_audio_seconds=1.0)
+
+        async def run():
+            await batcher.start()
+            results = await _transcribe_all(batcher, [6000, 7000, 5000, 20000, 1000])
+            await batcher.stop()
+            return results
+
+        results = asyncio.run(run())
+        # A request which exceeds the budget starts the next batch, and a longer request forms its own batch
+        assert model.batches == [[6000, 7000], [5000], [20000], [1000]]
+        assert results == ['len6000', 'len7000', 'len5000', 'len20000', 'len1000']
+
+    @pytest.mark.unit
+    def test_results_and_errors(self):
+        def transcribe(lengths):
+            if 666 in lengths:
+                raise ValueError("bad batch")
+            return [f'len{length}' for length in lengths]
+
+        model = _StubModel(transcribe)
+        batcher = _batcher(model, max_batch_size=2, max_latency_ms=50)
+
+        async def run():
+            await batcher.start()
+            results = await _transcribe_all(batcher, [100, 666, 200, 300, 400])
+            metrics = batcher.metrics()
+            await batcher.stop()
+            return results, metrics
+
+        results, metrics = asyncio.run(run())
+        assert model.batches == [[100, 666], [200, 300], [400]]
+        assert isinstance(results[0], ValueError) and isinstance(results[1], ValueError)
+        assert results[2:] == ['len200', 'len300', 'len400']
+
+        assert metrics['queue_depth'] == 0
+        assert metrics['num_requests'] == 3
+        assert metrics['num_batches'] == 2
+        assert metrics['num_errors'] == 2
+        assert metrics['mean_batch_size'] == 1.5
+        assert metrics['max_batch_size'] == 2
+        assert metrics['batch_size_histogram'] == {1: 1, 2: 1}
+        assert metrics['mean_batch_audio_seconds'] == pytest.approx((500 + 400) / 2 / SAMPLE_RATE)
+        assert metrics['mean_queue_latency_ms'] >= 0.0
+        assert metrics['p99_queue_latency_ms'] >= metrics['mean_queue_latency_ms']
+
+    @pytest.mark.unit
+    def test_not_started(self):
+        batcher = _batcher(_StubModel())
+        with pytest.raises(RuntimeError):
+            asyncio.run(batcher.transcribe(np.zeros(100, dtype=np.float32)))
+        assert batcher.metrics()['queue_depth'] == 0
+
+
+class TestBatchingHTTPServer:
+    @staticmethod
+    async def _request(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return head.split(b'\r\n')[0].decode(), json.loads(body)
+
+    @pytest.mark.unit
+    def test_transcribe_and_metrics(self):
+        model = _StubModel()
+        server = batching_server.BatchingHTTPServer(_batcher(model, max_latency_ms=10), port=0)
+
+        audio = io.BytesIO()
+        sf.write(audio, np.zeros(8000, dtype=np.float32), SAMPLE_RATE, format='WAV', subtype='PCM_16')
+        audio = audio.getvalue()
+
+        async def run():
+            await server.start()
+            try:
+                transcribe = await self._request(
+                    server.port, f"POST /transcribe HTTP/1.1\r\nContent-Length: {len(audio)}\r\n\r\n".encode() + audio,
+                )
+                metrics = await self._request(server.port, b"GET /metrics HTTP/1.1\r\n\r\n")
+                not_found = await self._request(server.port, b"GET /missing HTTP/1.1\r\n\r\n")
+            finally:
+                await server.stop()
+            return transcribe, metrics, not_found
+
+        transcribe, metrics, not_found = asyncio.run(run())
+        assert transcribe == ('HTTP/1.1 200 OK', {'text': 'len8000'})
+        assert metrics[0] == 'HTTP/1.1 200 OK'
+        assert metrics[1]['num_requests'] == 1
+        assert metrics[1]['num_batches'] == 1
+        assert metrics[1]['batch_size_histogram'] == {'1': 1}
+        assert not_found[0] == 'HTTP/1.1 404 Not Found'
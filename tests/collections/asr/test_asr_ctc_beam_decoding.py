@@ -0,0 +1,202 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import itertools
+import math
+import os
+import tempfile
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.asr.modules import BeamSearchDecoderWithLM
+from nemo.collections.asr.parts.submodules.ctc_beam_decoding import CTCPrefixBeamSearch
+from nemo.collections.asr.parts.utils.ngram_lm_utils import ARPALanguageModel
+from nemo.core.classes import typecheck
+
+ARPA = """
+\\data\\
+ngram 1=5
+ngram 2=3
+
+\\1-grams:
+-1.0 <s> -0.5
+-1.0 </s>
+-2.0 <unk>
+-0.3 ab -0.2
+-1.5 ba -0.1
+
+\\2-grams:
+-0.1 <s> ab
+-0.2 ab ba
+-0.4 ab </s>
+
+\\end\\
+"""
+
+
+@pytest.fixture()
+def arpa_lm():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'lm.arpa')
+        with open(path, 'w') as f:
+            f.write(ARPA)
+        yield ARPALanguageModel(path)
+
+
+def _random_probs(rng, num_frames, num_classes):
+    logits = rng.randn(num_frames, num_classes) * 2
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def _brute_force(probs, vocabulary):
+    """Sums the probabilities of all the alignments of every labeling."""
+    blank = len(vocabulary)
+    totals = {}
+    for alignment in itertools.product(range(blank + 1), repeat=len(probs)):
+        labels = tuple(label for label, _ in itertools.groupby(alignment) if label != blank)
+        prob = np.prod([probs[t, label] for t, label in enumerate(alignment)])
+        totals[labels] = totals.get(labels, 0.0) + prob
+    return {''.join(vocabulary[label] for label in labels): prob for labels, prob in totals.items()}
+
+
+class TestCTCPrefixBeamSearch:
+    @pytest.mark.unit
+    def test_arpa_scores(self, arpa_lm):
+        assert arpa_lm.order == 2
+        state = arpa_lm.begin_state()
+        assert state == ('<s>',)
+
+        score, state = arpa_lm.score(state, 'ab')
+        assert score == pytest.approx(-0.1)
+        assert state == ('ab',)
+
+        score, state = arpa_lm.score(state, 'ba')
+        assert score == pytest.approx(-0.2)
+        assert state == ('ba',)
+
+        # Backs off from "ba" to the unigram
+        score, state = arpa_lm.score(state, 'ab')
+        assert score == pytest.approx(-0.1 + -0.3)
+
+        # Unknown words get the probability of <unk> and an empty context
+        score, state = arpa_lm.score(('ab',), 'cd')
+        assert score == pytest.approx(-0.2 + -2.0)
+        assert state == ()
+
+    @pytest.mark.unit
+    def test_matches_brute_force_without_lm(self):
+        vocabulary = ['a', 'b', ' ']
+        rng = np.random.RandomState(0)
+        for _ in range(5):
+            probs = _random_probs(rng, 5, len(vocabulary) + 1)
+            expected = _brute_force(probs, vocabulary)
+            decoder = CTCPrefixBeamSearch(vocabulary, beam_width=len(expected))
+            results = decoder(probs)
+
+            assert len(results) == min(len(expected), decoder.beam_width)
+            for score, text in results:
+                assert math.exp(score) == pytest.approx(expected[text], rel=1e-4)
+            best = max(expected, key=expected.get)
+            assert results[0][1] == best
+
+    @pytest.mark.unit
+    def test_language_model(self, arpa_lm):
+        vocabulary = ['a', 'b', ' ']
+        # The acoustic model slightly prefers "bb ba" over "ab ba"
+        probs = np.array(
+            [
+                [0.44, 0.55, 0.0, 0.01],
+                [0.0, 0.0, 0.0, 1.0],
+                [0.0, 1.0, 0.0, 0.0],
+                [0.0, 0.0, 1.0, 0.0],
+                [0.0, 1.0, 0.0, 0.0],
+                [1.0, 0.0, 0.0, 0.0],
+            ]
+        )
+
+        acoustic = dict((text, score) for score, text in CTCPrefixBeamSearch(vocabulary, beam_width=16)(probs))
+        assert max(acoustic, key=acoustic.get) == 'bb ba'
+
+        decoder = CTCPrefixBeamSearch(vocabulary, beam_width=16, alpha=2.0, beta=0.5, language_model=arpa_lm)
+        score, text = decoder(probs)[0]
+        assert text == 'ab ba'
+        # The acoustic score plus the weighted language model scores of both words and the word bonus
+        assert score == pytest.approx(acoustic['ab ba'] + 2.0 * math.log(10) * (-0.1 - 0.2) + 2 * 0.5)
+        assert decoder.lm_cache_misses > 0
+
+        decoder(probs)
+        assert decoder.lm_cache_hits > 0
+
+    @pytest.mark.unit
+    def test_pruning(self):
+        vocabulary = ['a', 'b', 'c']
+        rng = np.random.RandomState(1)
+        probs = _random_probs(rng, 20, len(vocabulary) + 1)
+        probs[::2] = [0.001, 0.001, 0.001, 0.997]
+
+        full = CTCPrefixBeamSearch(vocabulary, beam_width=8)(probs)
+        pruned = CTCPrefixBeamSearch(vocabulary, beam_width=8, cutoff_top_n=2, blank_skip_threshold=0.99)(probs)
+        assert pruned[0][1] == full[0][1]
+
+        decoder = CTCPrefixBeamSearch(vocabulary, beam_width=8, cutoff_prob=0.5, blank_skip_threshold=0.99)
+        candidates = decoder._prune_frames(probs)
+        assert all(len(frame) == 0 for frame in candidates[::2])
+        assert all(1 <= len(frame) <= 3 for frame in candidates[1::2])
+
+    @pytest.mark.unit
+    def test_decode_batch(self, arpa_lm):
+        vocabulary = ['a', 'b', ' ']
+        rng = np.random.RandomState(2)
+        probs_list = [_random_probs(rng, num_frames, len(vocabulary) + 1) for num_frames in [10, 3, 25, 7]]
+        decoder = CTCPrefixBeamSearch(vocabulary, beam_width=4, language_model=arpa_lm)
+
+        expected = [decoder(probs) for probs in probs_list]
+        assert decoder.decode_batch(probs_list, num_processes=1) == expected
+        with decoder:
+            assert decoder.decode_batch(probs_list, num_processes=2) == expected
+            # The worker processes are kept for the following calls
+            pool = decoder._pool
+            assert pool is not None
+            assert decoder.decode_batch(probs_list[::-1], num_processes=2) == expected[::-1]
+            assert decoder._pool is pool
+        assert decoder._pool is None
+
+    @pytest.mark.unit
+    def test_beam_search_decoder_with_lm(self, arpa_lm):
+        vocabulary = ['a', 'b', ' ']
+        rng = np.random.RandomState(3)
+        probs = np.stack([_random_probs(rng, 12, len(vocabulary) + 1) for _ in range(2)])
+        lengths = torch.tensor([12, 7])
+
+        beam_search_lm = BeamSearchDecoderWithLM(
+            vocab=vocabulary,
+            beam_width=4,
+            alpha=1.0,
+            beta=0.5,
+            lm_path=arpa_lm.path,
+            num_cpus=1,
+            input_tensor=True,
+            decoder_type='nemo',
+        )
+        with typecheck.disable_checks():
+            results = beam_search_lm.forward(log_probs=torch.tensor(np.log(probs)), log_probs_length=lengths)
+
+        decoder = CTCPrefixBeamSearch(vocabulary, beam_width=4, alpha=1.0, beta=0.5, language_model=arpa_lm)
+        assert len(results) == 2
+        for result, sample_probs, length in zip(results, probs, lengths.tolist()):
+            expected = decoder(sample_probs[:length])
+            assert [text for _, text in result] == [text for _, text in expected]
+            assert [score for score, _ in result] == pytest.approx([score for score, _ in expected], abs=1e-4)
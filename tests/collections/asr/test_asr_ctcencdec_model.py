@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import copy
+import os
+import tempfile
 
+import numpy as np
 import pytest
+import soundfile as sf
 import torch
 from omegaconf import DictConfig, OmegaConf, open_dict
 
@@ -21,6 +25,7 @@ import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.data import audio_to_text
 from nemo.collections.asr.metrics.wer import CTCDecoding, CTCDecodingConfig
 from nemo.collections.asr.models import EncDecCTCModel, configs
+from nemo.collections.asr.parts.mixins.transcription import length_sorted_batches
 from nemo.utils.config_utils import assert_dataclass_signature_match, update_model_config
 
 
@@ -160,6 +165,36 @@ class TestEncDecCTCModel:
         assert asr_model.decoding.preserve_alignments is True
         assert asr_model.decoding.compute_timestamps is True
 
+    @pytest.mark.unit
+    def test_transcribe_audio(self, asr_model):
+        rng = np.random.RandomState(0)
+        lengths = [16000, 4000, 32000, 8000, 24000]
+        audio = [rng.uniform(-0.5, 0.5, size=length).astype(np.float32) for length in lengths]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inputs = list(audio)
+            for i in [1, 2]:
+                inputs[i] = os.path.join(tmpdir, f'audio_{i}.wav')
+                sf.write(inputs[i], audio[i], 16000, subtype='FLOAT')
+
+            # Results are returned in input order, whatever the order of the batches.
+            expected = asr_model.transcribe_audio(audio, batch_size=1, sort_by_duration=False, verbose=False)
+            assert asr_model.transcribe_audio(inputs, batch_size=1, verbose=False) == expected
+
+            expected = asr_model.transcribe_audio(audio, batch_size=2, verbose=False)
+            for num_workers in [0, 2]:
+                transcripts = asr_model.transcribe_audio(inputs, batch_size=2, num_workers=num_workers, verbose=False)
+                assert transcripts == expected
+
+            hypotheses = asr_model.transcribe_audio(inputs, batch_size=2, return_hypotheses=True, verbose=False)
+
+        assert [hyp.text for hyp in hypotheses] == expected
+        assert asr_model.training
+
+    @pytest.mark.unit
+    def test_length_sorted_batches(self):
+        assert length_sorted_batches([1.0, 3.0, 2.0, 5.0, 4.0], batch_size=2) == [[3, 4], [1, 2], [0]]
+
     @pytest.mark.unit
     def test_change_conv_asr_se_context_window(self, asr_model):
         old_cfg = copy.deepcopy(asr_model.cfg)
@@ -15,7 +15,9 @@
 import copy
 import json
 import os
+import shutil
 import tempfile
+from types import SimpleNamespace
 
 import numpy as np
 import pytest
@@ -24,7 +26,13 @@ from omegaconf import DictConfig, OmegaConf
 from torch.utils.data import DataLoader
 
 from nemo.collections.asr.data import audio_to_text_dataset
-from nemo.collections.asr.data.audio_to_text import TarredAudioToBPEDataset, TarredAudioToCharDataset
+from nemo.collections.asr.data.audio_to_text import (
+    AudioToCharDataset,
+    DurationBucketingDataset,
+    RandomAccessTarredAudioToCharDataset,
+    TarredAudioToBPEDataset,
+    TarredAudioToCharDataset,
+)
 from nemo.collections.asr.data.audio_to_text_dali import (
     __DALI_MINIMUM_VERSION__,
     AudioToBPEDALIDataset,
@@ -32,8 +40,13 @@ from nemo.collections.asr.data.audio_to_text_dali import (
     is_dali_supported,
 )
 from nemo.collections.asr.data.audio_to_text_dataset import inject_dataloader_value_from_model_config
+from nemo.collections.asr.data.audio_to_text_sampler import DurationBudgetBatchSampler, ResumableRandomBatchSampler
+from nemo.collections.asr.data.feature_store import FeatureStoreDataset, FeatureStoreOutputs, build_feature_store
+from nemo.collections.asr.data.tarred_audio_index import TarredAudioIndex, get_tar_index_filepath, write_tar_index
 from nemo.collections.asr.models.ctc_models import EncDecCTCModel
+from nemo.collections.asr.modules import AudioToMelSpectrogramPreprocessor
 from nemo.collections.common import tokenizers
+from nemo.collections.common.parts.preprocessing import collections, parsers
 from nemo.utils import logging
 
 try:
@@ -118,6 +131,183 @@ class TestASRDatasets:
             count += 1
         assert count == 32
 
+    @pytest.mark.unit
+    def test_duration_bucketing_dataset_seed(self, test_data_dir, monkeypatch):
+        manifest_path = os.path.abspath(os.path.join(test_data_dir, 'asr/tarred_an4/tarred_audio_manifest.json'))
+        tarpath = os.path.abspath(os.path.join(test_data_dir, 'asr/tarred_an4/audio_{0..1}.tar'))
+        config = {
+            'manifest_filepath': manifest_path,
+            'sample_rate': 16000,
+            'batch_size': 1,
+            'duration_bucketing_batch_duration': 20.0,
+            'seed': 7,
+        }
+        ds = TarredAudioToCharDataset(
+            audio_tar_filepaths=tarpath, manifest_filepath=manifest_path, labels=self.labels, sample_rate=16000
+        )
+        bucketing_ds = audio_to_text_dataset.wrap_duration_bucketing(config=config, dataset=ds)
+        assert isinstance(bucketing_ds, DurationBucketingDataset)
+        assert bucketing_ds.seed == 7
+
+        def _shuffle(epoch, worker_info=None):
+            monkeypatch.setattr(torch.utils.data, 'get_worker_info', lambda: worker_info)
+            bucketing_ds.set_epoch(epoch)
+            return bucketing_ds._get_rng().permutation(100).tolist()
+
+        # Reproducible for the same epoch and worker, different across epochs and workers
+        assert _shuffle(0) == _shuffle(0)
+        assert _shuffle(0) != _shuffle(1)
+        worker_0, worker_1 = SimpleNamespace(id=0, seed=11), SimpleNamespace(id=1, seed=12)
+        assert _shuffle(0, worker_0) == _shuffle(0)
+        assert _shuffle(0, worker_0) != _shuffle(0, worker_1)
+
+        # Without a seed, the per-worker seed of the DataLoader is used
+        bucketing_ds.seed = None
+        assert _shuffle(0, worker_0) == _shuffle(1, worker_0)
+        assert _shuffle(0, worker_0) != _shuffle(0, worker_1)
+
+    @pytest.mark.unit
+    def test_duration_bucketing_dataset(self, test_data_dir):
+        manifest_path = os.path.abspath(os.path.join(test_data_dir, 'asr/tarred_an4/tarred_audio_manifest.json'))
+        tarpath = os.path.abspath(os.path.join(test_data_dir, 'asr/tarred_an4/audio_{0..1}.tar'))
+        ds = TarredAudioToCharDataset(
+            audio_tar_filepaths=tarpath, manifest_filepath=manifest_path, labels=self.labels, sample_rate=16000
+        )
+
+        bucketing_ds = DurationBucketingDataset(ds, sample_rate=16000, buffer_size=16, batch_duration=20.0)
+        batches = list(bucketing_ds)
+        assert sum(len(batch) for batch in batches) == 32
+        for batch in batches:
+            lengths = [sample[1].item() / 16000 for sample in batch]
+            assert len(batch) == 1 or len(batch) * max(lengths) <= 20.0
+
+        bucketing_ds = DurationBucketingDataset(
+            ds, sample_rate=16000, bucket_boundaries=[3.0], bucket_batch_sizes=[8, 4]
+        )
+        batches = list(bucketing_ds)
+        assert sum(len(batch) for batch in batches) == 32
+        for batch in batches:
+            long_samples = [sample[1].item() / 16000 >= 3.0 for sample in batch]
+            assert all(long_samples) or not any(long_samples)
+            assert len(batch) <= (4 if long_samples[0] else 8)
+
+        audio_signal, audio_lengths, _, _ = bucketing_ds.collate_fn([batches[0]])
+        assert audio_signal.shape[0] == len(batches[0])
+
+    @pytest.mark.unit
+    def test_tarred_random_access(self, test_data_dir):
+        manifest_path = os.path.abspath(os.path.join(test_data_dir, 'asr/tarred_an4/tarred_audio_manifest.json'))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for shard_id in range(2):
+                shutil.copy(os.path.join(test_data_dir, f'asr/tarred_an4/audio_{shard_id}.tar'), tmpdir)
+            # Only the first shard has an index, the second one is scanned
+            write_tar_index(os.path.join(tmpdir, 'audio_0.tar'))
+            assert os.path.exists(get_tar_index_filepath(os.path.join(tmpdir, 'audio_0.tar')))
+            tarpath = os.path.join(tmpdir, 'audio_{0..1}.tar')
+
+            index = TarredAudioIndex([os.path.join(tmpdir, f'audio_{shard_id}.tar') for shard_id in range(2)])
+            assert len(index) == 32
+
+            tarred_ds = TarredAudioToCharDataset(
+                audio_tar_filepaths=tarpath, manifest_filepath=manifest_path, labels=self.labels, sample_rate=16000
+            )
+            random_access_ds = RandomAccessTarredAudioToCharDataset(
+                audio_tar_filepaths=tarpath, manifest_filepath=manifest_path, labels=self.labels, sample_rate=16000
+            )
+            assert len(random_access_ds) == 32
+
+            config = {
+                'is_tarred': True,
+                'tarred_random_access': True,
+                'tarred_audio_filepaths': tarpath,
+                'manifest_filepath': manifest_path,
+                'labels': self.labels,
+                'sample_rate': 16000,
+                'batch_size': 4,
+            }
+            config_ds = audio_to_text_dataset.get_tarred_dataset(
+                config=config, shuffle_n=0, global_rank=0, world_size=1
+            )
+            assert isinstance(config_ds, RandomAccessTarredAudioToCharDataset)
+            assert len(config_ds) == 32
+
+            def _key(sample):
+                return sample[1].item(), tuple(sample[2].tolist())
+
+            expected = sorted(_key(sample) for sample in tarred_ds)
+            assert sorted(_key(random_access_ds[idx]) for idx in range(len(random_access_ds))) == expected
+
+    @pytest.mark.unit
+    def test_resumable_random_batch_sampler(self):
+        sampler = ResumableRandomBatchSampler(total_samples=103, batch_size=4, world_size=2, global_rank=1, seed=3)
+        assert len(sampler) == 12
+        epochs = [list(sampler) for _ in range(2)]
+        assert sampler.consumed_samples == 2 * 96
+        assert epochs[0] != epochs[1]
+        for batches in epochs:
+            assert all(len(batch) == 4 for batch in batches)
+            assert len({idx for batch in batches for idx in batch}) == 48
+
+        # Resuming mid-epoch continues exactly where the interrupted run stopped
+        resumed = ResumableRandomBatchSampler(
+            total_samples=103, batch_size=4, consumed_samples=96 + 5 * 8, world_size=2, global_rank=1, seed=3
+        )
+        assert len(resumed) == 7
+        assert list(resumed) == epochs[1][5:]
+
+        # Ranks see disjoint samples
+        other = ResumableRandomBatchSampler(total_samples=103, batch_size=4, world_size=2, global_rank=0, seed=3)
+        seen = {idx for batch in other for idx in batch}
+        assert not seen & {idx for batch in epochs[0] for idx in batch}
+
+        with pytest.raises(ValueError):
+            ResumableRandomBatchSampler(total_samples=103, batch_size=4, consumed_samples=6, world_size=2)
+
+    @pytest.mark.unit
+    def test_feature_store(self, test_data_dir):
+        manifest_path = os.path.abspath(os.path.join(test_data_dir, 'asr/an4_val.json'))
+        preprocessor = AudioToMelSpectrogramPreprocessor(normalize='per_feature')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            subset_path = os.path.join(tmpdir, 'manifest.json')
+            with open(manifest_path, 'r') as m, open(subset_path, 'w') as f:
+                for line in m.readlines()[:4]:
+                    f.write(line.replace("tests/data/", "tests/.data/"))
+            store_path = os.path.join(tmpdir, 'features')
+            build_feature_store(subset_path, store_path, preprocessor=preprocessor, sample_rate=16000)
+
+            config = {
+                'manifest_filepath': subset_path,
+                'labels': self.labels,
+                'sample_rate': 16000,
+                'feature_store_path': store_path,
+                'return_sample_id': True,
+            }
+            dataset = audio_to_text_dataset.get_char_dataset(config=config)
+            assert isinstance(dataset, FeatureStoreDataset)
+            assert len(dataset) == 4
+
+            audio_dataset = dataset.dataset
+            for idx in range(len(dataset)):
+                features, features_len, tokens, tokens_len, sample_id = dataset[idx]
+                audio, audio_len, ref_tokens, _ = audio_dataset[idx][:4]
+                ref_features, ref_len = preprocessor(input_signal=audio.unsqueeze(0), length=audio_len.unsqueeze(0))
+                assert features_len == ref_len[0]
+                assert torch.allclose(features, ref_features[0, :, : ref_len[0]], atol=1e-2)
+                assert torch.equal(tokens, ref_tokens)
+
+            batch = dataset.collate_fn([dataset[idx] for idx in range(len(dataset))])
+            assert isinstance(batch, FeatureStoreOutputs) and batch.has_processed_signal
+            signal, signal_len, transcript, transcript_len, sample_ids = batch.to('cpu')
+            assert signal.shape[:2] == (4, 64) and signal.shape[2] % 16 == 0
+            assert sample_ids.tolist() == [0, 1, 2, 3]
+
+            # A modified manifest invalidates the store
+            with open(subset_path, 'a') as f:
+                f.write(line.replace("tests/data/", "tests/.data/"))
+            with pytest.raises(ValueError):
+                audio_to_text_dataset.get_char_dataset(config=config)
+
     @pytest.mark.unit
     def test_mismatch_in_model_dataloader_config(self, caplog):
         logging._logger.propagate = True
@@ -135,6 +325,86 @@ class TestASRDatasets:
 
         logging._logger.propagate = False
 
+    @pytest.mark.unit
+    def test_manifest_cache(self):
+        entries = [
+            {"audio_filepath": "/data/a.wav", "duration": 3.5, "text": "hello world", "offset": 1.0},
+            {"audio_filepath": "/data/b.wav", "duration": 0.5, "text": "short", "speaker": 3},
+            {"audio_filepath": "/data/c.wav", "duration": 12.0, "text": "", "lang": "en", "orig_sample_rate": 8000},
+            {"audio_filepath": "/data/d.wav", "duration": 1.5, "text": "abc", "token_labels": [1, 2, 3]},
+        ]
+        parser = parsers.make_parser(labels=self.labels, name='base')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, 'manifest.json')
+            with open(manifest_path, 'w') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+            cache_dir = os.path.join(tmpdir, 'cache')
+
+            for kwargs in [{}, {'min_duration': 1.0, 'max_duration': 10.0}, {'do_sort_by_duration': True}]:
+                ref = collections.ASRAudioText(manifest_path, parser=parser, **kwargs)
+                cached = collections.ASRAudioText(manifest_path, parser=parser, cache_dir=cache_dir, **kwargs)
+                assert len(ref) == len(cached)
+                assert list(ref) == list(cached)
+                for idx in [slice(1, 3), slice(None, None, -1), slice(5, None)]:
+                    assert isinstance(cached[idx], list)
+                    assert cached[idx] == ref[idx] == ref.data[idx]
+
+            # A single cache is reused for every filter setting
+            assert len(os.listdir(cache_dir)) == 1
+
+            cached = collections.ASRAudioText(manifest_path, parser=parser, cache_dir=cache_dir, index_by_file_id=True)
+            assert cached.mapping == {'a': [0], 'b': [1], 'c': [2], 'd': [3]}
+
+            # A different parser configuration invalidates the cache
+            other_parser = parsers.make_parser(labels=self.labels[:10], name='base')
+            collections.ASRAudioText(manifest_path, parser=other_parser, cache_dir=cache_dir)
+            assert len(os.listdir(cache_dir)) == 2
+
+    @pytest.mark.unit
+    def test_duration_budget_batch_sampler(self):
+        durations = np.random.RandomState(0).uniform(0.5, 20.0, size=500)
+        durations[0] = 45.0  # outlier longer than the budget
+
+        sampler = DurationBudgetBatchSampler(durations, batch_duration=60.0, num_buckets=8, shuffle=True)
+        batches = list(sampler)
+        assert sorted(idx for batch in batches for idx in batch) == list(range(len(durations)))
+        for batch in batches:
+            assert len(batch) == 1 or len(batch) * durations[batch].max() <= 60.0
+
+        # Short utterances get larger batches than long ones
+        short_sizes = [len(batch) for batch in batches if durations[batch].max() < 5.0]
+        long_sizes = [len(batch) for batch in batches if durations[batch].max() > 15.0]
+        assert max(short_sizes) > max(long_sizes)
+
+        # The epoch only advances through `set_epoch`, so the length matches the next iteration
+        assert len(sampler) == len(batches)
+        assert list(sampler) == batches
+
+        # Different epochs produce different batches, the same epoch is reproducible
+        sampler.set_epoch(1)
+        assert len(sampler) == len(list(sampler))
+        epoch_1 = list(sampler)
+        sampler.set_epoch(1)
+        assert list(sampler) == epoch_1
+        assert epoch_1 != batches
+
+        # Ranks see disjoint batches and the same number of steps
+        ranks = [
+            DurationBudgetBatchSampler(durations, 60.0, num_buckets=8, global_rank=rank, world_size=3)
+            for rank in range(3)
+        ]
+        assert len({len(rank_sampler) for rank_sampler in ranks}) == 1
+        seen = [idx for rank_sampler in ranks for batch in rank_sampler for idx in batch]
+        assert len(seen) == len(set(seen))
+
+        # Without shuffling, batches follow duration order
+        sampler = DurationBudgetBatchSampler(durations, 60.0, num_buckets=1, shuffle=False, max_batch_size=4)
+        flat = [idx for batch in sampler for idx in batch]
+        assert np.all(np.diff(durations[flat]) >= 0)
+        assert max(len(batch) for batch in sampler) <= 4
+
     @pytest.mark.with_downloads()
     @pytest.mark.unit
     def test_tarred_bpe_dataset(self, test_data_dir):
@@ -25,6 +25,7 @@ from nemo.collections.asr.models import (
     EncDecRNNTModel,
     EncDecSpeakerLabelModel,
 )
+from nemo.collections.asr.parts.submodules.ctc_greedy_decoding import ONNXGreedyBatchedCTCInfer
 from nemo.collections.asr.parts.utils import asr_module_utils
 from nemo.collections.common.parts.adapter_modules import LinearAdapterConfig
 from nemo.core.utils import numba_utils
@@ -32,6 +33,13 @@ from nemo.core.utils.numba_utils import __NUMBA_MINIMUM_VERSION__
 
 NUMBA_RNNT_LOSS_AVAILABLE = numba_utils.numba_cuda_is_supported(__NUMBA_MINIMUM_VERSION__)
 
+try:
+    import onnxruntime  # noqa: F401
+
+    ONNXRUNTIME_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    ONNXRUNTIME_AVAILABLE = False
+
 
 class TestExportable:
     @pytest.mark.run_only_on('GPU')
@@ -211,6 +219,83 @@ class TestExportable:
             assert onnx_model.graph.input[0].name == 'audio_signal'
             assert onnx_model.graph.output[0].name == 'logprobs'
 
+    @pytest.mark.skipif(not ONNXRUNTIME_AVAILABLE, reason='onnxruntime is not installed')
+    @pytest.mark.unit
+    def test_EncDecCTCModel_onnx_greedy_batched_infer(self):
+        model_config = DictConfig(
+            {
+                'preprocessor': DictConfig(
+                    {'_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor', 'features': 32}
+                ),
+                'encoder': DictConfig(
+                    {
+                        '_target_': 'nemo.collections.asr.modules.ConvASREncoder',
+                        'feat_in': 32,
+                        'activation': 'relu',
+                        'conv_mask': True,
+                        'jasper': [
+                            {
+                                'filters': 64,
+                                'repeat': 1,
+                                'kernel': [5],
+                                'stride': [stride],
+                                'dilation': [1],
+                                'dropout': 0.0,
+                                'residual': False,
+                                'separable': True,
+                                'se': True,
+                                'se_context_size': -1,
+                            }
+                            for stride in [2, 2, 1]
+                        ],
+                    }
+                ),
+                'decoder': DictConfig(
+                    {
+                        '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+                        'feat_in': 64,
+                        'num_classes': 28,
+                        'vocabulary': self.decoder_dict['params']['vocabulary'],
+                    }
+                ),
+            }
+        )
+        model = EncDecCTCModel(cfg=model_config).eval()
+        input_signal = torch.randn(3, 8000, generator=torch.Generator().manual_seed(0))
+        input_signal_length = torch.tensor([8000, 6400, 3300])
+        with torch.no_grad():
+            log_probs, encoded_len, _ = model(input_signal=input_signal, input_signal_length=input_signal_length)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'conf.onnx')
+            model.export(output=filename)
+            decoding = ONNXGreedyBatchedCTCInfer(
+                filename, preprocessor_cfg=model.cfg.preprocessor, compute_timestamps=True
+            )
+
+        assert decoding.subsampling_factor == 4
+        assert decoding._blank_index == model.decoder.num_classes_with_blank - 1
+
+        processed_signal, processed_signal_length = decoding.preprocess(input_signal, input_signal_length)
+        onnx_log_probs = decoding.run_encoder_decoder(processed_signal, processed_signal_length)
+        assert onnx_log_probs.shape == tuple(log_probs.shape)
+        for b, length in enumerate(encoded_len.tolist()):
+            assert torch.allclose(torch.from_numpy(onnx_log_probs[b, :length]), log_probs[b, :length], atol=1e-4)
+
+        hypotheses = decoding(processed_signal, processed_signal_length)
+        assert hypotheses.lengths.tolist() == encoded_len.tolist()
+        expected = model.decoding.ctc_decoder_predictions_tensor(
+            log_probs, decoder_lengths=encoded_len, return_hypotheses=True
+        )[0]
+        model.decoding.compute_timestamps = True
+        onnx_hypotheses = model.decoding.decode_batched_hypotheses(
+            hypotheses, fold_consecutive=True, return_hypotheses=True
+        )[0]
+        for hypothesis, onnx_hypothesis in zip(expected, onnx_hypotheses):
+            assert torch.equal(onnx_hypothesis.y_sequence, hypothesis.y_sequence)
+            assert onnx_hypothesis.text == hypothesis.text
+            assert len(onnx_hypothesis.timestep['char']) == len(hypothesis.text)
+
     def setup_method(self):
         self.preprocessor = {
             'cls': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
@@ -17,7 +17,7 @@ import numpy as np
 import pytest
 import torch
 
-from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures
+from nemo.collections.asr.parts.preprocessing.features import FilterbankFeatures, normalize_batch
 
 
 class TestFilterbankFeatures:
@@ -97,3 +97,34 @@ class TestFilterbankFeatures:
             assert (
                 fb_spec.shape[2] == audio_length // hop_size
             ), f"{fb_spec.shape}, {nfft}, {window_size}, {hop_size}, {audio_length}, {audio_length // hop_size}"
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("exact_pad", [False, True])
+    @pytest.mark.parametrize("normalize", ["None", "per_feature", "all_features"])
+    def test_stream(self, exact_pad, normalize):
+        fb_module = FilterbankFeatures(exact_pad=exact_pad, pad_to=0, dither=0.0, normalize=normalize).eval()
+        audio_length = 16037
+        test_1 = torch.randn(2, audio_length)
+        fb_spec, fb_len = fb_module(test_1, torch.tensor([audio_length, audio_length]))
+
+        chunks, state, start = [], None, 0
+        for chunk_size in [700, 1, 160, 3000, 45, 5000, 7131]:
+            chunk = test_1[:, start : start + chunk_size]
+            start += chunk_size
+            stream_spec, state = fb_module.stream(chunk, state, last=start >= audio_length)
+            chunks.append(stream_spec)
+        stream_spec = torch.cat(chunks, dim=2)
+
+        assert stream_spec.shape == fb_spec.shape
+        assert state.num_frames == fb_len[0]
+        if normalize == "None":
+            assert torch.equal(stream_spec, fb_spec)
+        else:
+            # After the last chunk, the running statistics are the statistics of the whole signal
+            raw_module = FilterbankFeatures(exact_pad=exact_pad, pad_to=0, dither=0.0, normalize="None").eval()
+            raw_spec, _ = raw_module(test_1, torch.tensor([audio_length, audio_length]))
+            _, x_mean, x_std = normalize_batch(raw_spec, fb_len, normalize)
+            assert torch.allclose(state.mean.flatten(), x_mean.flatten(), atol=1e-5)
+            assert torch.allclose(state.std.flatten(), x_std.flatten(), atol=1e-5)
+            last_frames = chunks[-1].shape[2]
+            assert torch.allclose(stream_spec[:, :, -last_frames:], fb_spec[:, :, -last_frames:], atol=1e-4)
@@ -19,13 +19,16 @@ from copy import deepcopy
 from typing import List
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 import torch
 
+from nemo.collections.asr.metrics.corpus_wer import CorpusWER, compute_error_counts
 from nemo.collections.asr.metrics.rnnt_wer import RNNTWER
 from nemo.collections.asr.metrics.rnnt_wer_bpe import RNNTBPEWER
 from nemo.collections.asr.metrics.wer import WER, CTCDecoding, CTCDecodingConfig, word_error_rate
 from nemo.collections.asr.metrics.wer_bpe import WERBPE, CTCBPEDecoding, CTCBPEDecodingConfig
+from nemo.collections.asr.parts.utils.ctc_timestamp_utils import CTCTimestamps, CTCTokenTable, compute_ctc_offsets
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 from nemo.collections.common.tokenizers import CharTokenizer
 from nemo.utils.config_utils import assert_dataclass_signature_match
@@ -103,6 +106,52 @@ class TestWordErrorRate:
         assert word_error_rate(hypotheses=['ducati motorcycle'], references=['ducuti motorcycle']) == 0.5
         assert word_error_rate(hypotheses=['a B c'], references=['a b c']) == 1.0 / 3.0
 
+    @pytest.mark.unit
+    def test_error_counts(self):
+        counts, alignments = compute_error_counts(
+            hypotheses=['the cat sat', 'a b', '', 'x y z'],
+            references=['the cat sat down', 'a c b', 'hello', 'x q z'],
+            return_alignments=True,
+        )
+        # Substitutions, deletions, insertions and reference words
+        assert counts.tolist() == [[0, 1, 0, 4], [0, 1, 0, 3], [0, 1, 0, 1], [1, 0, 0, 3]]
+        assert alignments[1] == [('C', 'a', 'a'), ('D', 'c', None), ('C', 'b', 'b')]
+        assert alignments[2] == [('D', 'hello', None)]
+        assert alignments[3] == [('C', 'x', 'x'), ('S', 'q', 'y'), ('C', 'z', 'z')]
+
+        counts, alignments = compute_error_counts(hypotheses=['abxc'], references=['abc'], use_cer=True)
+        assert counts.tolist() == [[0, 0, 1, 3]]
+        assert alignments is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("num_workers", [0, 2])
+    def test_corpus_wer_randomized(self, num_workers):
+        rng = random.Random(0)
+        words = ['a', 'b', 'c', 'd']
+        hypotheses = [' '.join(rng.choice(words) for _ in range(rng.randint(0, 10))) for _ in range(300)]
+        references = [' '.join(rng.choice(words) for _ in range(rng.randint(1, 10))) for _ in range(300)]
+
+        metric = CorpusWER(num_workers=num_workers, keep_alignments=True, batch_size=16)
+        for start in range(0, len(hypotheses), 100):
+            metric.update(hypotheses[start : start + 100], references[start : start + 100])
+        wer, substitutions, deletions, insertions, num_words = metric.compute()
+        metric.close()
+
+        assert wer.item() == pytest.approx(word_error_rate(hypotheses=hypotheses, references=references))
+        assert num_words.item() == sum(len(reference.split()) for reference in references)
+        assert len(metric.alignments) == len(hypotheses)
+        ops = [op for alignment in metric.alignments for op, _, _ in alignment]
+        assert ops.count('S') == substitutions.item()
+        assert ops.count('D') == deletions.item()
+        assert ops.count('I') == insertions.item()
+        for alignment, hypothesis, reference in zip(metric.alignments, hypotheses, references):
+            assert [hyp for _, _, hyp in alignment if hyp is not None] == hypothesis.split()
+            assert [ref for _, ref, _ in alignment if ref is not None] == reference.split()
+
+        metric.reset()
+        assert metric.words.item() == 0
+        assert metric.alignments == []
+
     @pytest.mark.unit
     @pytest.mark.parametrize("batch_dim_index", [0, 1])
     @pytest.mark.parametrize("test_wer_bpe", [False, True])
@@ -491,3 +540,135 @@ class TestWordErrorRate:
         assert hyp.text != ''
         assert len(hyp.timestep) == 3
         assert hyp.alignments is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("compute_timestamps", [False, True])
+    @pytest.mark.parametrize("fold_consecutive", [False, True])
+    def test_char_decoding_batched(self, compute_timestamps, fold_consecutive):
+        B, T, V = 8, 64, len(self.vocabulary) + 1
+        torch.manual_seed(0)
+        # Few distinct labels, so that labels repeat over consecutive frames
+        decoder_outputs = torch.randn(B, T, V, dtype=torch.float32)
+        decoder_outputs[:, :, 4:-1] -= 10.0
+        decoder_outputs = decoder_outputs.log_softmax(dim=-1)
+        decoder_lens = torch.randint(1, T, size=[B], dtype=torch.int32)
+        decoder_lens[0] = T
+
+        decoding_cfg = CTCDecodingConfig(compute_timestamps=compute_timestamps)
+        decoding = CTCDecoding(decoding_cfg, vocabulary=self.vocabulary)
+
+        # Decode every hypothesis separately
+        expected = decoding.decode_hypothesis(
+            [hyp for hyp in decoding.decoding.batched_decode(decoder_outputs, decoder_lens)], fold_consecutive
+        )
+        if compute_timestamps:
+            expected = [decoding.compute_ctc_timestamps(hyp) for hyp in expected]
+
+        hyps, _ = decoding.ctc_decoder_predictions_tensor(
+            decoder_outputs, decoder_lens, fold_consecutive=fold_consecutive, return_hypotheses=True
+        )
+        texts, _ = decoding.ctc_decoder_predictions_tensor(
+            decoder_outputs, decoder_lens, fold_consecutive=fold_consecutive
+        )
+        assert texts == [hyp.text for hyp in expected]
+        for idx, (hyp, expected_hyp) in enumerate(zip(hyps, expected)):
+            length = decoder_lens[idx]
+            logprobs, labels = decoder_outputs[idx, :length].max(dim=-1)
+            assert torch.equal(hyp.y_sequence, labels)
+            assert hyp.length == length
+            assert torch.allclose(hyp.score, logprobs[labels != decoding.blank_id].sum())
+            assert hyp.text == expected_hyp.text
+            assert hyp.timestep == expected_hyp.timestep
+
+    @pytest.mark.unit
+    def test_ctc_offsets_chars(self):
+        vocabulary = [' ', 'a', 'b']
+        token_table = CTCTokenTable(
+            lambda ids: ''.join(vocabulary[i] for i in ids), lambda ids: [vocabulary[i] for i in ids]
+        )
+        token_ids = [np.array([0, 1, 2, 0, 2]), np.array([1, 3, 2]), np.array([], dtype=np.int64)]
+        token_repetitions = [np.array([1, 1, 2, 1, 1]), np.array([1, 1, 1]), np.array([], dtype=np.int64)]
+        offsets = compute_ctc_offsets(token_ids, token_repetitions, [0, 0, 0], token_table, blank_id=3)
+
+        assert not offsets[0].is_subword
+        assert offsets[0].start_offsets.tolist() == [0, 1, 2, 4, 5]
+        assert offsets[0].end_offsets.tolist() == [1, 2, 4, 5, 6]
+        assert offsets[0].word_offsets() == [
+            {"word": "ab", "start_offset": 1, "end_offset": 4},
+            {"word": "b", "start_offset": 5, "end_offset": 6},
+        ]
+        # The blank token is dropped
+        assert offsets[1].char_offsets() == [
+            {"char": "a", "start_offset": 0, "end_offset": 1},
+            {"char": "b", "start_offset": 2, "end_offset": 3},
+        ]
+        assert offsets[1].word_offsets() == [{"word": "ab", "start_offset": 0, "end_offset": 3}]
+        assert offsets[2].char_offsets() == []
+        assert offsets[2].word_offsets() == []
+
+    @pytest.mark.unit
+    def test_ctc_offsets_subwords(self):
+        vocabulary = ['▁he', 'llo', '▁wor', 'ld', '▁a']
+        token_table = CTCTokenTable(
+            lambda ids: ''.join(vocabulary[i] for i in ids).replace('▁', ' ').strip(),
+            lambda ids: [vocabulary[i] for i in ids],
+        )
+        token_ids = [np.array([0, 1, 2, 3]), np.array([4])]
+        token_repetitions = [np.array([2, 1, 3, 1]), np.array([0])]
+        offsets = compute_ctc_offsets(token_ids, token_repetitions, [1, 0], token_table, blank_id=5)
+
+        assert offsets[0].is_subword
+        assert offsets[0].char_offsets() == [
+            {"char": "he", "start_offset": 1, "end_offset": 2},
+            {"char": "llo", "start_offset": 2, "end_offset": 3},
+            {"char": "wor", "start_offset": 3, "end_offset": 6},
+            {"char": "ld", "start_offset": 6, "end_offset": 7},
+        ]
+        # Words end where the next word starts
+        assert offsets[0].word_offsets() == [
+            {"word": "hello", "start_offset": 1, "end_offset": 3},
+            {"word": "world", "start_offset": 3, "end_offset": 7},
+        ]
+        assert offsets[0].word_token_start.tolist() == [0, 2]
+        assert offsets[0].word_token_end.tolist() == [2, 4]
+        assert offsets[1].word_offsets() == [{"word": "a", "start_offset": 0, "end_offset": 0}]
+
+        # The same timestamps through the decoding, as a dictionary view
+        decoding = CTCDecoding(CTCDecodingConfig(compute_timestamps=True), vocabulary=self.vocabulary)
+        hyp = Hypothesis(score=0.0, y_sequence=[], text=([8, 9, 0, 9], [1, 2, 1, 1]), timestep=[1, 3, 4, 5])
+        hyp = decoding.compute_ctc_timestamps(hyp)
+        assert hyp.text == 'hi i'
+        assert isinstance(hyp.timestep, CTCTimestamps)
+        assert isinstance(hyp.timestep, dict)
+        # The offsets are only built when they are first accessed
+        assert dict.__len__(hyp.timestep) == 1
+        assert len(hyp.timestep) == 3
+        assert 'word' in hyp.timestep
+        assert dict.__len__(hyp.timestep) == 1
+        assert dict(hyp.timestep) == {
+            "timestep": [1, 3, 4, 5],
+            "char": [
+                {"char": "h", "start_offset": 0, "end_offset": 1},
+                {"char": "i", "start_offset": 1, "end_offset": 3},
+                {"char": " ", "start_offset": 3, "end_offset": 4},
+                {"char": "i", "start_offset": 4, "end_offset": 5},
+            ],
+            "word": [
+                {"word": "hi", "start_offset": 0, "end_offset": 3},
+                {"word": "i", "start_offset": 4, "end_offset": 5},
+            ],
+        }
+
+        # The timestamps are still a mutable dictionary
+        hyp = decoding.compute_ctc_timestamps(
+            Hypothesis(score=0.0, y_sequence=[], text=([8, 9], [1, 2]), timestep=[1, 3])
+        )
+        hyp.timestep['word'] = []
+        assert hyp.timestep['word'] == []
+        assert hyp.timestep['char'] == [
+            {"char": "h", "start_offset": 0, "end_offset": 1},
+            {"char": "i", "start_offset": 1, "end_offset": 3},
+        ]
+        hyp.timestep.update({'segment': []})
+        assert list(hyp.timestep.keys()) == ['timestep', 'word', 'char', 'segment']
+        assert deepcopy(hyp.timestep) == hyp.timestep
@@ -0,0 +1,131 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import torch
+import torch.nn as nn
+from omegaconf import DictConfig
+
+from nemo.collections.asr.models import EncDecCTCModel
+from nemo.collections.asr.modules import ConformerEncoder, ConvASREncoder
+from nemo.collections.asr.parts.utils.quantization_utils import (
+    PointwiseConv1dAsLinear,
+    fold_batch_norm,
+    quantize_dynamic,
+)
+
+
+def _conv_asr_encoder():
+    jasper = [
+        {
+            'filters': 64,
+            'repeat': 2,
+            'kernel': [5],
+            'stride': [stride],
+            'dilation': [1],
+            'dropout': 0.0,
+            'residual': residual,
+            'separable': True,
+            'se': True,
+            'se_context_size': -1,
+        }
+        for stride, residual in [(2, False), (1, True), (1, True)]
+    ]
+    return ConvASREncoder(jasper=jasper, activation='relu', feat_in=32)
+
+
+def _conformer_encoder():
+    return ConformerEncoder(feat_in=32, n_layers=2, d_model=64, n_heads=4, subsampling_factor=4, conv_kernel_size=9)
+
+
+def _randomize_batch_norms(module):
+    generator = torch.Generator().manual_seed(0)
+    for submodule in module.modules():
+        if isinstance(submodule, nn.BatchNorm1d):
+            num_features = submodule.num_features
+            submodule.running_mean.copy_(torch.randn(num_features, generator=generator) * 0.1)
+            submodule.running_var.copy_(torch.rand(num_features, generator=generator) + 0.5)
+            submodule.weight.data.copy_(torch.rand(num_features, generator=generator) + 0.5)
+            submodule.bias.data.copy_(torch.randn(num_features, generator=generator) * 0.1)
+
+
+class TestQuantizationUtils:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("encoder_fn", [_conv_asr_encoder, _conformer_encoder])
+    def test_fold_and_quantize_encoder(self, encoder_fn):
+        torch.manual_seed(0)
+        encoder = encoder_fn().eval()
+        _randomize_batch_norms(encoder)
+        audio_signal = torch.randn(3, 32, 120)
+        length = torch.tensor([120, 97, 64])
+
+        with torch.no_grad():
+            expected, expected_len = encoder(audio_signal=audio_signal, length=length)
+
+            num_batch_norms = sum(isinstance(m, nn.BatchNorm1d) for m in encoder.modules())
+            assert fold_batch_norm(encoder) == num_batch_norms > 0
+            assert not any(isinstance(m, nn.BatchNorm1d) for m in encoder.modules())
+            folded, folded_len = encoder(audio_signal=audio_signal, length=length)
+            assert torch.equal(folded_len, expected_len)
+            assert torch.allclose(folded, expected, atol=1e-5)
+
+            assert quantize_dynamic(encoder) > 0
+            assert any(isinstance(m, PointwiseConv1dAsLinear) for m in encoder.modules())
+            assert not any(type(m) == nn.Linear for m in encoder.modules())
+            quantized, quantized_len = encoder(audio_signal=audio_signal, length=length)
+            assert torch.equal(quantized_len, expected_len)
+            for b, valid in enumerate(expected_len.tolist()):
+                error = (quantized[b, :, :valid] - expected[b, :, :valid]).norm() / expected[b, :, :valid].norm()
+                assert error < 0.05
+
+    @pytest.mark.unit
+    def test_prepare_for_cpu_inference(self):
+        preprocessor = {'_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor', 'features': 32}
+        decoder = {
+            '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+            'feat_in': 64,
+            'num_classes': 28,
+            'vocabulary': [' '] + [chr(ord('a') + i) for i in range(26)] + ["'"],
+        }
+        model_config = DictConfig(
+            {
+                'preprocessor': DictConfig(preprocessor),
+                'encoder': DictConfig(
+                    {
+                        '_target_': 'nemo.collections.asr.modules.ConformerEncoder',
+                        'feat_in': 32,
+                        'n_layers': 2,
+                        'd_model': 64,
+                        'n_heads': 4,
+                    }
+                ),
+                'decoder': DictConfig(decoder),
+            }
+        )
+        model = EncDecCTCModel(cfg=model_config)
+        model.eval()
+        decoder_module = model.decoder
+        signal = torch.randn(2, 16000, generator=torch.Generator().manual_seed(0))
+        signal_len = torch.tensor([16000, 12000])
+        with torch.no_grad():
+            expected, expected_len, _ = model(input_signal=signal, input_signal_length=signal_len)
+
+        model.prepare_for_cpu_inference()
+        assert model.decoder is decoder_module
+        assert not any(isinstance(m, nn.BatchNorm1d) for m in model.encoder.modules())
+        assert not any(type(m) == nn.Linear for m in model.encoder.modules())
+        with torch.no_grad():
+            log_probs, encoded_len, _ = model(input_signal=signal, input_signal_length=signal_len)
+        assert torch.equal(encoded_len, expected_len)
+        assert torch.allclose(log_probs.exp(), expected.exp(), atol=0.05)
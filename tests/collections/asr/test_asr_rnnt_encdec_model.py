@@ -514,6 +514,148 @@ class TestEncDecRNNTModel:
         with torch.no_grad():
             _ = beam(encoder_output=enc_out, encoded_lengths=enc_len)
 
+    @pytest.mark.skipif(
+        not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
+    )
+    @pytest.mark.unit
+    @pytest.mark.parametrize("decoder_class", [RNNTDecoder, StatelessTransducerDecoder])
+    @pytest.mark.parametrize("max_expansions", [0, 1, 3])
+    @pytest.mark.parametrize("hash_collisions", [False, True])
+    def test_batched_tsd_decoding(self, decoder_class, max_expansions, hash_collisions, monkeypatch):
+        if hash_collisions:
+            # The hashes of all the sequences of the same length with the same last label collide
+            monkeypatch.setattr(beam_decode, '_SEQUENCE_HASH_BASE', 0)
+
+        token_list = [" ", "a", "b", "c", "d"]
+        vocab_size = len(token_list)
+
+        encoder_output_size = 4
+        decoder_output_size = 4
+        joint_output_shape = 4
+
+        prednet_cfg = {'pred_hidden': decoder_output_size, 'pred_rnn_layers': 1}
+        jointnet_cfg = {
+            'encoder_hidden': encoder_output_size,
+            'pred_hidden': decoder_output_size,
+            'joint_hidden': joint_output_shape,
+            'activation': 'relu',
+        }
+
+        decoder = decoder_class(prednet_cfg, vocab_size)
+        joint_net = RNNTJoint(jointnet_cfg, vocab_size, vocabulary=token_list)
+
+        beam = beam_decode.BeamRNNTInfer(
+            decoder,
+            joint_net,
+            beam_size=3,
+            search_type="tsd",
+            tsd_max_sym_exp_per_step=max_expansions,
+            return_best_hypothesis=False,
+        )
+
+        # (B, D, T)
+        torch.manual_seed(0)
+        enc_out = torch.randn(4, encoder_output_size, 20)
+        enc_len = torch.tensor([20, 7, 0, 13], dtype=torch.int32)
+
+        with torch.no_grad():
+            hyps = beam(encoder_output=enc_out, encoded_lengths=enc_len)[0]
+
+            # Every sample decoded on its own
+            for idx in range(enc_out.size(0)):
+                inseq = enc_out[idx : idx + 1, :, : enc_len[idx]].transpose(1, 2)
+                expected = beam_decode.pack_hypotheses(beam.time_sync_decoding(inseq, enc_len[idx]))
+                nbest = hyps[idx].n_best_hypotheses
+                assert len(nbest) == len(expected)
+
+                for hyp, expected_hyp in zip(nbest, expected):
+                    assert torch.equal(hyp.y_sequence, expected_hyp.y_sequence)
+                    assert hyp.timestep == expected_hyp.timestep
+                    assert hyp.score == pytest.approx(float(expected_hyp.score), abs=1e-5)
+
+    @pytest.mark.skipif(
+        not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
+    )
+    @pytest.mark.unit
+    @pytest.mark.parametrize("decoder_class", [RNNTDecoder, StatelessTransducerDecoder])
+    @pytest.mark.parametrize(
+        "beam_config",
+        [
+            {"search_type": "default", "score_norm": False},
+            {"search_type": "maes", "maes_num_steps": 2, "maes_expansion_beta": 1},
+        ],
+    )
+    def test_beam_decoding_prediction_cache(self, decoder_class, beam_config):
+        token_list = [" ", "a", "b", "c"]
+        vocab_size = len(token_list)
+
+        encoder_output_size = 4
+        decoder_output_size = 4
+        joint_output_shape = 4
+
+        prednet_cfg = {'pred_hidden': decoder_output_size, 'pred_rnn_layers': 1}
+        jointnet_cfg = {
+            'encoder_hidden': encoder_output_size,
+            'pred_hidden': decoder_output_size,
+            'joint_hidden': joint_output_shape,
+            'activation': 'relu',
+        }
+
+        decoder = decoder_class(prednet_cfg, vocab_size)
+        joint_net = RNNTJoint(jointnet_cfg, vocab_size, vocabulary=token_list)
+
+        # (B, D, T)
+        torch.manual_seed(0)
+        enc_out = torch.randn(2, encoder_output_size, 30)
+        enc_len = torch.tensor([30, 20], dtype=torch.int32)
+
+        results = {}
+        for cache_size in [None, 2]:
+            beam = beam_decode.BeamRNNTInfer(
+                decoder,
+                joint_net,
+                beam_size=2,
+                **beam_config,
+                return_best_hypothesis=False,
+                prediction_cache_size=cache_size,
+            )
+            with torch.no_grad():
+                results[cache_size] = beam(encoder_output=enc_out, encoded_lengths=enc_len)[0]
+
+            stats = beam.prediction_cache.stats()
+            assert stats['hits'] > 0
+            assert 0.0 < stats['hit_rate'] < 1.0
+            if cache_size is not None:
+                assert stats['size'] <= cache_size
+                assert stats['evictions'] > 0
+
+        # Evicted sequences are recomputed, and do not change the results
+        for nbest, expected_nbest in zip(results[2], results[None]):
+            for hyp, expected_hyp in zip(nbest.n_best_hypotheses, expected_nbest.n_best_hypotheses):
+                assert torch.equal(hyp.y_sequence, expected_hyp.y_sequence)
+                assert hyp.score == pytest.approx(expected_hyp.score, abs=1e-5)
+
+    @pytest.mark.unit
+    def test_prediction_cache(self):
+        cache = rnnt_utils.PredictionCache(max_size=2)
+        cache[(0,)] = 'a'
+        cache[(0, 1)] = 'b'
+        assert (0,) in cache
+        assert cache[(0,)] == 'a'
+
+        # (0, 1) is the least recently used sequence
+        cache[(0, 2)] = 'c'
+        assert (0, 1) not in cache
+        assert len(cache) == 2
+        assert cache.stats() == {'size': 2, 'hits': 1, 'misses': 3, 'evictions': 1, 'hit_rate': 0.25}
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 1
+
+        with pytest.raises(ValueError):
+            rnnt_utils.PredictionCache(max_size=0)
+
     @pytest.mark.skipif(
         not NUMBA_RNNT_LOSS_AVAILABLE, reason='RNNTLoss has not been compiled with appropriate numba version.',
     )
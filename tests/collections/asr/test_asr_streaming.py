@@ -0,0 +1,461 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import math
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+from omegaconf import DictConfig
+
+from nemo.collections.asr.models import EncDecCTCModel
+from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
+from nemo.collections.asr.parts.utils.streaming_utils import (
+    AudioFeatureIterator,
+    BatchedFeatureFrameBufferer,
+    BatchedFrameASRCTC,
+    BatchedFrameASRRNNT,
+    CacheAwareStreamingSessionManager,
+    FeatureFrameBufferer,
+    FrameBatchASR,
+    FramewiseStreamingAudioBuffer,
+    LongestCommonSubsequenceBatchedFrameASRRNNT,
+    batched_lcs_alignment_merge_buffer,
+    batched_longest_common_subsequence_merge,
+    lcs_alignment_merge_buffer,
+    longest_common_subsequence_merge,
+)
+
+
+@pytest.fixture()
+def streaming_model():
+    preprocessor = {
+        '_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
+        'features': 80,
+        'normalize': 'per_feature',
+        'dither': 0.0,
+        'pad_to': 0,
+    }
+    encoder = {
+        '_target_': 'nemo.collections.asr.modules.ConformerEncoder',
+        'feat_in': 80,
+        'feat_out': -1,
+        'n_layers': 2,
+        'd_model': 64,
+        'subsampling': 'striding',
+        'subsampling_factor': 4,
+        'subsampling_conv_channels': 64,
+        'causal_downsampling': True,
+        'n_heads': 4,
+        'att_context_size': [8, 0],
+        'att_context_style': 'regular',
+        'conv_kernel_size': 9,
+        'conv_context_size': 'causal',
+        'dropout': 0.0,
+        'dropout_emb': 0.0,
+        'dropout_att': 0.0,
+    }
+    decoder = {
+        '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+        'feat_in': 64,
+        'num_classes': 28,
+        'vocabulary': [' '] + [chr(ord('a') + i) for i in range(26)] + ["'"],
+    }
+    model_config = DictConfig(
+        {'preprocessor': DictConfig(preprocessor), 'encoder': DictConfig(encoder), 'decoder': DictConfig(decoder)}
+    )
+    model = EncDecCTCModel(cfg=model_config)
+    model.eval()
+    return model
+
+
+@pytest.fixture()
+def buffered_model():
+    preprocessor = {
+        '_target_': 'nemo.collections.asr.modules.AudioToMelSpectrogramPreprocessor',
+        'features': 64,
+        'window_stride': 0.01,
+        'normalize': 'per_feature',
+        'dither': 0.0,
+        'pad_to': 0,
+    }
+    encoder = {
+        '_target_': 'nemo.collections.asr.modules.ConvASREncoder',
+        'feat_in': 64,
+        'activation': 'relu',
+        'conv_mask': True,
+        'jasper': [
+            {
+                'filters': 128,
+                'repeat': 1,
+                'kernel': [11],
+                'stride': [2],
+                'dilation': [1],
+                'dropout': 0.0,
+                'residual': False,
+                'separable': True,
+            }
+        ],
+    }
+    decoder = {
+        '_target_': 'nemo.collections.asr.modules.ConvASRDecoder',
+        'feat_in': 128,
+        'num_classes': 28,
+        'vocabulary': [' '] + [chr(ord('a') + i) for i in range(26)] + ["'"],
+    }
+    model_config = DictConfig(
+        {
+            'sample_rate': 16000,
+            'preprocessor': DictConfig(preprocessor),
+            'encoder': DictConfig(encoder),
+            'decoder': DictConfig(decoder),
+        }
+    )
+    model = EncDecCTCModel(cfg=model_config)
+    model.eval()
+    return model
+
+
+def _stream_chunks(model, num_samples, seed):
+    signal = torch.randn(1, num_samples, generator=torch.Generator().manual_seed(seed))
+    processed_signal, _ = model.preprocessor(input_signal=signal, length=torch.tensor([num_samples]))
+    streaming_buffer = FramewiseStreamingAudioBuffer(model=model)
+    streaming_buffer.append_processed_signal(processed_signal)
+    chunks = [chunk[0] for chunk, _ in streaming_buffer]
+    return chunks
+
+
+class TestCacheAwareStreamingSessionManager:
+    @pytest.mark.unit
+    def test_streams_join_and_leave(self, streaming_model):
+        model = streaming_model
+        streams = [_stream_chunks(model, num_samples, seed) for seed, num_samples in enumerate([16000, 9000, 24000])]
+
+        with torch.no_grad():
+            # Every stream on its own, with the batched API.
+            expected = []
+            for chunks in streams:
+                cache_last_channel, cache_last_time = model.encoder.get_initial_cache_state(batch_size=1)
+                pred_out = None
+                for step, chunk in enumerate(chunks):
+                    pred_out, texts, cache_last_channel, cache_last_time, _ = model.conformer_stream_step(
+                        processed_signal=chunk.unsqueeze(0),
+                        processed_signal_length=torch.tensor([chunk.size(-1)]),
+                        cache_last_channel=cache_last_channel,
+                        cache_last_time=cache_last_time,
+                        keep_all_outputs=step == len(chunks) - 1,
+                        previous_pred_out=pred_out,
+                        drop_extra_pre_encoded=0 if step == 0 else None,
+                    )
+                expected.append((pred_out[0], texts[0]))
+
+            # All streams through the session manager, starting at different steps.
+            manager = CacheAwareStreamingSessionManager(model, max_streams=2)
+            start_steps = [0, 3, 5]
+            positions = {}
+            outputs = {}
+            tick = 0
+            while len(outputs) < len(streams):
+                for idx, start_step in enumerate(start_steps):
+                    if start_step == tick:
+                        if len(manager) == manager.max_streams:
+                            # Wait for a free slot.
+                            start_steps[idx] += 1
+                            continue
+                        positions[manager.add_stream(stream_id=f'stream_{idx}')] = idx, 0
+
+                chunks, last_chunks = {}, []
+                for stream_id, (idx, position) in positions.items():
+                    chunks[stream_id] = streams[idx][position]
+                    if position == len(streams[idx]) - 1:
+                        last_chunks.append(stream_id)
+                    positions[stream_id] = idx, position + 1
+                results = manager.step(chunks, last_chunks=last_chunks)
+                assert set(results) == set(chunks)
+
+                for stream_id in last_chunks:
+                    idx, _ = positions.pop(stream_id)
+                    slot = manager._slots[stream_id]
+                    outputs[idx] = manager.previous_pred_out[slot], manager.remove_stream(stream_id)
+                tick += 1
+
+        assert len(manager) == 0
+        for (pred_out, text), (expected_pred_out, expected_text) in zip(
+            [outputs[idx] for idx in range(len(streams))], expected
+        ):
+            assert torch.equal(pred_out, expected_pred_out)
+            assert text == expected_text
+
+    @pytest.mark.unit
+    def test_slots(self, streaming_model):
+        manager = CacheAwareStreamingSessionManager(streaming_model, max_streams=2)
+        first = manager.add_stream()
+        second = manager.add_stream()
+        assert manager.stream_ids == [first, second]
+        with pytest.raises(ValueError):
+            manager.add_stream(stream_id=first)
+        with pytest.raises(RuntimeError):
+            manager.add_stream()
+        assert manager.remove_stream(first) is None
+        assert manager.add_stream(stream_id='third') == 'third'
+        manager.reset()
+        assert len(manager) == 0
+
+
+class TestBatchedFrameASRCTC:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("merge_algo", ['middle', 'timestamp'])
+    def test_batched_files(self, buffered_model, merge_algo):
+        chunk_len, total_buffer, model_stride_in_secs = 0.4, 1.2, 0.02
+        tokens_per_chunk = math.ceil(chunk_len / model_stride_in_secs)
+        delay = math.ceil((chunk_len + (total_buffer - chunk_len) / 2) / model_stride_in_secs)
+
+        rng = np.random.RandomState(0)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            audio_filepaths = []
+            for i, duration in enumerate([1.0, 3.3, 0.3, 2.1, 5.0]):
+                audio_filepaths.append(os.path.join(tmpdir, f'audio_{i}.wav'))
+                samples = rng.uniform(-0.5, 0.5, size=int(duration * 16000)).astype(np.float32)
+                sf.write(audio_filepaths[-1], samples, 16000, subtype='PCM_16')
+
+            results = {}
+            for batch_size in [1, 3]:
+                frame_asr = BatchedFrameASRCTC(
+                    buffered_model,
+                    frame_len=chunk_len,
+                    total_buffer=total_buffer,
+                    batch_size=batch_size,
+                    merge_algo=merge_algo,
+                )
+                results[batch_size] = frame_asr.transcribe(
+                    audio_filepaths, tokens_per_chunk, delay, model_stride_in_secs, return_hypotheses=True
+                )
+
+            if merge_algo == 'middle':
+                # Every file transcribed on its own with the buffers of a single file batched, the character model
+                # has no tokenizer and decodes the ids with its vocabulary.
+                buffered_model.tokenizer = SimpleNamespace(ids_to_text=buffered_model.decoding.decode_tokens_to_str)
+                frame_asr = FrameBatchASR(buffered_model, frame_len=chunk_len, total_buffer=total_buffer, batch_size=4)
+                expected_texts = []
+                for audio_filepath in audio_filepaths:
+                    frame_asr.reset()
+                    frame_asr.read_audio_file(audio_filepath, delay, model_stride_in_secs)
+                    expected_texts.append(frame_asr.transcribe(tokens_per_chunk, delay))
+                assert any(expected_texts)
+                assert [hyp.text for hyp in results[3]] == expected_texts
+
+        for hyp, expected in zip(results[3], results[1]):
+            assert isinstance(hyp, Hypothesis)
+            assert hyp.text == expected.text
+            assert hyp.timestep == expected.timestep
+            assert len(hyp.timestep) == len(hyp.y_sequence)
+            assert hyp.timestep == sorted(hyp.timestep)
+
+
+class TestAudioFeatureIterator:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("num_samples", [4000, 16000, 16037, 45000])
+    def test_streaming_features(self, buffered_model, num_samples):
+        frame_len = 0.4
+        frame_asr = BatchedFrameASRCTC(buffered_model, frame_len=frame_len, total_buffer=1.2, batch_size=1)
+        raw_preprocessor = frame_asr.raw_preprocessor
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=num_samples).astype(np.float32)
+        frames = list(AudioFeatureIterator(samples, frame_len, raw_preprocessor, buffered_model.device))
+
+        # The frames of the features of the whole signal, with the last frame padded with zeros
+        features, features_len = raw_preprocessor(
+            input_signal=torch.from_numpy(samples).unsqueeze(0), length=torch.tensor([num_samples])
+        )
+        features = features[0, :, : features_len[0]].numpy()
+        num_frames = int(frame_len / 0.01)
+        expected = np.zeros([features.shape[0], num_frames * (features.shape[1] // num_frames + 1)], dtype=np.float32)
+        expected[:, : features.shape[1]] = features
+        assert len(frames) == expected.shape[1] // num_frames
+        for idx, frame in enumerate(frames):
+            assert np.allclose(frame, expected[:, idx * num_frames : (idx + 1) * num_frames], atol=1e-5)
+
+    @pytest.mark.unit
+    def test_running_norm_consts(self, buffered_model):
+        rng = np.random.RandomState(0)
+        frame_bufferer = FeatureFrameBufferer(buffered_model, frame_len=0.4, batch_size=2, total_buffer=1.2)
+        batched_bufferer = BatchedFeatureFrameBufferer(buffered_model, frame_len=0.4, batch_size=2, total_buffer=1.2)
+        for step in range(10):
+            frames = [rng.randn(64, 40).astype(np.float32) * 4 - 10 for _ in range(2)]
+            for frame in frames:
+                [(mean, std)] = frame_bufferer.get_norm_consts_per_frame([frame])
+                assert np.allclose(mean, np.mean(frame_bufferer.feature_buffer, axis=1, keepdims=True), atol=1e-4)
+                assert np.allclose(std, np.std(frame_bufferer.feature_buffer, axis=1, keepdims=True), atol=1e-4)
+
+            if step == 5:
+                # The first sample has finished, its buffer is reset
+                frames[0] = None
+            mean, std = batched_bufferer.get_norm_consts_per_frame(frames)
+            assert np.allclose(mean, np.mean(batched_bufferer.feature_buffer, axis=2, keepdims=True), atol=1e-4)
+            assert np.allclose(std, np.std(batched_bufferer.feature_buffer, axis=2, keepdims=True), atol=1e-4)
+
+
+def _lcs_merge_cases(seed, num_cases):
+    """Pairs of the end of a previous buffer and a current chunk which overlap, with some mismatched tokens."""
+    rng = np.random.RandomState(seed)
+    cases = []
+    for _ in range(num_cases):
+        vocab = rng.randint(3, 30)
+        text = rng.randint(0, vocab, size=rng.randint(5, 60)).tolist()
+        start = rng.randint(0, len(text))
+        overlap = rng.randint(0, len(text) - start + 1)
+        X = text[: start + overlap]
+        Y = text[start:] + rng.randint(0, vocab, size=rng.randint(0, 20)).tolist()
+        Y = [t if rng.rand() > 0.1 else int(rng.randint(0, vocab)) for t in Y]
+        if rng.rand() < 0.2:
+            X = X[: rng.randint(0, len(X) + 1)]
+        cases.append((X, Y))
+    return cases
+
+
+class TestLongestCommonSubsequenceMerge:
+    # Slices of `_lcs_merge_cases(0, 40)` computed by the original nested loop implementation
+    # fmt: off
+    EXPECTED_SLICES = [
+        [23, 0, 3], [8, 0, 12], [11, 0, 0], [37, 0, 0], [22, 2, 5], [18, 6, 20], [20, 2, 6], [6, 0, 2],
+        [35, 0, 0], [8, 19, 1], [16, 9, 1], [26, 0, 3], [23, 0, 13], [0, 11, 1], [0, 0, 3], [24, 0, 0],
+        [7, 0, 3], [16, 0, 7], [1, 46, 1], [55, 3, 1], [1, 0, 11], [27, 0, 2], [6, 51, 4], [5, 0, 6],
+        [22, 0, 23], [17, 3, 10], [0, 6, 2], [21, 10, 2], [9, 0, 7], [3, 0, 6], [25, 0, 3], [3, 0, 14],
+        [6, 0, 0], [0, 15, 7], [9, 0, 5], [18, 0, 1], [13, 0, 0], [0, 6, 8], [0, 10, 4], [0, 0, 5],
+    ]
+    # fmt: on
+
+    @pytest.mark.unit
+    def test_merge_slices(self):
+        cases = _lcs_merge_cases(0, 40)
+        for (X, Y), expected in zip(cases, self.EXPECTED_SLICES):
+            slice_idx, alignment = longest_common_subsequence_merge(X, Y)
+            assert slice_idx == expected
+            assert alignment.shape == (len(X) + 1, len(Y) + 1)
+
+            # Longest common suffix table
+            for i in range(1, len(X) + 1):
+                for j in range(1, len(Y) + 1):
+                    expected_length = alignment[i - 1, j - 1] + 1 if X[i - 1] == Y[j - 1] else 0
+                    assert alignment[i, j] == expected_length
+
+    @pytest.mark.unit
+    def test_batched_merge(self):
+        cases = _lcs_merge_cases(1, 50) + [([], [1, 2]), ([1, 2], []), ([], [])]
+        batched = batched_longest_common_subsequence_merge([X for X, _ in cases], [Y for _, Y in cases])
+        for (X, Y), (slice_idx, alignment) in zip(cases, batched):
+            expected_slice_idx, expected_alignment = longest_common_subsequence_merge(X, Y)
+            assert slice_idx == expected_slice_idx
+            assert np.array_equal(alignment, expected_alignment)
+
+        buffers = [list(X) for X, _ in cases]
+        merged = batched_lcs_alignment_merge_buffer(
+            buffers, [Y for _, Y in cases], delay=4, model=None, max_steps_per_timestep=5
+        )
+        for (X, Y), buffer in zip(cases, merged):
+            assert buffer == lcs_alignment_merge_buffer(list(X), Y, delay=4, model=None, max_steps_per_timestep=5)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("delay", [0, 4, 40])
+    def test_batched_merge_buffer_streams(self, delay):
+        # Overlapping chunks of several streams, merged at every step like in buffered RNNT inference
+        rng = np.random.RandomState(2)
+        num_streams, num_steps, chunk_tokens = 6, 8, 12
+        streams = [rng.randint(0, 20, size=(num_steps + 2) * chunk_tokens).tolist() for _ in range(num_streams)]
+        search_size = delay * 5
+
+        buffers = [[] for _ in range(num_streams)]
+        expected_buffers = [[] for _ in range(num_streams)]
+        for step in range(num_steps):
+            end = (step + 1) * chunk_tokens
+            datas = []
+            for stream in streams:
+                data = stream[max(0, end - 2 * chunk_tokens) : end + rng.randint(0, chunk_tokens)]
+                datas.append([t if rng.rand() > 0.1 else int(rng.randint(0, 20)) for t in data])
+
+            buffers = batched_lcs_alignment_merge_buffer(buffers, datas, delay=delay, model=None)
+
+            # Every stream merged on its own, with the slices of the per-stream LCS merge
+            for buffer, data in zip(expected_buffers, datas):
+                if delay >= 1 and len(buffer) > 0:
+                    (_, j, slice_len), _ = longest_common_subsequence_merge(buffer[-search_size:], data)
+                    data = data[j + slice_len :]
+                buffer += data
+
+            assert buffers == expected_buffers
+
+
+class _StubTokenizer:
+    def ids_to_tokens(self, ids):
+        return [str(token_id) for token_id in ids]
+
+    def ids_to_text(self, ids):
+        return ' '.join(str(token_id) for token_id in ids)
+
+
+class TestBatchedFrameASRRNNT:
+    TOKENS_PER_CHUNK = 4
+    DELAY = 6
+
+    @staticmethod
+    def _buffered_model(cls, num_chunks, seed=0):
+        """Buffered RNNT inference with the alignments of a stub model, which emits token 0 as blank."""
+        rng = np.random.RandomState(seed)
+        buffered = cls.__new__(cls)
+        buffered.asr_model = SimpleNamespace(tokenizer=_StubTokenizer())
+        buffered.batch_size = len(num_chunks)
+        buffered.blank_id = 0
+        buffered.max_steps_per_timestep = 5
+        buffered.all_alignments = [
+            [[[(0.0, int(token))] for token in rng.randint(0, 4, size=12)] for _ in range(chunks)]
+            for chunks in num_chunks
+        ]
+        buffered.frame_bufferer = SimpleNamespace(signal_end_index=list(num_chunks))
+        buffered.infer_logits = lambda: None
+        if isinstance(buffered, LongestCommonSubsequenceBatchedFrameASRRNNT):
+            buffered.sample_offset = 0
+            buffered.alignment_basepath = None
+            buffered.lcs_delay = 4
+        return buffered
+
+    @staticmethod
+    def _ids(alignment):
+        return [int(token) for step in alignment for _, token in step if token != 0]
+
+    @pytest.mark.unit
+    def test_middle_token_merge(self):
+        buffered = self._buffered_model(BatchedFrameASRRNNT, num_chunks=[3, 1, 4])
+        transcripts = buffered.transcribe(self.TOKENS_PER_CHUNK, self.DELAY)
+
+        start = 12 - 1 - self.DELAY
+        for alignments, transcript in zip(buffered.all_alignments, transcripts):
+            ids = []
+            for alignment in alignments:
+                ids += self._ids(alignment[start : start + self.TOKENS_PER_CHUNK])
+            assert transcript == ' '.join(str(token_id) for token_id in ids)
+
+    @pytest.mark.unit
+    def test_lcs_merge(self):
+        buffered = self._buffered_model(LongestCommonSubsequenceBatchedFrameASRRNNT, num_chunks=[3, 1, 4])
+        transcripts = buffered.transcribe(self.TOKENS_PER_CHUNK, self.DELAY)
+
+        # Streams merged one at a time
+        for alignments, transcript in zip(buffered.all_alignments, transcripts):
+            ids = self._ids(alignments[0][12 - 1 - self.DELAY :])
+            for alignment in alignments[1:]:
+                if len(self._ids(alignment)) > 0:
+                    ids = lcs_alignment_merge_buffer(ids, self._ids(alignment), delay=4, model=None)
+            assert transcript == ' '.join(str(token_id) for token_id in ids)
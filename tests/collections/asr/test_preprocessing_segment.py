@@ -0,0 +1,260 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import pickle
+import random
+import tempfile
+
+import librosa
+import numpy as np
+import pytest
+import scipy.signal
+import soundfile as sf
+
+from nemo.collections.asr.parts.preprocessing.convolution import FFTConvolver, fft_convolve
+from nemo.collections.asr.parts.preprocessing.perturb import (
+    AudioPool,
+    ImpulsePerturbation,
+    NoisePerturbation,
+    RirAndNoisePerturbation,
+    SpeedPerturbation,
+)
+from nemo.collections.asr.parts.preprocessing.resample import get_resample_filter, resample
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment, _read_wav_window
+
+
+class TestAudioSegment:
+    sample_rate = 16000
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("subtype", ['PCM_16', 'PCM_32', 'FLOAT'])
+    def test_wav_window_fast_path(self, subtype):
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=10 * self.sample_rate).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            audio_file = os.path.join(tmpdir, 'audio.wav')
+            sf.write(audio_file, samples, self.sample_rate, subtype=subtype)
+            assert _read_wav_window(audio_file) is not None
+
+            for offset, duration in [(0, 0), (1.5, 2.25), (9.5, 3.0)]:
+                segment = AudioSegment.from_file(audio_file, offset=offset, duration=duration)
+
+                with sf.SoundFile(audio_file, 'r') as f:
+                    f.seek(int(offset * self.sample_rate))
+                    expected = f.read(int(duration * self.sample_rate) if duration > 0 else -1, dtype='float32')
+
+                assert segment.samples.dtype == np.float32
+                assert segment.sample_rate == self.sample_rate
+                assert np.allclose(segment.samples, expected, atol=1e-7)
+
+                with open(audio_file, 'rb') as f:
+                    in_memory = AudioSegment.from_file(io.BytesIO(f.read()), offset=offset, duration=duration)
+                assert in_memory == segment
+
+    @pytest.mark.unit
+    def test_wav_window_fallback(self):
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=(self.sample_rate, 2)).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stereo_file = os.path.join(tmpdir, 'stereo.wav')
+            sf.write(stereo_file, samples, self.sample_rate)
+            assert _read_wav_window(stereo_file) is None
+
+            flac_file = os.path.join(tmpdir, 'audio.flac')
+            sf.write(flac_file, samples[:, 0], self.sample_rate)
+            assert _read_wav_window(flac_file) is None
+            segment = AudioSegment.from_file(flac_file, offset=0.25, duration=0.5)
+            assert segment.num_samples == self.sample_rate // 2
+
+
+class TestResample:
+    target_sr = 16000
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("orig_sr", [8000, 22050, 44100])
+    @pytest.mark.parametrize("quality", ['fast', 'medium', 'best'])
+    def test_resample_sine(self, orig_sr, quality):
+        t = np.arange(2 * orig_sr) / orig_sr
+        samples = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+        resampled = resample(samples, orig_sr, self.target_sr, quality=quality)
+        num_samples = int(np.ceil(len(samples) * self.target_sr / orig_sr))
+        expected = 0.5 * np.sin(2 * np.pi * 440 * np.arange(num_samples) / self.target_sr)
+
+        assert resampled.dtype == np.float32
+        assert resampled.shape == (num_samples,)
+        # Ignore the edges, which are affected by the zero padding of the filter.
+        assert np.abs(resampled[1000:-1000] - expected[1000:-1000]).max() < 1e-3
+
+    @pytest.mark.unit
+    def test_resample_filter_cache(self):
+        up, down, taps = get_resample_filter(44100, self.target_sr, 'medium')
+        assert (up, down) == (160, 441)
+        assert get_resample_filter(44100, self.target_sr, 'medium')[2] is taps
+
+        with pytest.raises(ValueError):
+            resample(np.zeros(100, dtype=np.float32), 44100, self.target_sr, quality='ultra')
+
+    @pytest.mark.unit
+    def test_audio_segment_resample(self):
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=22050).astype(np.float32)
+        # librosa is the default resampler, the polyphase filter is opt-in
+        segment = AudioSegment(samples, 22050, target_sr=self.target_sr)
+        assert segment.sample_rate == self.target_sr
+        assert np.allclose(segment.samples, librosa.core.resample(samples, orig_sr=22050, target_sr=self.target_sr))
+
+        segment = AudioSegment(samples, 22050, target_sr=self.target_sr, resample_quality='medium')
+        assert segment.sample_rate == self.target_sr
+        assert segment.num_samples == self.target_sr
+        assert np.allclose(segment.samples, resample(samples, 22050, self.target_sr))
+
+    @pytest.mark.unit
+    def test_speed_perturbation(self):
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=self.target_sr).astype(np.float32)
+        perturbation = SpeedPerturbation(
+            sr=self.target_sr, resample_type='polyphase', min_speed_rate=0.95, max_speed_rate=0.95, num_rates=1
+        )
+        segment = AudioSegment(samples, self.target_sr)
+        perturbation.perturb(segment)
+        assert segment.num_samples == 15200
+
+    @pytest.mark.unit
+    def test_perturbation_audio_resample(self):
+        samples = np.random.RandomState(0).uniform(-0.5, 0.5, size=8000).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            audio_file = os.path.join(tmpdir, 'noise.wav')
+            sf.write(audio_file, samples, 8000, subtype='FLOAT')
+            manifest_path = os.path.join(tmpdir, 'noise.json')
+            with open(manifest_path, 'w') as f:
+                f.write(json.dumps({'audio_filepath': audio_file, 'duration': 1.0}) + '\n')
+
+            # Noise and RIRs are resampled like the data, by librosa unless a polyphase quality is set
+            noise = NoisePerturbation(manifest_path=manifest_path).get_one_noise_sample(self.target_sr)
+            assert np.allclose(noise.samples, librosa.core.resample(samples, orig_sr=8000, target_sr=self.target_sr))
+
+            expected = resample(samples, 8000, self.target_sr, quality='fast')
+            noise = NoisePerturbation(manifest_path=manifest_path, resample_quality='fast')
+            assert np.allclose(noise.get_one_noise_sample(self.target_sr).samples, expected)
+            impulse = ImpulsePerturbation(manifest_path=manifest_path, resample_quality='fast')
+            assert np.allclose(impulse._read_one_impulse(self.target_sr).samples, expected)
+
+            perturbation = RirAndNoisePerturbation(
+                rir_manifest_path=manifest_path,
+                noise_manifest_paths=[manifest_path],
+                min_snr_db=[10],
+                max_snr_db=[10],
+                noise_tar_filepaths=[None],
+                bg_noise_manifest_paths=[manifest_path],
+                bg_min_snr_db=[10],
+                bg_max_snr_db=[10],
+                bg_noise_tar_filepaths=[None],
+                resample_quality='fast',
+            )
+            assert np.allclose(perturbation._rir_perturber._read_one_impulse(self.target_sr).samples, expected)
+            for perturber in [perturbation._fg_noise_perturbers[16000], perturbation._bg_noise_perturbers[16000]]:
+                assert np.allclose(perturber.get_one_noise_sample(self.target_sr).samples, expected)
+
+
+class TestAudioPool:
+    sample_rate = 16000
+
+    @pytest.mark.unit
+    def test_noise_pool(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, 'noise.json')
+            with open(manifest_path, 'w') as f:
+                for i in range(4):
+                    audio_file = os.path.join(tmpdir, f'noise_{i}.wav')
+                    sf.write(audio_file, np.full(self.sample_rate * (i + 1), 0.1 * (i + 1), dtype=np.float32), 8000)
+                    f.write(json.dumps({'audio_filepath': audio_file, 'duration': 2.0 * (i + 1)}) + '\n')
+
+            perturbation = NoisePerturbation(
+                manifest_path=manifest_path,
+                min_snr_db=10,
+                max_snr_db=10,
+                pool_size=3,
+                pool_refresh_every=5,
+                pool_sample_rate=self.sample_rate,
+                rng=random.Random(0),
+            )
+            pool = perturbation._pool
+            assert len(pool) == 3
+            assert pool.sample_rate == self.sample_rate
+
+            # Noise files are not read anymore once the pool is built.
+            for i in range(4):
+                os.remove(os.path.join(tmpdir, f'noise_{i}.wav'))
+
+            for _ in range(4):
+                noise = pool.sample(self.sample_rate, num_samples=1000)
+                assert noise.num_samples == 1000
+                assert noise.sample_rate == self.sample_rate
+                noise.gain_db(10.0)
+
+            data = AudioSegment(np.zeros(self.sample_rate, dtype=np.float32) + 0.5, self.sample_rate)
+            perturbation.perturb(data)
+            assert not np.allclose(data.samples, 0.5)
+
+            # The pool is rebuilt after `pool_refresh_every` draws, which requires the files.
+            with pytest.raises(Exception):
+                pool.sample(self.sample_rate)
+
+    @pytest.mark.unit
+    def test_audio_pool_pickle(self):
+        rng = np.random.RandomState(0)
+        pool = AudioPool(
+            lambda sr: AudioSegment(rng.uniform(-0.5, 0.5, size=100).astype(np.float32), sr),
+            pool_size=2,
+            sample_rate=self.sample_rate,
+        )
+        samples = pool._samples.copy()
+        pool._load_fn = None
+        restored = pickle.loads(pickle.dumps(pool))
+        assert np.array_equal(restored._samples, samples)
+        assert restored.sample(self.sample_rate).num_samples == 100
+
+
+class TestFFTConvolver:
+    @pytest.mark.unit
+    @pytest.mark.parametrize("mode", ['full', 'same'])
+    @pytest.mark.parametrize("signal_len, impulse_len", [(10, 1000), (1000, 10), (5, 5), (80000, 8000)])
+    def test_convolve(self, mode, signal_len, impulse_len):
+        rng = np.random.RandomState(0)
+        x = rng.uniform(-0.5, 0.5, size=signal_len).astype(np.float32)
+        h = rng.uniform(-0.5, 0.5, size=impulse_len).astype(np.float32)
+
+        expected = scipy.signal.fftconvolve(x.astype(np.float64), h.astype(np.float64), mode)
+        y = fft_convolve(x, h, mode=mode)
+        assert y.dtype == np.float32
+        assert y.shape == expected.shape
+        assert np.allclose(y, expected, atol=1e-4)
+
+    @pytest.mark.unit
+    def test_convolve_batch(self):
+        rng = np.random.RandomState(0)
+        signals = [rng.uniform(-0.5, 0.5, size=rng.randint(100, 20000)).astype(np.float32) for _ in range(4)]
+        impulses = [rng.uniform(-0.5, 0.5, size=rng.randint(10, 4000)).astype(np.float32) for _ in range(4)]
+
+        convolver = FFTConvolver(cache_size=2)
+        outputs = convolver.convolve(signals, impulses, mode='same')
+        for x, h, y in zip(signals, impulses, outputs):
+            assert np.allclose(y, scipy.signal.fftconvolve(x, h, 'same'), atol=1e-4)
+        assert len(convolver._spectra) == 2
+
+        outputs = convolver.convolve(signals, impulses[0])
+        for x, y in zip(signals, outputs):
+            assert np.allclose(y, scipy.signal.fftconvolve(x, impulses[0]), atol=1e-4)
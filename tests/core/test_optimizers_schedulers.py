@@ -289,6 +289,26 @@ class TestOptimizersSchedulers:
         scheduler_setup = optim.lr_scheduler.prepare_lr_scheduler(opt, dict_config)
         assert isinstance(scheduler_setup['scheduler'], optim.lr_scheduler.CosineAnnealing)
 
+    @pytest.mark.unit
+    def test_sched_config_max_steps_from_batch_sampler(self):
+        model = TempModel()
+        opt_cls = optim.get_optimizer('novograd')
+        opt = opt_cls(model.parameters(), lr=self.INITIAL_LR)
+
+        # A batch sampler with variable batch sizes which already shards the data across 2 devices
+        batch_sampler = [[0, 1, 2, 3], [4, 5], [6], [7, 8, 9]]
+        dataloader = torch.utils.data.DataLoader(torch.randn(20, 5), batch_sampler=batch_sampler)
+
+        sched_config = {
+            'name': 'CosineAnnealing',
+            't_max_epochs': 3,
+            't_accumulate_grad_batches': 2,
+            't_limit_train_batches': 1.0,
+            't_num_workers': 2,
+        }
+        scheduler_setup = optim.lr_scheduler.prepare_lr_scheduler(opt, sched_config, train_dataloader=dataloader)
+        assert scheduler_setup['scheduler'].max_steps == 2 * 3
+
     @pytest.mark.unit
     def test_sched_config_parse_from_cls(self):
         model = TempModel()
@@ -14,6 +14,7 @@
 import filecmp
 import os
 import shutil
+import tarfile
 import tempfile
 from typing import Dict, Optional, Set, Union
 
@@ -607,6 +608,64 @@ class TestSaveRestore:
         for orig, restored in zip(original_state_dict.keys(), restored_state_dict.keys()):
             assert (original_state_dict[orig] - restored_state_dict[restored]).abs().mean() < 1e-6
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize("compressed", [False, True])
+    def test_restore_from_save_restore_connector_lazy_restore(self, compressed):
+        def make_nemo_file(folder, path):
+            if compressed:
+                # Older .nemo files are compressed tar files
+                with tarfile.open(path, 'w:gz') as tar:
+                    tar.add(folder, arcname='.')
+            else:
+                save_restore_connector.SaveRestoreConnector._make_nemo_file_from_folder(path, folder)
+
+        connector = save_restore_connector.SaveRestoreConnector()
+        connector.lazy_restore = True
+        with tempfile.NamedTemporaryFile('w') as temp_file, tempfile.TemporaryDirectory() as tmpdir:
+            temp_file.writelines(["*****\n"])
+            temp_file.flush()
+
+            cfg = _mock_model_config()
+            cfg.model.temp_file = temp_file.name
+            model = MockModel(cfg=cfg.model, trainer=None).to('cpu')
+            save_path = os.path.join(tmpdir, 'lazy.nemo')
+            model.save_to(save_path)
+            extracted_dir = os.path.join(tmpdir, 'extracted')
+            connector._unpack_nemo_file(save_path, extracted_dir)
+            make_nemo_file(extracted_dir, save_path)
+
+            conf = MockModel.restore_from(save_path, return_config=True, save_restore_connector=connector)
+            assert conf.temp_file.startswith('nemo:')
+            restored_model = MockModel.restore_from(save_path, map_location='cpu', save_restore_connector=connector)
+            assert restored_model.temp_data == ["*****\n"]
+            assert torch.equal(restored_model.w.weight, model.w.weight)
+            assert torch.equal(restored_model.w.bias, model.w.bias)
+
+            # Tensors sharing a storage, and tensors of other types
+            weight = torch.randn(4, 6)
+            state_dict = {
+                'weight': weight,
+                'view': weight[1:, ::2],
+                'steps': torch.arange(3),
+                'half': torch.randn(5).to(torch.bfloat16),
+                'empty': torch.zeros(0),
+            }
+            weights_dir = os.path.join(tmpdir, 'weights')
+            os.makedirs(weights_dir)
+            connector._save_state_dict_to_disk(state_dict, os.path.join(weights_dir, connector.model_weights_ckpt))
+            weights_path = os.path.join(tmpdir, 'weights.nemo')
+            make_nemo_file(weights_dir, weights_path)
+            with connector._open_nemo_file(weights_path) as tar:
+                member = connector._get_nemo_file_member(tar, connector.model_weights_ckpt)
+                restored_state_dict = connector._load_state_dict_from_nemo_file(weights_path, tar, member, tmpdir)
+
+        for key, value in state_dict.items():
+            assert restored_state_dict[key].dtype == value.dtype
+            assert torch.equal(restored_state_dict[key], value)
+        view = restored_state_dict['view']
+        assert view.stride() == (6, 2)
+        assert view.data_ptr() == restored_state_dict['weight'][1].data_ptr()
+
     @pytest.mark.unit
     def test_hf_model_filter(self):
         filt = ModelPT.get_hf_model_filter()
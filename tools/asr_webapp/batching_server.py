@@ -0,0 +1,349 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Asynchronous ASR inference server with dynamic batching.
+
+Requests are queued and grouped into batches, which are transcribed with a single forward pass of the model.
+A batch is closed as soon as one of the following holds:
+
+* it holds ``max_batch_size`` requests,
+* adding the next request would exceed ``max_batch_audio_seconds`` of audio,
+* its oldest request has waited ``max_latency_ms``.
+
+Batches are transcribed one at a time on an inference thread, calling the forward pass and the decoding of the
+model directly on tensors. Requests that arrive while a batch is transcribed queue up and form the next batch, so
+batches grow with the load.
+
+The server is a minimal HTTP/1.1 stand-in on top of asyncio, without dependencies beyond NeMo:
+
+* ``POST /transcribe`` with an audio file (any format readable by soundfile) as body returns ``{"text": ...}``,
+* ``GET /metrics`` returns the queue depth and batching statistics.
+
+Usage:
+
+    python batching_server.py --model stt_en_conformer_ctc_small --port 8001 \\
+        --max_batch_size 32 --max_latency_ms 20 --max_batch_audio_seconds 300
+
+    curl -X POST --data-binary @audio.wav http://127.0.0.1:8001/transcribe
+    curl http://127.0.0.1:8001/metrics
+"""
+
+import argparse
+import asyncio
+import collections
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from nemo.collections.asr.parts.preprocessing.segment import AudioSegment
+from nemo.utils import logging
+
+
+@dataclass
+class _Request:
+    samples: np.ndarray
+    future: asyncio.Future
+    enqueue_time: float = field(default_factory=time.monotonic)
+
+
+class DynamicBatcher:
+    """
+    Queues transcription requests and transcribes them in dynamic batches on a single inference thread.
+
+    Args:
+        model: ASR model which implements `_transcribe_batch` (CTC and RNNT models). It is switched to evaluation
+            mode, without dither and padding of the features.
+        max_batch_size: Maximum number of requests per batch.
+        max_latency_ms: Maximum time the oldest request of a batch waits for the batch to fill up.
+        max_batch_audio_seconds: Maximum total audio duration of a batch. A single longer request forms its own batch.
+        max_queue_size: Maximum number of queued requests, further requests wait for a free slot. 0 is unbounded.
+        device: Device of the model, defaults to the device of its parameters.
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        max_batch_size: int = 32,
+        max_latency_ms: float = 20.0,
+        max_batch_audio_seconds: float = 300.0,
+        max_queue_size: int = 0,
+        device: Optional[torch.device] = None,
+    ):
+        self.model = model
+        self.sample_rate = model.preprocessor._sample_rate
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_batch_samples = int(max_batch_audio_seconds * self.sample_rate)
+        self.max_queue_size = max_queue_size
+        self.device = device or next(model.parameters()).device
+
+        model.eval()
+        model.preprocessor.featurizer.dither = 0.0
+        model.preprocessor.featurizer.pad_to = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Optional[_Request] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        # The model runs on a single thread, audio is decoded on the default executor of the loop.
+        self._inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='asr-inference')
+
+        self._num_requests = 0
+        self._num_batches = 0
+        self._num_errors = 0
+        self._batch_sizes: Deque[int] = collections.deque(maxlen=1000)
+        self._batch_seconds: Deque[float] = collections.deque(maxlen=1000)
+        self._queue_latencies: Deque[float] = collections.deque(maxlen=1000)
+
+    async def start(self):
+        """Starts the batching loop on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batch_task = asyncio.ensure_future(self._batch_loop())
+
+    async def stop(self):
+        """Stops the batching loop. Queued requests are cancelled."""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+        if self._pending is not None:
+            self._pending.future.cancel()
+            self._pending = None
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+        self._inference_executor.shutdown(wait=True)
+
+    async def transcribe(self, samples: np.ndarray) -> Any:
+        """Transcribes mono float32 samples at the sample rate of the model."""
+        if self._queue is None:
+            raise RuntimeError("The batcher has not been started, please call `start()`")
+        request = _Request(
+            samples=np.asarray(samples, dtype=np.float32), future=asyncio.get_event_loop().create_future()
+        )
+        await self._queue.put(request)
+        return await request.future
+
+    async def transcribe_bytes(self, data: bytes) -> Any:
+        """Decodes an audio file in memory, resamples it to the sample rate of the model and transcribes it."""
+        loop = asyncio.get_event_loop()
+        samples = await loop.run_in_executor(None, self._decode, data)
+        return await self.transcribe(samples)
+
+    def _decode(self, data: bytes) -> np.ndarray:
+        return AudioSegment.from_file(io.BytesIO(data), target_sr=self.sample_rate).samples
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns the queue depth and statistics over the last 1000 batches."""
+        batch_sizes = np.asarray(self._batch_sizes, dtype=np.float64)
+        queue_latencies = np.asarray(self._queue_latencies, dtype=np.float64)
+        return {
+            'queue_depth': self._queue.qsize() + int(self._pending is not None) if self._queue is not None else 0,
+            'num_requests': self._num_requests,
+            'num_batches': self._num_batches,
+            'num_errors': self._num_errors,
+            'mean_batch_size': float(batch_sizes.mean()) if len(batch_sizes) else 0.0,
+            'max_batch_size': int(batch_sizes.max()) if len(batch_sizes) else 0,
+            'batch_size_histogram': {
+                int(size): int(count) for size, count in zip(*np.unique(batch_sizes, return_counts=True))
+            },
+            'mean_batch_audio_seconds': float(np.mean(self._batch_seconds)) if self._batch_seconds else 0.0,
+            'mean_queue_latency_ms': float(queue_latencies.mean() * 1000) if len(queue_latencies) else 0.0,
+            'p99_queue_latency_ms': float(np.percentile(queue_latencies, 99) * 1000) if len(queue_latencies) else 0.0,
+        }
+
+    async def _next_request(self, timeout: Optional[float]) -> Optional[_Request]:
+        if self._pending is not None:
+            request, self._pending = self._pending, None
+            return request
+        if timeout is None:
+            return await self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait() if not self._queue.empty() else None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _form_batch(self) -> List[_Request]:
+        """Waits for a request, then adds requests until the size, audio or latency limit is reached."""
+        first = await self._next_request(timeout=None)
+        batch, num_samples = [first], len(first.samples)
+        deadline = first.enqueue_time + self.max_latency
+        while len(batch) < self.max_batch_size:
+            request = await self._next_request(timeout=deadline - time.monotonic())
+            if request is None:
+                break
+            if request.future.cancelled():
+                continue
+            if num_samples + len(request.samples) > self.max_batch_samples:
+                # Keep the request for the next batch.
+                self._pending = request
+                break
+            batch.append(request)
+            num_samples += len(request.samples)
+        return batch
+
+    async def _batch_loop(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            # Batches are formed once the model is free, requests queue up while a batch is transcribed.
+            batch = [request for request in await self._form_batch() if not request.future.cancelled()]
+            if not batch:
+                continue
+            now = time.monotonic()
+            self._queue_latencies.extend(now - request.enqueue_time for request in batch)
+            try:
+                results = await loop.run_in_executor(
+                    self._inference_executor, self._infer, [request.samples for request in batch]
+                )
+            except asyncio.CancelledError:
+                for request in batch:
+                    request.future.cancel()
+                raise
+            except Exception as e:
+                logging.error(f"Transcription of a batch of {len(batch)} requests failed: {e}")
+                self._num_errors += len(batch)
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            self._num_requests += len(batch)
+            self._num_batches += 1
+            self._batch_sizes.append(len(batch))
+            self._batch_seconds.append(sum(len(request.samples) for request in batch) / self.sample_rate)
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+
+    def _infer(self, batch: List[np.ndarray]) -> List[Any]:
+        lengths = [len(samples) for samples in batch]
+        signal = torch.zeros(len(batch), max(lengths), dtype=torch.float32)
+        for i, samples in enumerate(batch):
+            signal[i, : len(samples)] = torch.from_numpy(samples)
+        with torch.no_grad():
+            return self.model._transcribe_batch(
+                input_signal=signal.to(self.device),
+                input_signal_length=torch.tensor(lengths, dtype=torch.long, device=self.device),
+                return_hypotheses=False,
+            )
+
+
+class BatchingHTTPServer:
+    """
+    Minimal HTTP/1.1 server in front of a `DynamicBatcher`, which serves ``POST /transcribe`` and ``GET /metrics``.
+    Connections are closed after every response.
+    """
+
+    def __init__(self, batcher: DynamicBatcher, host: str = '127.0.0.1', port: int = 8001):
+        self.batcher = batcher
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        await self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Serving on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+            if len(request_line) < 2:
+                status, body = 400, {'error': 'malformed request'}
+            elif request_line[0] == 'GET' and request_line[1] == '/metrics':
+                status, body = 200, self.batcher.metrics()
+            elif request_line[0] == 'POST' and request_line[1] == '/transcribe':
+                data = await reader.readexactly(int(headers.get('content-length', 0)))
+                try:
+                    status, body = 200, {'text': await self.batcher.transcribe_bytes(data)}
+                except Exception as e:
+                    status, body = 500, {'error': str(e)}
+            else:
+                status, body = 404, {'error': 'not found'}
+
+            payload = json.dumps(body).encode()
+            reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asynchronous ASR inference server with dynamic batching")
+    parser.add_argument('--model', required=True, help="Name of a pretrained model or of a .nemo file in models/")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--max_batch_size', type=int, default=32)
+    parser.add_argument('--max_latency_ms', type=float, default=20.0)
+    parser.add_argument('--max_batch_audio_seconds', type=float, default=300.0)
+    parser.add_argument('--max_queue_size', type=int, default=0)
+    parser.add_argument('--cpu', action='store_true', help="Run the model on CPU even if a GPU is available")
+    args = parser.parse_args()
+
+    import model_api
+
+    model = model_api.initialize_model(args.model)
+    if torch.cuda.is_available() and not args.cpu:
+        model = model.cuda()
+
+    batcher = DynamicBatcher(
+        model,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        max_batch_audio_seconds=args.max_batch_audio_seconds,
+        max_queue_size=args.max_queue_size,
+    )
+    server = BatchingHTTPServer(batcher, host=args.host, port=args.port)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+
+if __name__ == '__main__':
+    main()